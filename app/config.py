@@ -32,6 +32,19 @@ ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "admin123")
 # ไดเรกทอรีข้อมูล/เอาต์พุต (ใช้ของโปรเจกต์เดิม)
 DATA_DIR = os.getenv("DATA_DIR", "./data")
 OUTPUT_DIR = os.getenv("OUTPUT_DIR", "./output")
+# รากโปรเจกต์สำหรับ path ไฟล์สื่อแบบ relative (output/<run_id>/artifacts, data/voiceovers)
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", ".")
+
+# คิวงานและเมตริก (ใช้กับ /metrics ให้ตรงกับ scripts/scheduler_runner.py)
+QUEUE_DIR = os.getenv("QUEUE_DIR", "./data/queue")
+QUEUE_BACKEND = os.getenv("QUEUE_BACKEND", "file")
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(OUTPUT_DIR, "metrics"))
+# ดัชนีรอบ pipeline ที่ orchestrator เขียน (ใช้กับหน้า /runs และแดชบอร์ด)
+RUN_INDEX_DIR = os.getenv("RUN_INDEX_DIR", os.path.join(OUTPUT_DIR, "index"))
+# เพดานงาน running รวมของคิว (งานตามตาราง + งานที่สั่งจากเว็บ)
+QUEUE_MAX_RUNNING = int(os.getenv("QUEUE_MAX_RUNNING", "2"))
+# จำนวนรอบที่จบแล้วที่เว็บเก็บไว้แสดงประวัติ
+RUN_HISTORY_LIMIT = int(os.getenv("RUN_HISTORY_LIMIT", "50"))
 
 # ตั้งค่า LLM/API (ไม่บังคับในเว็บนี้)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
@@ -1,31 +1,249 @@
+"""
+ตัวจัดการงานของเว็บ: รันได้หลายรอบพร้อมกันต่อเอเจนต์ แต่ละรอบมี run_id ของตัวเอง
+
+รอบที่สั่งจากเว็บถูกบันทึกลงคิวเดียวกับ scripts/scheduler_runner.py ในสถานะ
+running (enqueue_running) ตอนเริ่มรัน จึงนับรวมในเพดาน QUEUE_MAX_RUNNING
+เดียวกับงานตามตาราง ถ้าคิวเต็ม รอบใหม่จะรออยู่ใน pending ของเว็บ (FIFO)
+จนกว่าจะมีที่ว่าง
+
+pipeline_path ของงานจากเว็บเป็น ``web:<agent_key>`` ซึ่งไม่ใช่ไฟล์ ถ้าเว็บตาย
+ระหว่างรันแล้ว lease หมดอายุ requeue_expired ย้ายงานไป dead ทันทีโดยไม่ retry
+และ worker ไม่รันงานแบบนี้ (fail ด้วย ``job_not_replayable`` ถ้าหยิบได้)
+"""
+
+from __future__ import annotations
+
 import asyncio
+import secrets
+from collections import deque
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+from app import config
+from app.core.runner import PROCESS_JOB_TYPE, RUNNER, Runner
+from automation_core.queue import (
+    EXTERNAL_PIPELINE_PREFIX,
+    JobError,
+    JobQueue,
+    JobSpec,
+    QueueItem,
+    open_queue,
+)
+
+WEB_PIPELINE_PREFIX = EXTERNAL_PIPELINE_PREFIX
+# เว็บปลุกตัวเองเป็นระยะ เพราะความจุอาจว่างจาก worker process อื่น
+DISPATCH_POLL_SECONDS = 5.0
+ACTIVE_STATUSES = ("queued", "starting", "running", "paused", "stopping")
+
+
+def _utc_iso(value: datetime) -> str:
+    return value.astimezone(UTC).isoformat().replace("+00:00", "Z")
 
-from app.core.runner import PROCESS_JOB_TYPE, RUNNER
+
+def _default_queue() -> JobQueue:
+    return open_queue(config.QUEUE_DIR, config.QUEUE_BACKEND)
 
 
 class JobManager:
-    def __init__(self):
-        self.runner = RUNNER
+    def __init__(
+        self,
+        runner: Runner = RUNNER,
+        queue_factory: Callable[[], JobQueue] = _default_queue,
+        max_running: int | None = None,
+        history_limit: int | None = None,
+    ):
+        self.runner = runner
+        self.max_running = max(max_running or config.QUEUE_MAX_RUNNING, 1)
+        self.history_limit = history_limit or config.RUN_HISTORY_LIMIT
+        self._queue_factory = queue_factory
+        self._queue: JobQueue | None = None
+        # เรียงตามลำดับที่สั่ง (dict คงลำดับ insertion)
+        self.runs: dict[str, PROCESS_JOB_TYPE] = {}
+        self._pending: deque[str] = deque()
+        self._active: dict[str, QueueItem] = {}
+        self._dispatcher: asyncio.Task | None = None
+        # เก็บ reference ของ task ที่กำลังรัน กัน task ถูก garbage collect กลางทาง
+        self._tasks: set[asyncio.Task] = set()
+        self._wake: asyncio.Event | None = None
 
-    def get(self, agent_key: str) -> PROCESS_JOB_TYPE:
-        return self.runner.get(agent_key)
+    @property
+    def queue(self) -> JobQueue:
+        if self._queue is None:
+            self._queue = self._queue_factory()
+        return self._queue
 
-    async def start(self, agent_key: str) -> PROCESS_JOB_TYPE:
-        job = self.get(agent_key)
-        asyncio.create_task(job.start())
+    # ----- การค้นหารอบ -----
+
+    def runs_for(self, agent_key: str) -> list[PROCESS_JOB_TYPE]:
+        """รอบของเอเจนต์นี้ ใหม่สุดก่อน"""
+
+        return [
+            job for job in reversed(self.runs.values()) if job.agent_key == agent_key
+        ]
+
+    def get_run(self, run_id: str) -> PROCESS_JOB_TYPE | None:
+        return self.runs.get(run_id)
+
+    def get(self, agent_key: str, run_id: str | None = None) -> PROCESS_JOB_TYPE:
+        """รอบที่ระบุ หรือรอบล่าสุดของเอเจนต์ (ยังไม่เคยรันได้งาน idle ไว้แสดงผล)"""
+
+        if run_id is not None:
+            job = self.runs.get(run_id)
+            if job is not None and job.agent_key == agent_key:
+                return job
+        runs = self.runs_for(agent_key)
+        return runs[0] if runs else self.runner.get(agent_key)
+
+    def capacity(self) -> dict[str, int]:
+        return {
+            "max_running": self.max_running,
+            "web_running": len(self._active),
+            "web_pending": sum(
+                1
+                for run_id in self._pending
+                if (job := self.runs.get(run_id)) is not None and job.status == "queued"
+            ),
+        }
+
+    # ----- การสั่งงาน -----
+
+    def submit(self, agent_key: str) -> PROCESS_JOB_TYPE:
+        """สร้างรอบใหม่แล้วรอคิว จะเริ่มรันเมื่อคิวรวมมีที่ว่าง"""
+
+        stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ")
+        run_id = f"{agent_key}_{stamp}_{secrets.token_hex(3)}"
+        job = self.runner.new_job(agent_key, run_id)
+        job.status = "queued"
+        job.log.append(f"รอคิว run_id={run_id}")
+        self.runs[run_id] = job
+        self._pending.append(run_id)
+        self._trim_history()
+        self._notify()
         return job
 
-    def pause(self, agent_key: str):
-        self.get(agent_key).pause()
+    async def start(self, agent_key: str) -> PROCESS_JOB_TYPE:
+        return self.submit(agent_key)
+
+    def _resolve(self, agent_key: str, run_id: str | None) -> PROCESS_JOB_TYPE:
+        return self.get(agent_key, run_id)
+
+    def pause(self, agent_key: str, run_id: str | None = None):
+        self._resolve(agent_key, run_id).pause()
+
+    def resume(self, agent_key: str, run_id: str | None = None):
+        self._resolve(agent_key, run_id).resume()
+
+    def stop(self, agent_key: str, run_id: str | None = None):
+        job = self._resolve(agent_key, run_id)
+        if job.status == "queued":
+            # ยังไม่ได้เริ่ม ดึงออกจากคิวของเว็บเฉยๆ
+            job.status = "stopped"
+            job.log.append("ยกเลิกก่อนเริ่มรัน")
+            return
+        job.stop()
+
+    def reset(self, agent_key: str, run_id: str | None = None):
+        job = self._resolve(agent_key, run_id)
+        if job.status not in ACTIVE_STATUSES:
+            job.reset()
+
+    # ----- dispatcher -----
+
+    def _notify(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wake = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch_loop())
+        elif self._wake is not None:
+            self._wake.set()
+
+    def _trim_history(self) -> None:
+        finished = [
+            run_id
+            for run_id, job in self.runs.items()
+            if job.status not in ACTIVE_STATUSES
+        ]
+        for run_id in finished[: max(0, len(self.runs) - self.history_limit)]:
+            del self.runs[run_id]
+
+    def _job_spec(self, job: PROCESS_JOB_TYPE) -> JobSpec:
+        now = _utc_iso(datetime.now(UTC))
+        return JobSpec(
+            job_id=f"web_{job.run_id}",
+            created_at=now,
+            scheduled_for=now,
+            pipeline_path=f"{WEB_PIPELINE_PREFIX}{job.agent_key}",
+            run_id=str(job.run_id),
+            params=None,
+            status="running",
+        )
+
+    def _queue_full(self) -> bool:
+        return self.queue.count_by_state().get("running", 0) >= self.max_running
+
+    async def _fill(self) -> None:
+        while self._pending:
+            job = self.runs.get(self._pending[0])
+            if job is None or job.status != "queued":
+                self._pending.popleft()
+                continue
+            # แตะดิสก์/ฐานข้อมูลของคิวใน thread เพื่อไม่บล็อก event loop
+            if await asyncio.to_thread(self._queue_full):
+                return
+            self._pending.popleft()
+            item = await asyncio.to_thread(
+                self.queue.enqueue_running, self._job_spec(job)
+            )
+            if item is None:
+                job.status = "error"
+                job.log.append(f"ลงคิวไม่สำเร็จ: มี run_id={job.run_id} อยู่แล้ว")
+                continue
+            self._active[str(job.run_id)] = item
+            task = asyncio.create_task(self._execute(job, item))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
 
-    def resume(self, agent_key: str):
-        self.get(agent_key).resume()
+    async def _execute(self, job: PROCESS_JOB_TYPE, item: QueueItem) -> None:
+        try:
+            # ถูกยกเลิกระหว่างจองที่ในคิว ก็ปิดงานในคิวโดยไม่เริ่ม process
+            if job.status == "queued":
+                await job.start()
+        finally:
+            self._active.pop(str(job.run_id), None)
+            try:
+                if job.status == "completed":
+                    await asyncio.to_thread(self.queue.mark_done, item)
+                else:
+                    error = JobError(code=f"web_{job.status}", message=job.agent_key)
+                    await asyncio.to_thread(self.queue.mark_failed, item, error)
+            except FileNotFoundError:
+                # lease หมดอายุและ worker อื่นย้ายงานไปแล้ว
+                pass
+            self._trim_history()
+            self._notify()
 
-    def stop(self, agent_key: str):
-        self.get(agent_key).stop()
+    async def _heartbeat(self) -> None:
+        for run_id, item in list(self._active.items()):
+            alive = await asyncio.to_thread(self.queue.heartbeat, item)
+            job = self.runs.get(run_id)
+            if not alive and job is not None:
+                job.log.append("lease ในคิวหมดอายุ งานนี้ไม่ถูกนับในความจุอีกต่อไป")
+                self._active.pop(run_id, None)
 
-    def reset(self, agent_key: str):
-        self.get(agent_key).reset()
+    async def _dispatch_loop(self) -> None:
+        wake = self._wake
+        assert wake is not None
+        while self._pending or self._active:
+            await self._fill()
+            try:
+                await asyncio.wait_for(wake.wait(), DISPATCH_POLL_SECONDS)
+            except TimeoutError:
+                pass
+            wake.clear()
+            await self._heartbeat()
 
 
 JOB_MANAGER = JobManager()
@@ -0,0 +1,84 @@
+"""
+บัฟเฟอร์ log แบบวงแหวน (ring buffer) สำหรับงานที่รันจากเว็บ
+
+แต่ละบรรทัดได้หมายเลขลำดับ (seq) เพิ่มขึ้นเรื่อย ๆ ไม่ซ้ำ ผู้ชมหลายคนจึงอ่าน
+เฉพาะบรรทัดใหม่หลัง seq ล่าสุดของตัวเองได้ และใช้เป็น SSE ``id:`` สำหรับ
+``Last-Event-ID`` ตอนเชื่อมต่อใหม่ บรรทัดเก่าที่เกินความจุถูกทิ้ง (ไฟล์ log ยังครบ)
+
+การแจ้งเตือนใช้ asyncio.Event ที่เปลี่ยนตัวใหม่ทุกครั้งที่ notify (broadcast)
+ผู้รอทุกคนตื่นพร้อมกันโดยไม่ต้อง poll และ append() เรียกจากโค้ด sync ได้
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Iterator
+from itertools import islice
+
+DEFAULT_MAX_LINES = 2000
+
+
+class LogBuffer:
+    """log ที่จำกัดจำนวนบรรทัด พร้อมหมายเลขลำดับและการแจ้งเตือนแบบ broadcast"""
+
+    def __init__(self, max_lines: int = DEFAULT_MAX_LINES) -> None:
+        self._lines: deque[tuple[int, str]] = deque(maxlen=max(1, max_lines))
+        self._last_seq = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def last_seq(self) -> int:
+        return self._last_seq
+
+    @property
+    def first_seq(self) -> int:
+        """seq ของบรรทัดเก่าสุดที่ยังเก็บอยู่ (last_seq + 1 ถ้าว่าง)"""
+
+        return self._lines[0][0] if self._lines else self._last_seq + 1
+
+    def append(self, text: str) -> int:
+        self._last_seq += 1
+        self._lines.append((self._last_seq, text))
+        self.notify()
+        return self._last_seq
+
+    def notify(self) -> None:
+        """ปลุกผู้รอทั้งหมด (ใช้ทั้งตอนมีบรรทัดใหม่และตอนสถานะงานเปลี่ยน)"""
+
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def changed(self) -> asyncio.Event:
+        """
+        Event ที่จะถูก set ในการเปลี่ยนแปลงครั้งถัดไป
+
+        ให้เรียกก่อนอ่านสถานะ แล้วค่อย ``await event.wait()`` เพื่อไม่ให้พลาด
+        การเปลี่ยนแปลงที่เกิดระหว่างอ่าน
+        """
+
+        return self._changed
+
+    def since(self, seq: int) -> tuple[list[tuple[int, str]], int]:
+        """
+        คืนบรรทัดที่ seq มากกว่าค่าที่ให้ และจำนวนบรรทัดที่หลุดไปแล้ว
+
+        Returns:
+            (รายการ (seq, text), จำนวนบรรทัดที่ถูกทิ้งจากบัฟเฟอร์ก่อนผู้อ่านจะได้เห็น)
+        """
+
+        if seq >= self._last_seq:
+            return [], 0
+        first = self.first_seq
+        skipped = max(0, first - seq - 1)
+        # seq ต่อเนื่องกัน จึงหยิบจากท้ายเท่าจำนวนบรรทัดใหม่ได้เลย (O(บรรทัดใหม่))
+        count = min(len(self._lines), self._last_seq - seq)
+        lines = list(islice(reversed(self._lines), count))
+        lines.reverse()
+        return lines, skipped
+
+    def __iter__(self) -> Iterator[str]:
+        return (text for _, text in self._lines)
+
+    def __len__(self) -> int:
+        return len(self._lines)
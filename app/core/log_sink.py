@@ -0,0 +1,192 @@
+"""
+ตัวเขียนไฟล์ log แบบ buffer + async สำหรับงานที่รันจากเว็บ
+
+write() แค่ต่อบรรทัดเข้า buffer ในหน่วยความจำ การเขียนดิสก์ทำเป็นชุดใน thread
+(asyncio.to_thread) เมื่อ buffer ถึงขนาดที่กำหนดหรือครบรอบเวลา event loop
+จึงไม่ต้องรอ open/write/close ทีละบรรทัดอีก ไฟล์ที่โตเกิน max_bytes จะถูกหมุน
+(<name>.log -> <name>.log.1 -> ...) และเก็บไว้ไม่เกิน backups ไฟล์
+
+แต่ละรอบเขียนไฟล์ใหม่ในโฟลเดอร์เดียวกัน การเขียนครั้งแรกของ sink จึงลบ log ของรอบเก่า
+ในโฟลเดอร์นั้นตาม keep_files (จำนวนรอบล่าสุดที่เก็บ) และ keep_days (อายุ) ด้วย
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUPS = 3
+DEFAULT_FLUSH_BYTES = 64 * 1024
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_KEEP_FILES = 100
+DEFAULT_KEEP_DAYS = 30.0
+
+
+def prune_run_logs(
+    directory: Path | str,
+    *,
+    keep_files: int,
+    keep_days: float,
+    exclude: str | None = None,
+    now: float | None = None,
+) -> int:
+    """
+    ลบ log ของรอบเก่าใน ``directory`` คืนจำนวนไฟล์ที่ลบ
+
+    ไฟล์ ``<run>.log`` กับไฟล์ที่หมุนแล้ว ``<run>.log.N`` นับเป็นรอบเดียว เก็บรอบล่าสุด
+    ``keep_files`` รอบ และลบรอบที่ไม่ได้เขียนมานานกว่า ``keep_days`` วัน (0 = ไม่จำกัด)
+    ``exclude`` คือชื่อไฟล์ log ของรอบที่กำลังเขียน ซึ่งไม่ถูกลบและไม่นับรวม
+    """
+
+    runs: dict[str, list[tuple[Path, float]]] = {}
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return 0
+    for entry in entries:
+        name, sep, _ = entry.name.partition(".log")
+        if not sep or f"{name}.log" == exclude:
+            continue
+        try:
+            if not entry.is_file():
+                continue
+            mtime = entry.stat().st_mtime
+        except OSError:
+            continue
+        runs.setdefault(name, []).append((Path(entry.path), mtime))
+
+    newest_first = sorted(
+        runs.values(), key=lambda files: max(m for _, m in files), reverse=True
+    )
+    cutoff = (now if now is not None else time.time()) - keep_days * 86400
+    removed = 0
+    for position, files in enumerate(newest_first):
+        expired = keep_days > 0 and max(m for _, m in files) < cutoff
+        if not expired and (keep_files <= 0 or position < keep_files):
+            continue
+        for path, _ in files:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+class AsyncLogSink:
+    """buffer log ของ 1 ไฟล์ แล้วเขียนลงดิสก์เป็นชุดนอก event loop"""
+
+    def __init__(
+        self,
+        path: Path | str,
+        *,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backups: int = DEFAULT_BACKUPS,
+        flush_bytes: int = DEFAULT_FLUSH_BYTES,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        keep_files: int = 0,
+        keep_days: float = 0.0,
+    ) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.keep_files = keep_files
+        self.keep_days = keep_days
+        self._pruned = not (keep_files > 0 or keep_days > 0)
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self._pending: list[str] = []
+        self._pending_bytes = 0
+        self._task: asyncio.Task | None = None
+        self._wake: asyncio.Event | None = None
+        # กันไม่ให้ thread ที่กำลังเขียนชนกับการ flush แบบ sync
+        self._io_lock = threading.Lock()
+
+    def write(self, text: str) -> None:
+        """ต่อบรรทัดเข้า buffer (ไม่แตะดิสก์เมื่อมี event loop ทำงานอยู่)"""
+
+        line = text + "\n"
+        self._pending.append(line)
+        self._pending_bytes += len(line)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # ถูกเรียกนอก event loop (เช่นสคริปต์/เทสต์): เขียนตรงได้ ไม่มีอะไรให้บล็อก
+            self._write_batch(self._take())
+            return
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = loop.create_task(self._flush_loop())
+        if self._pending_bytes >= self.flush_bytes and self._wake is not None:
+            self._wake.set()
+
+    async def flush(self) -> None:
+        """เขียนทุกบรรทัดที่ค้างอยู่ให้เสร็จ (เรียกตอนจบงาน)"""
+
+        if self._wake is not None:
+            self._wake.set()
+        if self._task is not None and not self._task.done():
+            await self._task
+        batch = self._take()
+        if batch:
+            await asyncio.to_thread(self._write_batch, batch)
+
+    def _take(self) -> list[str]:
+        batch, self._pending = self._pending, []
+        self._pending_bytes = 0
+        return batch
+
+    async def _flush_loop(self) -> None:
+        wake = self._wake
+        assert wake is not None
+        while self._pending:
+            try:
+                await asyncio.wait_for(wake.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+            wake.clear()
+            batch = self._take()
+            if batch:
+                await asyncio.to_thread(self._write_batch, batch)
+
+    def _rotate(self) -> None:
+        for index in range(self.backups - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{index}")
+            if source.exists():
+                os.replace(source, self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink(missing_ok=True)
+
+    def _write_batch(self, batch: list[str]) -> None:
+        if not batch:
+            return
+        data = "".join(batch)
+        with self._io_lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                if not self._pruned:
+                    # ครั้งเดียวต่อ sink และอยู่ใน thread เดียวกับการเขียน
+                    self._pruned = True
+                    prune_run_logs(
+                        self.path.parent,
+                        keep_files=self.keep_files,
+                        keep_days=self.keep_days,
+                        exclude=self.path.name,
+                    )
+                try:
+                    size = self.path.stat().st_size
+                except FileNotFoundError:
+                    size = 0
+                if size and size + len(data.encode("utf-8")) > self.max_bytes:
+                    self._rotate()
+                with open(self.path, "a", encoding="utf-8") as handle:
+                    handle.write(data)
+            except OSError:
+                # log เป็น best-effort เหมือนเดิม เขียนไม่ได้ก็ไม่ทำให้งานล้ม
+                pass
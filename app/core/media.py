@@ -0,0 +1,71 @@
+"""
+การเลือกไฟล์สื่อ (วิดีโอ/เสียง) ที่เว็บเปิดให้ดูตัวอย่างได้
+
+path ที่รับจากผู้ใช้ต้องเป็น path แบบ relative จากรากโปรเจกต์ ตามกติกาเดียวกับ
+agent_video_render ใน orchestrator.py (ห้าม absolute, ห้าม ``..``, ต้องอยู่ใต้ราก)
+และจำกัดเพิ่มเฉพาะโฟลเดอร์ผลลัพธ์ของรอบกับนามสกุลสื่อที่รู้จัก เพื่อไม่ให้
+endpoint กลายเป็นช่องอ่านไฟล์ใดๆ ในเครื่อง
+"""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path, PurePosixPath
+
+# ข้อมูลต่อรอบ: output/<run_id>/artifacts/... และ data/voiceovers/<run_id>/...
+ALLOWED_MEDIA_PATTERNS = (
+    re.compile(r"^output/[A-Za-z0-9_.-]+/artifacts/"),
+    re.compile(r"^data/voiceovers/[A-Za-z0-9_.-]+/"),
+    # peaks/sprite ของหน้ารีวิว (ชื่อไฟล์เป็น hash ของไฟล์ต้นทาง)
+    re.compile(r"^output/media_cache/[0-9a-f]+\.(peaks\.json|sprite\.(jpg|json))$"),
+)
+MEDIA_TYPES = {
+    ".mp4": "video/mp4",
+    ".webm": "video/webm",
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+    ".m4a": "audio/mp4",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".json": "application/json",
+}
+
+
+class MediaPathError(ValueError):
+    """path ไม่ผ่านกติกา allowlist"""
+
+
+def resolve_media_path(value: str, root_dir: Path) -> tuple[Path, str]:
+    """
+    ตรวจ path แบบ relative แล้วคืน (path จริง, media type)
+
+    Raises:
+        MediaPathError: path/นามสกุลไม่อยู่ใน allowlist หรือหลุดออกนอกราก
+        FileNotFoundError: ผ่านกติกาแต่ไม่มีไฟล์
+    """
+
+    if not value or not value.strip():
+        raise MediaPathError("path must be a non-empty string")
+    candidate = PurePosixPath(value.replace("\\", "/"))
+    if candidate.is_absolute() or Path(value).is_absolute():
+        raise MediaPathError("path must be a relative path")
+    if ".." in candidate.parts:
+        raise MediaPathError("path must not contain path traversal")
+    relative = candidate.as_posix()
+    if not any(pattern.match(relative) for pattern in ALLOWED_MEDIA_PATTERNS):
+        raise MediaPathError(
+            "path must be under output/<run_id>/artifacts or data/voiceovers/<run_id>"
+        )
+    media_type = MEDIA_TYPES.get(candidate.suffix.lower())
+    if media_type is None:
+        raise MediaPathError(f"unsupported media type: {candidate.suffix}")
+    root = root_dir.resolve()
+    resolved = (root / relative).resolve()
+    # symlink ที่ชี้ออกนอกรากถือว่าไม่ผ่าน
+    try:
+        resolved.relative_to(root)
+    except ValueError as exc:
+        raise MediaPathError("path must be within repository root") from exc
+    if not resolved.is_file():
+        raise FileNotFoundError(relative)
+    return resolved, media_type
@@ -4,11 +4,22 @@ import asyncio
 import os
 import signal
 import sys
+from datetime import UTC, datetime
 from pathlib import Path
 from typing import TypeAlias
 
 import yaml
 
+from app.core.log_buffer import DEFAULT_MAX_LINES, LogBuffer
+from app.core.log_sink import (
+    DEFAULT_BACKUPS,
+    DEFAULT_KEEP_DAYS,
+    DEFAULT_KEEP_FILES,
+    DEFAULT_MAX_BYTES,
+    AsyncLogSink,
+)
+from automation_core.progress import PROGRESS_FD_ENV, parse_progress_line
+
 try:
     import psutil  # สำหรับ Windows pause/resume
 except Exception:  # pragma: no cover
@@ -16,6 +27,14 @@ except Exception:  # pragma: no cover
 
 LOG_DIR = Path("output") / "logs"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
+# จำนวนบรรทัด log ที่เก็บในหน่วยความจำต่องาน (ไฟล์ log ใน LOG_DIR ยังเก็บครบ)
+LOG_BUFFER_LINES = int(os.getenv("LOG_BUFFER_LINES", str(DEFAULT_MAX_LINES)))
+# ไฟล์ log ต่อรอบ: output/logs/<agent>/<run_id>.log หมุนไฟล์เมื่อเกินขนาด
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(DEFAULT_MAX_BYTES)))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", str(DEFAULT_BACKUPS)))
+# log ของรอบเก่าต่อ agent: เก็บกี่รอบล่าสุด และนานกี่วัน (0 = ไม่จำกัด)
+LOG_KEEP_FILES = int(os.getenv("LOG_KEEP_FILES", str(DEFAULT_KEEP_FILES)))
+LOG_KEEP_DAYS = float(os.getenv("LOG_KEEP_DAYS", str(DEFAULT_KEEP_DAYS)))
 
 
 def _resolve_python(cmd: list[str]) -> list[str]:
@@ -53,25 +72,68 @@ def _parse_pipeline_enabled(env_value: str | None) -> bool:
 
 
 class ProcessJob:
-    def __init__(self, agent_key: str, cmd: list[str]):
+    def __init__(self, agent_key: str, cmd: list[str], run_id: str | None = None):
         self.agent_key = agent_key
         self.cmd = _resolve_python(cmd)
-        self.status = (
-            "idle"  # idle|starting|running|paused|stopping|stopped|completed|error
-        )
-        self.progress = 0
-        self.log: list[str] = []
+        self.log = LogBuffer(LOG_BUFFER_LINES)
+        # idle|starting|running|paused|stopping|stopped|completed|error
+        self._status = "idle"
+        self._progress = 0
         self.proc: asyncio.subprocess.Process | None = None
         self._stdout_task: asyncio.Task | None = None
         self._stderr_task: asyncio.Task | None = None
-        self._log_file_path = LOG_DIR / f"{agent_key}.log"
+        self._progress_task: asyncio.Task | None = None
+        # ข้อมูลจากช่องทางความคืบหน้า (PROGRESS_FD) ของรอบปัจจุบัน
+        self.stage = ""
+        self.steps: dict[str, dict] = {}
+        self.artifacts: list[str] = []
+        self.summary_path: str | None = None
+        self.log_dir = LOG_DIR / agent_key
+        self.run_id = run_id
+        self._log_sink: AsyncLogSink | None = None
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @status.setter
+    def status(self, value: str) -> None:
+        if value != self._status:
+            self._status = value
+            self.log.notify()
+
+    @property
+    def progress(self) -> int:
+        return self._progress
+
+    @progress.setter
+    def progress(self, value: int) -> None:
+        if value != self._progress:
+            self._progress = value
+            self.log.notify()
+
+    @property
+    def log_file_path(self) -> Path | None:
+        return self._log_sink.path if self._log_sink else None
+
+    def _open_run_log(self) -> AsyncLogSink:
+        """เริ่มไฟล์ log ใหม่สำหรับรอบนี้ (ไม่มี run_id ก็ตั้งจากเวลาเริ่มแบบ UTC)"""
+
+        if self.run_id is None or self._log_sink is not None:
+            self.run_id = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%fZ")
+        self._log_sink = AsyncLogSink(
+            self.log_dir / f"{self.run_id}.log",
+            max_bytes=LOG_MAX_BYTES,
+            backups=LOG_BACKUPS,
+            keep_files=LOG_KEEP_FILES,
+            keep_days=LOG_KEEP_DAYS,
+        )
+        return self._log_sink
 
     def _append_file_log(self, text: str):
-        try:
-            with open(self._log_file_path, "a", encoding="utf-8") as f:
-                f.write(text + "\n")
-        except Exception:
-            pass
+        # เข้า buffer เท่านั้น การเขียนดิสก์ทำเป็นชุดนอก event loop
+        sink = self._log_sink or self._open_run_log()
+        sink.write(text)
 
     async def _read_stream(self, stream: asyncio.StreamReader, prefix: str):
         while True:
@@ -89,54 +151,59 @@ class ProcessJob:
                 break
             self.log.append(f"{prefix}: {text}")
             self._append_file_log(f"{prefix}: {text}")
-            # heuristic progress e.g., "progress=42%"
-            if "progress=" in text:
-                try:
-                    pct_str = text.split("progress=")[-1].strip().rstrip("%")
-                    pct = int(pct_str)
-                    self.progress = max(0, min(100, pct))
-                except Exception:
-                    pass
-            else:
-                # additional heuristics for known messages to reflect coarse progress
-                lower = text.lower()
-                # Trend Scout Agent typical stages
-                if "กำลังโหลดข้อมูล" in text or "loading" in lower:
-                    self.progress = max(self.progress, 20)
-                if "กำลังวิเคราะห์" in text or "analyzing" in lower:
-                    self.progress = max(self.progress, 60)
-                if "กำลังบันทึกผลลัพธ์" in text or "saving" in lower:
-                    self.progress = max(self.progress, 90)
-
-                # If CLI prints the saved output path, try to append file content to logs
-                if prefix == "STDOUT" and (
-                    "บันทึกผลลัพธ์แล้ว:" in text or "saved result:" in lower
-                ):
-                    try:
-                        # Extract path after ':' and normalize
-                        path_part = text.split(":", 1)[-1].strip().strip("'\"")
-                        out_path = Path(path_part)
-                        if not out_path.is_absolute():
-                            out_path = (Path.cwd() / out_path).resolve()
-                        if (
-                            out_path.suffix.lower() == ".json"
-                            and out_path.exists()
-                            and out_path.is_file()
-                        ):
-                            # Limit size to avoid huge logs
-                            if out_path.stat().st_size <= 1024 * 512:  # 512KB
-                                content = out_path.read_text(
-                                    encoding="utf-8", errors="ignore"
-                                )
-                                banner = f"RESULT_JSON ({out_path}):"
-                                self.log.append(banner)
-                                self._append_file_log(banner)
-                                for ln in content.splitlines():
-                                    self.log.append(ln)
-                                    self._append_file_log(ln)
-                    except Exception:
-                        # ignore errors while trying to include file content
-                        pass
+
+    def _emit(self, text: str) -> None:
+        self.log.append(text)
+        self._append_file_log(text)
+
+    def _apply_progress(self, event: dict) -> None:
+        """อัปเดตสถานะจาก event ของ automation_core.progress"""
+
+        kind = event["event"]
+        if "percent" in event:
+            self.progress = int(event["percent"])
+        if kind == "step_started":
+            self.stage = f"{event['index']}/{event['total']} {event['step_id']}"
+            self.log.notify()
+            self._emit(f"STEP [{self.stage}] เริ่ม")
+        elif kind == "step_finished":
+            artifacts = list(event.get("artifacts") or [])
+            self.steps[event["step_id"]] = {
+                "index": event["index"],
+                "status": event["status"],
+                "duration_seconds": event["duration_seconds"],
+                "artifacts": artifacts,
+            }
+            self._emit(
+                f"STEP [{event['index']}/{event['total']} {event['step_id']}] "
+                f"{event['status']} ({event['duration_seconds']:.1f}s)"
+            )
+            for path in artifacts:
+                self.artifacts.append(path)
+                self._emit(f"ARTIFACT: {path}")
+        elif kind == "progress":
+            if event.get("stage"):
+                self.stage = event["stage"]
+                self.log.notify()
+        elif kind == "artifact":
+            self.artifacts.append(event["path"])
+            self._emit(f"ARTIFACT: {event['path']}")
+        elif kind == "run_finished":
+            self.summary_path = event.get("summary_path")
+
+    async def _read_progress(self, fd: int) -> None:
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, "rb", 0)
+        )
+        try:
+            while line := await reader.readline():
+                event = parse_progress_line(line)
+                if event is not None:
+                    self._apply_progress(event)
+        finally:
+            transport.close()
 
     async def start(self):
         if self.status in ("running", "starting", "paused"):
@@ -153,6 +220,11 @@ class ProcessJob:
             return
 
         self.status = "starting"
+        self.stage = ""
+        self.steps = {}
+        self.artifacts = []
+        self.summary_path = None
+        self._open_run_log()
         msg = f"เริ่มรันคำสั่ง: {' '.join(self.cmd)}"
         self.log.append(msg)
         self._append_file_log(msg)
@@ -162,12 +234,32 @@ class ProcessJob:
                 import subprocess as sp
 
                 creationflags = getattr(sp, "CREATE_NEW_PROCESS_GROUP", 0)
-            self.proc = await asyncio.create_subprocess_exec(
-                *self.cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                creationflags=creationflags,
-            )
+            # ช่องทางความคืบหน้าแบบ JSON Lines ผ่าน pipe ที่ส่งให้ลูก (POSIX เท่านั้น)
+            progress_fds = None if os.name == "nt" else os.pipe()
+            extra: dict = {}
+            if progress_fds is not None:
+                extra["env"] = {**os.environ, PROGRESS_FD_ENV: str(progress_fds[1])}
+                extra["pass_fds"] = (progress_fds[1],)
+            try:
+                self.proc = await asyncio.create_subprocess_exec(
+                    *self.cmd,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    creationflags=creationflags,
+                    **extra,
+                )
+            except BaseException:
+                if progress_fds is not None:
+                    os.close(progress_fds[0])
+                raise
+            finally:
+                # ปลายเขียนเป็นของลูกแล้ว ปิดฝั่งเราเพื่อให้อ่านเจอ EOF เมื่อลูกจบ
+                if progress_fds is not None:
+                    os.close(progress_fds[1])
+            if progress_fds is not None:
+                self._progress_task = asyncio.create_task(
+                    self._read_progress(progress_fds[0])
+                )
             self.status = "running"
             if self.proc.stdout:
                 self._stdout_task = asyncio.create_task(
@@ -182,6 +274,8 @@ class ProcessJob:
                 await self._stdout_task
             if self._stderr_task:
                 await self._stderr_task
+            if self._progress_task:
+                await self._progress_task
             if rc == 0 and self.status not in ("stopped", "stopping"):
                 self.status = "completed"
                 self.progress = 100
@@ -202,6 +296,9 @@ class ProcessJob:
             msg = f"ข้อผิดพลาด: {e!r}"
             self.log.append(msg)
             self._append_file_log(msg)
+        finally:
+            if self._log_sink is not None:
+                await self._log_sink.flush()
 
     def _psutil_proc(self):
         if psutil and self.proc and self.proc.pid:
@@ -299,6 +396,11 @@ class Runner:
         ]
         return _resolve_python(cmd)
 
+    def new_job(self, agent_key: str, run_id: str) -> ProcessJob:
+        """สร้างงานใหม่ 1 รอบ (ไม่เก็บใน self.jobs ผู้เรียกดูแลประวัติเอง)"""
+
+        return ProcessJob(agent_key, self._get_cmd(agent_key), run_id=run_id)
+
     def get(self, agent_key: str) -> ProcessJob:
         if agent_key not in self.jobs:
             self.jobs[agent_key] = ProcessJob(agent_key, self._get_cmd(agent_key))
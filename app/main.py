@@ -4,10 +4,19 @@ import os
 import subprocess
 import sys
 import time
+from email.utils import parsedate
 from pathlib import Path
-
-from fastapi import BackgroundTasks, FastAPI, Form, Request
-from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from urllib.parse import urlencode
+
+from fastapi import BackgroundTasks, FastAPI, Form, HTTPException, Request
+from fastapi.responses import (
+    FileResponse,
+    HTMLResponse,
+    PlainTextResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
@@ -21,7 +30,11 @@ from app.auth import (
     require_login,
 )
 from app.core.agents_registry import AGENTS
-from app.core.jobs import JOB_MANAGER
+from app.core.jobs import ACTIVE_STATUSES, JOB_MANAGER
+from app.core.media import MediaPathError, resolve_media_path
+from automation_core.metrics import MetricsStore, render_metrics
+from automation_core.queue import open_queue
+from automation_core.run_index import RunIndex
 
 app = FastAPI(title=config.APP_NAME)
 app.add_middleware(
@@ -60,6 +73,21 @@ async def meta():
     }
 
 
+def _collect_metrics() -> str:
+    queue = open_queue(config.QUEUE_DIR, config.QUEUE_BACKEND)
+    return render_metrics(
+        MetricsStore(config.METRICS_DIR), queue_depths=queue.count_by_state()
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """เมตริกคิว/pipeline รูปแบบ Prometheus (ไม่ต้องล็อกอิน เช่นเดียวกับ /healthz)"""
+    # อ่านไดเรกทอรีคิวและ SQLite เป็นงาน blocking จึงย้ายไปรันใน thread
+    text = await asyncio.to_thread(_collect_metrics)
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     if current_user(request):
@@ -109,6 +137,7 @@ async def forgot(request: Request):
 @app.get("/dashboard", response_class=HTMLResponse)
 async def dashboard(request: Request):
     require_login(request)
+    run_stats = await asyncio.to_thread(RunIndex(config.RUN_INDEX_DIR).stats)
     job_states = []
     for a in AGENTS:
         j = JOB_MANAGER.get(a["key"])
@@ -118,6 +147,11 @@ async def dashboard(request: Request):
                 "name": a["name"],
                 "status": j.status,
                 "progress": j.progress,
+                "active_runs": sum(
+                    1
+                    for run in JOB_MANAGER.runs_for(a["key"])
+                    if run.status in ACTIVE_STATUSES
+                ),
             }
         )
     # Warnings for security hygiene
@@ -139,10 +173,126 @@ async def dashboard(request: Request):
             "warnings": warnings,
             "cfg": config,
             "restart_ok": restart_ok,
+            "capacity": JOB_MANAGER.capacity(),
+            "run_stats": run_stats,
         },
     )
 
 
+def _query_runs(filters: dict[str, str | None], page: int):
+    index = RunIndex(config.RUN_INDEX_DIR)
+    return (
+        index.query(page=page, **filters),
+        index.stats(**filters),
+        index.pipelines(),
+    )
+
+
+@app.get("/runs", response_class=HTMLResponse)
+async def runs_history(
+    request: Request,
+    page: int = 1,
+    status: str | None = None,
+    pipeline: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+):
+    """ประวัติรอบ pipeline จากดัชนี (แบ่งหน้า + กรองวันที่/สถานะ/pipeline)"""
+    require_login(request)
+    filters = {
+        "status": status or None,
+        "pipeline": pipeline or None,
+        "since": since or None,
+        "until": until or None,
+    }
+    run_page, stats, pipelines = await asyncio.to_thread(_query_runs, filters, page)
+    query = urlencode({key: value for key, value in filters.items() if value})
+    return templates.TemplateResponse(
+        request,
+        "runs.html",
+        {
+            "request": request,
+            "run_page": run_page,
+            "stats": stats,
+            "pipelines": pipelines,
+            "filters": filters,
+            "query": query,
+        },
+    )
+
+
+class MediaFileResponse(FileResponse):
+    # ชิ้นละ 1 MiB ลดจำนวนรอบ thread ตอนส่งวิดีโอหลายร้อย MB (ยังไม่อ่านทั้งไฟล์)
+    chunk_size = 1024 * 1024
+
+
+def _is_not_modified(request_headers, response_headers) -> bool:
+    """เงื่อนไข 304 แบบเดียวกับ StaticFiles (If-None-Match มาก่อน If-Modified-Since)"""
+    if if_none_match := request_headers.get("if-none-match"):
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or response_headers["etag"] in tags
+    if_modified_since = parsedate(request_headers.get("if-modified-since") or "")
+    last_modified = parsedate(response_headers["last-modified"])
+    return bool(if_modified_since and last_modified) and (
+        if_modified_since >= last_modified
+    )
+
+
+@app.api_route("/media/{media_path:path}", methods=["GET", "HEAD"])
+async def media_file(request: Request, media_path: str):
+    """
+    ไฟล์วิดีโอ/เสียงของรอบ สำหรับดูตัวอย่างในเบราว์เซอร์
+
+    รองรับ Range (เลื่อนดูวิดีโอได้โดยไม่โหลดทั้งไฟล์), ETag/Last-Modified (304)
+    และส่งแบบ pathsend (zero-copy) เมื่อ ASGI server รองรับ
+    """
+    require_login(request)
+    try:
+        path, media_type = await asyncio.to_thread(
+            resolve_media_path, media_path, Path(config.MEDIA_ROOT)
+        )
+        stat_result = await asyncio.to_thread(os.stat, path)
+    except MediaPathError as exc:
+        raise HTTPException(status_code=403, detail=str(exc)) from exc
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404) from exc
+    response = MediaFileResponse(
+        path,
+        media_type=media_type,
+        stat_result=stat_result,
+        headers={"cache-control": "private, no-cache"},
+    )
+    if _is_not_modified(request.headers, response.headers):
+        keep = ("etag", "last-modified", "cache-control")
+        return Response(
+            status_code=304, headers={key: response.headers[key] for key in keep}
+        )
+    return response
+
+
+def _load_review(run_id: str) -> dict:
+    rel = f"output/{run_id}/artifacts/review_media_summary.json"
+    path, _ = resolve_media_path(rel, Path(config.MEDIA_ROOT))
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+@app.get("/review/{run_id}", response_class=HTMLResponse)
+async def review_media(request: Request, run_id: str):
+    """หน้ารีวิวเสียง/วิดีโอของรอบ ใช้ peaks และ sprite ที่ step review.media เตรียมไว้"""
+    require_login(request)
+    try:
+        review = await asyncio.to_thread(_load_review, run_id)
+    except MediaPathError as exc:
+        raise HTTPException(status_code=403, detail=str(exc)) from exc
+    except (FileNotFoundError, json.JSONDecodeError) as exc:
+        raise HTTPException(status_code=404) from exc
+    return templates.TemplateResponse(
+        request,
+        "review.html",
+        {"request": request, "run_id": run_id, "review": review},
+    )
+
+
 @app.get("/agents", response_class=HTMLResponse)
 async def agents_list(request: Request):
     require_login(request)
@@ -155,74 +305,122 @@ async def agents_list(request: Request):
 
 
 @app.get("/agents/{agent_key}", response_class=HTMLResponse)
-async def agent_detail(request: Request, agent_key: str):
+async def agent_detail(request: Request, agent_key: str, run_id: str | None = None):
     require_login(request)
     agent = next((a for a in AGENTS if a["key"] == agent_key), None)
     if not agent:
         return _redirect("/agents")
-    job = JOB_MANAGER.get(agent_key)
+    job = JOB_MANAGER.get(agent_key, run_id)
     return templates.TemplateResponse(
         request,
         "agent_detail.html",
-        {"request": request, "agent": agent, "job": job},
+        {
+            "request": request,
+            "agent": agent,
+            "job": job,
+            "runs": JOB_MANAGER.runs_for(agent_key),
+        },
     )
 
 
 @app.post("/agents/{agent_key}/action")
-async def agent_action(request: Request, agent_key: str, action: str = Form(...)):
+async def agent_action(
+    request: Request,
+    agent_key: str,
+    action: str = Form(...),
+    run_id: str | None = Form(None),
+):
     require_login(request)
     if action == "start":
-        await JOB_MANAGER.start(agent_key)
+        # เริ่มรอบใหม่เสมอ รอบเดิมที่ยังรันอยู่ไม่ถูกแตะ
+        run_id = (await JOB_MANAGER.start(agent_key)).run_id
     elif action == "pause":
-        JOB_MANAGER.pause(agent_key)
+        JOB_MANAGER.pause(agent_key, run_id)
     elif action == "resume":
-        JOB_MANAGER.resume(agent_key)
+        JOB_MANAGER.resume(agent_key, run_id)
     elif action == "stop":
-        JOB_MANAGER.stop(agent_key)
+        JOB_MANAGER.stop(agent_key, run_id)
     elif action == "reset":
-        JOB_MANAGER.reset(agent_key)
+        JOB_MANAGER.reset(agent_key, run_id)
     elif action == "restart":
-        # หยุด -> รีเซ็ต -> เริ่มใหม่
-        JOB_MANAGER.stop(agent_key)
-        JOB_MANAGER.reset(agent_key)
-        await JOB_MANAGER.start(agent_key)
+        # หยุดรอบนี้ -> เริ่มรอบใหม่
+        JOB_MANAGER.stop(agent_key, run_id)
+        run_id = (await JOB_MANAGER.start(agent_key)).run_id
+    if run_id:
+        return _redirect(f"/agents/{agent_key}?run_id={run_id}")
     return _redirect(f"/agents/{agent_key}")
 
 
+# ส่ง comment เป็นระยะเพื่อให้ proxy ไม่ตัดการเชื่อมต่อที่เงียบนาน
+SSE_KEEPALIVE_SECONDS = 15.0
+
+
+def _parse_last_event_id(request: Request) -> int:
+    """seq ล่าสุดที่ไคลเอนต์ได้รับ (header Last-Event-ID หรือ ?last_event_id=)"""
+
+    raw = request.headers.get("last-event-id") or request.query_params.get(
+        "last_event_id"
+    )
+    try:
+        return max(0, int(raw or 0))
+    except ValueError:
+        return 0
+
+
 @app.get("/agents/{agent_key}/logs/stream")
 async def agent_logs_stream(request: Request, agent_key: str):
-    """SSE stream ของสถานะและ log แบบเรียลไทม์สำหรับเอเจนต์ที่เลือก"""
+    """
+    SSE stream ของสถานะและ log แบบเรียลไทม์สำหรับเอเจนต์ที่เลือก
+
+    ทุก event: log มี id เป็น seq ของบรรทัด เมื่อเชื่อมต่อใหม่ เบราว์เซอร์ส่ง
+    Last-Event-ID มาเอง จึงได้เฉพาะบรรทัดที่ยังไม่เคยเห็น ถ้าบรรทัดที่ต้องการ
+    หลุดจากบัฟเฟอร์ไปแล้วจะส่ง event: gap บอกจำนวนที่ข้าม
+    """
     require_login(request)
 
-    job = JOB_MANAGER.get(agent_key)
+    job = JOB_MANAGER.get(agent_key, request.query_params.get("run_id"))
+    last_seq = _parse_last_event_id(request)
 
     async def event_gen():
-        last_idx = 0
-        # ส่งสถานะเริ่มต้นทันที
-        initial = {"status": job.status, "progress": job.progress}
-        yield f"event: status\ndata: {json.dumps(initial, ensure_ascii=False)}\n\n"
+        seq = last_seq
+        sent_state = None
         try:
             while True:
-                # ส่ง log ใหม่ตั้งแต่ last_idx
-                if last_idx < len(job.log):
-                    for line in job.log[last_idx:]:
-                        # ส่งทีละบรรทัดเป็น event: log
-                        payload = json.dumps(line, ensure_ascii=False)
-                        yield f"event: log\ndata: {payload}\n\n"
-                    last_idx = len(job.log)
-
-                # อัปเดตสถานะ/ความคืบหน้าเป็นระยะ
-                status_payload = json.dumps(
-                    {"status": job.status, "progress": job.progress},
-                    ensure_ascii=False,
-                )
-                yield f"event: status\ndata: {status_payload}\n\n"
+                # หยิบ event ก่อนอ่านสถานะ การเปลี่ยนแปลงระหว่างนี้จึงไม่หลุด
+                changed = job.log.changed()
+                lines, skipped = job.log.since(seq)
+                if skipped:
+                    gap = json.dumps({"skipped": skipped})
+                    yield f"event: gap\ndata: {gap}\n\n"
+                for line_seq, line in lines:
+                    payload = json.dumps(line, ensure_ascii=False)
+                    yield f"id: {line_seq}\nevent: log\ndata: {payload}\n\n"
+                    seq = line_seq
+
+                # ส่งสถานะเฉพาะเมื่อเปลี่ยน
+                state = (job.status, job.progress, job.stage)
+                if state != sent_state:
+                    sent_state = state
+                    status_payload = json.dumps(
+                        {
+                            "status": job.status,
+                            "progress": job.progress,
+                            "stage": job.stage,
+                        },
+                        ensure_ascii=False,
+                    )
+                    yield f"event: status\ndata: {status_payload}\n\n"
 
                 # หากงานสิ้นสุดหรือผิดพลาดแล้ว ให้ส่งสรุปแล้วจบการสตรีม
                 if job.status in ("completed", "error", "stopped"):
                     break
 
-                await asyncio.sleep(0.5)
+                try:
+                    await asyncio.wait_for(changed.wait(), SSE_KEEPALIVE_SECONDS)
+                except TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
         except asyncio.CancelledError:  # pragma: no cover
             # ไคลเอนต์ยกเลิกการเชื่อมต่อ
             return
@@ -334,6 +532,6 @@ async def wizard_view(request: Request):
 @app.post("/wizard/run")
 async def wizard_run(request: Request):
     require_login(request)
-    # เรียก Orchestrator Pipeline
-    await JOB_MANAGER.start("orchestrator_pipeline")
-    return _redirect("/agents/orchestrator_pipeline")
+    # เรียก Orchestrator Pipeline เป็นรอบใหม่ (ใช้ความจุคิวร่วมกับงานตามตาราง)
+    job = await JOB_MANAGER.start("orchestrator_pipeline")
+    return _redirect(f"/agents/orchestrator_pipeline?run_id={job.run_id}")
@@ -19,6 +19,7 @@ from rich.table import Table
 from agents.trend_scout import TrendScoutAgent, TrendScoutInput
 from automation_core.config import config
 from automation_core.logging import get_logger
+from automation_core.progress import ProgressReporter
 
 # สร้าง Typer app
 app = typer.Typer(
@@ -60,6 +61,9 @@ def trend_scout(
     console.print("\n🙏 [bold blue]ระบบอัตโนมัติ FlowBiz Client Dhamma[/bold blue]")
     console.print("📊 รัน TrendScoutAgent v1.0.0\n")
 
+    # รายงานความคืบหน้าให้ web runner (no-op เมื่อรันจาก terminal)
+    reporter = ProgressReporter.from_env()
+
     try:
         # โหลดข้อมูลนำเข้า
         with Progress(
@@ -69,6 +73,7 @@ def trend_scout(
         ) as progress:
             # โหลดไฟล์ input
             task1 = progress.add_task("📖 กำลังโหลดข้อมูล...", total=100)
+            reporter.progress(20, "load_input")
             progress.update(task1, advance=30)
 
             try:
@@ -94,6 +99,7 @@ def trend_scout(
 
             # สร้าง Agent และรัน
             task2 = progress.add_task("🤖 กำลังวิเคราะห์เทรนด์...", total=100)
+            reporter.progress(60, "analyze")
 
             try:
                 agent = TrendScoutAgent()
@@ -113,6 +119,7 @@ def trend_scout(
 
             # บันทึกผลลัพธ์
             task3 = progress.add_task("💾 กำลังบันทึกผลลัพธ์...", total=100)
+            reporter.progress(90, "save_output")
             progress.update(task3, advance=30)
 
             try:
@@ -134,6 +141,7 @@ def trend_scout(
                 progress.update(task3, advance=40)
 
                 console.print(f"✅ บันทึกผลลัพธ์แล้ว: [green]{output_file}[/green]")
+                reporter.artifact(output_file.resolve())
 
             except Exception as e:
                 console.print(f"❌ [red]ไม่สามารถบันทึกผลลัพธ์ได้: {e}[/red]")
@@ -10,6 +10,7 @@ import re
 import subprocess
 import sys
 import time
+import wave
 from collections.abc import Callable
 from dataclasses import dataclass
 from datetime import UTC, datetime
@@ -34,6 +35,10 @@ from automation_core.adapters import (  # noqa: E402
     preview_from_publish_request,
 )
 from automation_core.adapters.noop import NoopAdapter  # noqa: E402
+from automation_core.media_preview import MediaPreviewCache  # noqa: E402
+from automation_core.metrics import record_observation  # noqa: E402
+from automation_core.progress import ProgressReporter  # noqa: E402
+from automation_core.run_index import index_run_summary  # noqa: E402
 from automation_core.utils.env import parse_pipeline_enabled  # noqa: E402
 from steps.agent_monitoring import AgentMonitoringStep  # noqa: E402
 from steps.approval_gate import (  # noqa: E402
@@ -2271,6 +2276,7 @@ def agent_voiceover_tts(step, run_dir: Path):
             dry_run=True,
         )
 
+    tts_started = time.monotonic()
     metadata = voiceover_tts.generate_voiceover(
         script_text,
         run_id,
@@ -2282,6 +2288,15 @@ def agent_voiceover_tts(step, run_dir: Path):
         log(voiceover_tts.PIPELINE_DISABLED_MESSAGE, "INFO")
         return summary_rel
 
+    tts_elapsed = time.monotonic() - tts_started
+    if tts_elapsed > 0:
+        record_observation(
+            root_dir,
+            "tts_chars_per_second",
+            len(script_text) / tts_elapsed,
+            {"engine": str(metadata.get("engine_name", "unknown"))},
+        )
+
     wav_rel = Path(str(metadata["output_wav_path"])).as_posix()
     metadata_rel = Path(wav_rel).with_suffix(".json").as_posix()
     if Path(wav_rel).is_absolute() or Path(metadata_rel).is_absolute():
@@ -2313,6 +2328,19 @@ def agent_voiceover_tts(step, run_dir: Path):
     return summary_rel
 
 
+def _wav_duration_seconds(wav_path: Path) -> float | None:
+    """ความยาวเสียงจาก header ของ WAV (ใช้คำนวณความเร็ว encode) คืน None ถ้าอ่านไม่ได้"""
+    try:
+        with wave.open(str(wav_path), "rb") as wav_file:
+            frames = wav_file.getnframes()
+            rate = wav_file.getframerate()
+    except (OSError, EOFError, wave.Error):
+        return None
+    if rate <= 0:
+        return None
+    return frames / rate
+
+
 def agent_video_render(step, run_dir: Path):
     """Render MP4 from voiceover summary using ffmpeg."""
     run_id = run_dir.name
@@ -2552,6 +2580,7 @@ def agent_video_render(step, run_dir: Path):
             output_mp4_rel,
         ]
 
+    render_started = time.monotonic()
     try:
         subprocess.run(cmd_exec, check=True, capture_output=True, text=True)
     except FileNotFoundError as exc:
@@ -2563,6 +2592,15 @@ def agent_video_render(step, run_dir: Path):
         if tail:
             message = f"ffmpeg failed:\n{tail}"
         raise RuntimeError(message) from exc
+    render_elapsed = time.monotonic() - render_started
+    media_seconds = _wav_duration_seconds(wav_abs)
+    if media_seconds and render_elapsed > 0:
+        record_observation(
+            root_dir,
+            "render_speed_ratio",
+            media_seconds / render_elapsed,
+            {"mode": "image" if image_abs is not None else "color"},
+        )
 
     render_summary = {
         "schema_version": "v1",
@@ -2796,6 +2834,81 @@ def agent_quality_gate(step, run_dir: Path):
     return summary_out.relative_to(root_dir).as_posix()
 
 
+def agent_review_media(step, run_dir: Path):
+    """Review Media - เตรียม waveform peaks และ sprite ภาพย่อสำหรับหน้ารีวิว/อนุมัติ"""
+    run_id = run_dir.name
+    root_dir = ROOT.resolve()
+    config = step.get("config") or {}
+    if not isinstance(config, dict):
+        raise TypeError("config must be a dict")
+
+    render_rel = (
+        Path("output") / run_id / "artifacts" / "video_render_summary.json"
+    ).as_posix()
+    try:
+        render_summary = read_json(root_dir / render_rel)
+    except FileNotFoundError as exc:
+        raise FileNotFoundError(
+            f"Video render summary not found: {render_rel}"
+        ) from exc
+    if not isinstance(render_summary, dict):
+        raise TypeError("video_render_summary must be a JSON object")
+
+    def _resolve_input(field_name: str) -> tuple[Path, str] | None:
+        value = render_summary.get(field_name)
+        if not isinstance(value, str) or not value.strip():
+            return None
+        relative = Path(value)
+        if relative.is_absolute() or ".." in relative.parts:
+            raise ValueError(f"video_render_summary.{field_name} must be relative")
+        resolved = (root_dir / relative).resolve()
+        try:
+            resolved.relative_to(root_dir)
+        except ValueError as exc:
+            raise ValueError(
+                f"video_render_summary.{field_name} must be within repository root"
+            ) from exc
+        return (resolved, relative.as_posix()) if resolved.is_file() else None
+
+    # cache ร่วมทุกรอบ ไฟล์เดียวกัน (hash เดียวกัน) ไม่ต้องคำนวณซ้ำ
+    cache = MediaPreviewCache(root_dir / "output" / "media_cache")
+    review = {
+        "schema_version": "v1",
+        "run_id": run_id,
+        "input_video_render_summary": render_rel,
+        "wav_path": None,
+        "mp4_path": None,
+        "peaks_path": None,
+        "sprite_path": None,
+        "sprite": None,
+    }
+
+    wav = _resolve_input("input_wav_path")
+    if wav is not None:
+        review["wav_path"] = wav[1]
+        review["peaks_path"] = cache.peaks(wav[0]).relative_to(root_dir).as_posix()
+
+    mp4 = _resolve_input("output_mp4_path")
+    if mp4 is not None and config.get("sprite", True):
+        review["mp4_path"] = mp4[1]
+        sprite_path, meta_path = cache.sprite(
+            mp4[0],
+            interval_seconds=float(config.get("sprite_interval_seconds", 2.0)),
+            tile_width=int(config.get("sprite_tile_width", 160)),
+        )
+        review["sprite_path"] = sprite_path.relative_to(root_dir).as_posix()
+        review["sprite"] = read_json(meta_path)
+    elif mp4 is not None:
+        review["mp4_path"] = mp4[1]
+
+    summary_out = (
+        root_dir / "output" / run_id / "artifacts" / "review_media_summary.json"
+    )
+    write_json(summary_out, review)
+    log(f"Review media summary created: {summary_out.relative_to(root_dir)}")
+    return summary_out.relative_to(root_dir).as_posix()
+
+
 def agent_post_templates(_step, run_dir: Path):
     """
     รันเอเจนต์ post templates เพื่อสร้างสรุปเนื้อหาโพสต์แบบ deterministic
@@ -4079,6 +4192,7 @@ AGENTS = {
     "voiceover.tts": agent_voiceover_tts,
     "video.render": agent_video_render,
     "quality.gate": agent_quality_gate,
+    "review.media": agent_review_media,
     "post_templates": agent_post_templates,
     "post.templates": agent_post_templates,
     "dispatch.v0": agent_dispatch_v0,
@@ -4101,6 +4215,15 @@ AGENTS = {
 # ========== PIPELINE RUNNER ==========
 
 
+def _step_artifacts(result: PlannedArtifacts | Path | str | None) -> list[str]:
+    """path ผลลัพธ์ของ step สำหรับรายงานความคืบหน้า (ไม่มีถ้าข้าม/ไม่สำเร็จ)"""
+
+    output_path = result.output_path if isinstance(result, PlannedArtifacts) else result
+    if output_path is None or str(output_path) == "skipped":
+        return []
+    return [str(output_path)]
+
+
 def run_pipeline(pipeline_path: Path, run_id: str):
     """รัน pipeline ตามไฟล์ YAML"""
     log(f"Loading pipeline: {pipeline_path}")
@@ -4258,87 +4381,146 @@ def run_pipeline(pipeline_path: Path, run_id: str):
                 )
                 raise
 
-    for i, step in enumerate(steps, 1):
-        step_id = step["id"]
-        uses = step["uses"]
+    reporter = ProgressReporter.from_env()
+    run_started = time.monotonic()
+    started_at = datetime.now().isoformat()
+    step_durations: dict[str, float] = {}
 
-        log(f"[{i}/{len(steps)}] Running: {step_id} (uses: {uses})")
+    def _summary() -> dict:
+        return {
+            "pipeline": pipeline_name,
+            "run_id": run_id,
+            "started_at": started_at,
+            "ended_at": datetime.now().isoformat(),
+            "duration_seconds": round(time.monotonic() - run_started, 3),
+            "total_steps": len(steps),
+            "successful": len(
+                [r for r in results.values() if r["status"] == "success"]
+            ),
+            "failed": len([r for r in results.values() if r["status"] == "error"]),
+            "results": results,
+            "step_seconds": step_durations,
+            "output_dir": str(run_dir),
+        }
 
-        if uses == "preview" and preview_ran:
-            log(f"[{i}/{len(steps)}] Preview already ran; skipping {step_id}")
-            results[step_id] = {"status": "success", "output": "skipped"}
-            continue
+    summary_path = run_dir / "pipeline_summary.json"
+    step_id = None
+    try:
+        for i, step in enumerate(steps, 1):
+            step_id = step["id"]
+            uses = step["uses"]
 
-        agent_func = AGENTS.get(uses)
-        if not agent_func:
-            log(f"ERROR: Agent not implemented: {uses}", "ERROR")
-            raise RuntimeError(f"Agent not implemented: {uses}")
+            log(f"[{i}/{len(steps)}] Running: {step_id} (uses: {uses})")
+            reporter.step_started(i, len(steps), step_id)
 
-        try:
-            result = agent_func(step, run_dir)
-        except ApprovalPendingHold as e:
-            # Graceful stop for manual approval or wait
-            log(f"⏸ Pipeline HELD at {step_id}: {e}", "WARNING")
-            results[step_id] = {"status": "held", "reason": str(e)}
-            # Do NOT mark as failure, but stop pipeline
-            break
-        except ApprovalRejectedError as e:
-            # Hard stop for rejection
-            log(f"⛔ Pipeline REJECTED at {step_id}: {e}", "ERROR")
-            results[step_id] = {"status": "rejected", "reason": str(e)}
-            break
+            if uses == "preview" and preview_ran:
+                log(f"[{i}/{len(steps)}] Preview already ran; skipping {step_id}")
+                results[step_id] = {"status": "success", "output": "skipped"}
+                continue
 
-        try:
-            # Continue with normal success processing assuming result is valid
-            pass  # result already set above
-            output_path = result
-            planned_paths = None
-            if isinstance(result, PlannedArtifacts):
-                output_path = result.output_path
-                if dry_run_only_pipeline:
-                    planned_paths = result.planned_paths
-            entry = {"status": "success", "output": str(output_path)}
-            if planned_paths is not None:
-                entry["planned_paths"] = planned_paths
-            results[step_id] = entry
-            if uses in POST_TEMPLATES_ALIASES:
-                _mark_post_templates_complete()
-            if uses == "dispatch.v0":
-                dispatch_ran = True
-                _run_publish_request_once()
-            if uses == "publish_request.v0":
-                publish_request_ran = True
-                if output_path != "skipped":
-                    _run_preview_once()
-            if uses == "preview":
-                preview_ran = True
-            log(f"[{i}/{len(steps)}] ✓ {step_id} completed", "SUCCESS")
-            _maybe_run_post_templates(uses, result)
-        except Exception as e:
-            log(f"ERROR in {step_id}: {e}", "ERROR")
-            results[step_id] = {"status": "error", "error": str(e)}
-            raise
+            agent_func = AGENTS.get(uses)
+            if not agent_func:
+                log(f"ERROR: Agent not implemented: {uses}", "ERROR")
+                raise RuntimeError(f"Agent not implemented: {uses}")
+
+            step_started = time.monotonic()
+            step_outcome = "error"
+            result = None
+            try:
+                result = agent_func(step, run_dir)
+                step_outcome = "success"
+            except ApprovalPendingHold as e:
+                step_outcome = "held"
+                # Graceful stop for manual approval or wait
+                log(f"⏸ Pipeline HELD at {step_id}: {e}", "WARNING")
+                results[step_id] = {"status": "held", "reason": str(e)}
+                # Do NOT mark as failure, but stop pipeline
+                break
+            except ApprovalRejectedError as e:
+                step_outcome = "rejected"
+                # Hard stop for rejection
+                log(f"⛔ Pipeline REJECTED at {step_id}: {e}", "ERROR")
+                results[step_id] = {"status": "rejected", "reason": str(e)}
+                break
+            finally:
+                step_seconds = time.monotonic() - step_started
+                step_durations[step_id] = round(step_seconds, 3)
+                # step แบบ dry run ต้องไม่เขียนไฟล์ใดๆ รวมถึงเมตริก
+                if not _is_dry_run_step(step):
+                    record_observation(
+                        ROOT,
+                        "pipeline_step_seconds",
+                        step_seconds,
+                        {"step": uses, "outcome": step_outcome},
+                    )
+                reporter.step_finished(
+                    i,
+                    len(steps),
+                    step_id,
+                    step_outcome,
+                    step_seconds,
+                    artifacts=_step_artifacts(result),
+                )
+
+            try:
+                # Continue with normal success processing assuming result is valid
+                pass  # result already set above
+                output_path = result
+                planned_paths = None
+                if isinstance(result, PlannedArtifacts):
+                    output_path = result.output_path
+                    if dry_run_only_pipeline:
+                        planned_paths = result.planned_paths
+                entry = {"status": "success", "output": str(output_path)}
+                if planned_paths is not None:
+                    entry["planned_paths"] = planned_paths
+                results[step_id] = entry
+                if uses in POST_TEMPLATES_ALIASES:
+                    _mark_post_templates_complete()
+                if uses == "dispatch.v0":
+                    dispatch_ran = True
+                    _run_publish_request_once()
+                if uses == "publish_request.v0":
+                    publish_request_ran = True
+                    if output_path != "skipped":
+                        _run_preview_once()
+                if uses == "preview":
+                    preview_ran = True
+                log(f"[{i}/{len(steps)}] ✓ {step_id} completed", "SUCCESS")
+                _maybe_run_post_templates(uses, result)
+            except Exception as e:
+                log(f"ERROR in {step_id}: {e}", "ERROR")
+                results[step_id] = {"status": "error", "error": str(e)}
+                raise
+    except Exception as e:
+        # รอบที่ล้มต้องมี summary และอยู่ในดัชนีเช่นกัน (ไม่งั้นตัวกรอง error ว่างเสมอ)
+        if step_id is not None:
+            results.setdefault(step_id, {"status": "error", "error": str(e)})
+        if not dry_run_only_pipeline:
+            summary = _summary()
+            try:
+                write_json(summary_path, summary)
+            except OSError as write_error:
+                log(f"Could not write failed run summary: {write_error}", "ERROR")
+            index_run_summary(ROOT, summary, summary_path)
+        raise
 
     # สรุปผล
-    summary = {
-        "pipeline": pipeline_name,
-        "run_id": run_id,
-        "started_at": datetime.now().isoformat(),
-        "total_steps": len(steps),
-        "successful": len([r for r in results.values() if r["status"] == "success"]),
-        "failed": len([r for r in results.values() if r["status"] == "error"]),
-        "results": results,
-        "output_dir": str(run_dir),
-    }
+    summary = _summary()
 
+    run_status = "error" if summary["failed"] else "success"
     if dry_run_only_pipeline:
         log("=" * 60)
         log("Pipeline completed (dry run) - no files were written")
         log("=" * 60)
+        reporter.run_finished(run_status, time.monotonic() - run_started)
         return summary
 
-    summary_path = run_dir / "pipeline_summary.json"
     write_json(summary_path, summary)
+    index_run_summary(ROOT, summary, summary_path)
+    reporter.run_finished(
+        run_status, time.monotonic() - run_started, summary_path=summary_path
+    )
 
     log("=" * 60)
     log(
@@ -0,0 +1,103 @@
+"""
+วัดเวลาสร้างและค้นดัชนีคลังธรรมะ (CorpusIndex) ด้วยข้อความสังเคราะห์
+
+ตัวอย่าง:
+    python scripts/benchmark_corpus_index.py --passages 100000 --queries 200
+    python scripts/benchmark_corpus_index.py --passages 100000 --embed hashing
+
+passage สร้างจากคำในพจนานุกรมไทยแบบสุ่ม เพิ่มเข้าดัชนีทีละ ``--batch`` (จำลองการ
+เพิ่มแบบ incremental และการรวม segment) แล้ววัดเวลาค้นต่อคำค้น (p50/p95) ทั้งแบบ
+ไม่กรองและกรองด้วย required_tags ``--embed`` ระบุ model สำหรับ embedding
+(``hashing`` = embedder ตัวแทนที่ไม่ต้องติดตั้ง model)
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from agents.research_retrieval.corpus_index import CorpusIndex  # noqa: E402
+from automation_core.embedding_service import load_encoder  # noqa: E402
+from automation_core.thai_tokenizer import default_tokenizer  # noqa: E402
+
+TAGS = ["สติ", "ปล่อยวาง", "อนิจจัง", "ทุกข์", "สมาธิ", "เมตตา", "กรรม", "อนัตตา"]
+
+
+def _passages(count: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    words = sorted(default_tokenizer().words)
+    return [
+        {
+            "id": f"p{i}",
+            "source_name": "synthetic",
+            "original_text": "".join(rng.choices(words, k=rng.randint(15, 40))),
+            "doctrinal_tags": rng.sample(TAGS, k=rng.randint(1, 2)),
+        }
+        for i in range(count)
+    ]
+
+
+def _latency(index: CorpusIndex, queries: list[str], tags: list[str]) -> str:
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search([query], 17, required_tags=tags)
+        timings.append(time.perf_counter() - started)
+    p50, p95 = np.percentile(np.asarray(timings) * 1000, [50, 95])
+    return f"p50 {p50:.1f}ms p95 {p95:.1f}ms"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark CorpusIndex")
+    parser.add_argument("--passages", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--embed", help="ชื่อ model สำหรับ embedding (เช่น hashing)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    passages = _passages(args.passages, args.seed)
+    rng = random.Random(args.seed + 1)
+    tokenizer = default_tokenizer()
+    queries = [
+        " ".join(rng.sample(tokenizer.tokenize(p["original_text"]), k=3))
+        for p in rng.sample(passages, k=min(args.queries, len(passages)))
+    ]
+    encoder = load_encoder(args.embed) if args.embed else None
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = CorpusIndex(directory, encoder=encoder)
+        started = time.perf_counter()
+        for start in range(0, len(passages), args.batch):
+            index.add(passages[start : start + args.batch])
+        built = time.perf_counter() - started
+
+        started = time.perf_counter()
+        index.search(queries[:1], 1)
+        loaded = time.perf_counter() - started
+        print(
+            f"passages={len(passages)} build {built:.1f}s "
+            f"({len(passages) / built:,.0f}/s), load {loaded * 1000:.0f}ms"
+        )
+        print(f"  search: {_latency(index, queries, [])}")
+        print(f"  search + required_tags: {_latency(index, queries, TAGS[:1])}")
+
+        started = time.perf_counter()
+        index.add(_passages(100, args.seed + 2))
+        print(f"  add 100 passages: {(time.perf_counter() - started) * 1000:.0f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
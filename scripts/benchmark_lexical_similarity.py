@@ -0,0 +1,188 @@
+"""
+วัดความเร็วและความสอดคล้องของ lexical similarity (ตัดคำไทย + cosine ของ tf) กับ embedding
+
+ตัวอย่าง:
+    python scripts/benchmark_lexical_similarity.py --passages 1000 10000 --queries 200
+    python scripts/benchmark_lexical_similarity.py --bundle output/<run>/research_bundle.json
+
+ความเร็ว: เทียบการวนเทียบทีละคู่ด้วย ``Counter(str.split())`` แบบเดิมกับ
+LexicalIndex ที่คำนวณทุกคู่ในครั้งเดียว (ข้อความสังเคราะห์จากพจนานุกรมคำไทย
+แต่ละ query คือ passage สุ่มที่ถูกตัด/สลับคำบางส่วน)
+
+ความสอดคล้อง: ถ้ามี embedding (ตั้ง ``EMBEDDING_SERVICE_SOCKET`` หรือติดตั้ง
+sentence-transformers) จะคำนวณ Spearman ระหว่างคะแนน lexical กับ cosine ของ embedding
+ทุกคู่ และสัดส่วนที่ passage อันดับหนึ่งตรงกัน ไม่มีก็พิมพ์ว่าข้าม
+ใช้ passages จริงจาก research bundle ได้ด้วย ``--bundle``
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from agents.doctrine_validator.agent import EMBEDDING_MODEL_NAME  # noqa: E402
+from agents.doctrine_validator.lexical import LexicalIndex  # noqa: E402
+from automation_core.embedding_service import (  # noqa: E402
+    EmbeddingClient,
+    EmbeddingServiceError,
+)
+from automation_core.thai_tokenizer import default_tokenizer  # noqa: E402
+
+
+def _split_cosine(source: str, target: str) -> float:
+    # วิธีเดิมของ DoctrineValidatorAgent._lexical_similarity
+    source_counter = Counter(source.split())
+    target_counter = Counter(target.split())
+    numerator = sum(source_counter[t] * target_counter[t] for t in source_counter)
+    norm = math.sqrt(sum(v * v for v in source_counter.values())) * math.sqrt(
+        sum(v * v for v in target_counter.values())
+    )
+    return numerator / norm if norm else 0.0
+
+
+def _synthetic(passages: int, queries: int, seed: int) -> tuple[list[str], list[str]]:
+    rng = random.Random(seed)
+    words = sorted(default_tokenizer().words)
+    texts = ["".join(rng.choices(words, k=rng.randint(8, 20))) for _ in range(passages)]
+    probes = []
+    for _ in range(queries):
+        tokens = default_tokenizer().tokenize(rng.choice(texts))
+        kept = [t for t in tokens if rng.random() > 0.3] or tokens
+        rng.shuffle(kept)
+        probes.append("".join(kept))
+    return texts, probes
+
+
+def _load_bundle(path: Path) -> list[str]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    data = data.get("passages", data)
+    texts = []
+    for passage in data.get("primary", []) + data.get("supportive", []):
+        texts.extend(
+            t
+            for t in (passage.get("original_text"), passage.get("thai_modernized"))
+            if t
+        )
+    return texts
+
+
+def _ranks(values: np.ndarray) -> np.ndarray:
+    ranks = np.empty(values.size)
+    ranks[np.argsort(values, kind="stable")] = np.arange(values.size)
+    return ranks
+
+
+def _spearman(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.corrcoef(_ranks(a.ravel()), _ranks(b.ravel()))[0, 1])
+
+
+def _load_encoder() -> tuple[Any | None, str]:
+    """encoder แบบเดียวกับ DoctrineValidatorAgent (บริการก่อน แล้วจึงโหลดใน process)"""
+
+    client = EmbeddingClient.from_env(EMBEDDING_MODEL_NAME)
+    if client is not None:
+        try:
+            client.ping()
+            return client, ""
+        except (EmbeddingServiceError, OSError) as exc:
+            client.close()
+            reason = f"ติดต่อ embedding service ไม่ได้ ({exc})"
+    else:
+        reason = "ไม่ได้ตั้ง EMBEDDING_SERVICE_SOCKET"
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ModuleNotFoundError:
+        return None, f"{reason} และไม่ได้ติดตั้ง sentence-transformers"
+    try:
+        return SentenceTransformer(EMBEDDING_MODEL_NAME), ""
+    except Exception as exc:  # โหลด model ไม่ได้ (เช่น offline)
+        return None, f"โหลด {EMBEDDING_MODEL_NAME} ไม่ได้ ({exc})"
+
+
+def _encode(encoder: Any, texts: list[str]) -> np.ndarray:
+    vectors = np.asarray(encoder.encode(texts), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def _agreement(
+    encoder: Any | None,
+    texts: list[str],
+    probes: list[str],
+    lexical: np.ndarray,
+    skip_reason: str,
+) -> None:
+    if encoder is None:
+        print(f"  agreement: ข้าม ({skip_reason})")
+        return
+    embedding = _encode(encoder, probes) @ _encode(encoder, texts).T
+    top1 = float(np.mean(lexical.argmax(axis=1) == embedding.argmax(axis=1)))
+    print(f"  agreement: spearman={_spearman(lexical, embedding):.3f} top1={top1:.1%}")
+
+
+def _run(texts: list[str], probes: list[str], baseline_pairs: int) -> np.ndarray:
+    started = time.perf_counter()
+    index = LexicalIndex([str(i) for i in range(len(texts))], texts)
+    built = time.perf_counter()
+    scores = index.scores(probes)
+    scored = time.perf_counter()
+
+    pairs = min(baseline_pairs, len(texts) * len(probes))
+    sample = [(probes[i % len(probes)], texts[i % len(texts)]) for i in range(pairs)]
+    baseline_started = time.perf_counter()
+    for probe, text in sample:
+        _split_cosine(probe, text)
+    per_pair = (time.perf_counter() - baseline_started) / max(1, pairs)
+
+    total_pairs = len(texts) * len(probes)
+    print(
+        f"passages={len(texts)} queries={len(probes)}: "
+        f"index {built - started:.3f}s, scores {scored - built:.3f}s "
+        f"({total_pairs / max(scored - built, 1e-9):,.0f} pairs/s); "
+        f"split baseline ~{per_pair * total_pairs:.3f}s"
+    )
+    return scores
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark lexical similarity")
+    parser.add_argument("--passages", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--bundle", type=Path, help="research_bundle.json จริง")
+    parser.add_argument("--baseline-pairs", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    encoder, skip_reason = _load_encoder()
+    if args.bundle:
+        texts = _load_bundle(args.bundle)
+        probes = texts[: args.queries]
+        scores = _run(texts, probes, args.baseline_pairs)
+        _agreement(encoder, texts, probes, scores, skip_reason)
+        return 0
+
+    for count in args.passages:
+        texts, probes = _synthetic(count, args.queries, args.seed)
+        scores = _run(texts, probes, args.baseline_pairs)
+        if count <= 2000:
+            # เมทริกซ์ embedding ทุกคู่ของชุดใหญ่ใช้เวลา encode นานเกินไป
+            _agreement(encoder, texts, probes, scores, skip_reason)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,154 @@
+"""
+เปรียบเทียบ throughput ของคิว file กับ sqlite เมื่อมี worker หลาย process
+
+ตัวอย่าง:
+    python scripts/benchmark_queue_backends.py --jobs 10000 100000 --workers 1 4 16
+
+แต่ละรอบจะ enqueue งานจำนวน N ลงคิวใหม่ใน temp dir แล้วให้ worker W ตัว
+dequeue + mark_done จนคิวว่างหรือหมดเวลา (--time-budget) แล้วรายงาน jobs/s
+และตรวจว่าไม่มีงานใดถูกจองซ้ำ
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from automation_core.queue import (  # noqa: E402
+    QUEUE_BACKENDS,
+    JobSpec,
+    QueueBackend,
+    open_queue,
+)
+
+_BASE_TIME = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+def _utc_iso(value: datetime) -> str:
+    return value.astimezone(UTC).isoformat().replace("+00:00", "Z")
+
+
+def _build_job(index: int) -> JobSpec:
+    return JobSpec(
+        schema_version="v1",
+        job_id=f"bench{index:08d}",
+        created_at=_utc_iso(_BASE_TIME),
+        scheduled_for=_utc_iso(_BASE_TIME + timedelta(seconds=index)),
+        pipeline_path="pipeline.web.yml",
+        run_id=f"bench_{index:08d}",
+        params=None,
+        status="pending",
+        attempts=0,
+        last_error=None,
+    )
+
+
+def _worker(
+    queue_dir: str,
+    backend: QueueBackend,
+    deadline: float,
+    results: multiprocessing.Queue,
+) -> None:
+    queue = open_queue(queue_dir, backend)
+    claimed: list[str] = []
+    while time.monotonic() < deadline:
+        item = queue.dequeue_next()
+        if item is None:
+            break
+        queue.mark_done(item)
+        claimed.append(item.job_id)
+    results.put(claimed)
+
+
+def run_case(
+    backend: QueueBackend, jobs: int, workers: int, time_budget: float
+) -> dict[str, float | int | str]:
+    """รัน 1 กรณีและคืนสถิติ"""
+
+    with tempfile.TemporaryDirectory(prefix="queue_bench_") as temp_dir:
+        queue_dir = Path(temp_dir) / "queue"
+        queue = open_queue(queue_dir, backend)
+
+        started = time.perf_counter()
+        for index in range(jobs):
+            queue.enqueue(_build_job(index))
+        enqueue_seconds = time.perf_counter() - started
+        if hasattr(queue, "close"):
+            queue.close()
+
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        started = time.perf_counter()
+        deadline = time.monotonic() + time_budget
+        processes = [
+            ctx.Process(
+                target=_worker, args=(str(queue_dir), backend, deadline, results)
+            )
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        claimed = [job_id for _ in processes for job_id in results.get()]
+        for process in processes:
+            process.join()
+        drain_seconds = time.perf_counter() - started
+
+    return {
+        "backend": backend,
+        "jobs": jobs,
+        "workers": workers,
+        "enqueue_per_s": jobs / enqueue_seconds if enqueue_seconds else 0.0,
+        "processed": len(claimed),
+        "duplicates": len(claimed) - len(set(claimed)),
+        "dequeue_per_s": len(claimed) / drain_seconds if drain_seconds else 0.0,
+        "drained": int(len(set(claimed)) == jobs),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark file vs sqlite queue")
+    parser.add_argument(
+        "--backends", nargs="+", choices=QUEUE_BACKENDS, default=list(QUEUE_BACKENDS)
+    )
+    parser.add_argument("--jobs", nargs="+", type=int, default=[10_000, 100_000])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4, 8, 16])
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=60.0,
+        help="seconds per case before workers stop (file backend is O(N) per dequeue)",
+    )
+    args = parser.parse_args(argv)
+
+    header = (
+        f"{'backend':<8}{'jobs':>9}{'workers':>9}{'enq/s':>11}"
+        f"{'processed':>11}{'deq/s':>11}{'dup':>5}{'drained':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for jobs in args.jobs:
+        for backend in args.backends:
+            for workers in args.workers:
+                row = run_case(backend, jobs, workers, args.time_budget)
+                print(
+                    f"{row['backend']:<8}{row['jobs']:>9}{row['workers']:>9}"
+                    f"{row['enqueue_per_s']:>11.0f}{row['processed']:>11}"
+                    f"{row['dequeue_per_s']:>11.0f}{row['duplicates']:>5}"
+                    f"{'yes' if row['drained'] else 'no':>9}",
+                    flush=True,
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
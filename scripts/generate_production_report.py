@@ -10,9 +10,16 @@ Production Report Generator - สร้าง HTML report สำหรับข
 
 import argparse
 import json
+import sys
 from datetime import datetime
 from pathlib import Path
 
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT / "src") not in sys.path:
+    sys.path.insert(0, str(ROOT / "src"))
+
+from automation_core.run_index import RunIndex  # noqa: E402
+
 
 def load_json_safe(file_path: Path) -> dict:
     """โหลด JSON file อย่างปลอดภัย"""
@@ -1216,8 +1223,8 @@ def main():
     parser.add_argument(
         "--run-id",
         type=str,
-        required=True,
-        help="Run ID (e.g., production_complete_001)",
+        default=None,
+        help="Run ID (e.g., production_complete_001; default: latest indexed run)",
     )
     parser.add_argument(
         "--output-dir",
@@ -1226,10 +1233,36 @@ def main():
         help="Output directory (default: output/<run-id>/)",
     )
 
+    parser.add_argument(
+        "--list",
+        action="store_true",
+        help="List recent runs from the run index and exit",
+    )
+    parser.add_argument(
+        "--status",
+        default=None,
+        help="Filter --list / latest run by status (e.g., success)",
+    )
+
     args = parser.parse_args()
 
     # Paths
     base_dir = Path.cwd()
+
+    # ค้นรอบจากดัชนี (output/index/runs.sqlite3) แทนการไล่เปิดโฟลเดอร์ output/
+    if args.list or args.run_id is None:
+        run_page = RunIndex.from_env(base_dir).query(
+            status=args.status, per_page=20 if args.list else 1
+        )
+        if args.list:
+            for run in run_page.items:
+                print(f"{run.started_at[:19]}  {run.status:<8}  {run.run_id}")
+            print(f"({run_page.total} runs indexed)")
+            return 0
+        if not run_page.items:
+            print("❌ ไม่พบรอบในดัชนี ระบุ --run-id เอง")
+            return 1
+        args.run_id = run_page.items[0].run_id
     output_dir = args.output_dir or (base_dir / "output" / args.run_id)
     output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -1283,6 +1316,4 @@ def main():
 
 
 if __name__ == "__main__":
-    import sys
-
     sys.exit(main())
@@ -9,13 +9,36 @@ from pathlib import Path
 
 import yaml
 
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT / "src") not in sys.path:
+    sys.path.insert(0, str(ROOT / "src"))
+
+from automation_core.progress import PROGRESS_FD_ENV, ProgressReporter  # noqa: E402
+
+# อาร์กิวเมนต์ที่ CLI ของเอเจนต์ใช้ระบุไฟล์ผลลัพธ์ (ใช้รายงาน artifact ของ step)
+OUTPUT_FLAGS = ("--out", "--output")
+
+
+def step_env(overrides=None):
+    """
+    env ของ step ลูก ไม่ส่ง PROGRESS_FD ต่อ: Popen ปิด fd นั้นในลูก (close_fds)
+    เลขเดียวกันในลูกจึงอาจเป็นไฟล์อื่นที่ไม่เกี่ยวข้อง
+    """
+
+    env = os.environ.copy()
+    env.update(overrides or {})
+    env.pop(PROGRESS_FD_ENV, None)
+    return env
+
 
 def run_cmd(cmd, cwd=None, env=None, log_file=None):
     start = time.time()
+    env = dict(env) if env is not None else os.environ.copy()
+    env.pop(PROGRESS_FD_ENV, None)
     proc = subprocess.Popen(
         cmd,
         cwd=cwd,
-        env=env or os.environ.copy(),
+        env=env,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         text=True,
@@ -33,6 +56,18 @@ def run_cmd(cmd, cwd=None, env=None, log_file=None):
     return rc, dur, lines
 
 
+def declared_outputs(step: dict, cmd: list[str]) -> list[str]:
+    """artifact ของ step: ระบุเองด้วย artifacts หรืออ่านจาก --out ในคำสั่ง"""
+
+    if step.get("artifacts"):
+        return [str(path) for path in step["artifacts"]]
+    outputs = []
+    for flag, value in zip(cmd, cmd[1:], strict=False):
+        if flag in OUTPUT_FLAGS:
+            outputs.append(value)
+    return outputs
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--pipeline", required=True, help="path to pipeline yaml")
@@ -42,6 +77,8 @@ def main():
         pipeline = yaml.safe_load(f)
 
     steps = pipeline.get("steps", [])
+    reporter = ProgressReporter.from_env()
+    run_started = time.time()
     run_id = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
     out_dir = Path("output") / "pipelines" / run_id
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -59,9 +96,7 @@ def main():
             name = step.get("id") or f"step{i}"
             cmd = step.get("cmd")
             cwd = step.get("cwd")
-            env = os.environ.copy()
-            for k, v in (step.get("env") or {}).items():
-                env[k] = v
+            env = step_env(step.get("env"))
             # Resolve python if set
             if cmd and cmd[0].lower() == "python":
                 py = os.getenv("PYTHON_BIN") or sys.executable
@@ -70,8 +105,17 @@ def main():
             lf.write(f"==> [{name}] CMD: {' '.join(cmd)}\n")
             lf.flush()
             print(f"==> RUN [{name}]")
+            reporter.step_started(i, len(steps), name)
             rc, dur, _ = run_cmd(cmd, cwd=cwd, env=env, log_file=lf)
             status = "success" if rc == 0 else "error"
+            reporter.step_finished(
+                i,
+                len(steps),
+                name,
+                status,
+                dur,
+                artifacts=declared_outputs(step, cmd) if rc == 0 else (),
+            )
             summary["steps"].append(
                 {
                     "id": name,
@@ -90,6 +134,12 @@ def main():
     (out_dir / "summary.json").write_text(
         json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8"
     )
+    failed = any(step["status"] != "success" for step in summary["steps"])
+    reporter.run_finished(
+        "error" if failed else "success",
+        time.time() - run_started,
+        summary_path=out_dir / "summary.json",
+    )
     print(f"[DONE] run_id={run_id} summary={out_dir / 'summary.json'}")
 
 
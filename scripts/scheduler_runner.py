@@ -6,12 +6,18 @@ from __future__ import annotations
 
 import argparse
 import json
+import multiprocessing
+import multiprocessing.connection
 import os
+import signal
 import sys
-from collections.abc import Callable
-from datetime import UTC, datetime
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -21,19 +27,49 @@ if str(SRC_ROOT) not in sys.path:
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from automation_core.metrics import (  # noqa: E402
+    MetricsStore,
+    record_observation,
+    render_metrics,
+    write_textfile,
+)
 from automation_core.params import (  # noqa: E402
     ParamsSerializationError,
     inject_pipeline_params,
 )
-from automation_core.queue import FileQueue, JobError, QueueItem  # noqa: E402
+from automation_core.queue import (  # noqa: E402
+    QUEUE_BACKENDS,
+    RESOURCE_CLASSES,
+    FileQueue,
+    JobError,
+    JobQueue,
+    QueueBackend,
+    QueueItem,
+    is_external_job,
+    lane_depths,
+    open_queue,
+)
+from automation_core.queue_watch import QueueWatcher  # noqa: E402
 from automation_core.scheduler import (  # noqa: E402
     DEFAULT_TIMEZONE,
+    SchedulePlanCache,
     SchedulePlanError,
     parse_iso_datetime,
     schedule_due_jobs,
 )
 from orchestrator import parse_pipeline_enabled  # noqa: E402
 
+DEFAULT_POLL_INTERVAL_SECONDS = 5.0
+# โหมด inotify ยังต้องตื่นเป็นระยะเพื่อคืนงานที่ lease หมดอายุ
+DEFAULT_MAX_IDLE_SECONDS = 60.0
+MIN_WAKE_SECONDS = 0.05
+PLAN_CACHE_DIRNAME = ".plan_cache"
+# เพดานงานพร้อมกันต่อ resource_class บนเครื่องนี้ (class ที่ไม่ระบุจำกัดแค่ concurrency)
+DEFAULT_CLASS_LIMITS: dict[str, int] = {"cpu_heavy": 1}
+DEFAULT_COMPACT_AFTER_DAYS = 7.0
+# เพดานงาน running รวมทั้งคิว (ทุก worker + งานที่สั่งจากเว็บ) อ่านจาก QUEUE_MAX_RUNNING
+MAX_RUNNING_ENV = "QUEUE_MAX_RUNNING"
+
 
 def _utc_now() -> datetime:
     return datetime.now(UTC)
@@ -108,6 +144,7 @@ def _build_schedule_summary(
     skipped_entries: list[dict[str, Any]],
     dry_run: bool,
     base_dir: Path,
+    not_due_count: int = 0,
 ) -> dict[str, Any]:
     return {
         "schema_version": "v1",
@@ -118,6 +155,7 @@ def _build_schedule_summary(
         "window_minutes": window_minutes,
         "enqueued_job_ids": enqueued_job_ids,
         "skipped_entries": skipped_entries,
+        "not_due_count": not_due_count,
         "dry_run": dry_run,
     }
 
@@ -160,6 +198,7 @@ def run_schedule(
     window_minutes: int,
     dry_run: bool,
     base_dir: Path = ROOT,
+    backend: QueueBackend = "file",
 ) -> dict[str, Any] | None:
     pipeline_enabled = parse_pipeline_enabled(os.environ.get("PIPELINE_ENABLED"))
     if not pipeline_enabled:
@@ -188,7 +227,7 @@ def run_schedule(
 
     plan_path = _resolve_path(base_dir, plan_path)
     queue_dir = _resolve_path(base_dir, queue_dir)
-    queue = FileQueue(queue_dir)
+    queue = open_queue(queue_dir, backend)
 
     try:
         result = schedule_due_jobs(
@@ -199,6 +238,8 @@ def run_schedule(
             dry_run=dry_run,
             scheduler_enabled=scheduler_enabled,
             created_at_utc=_utc_now(),
+            # เก็บแคชไว้ในโฟลเดอร์คิว ลบคิวทิ้งเมื่อไรแคชก็หายไปด้วย
+            plan_cache=SchedulePlanCache(queue_dir / PLAN_CACHE_DIRNAME),
         )
         skipped_entries = [
             {
@@ -218,6 +259,7 @@ def run_schedule(
             skipped_entries=skipped_entries,
             dry_run=dry_run,
             base_dir=base_dir,
+            not_due_count=result.not_due_count,
         )
         summary_path = _schedule_summary_path(base_dir, now_utc, result.timezone)
         _write_json(summary_path, summary)
@@ -266,11 +308,174 @@ def _extract_job_fields(item: QueueItem | None) -> tuple[str, str, str]:
     return job_id, item.job.run_id, item.job.pipeline_path
 
 
+@contextmanager
+def _lease_heartbeat(queue: JobQueue, item: QueueItem) -> Iterator[None]:
+    """ส่ง heartbeat ต่ออายุ lease เป็นระยะระหว่างที่งานกำลังรัน"""
+
+    interval = max(queue.lease_seconds / 3, 0.05)
+    stop = threading.Event()
+
+    def _beat() -> None:
+        while not stop.wait(interval):
+            if not queue.heartbeat(item):
+                # งานถูกย้ายออกจาก running แล้ว (เช่น lease หมดอายุไปก่อน)
+                return
+
+    thread = threading.Thread(
+        target=_beat, name=f"heartbeat-{item.job_id}", daemon=True
+    )
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _job_wait_seconds(item: QueueItem, started_at: datetime) -> float | None:
+    """เวลารอจากที่งานพร้อมรัน (enqueue หรือ scheduled_for ที่ช้ากว่า) จนเริ่มรัน"""
+
+    if item.job is None:
+        return None
+    try:
+        ready_at = max(
+            parse_iso_datetime(item.job.created_at),
+            parse_iso_datetime(item.job.scheduled_for),
+        )
+    except ValueError:
+        return None
+    if ready_at.tzinfo is None:
+        ready_at = ready_at.replace(tzinfo=UTC)
+    return max((started_at - ready_at).total_seconds(), 0.0)
+
+
+def _execute_job(
+    queue: JobQueue,
+    item: QueueItem,
+    dry_run: bool,
+    base_dir: Path,
+    pipeline_runner: Callable[[Path, str], Any] | None,
+) -> dict[str, Any]:
+    """รันงานที่ dequeue แล้ว 1 งาน ย้ายสถานะคิว เขียน worker summary และบันทึกเมตริก"""
+
+    wait_seconds = _job_wait_seconds(item, _utc_now())
+    started = time.monotonic()
+    summary = _run_job(queue, item, dry_run, base_dir, pipeline_runner)
+    if not dry_run:
+        pipeline = item.job.pipeline_path if item.job is not None else ""
+        if wait_seconds is not None:
+            record_observation(
+                base_dir, "job_wait_seconds", wait_seconds, {"pipeline": pipeline}
+            )
+        record_observation(
+            base_dir,
+            "job_run_seconds",
+            time.monotonic() - started,
+            {"pipeline": pipeline, "outcome": summary.get("decision", "failed")},
+        )
+    return summary
+
+
+def _settle(
+    queue: JobQueue, item: QueueItem, error: JobError | None
+) -> JobError | None:
+    """
+    บันทึกผลงานลงคิว (done เมื่อ ``error`` เป็น None) ถ้า lease หมดอายุไปแล้วและ
+    process อื่น requeue/release งานไปก่อน คืน error ``lease_lost`` แทนการโยน
+    FileNotFoundError ต่อ
+    """
+
+    try:
+        if error is None:
+            queue.mark_done(item)
+        else:
+            queue.mark_failed(item, error)
+    except FileNotFoundError:
+        print(
+            f"lease lost for job {item.job_id}: result not recorded",
+            file=sys.stderr,
+        )
+        return JobError(
+            code="lease_lost",
+            message="job is no longer running (lease expired and was requeued)",
+        )
+    return None
+
+
+def _run_job(
+    queue: JobQueue,
+    item: QueueItem,
+    dry_run: bool,
+    base_dir: Path,
+    pipeline_runner: Callable[[Path, str], Any] | None,
+) -> dict[str, Any]:
+
+    job_id, run_id, pipeline_path = _extract_job_fields(item)
+    error: JobError | None
+    if item.job is None:
+        error = JobError(code="job_invalid", message="invalid job payload")
+    elif is_external_job(item.job):
+        # รอบจากเว็บที่หลุดมาอยู่ใน pending: ไม่มีไฟล์ pipeline ให้รันซ้ำ
+        error = JobError(
+            code="job_not_replayable",
+            message=f"{item.job.pipeline_path} runs in its own process",
+        )
+    else:
+        if pipeline_runner is None:
+            from orchestrator import run_pipeline  # noqa: E402
+
+            pipeline_runner = run_pipeline
+
+        try:
+            pipeline_path_obj = Path(item.job.pipeline_path)
+            if not pipeline_path_obj.is_absolute():
+                pipeline_path_obj = base_dir / pipeline_path_obj
+            # ป้องกัน path traversal โดย resolve path และตรวจสอบว่าต้องอยู่ภายใน base_dir เท่านั้น
+            base_dir_resolved = base_dir.resolve()
+            pipeline_path_obj = pipeline_path_obj.resolve()
+            try:
+                pipeline_path_obj.relative_to(base_dir_resolved)
+            except ValueError as exc:
+                raise ValueError(
+                    f"invalid pipeline path outside base dir: {pipeline_path_obj}"
+                ) from exc
+            with (
+                inject_pipeline_params(item.job.params),
+                _lease_heartbeat(queue, item),
+            ):
+                pipeline_runner(pipeline_path_obj, item.job.run_id)
+            error = None
+        except ParamsSerializationError:
+            error = JobError(
+                code="job_invalid", message="job params not JSON serializable"
+            )
+        except Exception as exc:  # noqa: BLE001
+            error = JobError(code="orchestrator_failed", message=str(exc))
+
+    lost = _settle(queue, item, error)
+    if lost is not None:
+        decision, error = "skipped", lost
+    else:
+        decision = "done" if error is None else "failed"
+    summary = _build_worker_summary(
+        job_id=job_id,
+        run_id=run_id,
+        pipeline_path=pipeline_path,
+        decision=decision,
+        error=error,
+        dry_run=dry_run,
+    )
+    summary_path = _worker_summary_path(base_dir, job_id)
+    _write_json(summary_path, summary)
+    return summary
+
+
 def run_worker(
     queue_dir: str | Path,
     dry_run: bool,
     base_dir: Path = ROOT,
     pipeline_runner: Callable[[Path, str], Any] | None = None,
+    backend: QueueBackend = "file",
 ) -> dict[str, Any] | None:
     pipeline_enabled = parse_pipeline_enabled(os.environ.get("PIPELINE_ENABLED"))
     if not pipeline_enabled:
@@ -279,7 +484,7 @@ def run_worker(
 
     worker_enabled = dry_run or _parse_enabled_flag(os.environ.get("WORKER_ENABLED"))
     queue_dir = _resolve_path(base_dir, queue_dir)
-    queue = FileQueue(queue_dir)
+    queue = open_queue(queue_dir, backend)
 
     if not worker_enabled:
         peek = queue.peek_next()
@@ -317,6 +522,7 @@ def run_worker(
         _write_json(summary_path, summary)
         return summary
 
+    queue.requeue_expired()
     item = queue.dequeue_next()
     if item is None:
         summary = _build_worker_summary(
@@ -331,90 +537,455 @@ def run_worker(
         _write_json(summary_path, summary)
         return summary
 
-    job_id, run_id, pipeline_path = _extract_job_fields(item)
-    if item.job is None:
-        queue.mark_failed(
-            item,
-            JobError(code="job_invalid", message="invalid job payload"),
-        )
-        summary = _build_worker_summary(
-            job_id=job_id,
-            run_id=run_id,
-            pipeline_path=pipeline_path,
-            decision="failed",
-            error=JobError(code="job_invalid", message="invalid job payload"),
-            dry_run=dry_run,
-        )
-        summary_path = _worker_summary_path(base_dir, job_id)
-        _write_json(summary_path, summary)
-        return summary
+    return _execute_job(
+        queue,
+        item,
+        dry_run=dry_run,
+        base_dir=base_dir,
+        pipeline_runner=pipeline_runner,
+    )
 
-    if pipeline_runner is None:
-        from orchestrator import run_pipeline  # noqa: E402
 
-        pipeline_runner = run_pipeline
+def _worker_log_path(base_dir: Path, job_id: str) -> Path:
+    return base_dir / "output" / "worker" / "logs" / f"{job_id or 'none'}.log"
 
-    try:
-        pipeline_path_obj = Path(item.job.pipeline_path)
-        if not pipeline_path_obj.is_absolute():
-            pipeline_path_obj = base_dir / pipeline_path_obj
-        # ป้องกัน path traversal โดย resolve path และตรวจสอบว่าต้องอยู่ภายใน base_dir เท่านั้น
-        base_dir_resolved = base_dir.resolve()
-        pipeline_path_obj = pipeline_path_obj.resolve()
-        try:
-            pipeline_path_obj.relative_to(base_dir_resolved)
-        except ValueError as exc:
-            raise ValueError(
-                f"invalid pipeline path outside base dir: {pipeline_path_obj}"
-            ) from exc
-        with inject_pipeline_params(item.job.params):
-            pipeline_runner(pipeline_path_obj, item.job.run_id)
-        queue.mark_done(item)
-        summary = _build_worker_summary(
-            job_id=job_id,
-            run_id=run_id,
-            pipeline_path=pipeline_path,
-            decision="done",
-            error=None,
-            dry_run=dry_run,
+
+def _worker_pool_summary_path(base_dir: Path, started_at: datetime) -> Path:
+    stamp = started_at.astimezone(UTC).strftime("%Y%m%dT%H%M%SZ")
+    return (
+        base_dir
+        / "output"
+        / "worker"
+        / "artifacts"
+        / (f"worker_pool_summary_{stamp}.json")
+    )
+
+
+def _run_pool_child(
+    queue_dir: Path,
+    backend: QueueBackend,
+    item: QueueItem,
+    base_dir: Path,
+    pipeline_runner: Callable[[Path, str], Any] | None,
+) -> None:
+    """entrypoint ของ child process: รันงาน 1 งานโดยส่ง stdout/stderr ลงไฟล์ log ของงาน"""
+
+    # ให้ parent เป็นผู้ตัดสินใจเรื่อง shutdown งานที่กำลังรันจะได้ไม่ถูกตัดกลางทาง
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    log_path = _worker_log_path(base_dir, item.job_id)
+    _ensure_dir(log_path.parent)
+    with open(log_path, "a", encoding="utf-8", buffering=1) as log_file:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # dup2 ระดับ fd เพื่อให้ subprocess (เช่น ffmpeg) เขียนลงไฟล์เดียวกัน
+        os.dup2(log_file.fileno(), 1)
+        os.dup2(log_file.fileno(), 2)
+        with redirect_stdout(log_file), redirect_stderr(log_file):
+            queue = open_queue(queue_dir, backend)
+            summary = _execute_job(
+                queue,
+                item,
+                dry_run=False,
+                base_dir=base_dir,
+                pipeline_runner=pipeline_runner,
+            )
+    if summary.get("decision") != "done":
+        raise SystemExit(1)
+
+
+class _PoolSlot(NamedTuple):
+    item: QueueItem
+    process: multiprocessing.process.BaseProcess
+    started_at: datetime
+
+
+class WorkerPool:
+    """รักษาให้มี child process ทำงานพร้อมกัน N ตัว ดึงงานจากคิวต่อเนื่อง"""
+
+    def __init__(
+        self,
+        queue_dir: Path,
+        backend: QueueBackend,
+        concurrency: int,
+        loop: bool,
+        base_dir: Path,
+        poll_interval: float,
+        pipeline_runner: Callable[[Path, str], Any] | None = None,
+        class_limits: dict[str, int] | None = None,
+        max_running: int | None = None,
+    ) -> None:
+        self.queue_dir = queue_dir
+        self.backend = backend
+        self.concurrency = max(concurrency, 1)
+        self.class_limits = dict(
+            DEFAULT_CLASS_LIMITS if class_limits is None else class_limits
         )
-        summary_path = _worker_summary_path(base_dir, job_id)
-        _write_json(summary_path, summary)
-        return summary
-    except ParamsSerializationError:
-        error = JobError(code="job_invalid", message="job params not JSON serializable")
-        queue.mark_failed(item, error)
-        summary = _build_worker_summary(
-            job_id=job_id,
-            run_id=run_id,
-            pipeline_path=pipeline_path,
-            decision="failed",
-            error=error,
-            dry_run=dry_run,
+        self.max_running = max_running
+        self.loop = loop
+        self.base_dir = base_dir
+        self.poll_interval = max(poll_interval, 0.1)
+        self.pipeline_runner = pipeline_runner
+        self.queue = open_queue(queue_dir, backend)
+        self._ctx = multiprocessing.get_context()
+        self._slots: list[_PoolSlot] = []
+        self._results: list[dict[str, Any]] = []
+        self._recovered: list[str] = []
+        self._stop_requests = 0
+        self._watcher: QueueWatcher | None = None
+        # pipe สำหรับปลุก wait() ทันทีเมื่อได้รับสัญญาณหยุด
+        self._stop_reader, self._stop_writer = multiprocessing.Pipe(duplex=False)
+
+    def request_stop(self, *_args: Any) -> None:
+        """ครั้งแรก: หยุดรับงานใหม่และรอให้งานที่รันอยู่จบ ครั้งที่สอง: ยุติทันที"""
+
+        self._stop_requests += 1
+        self._stop_writer.send_bytes(b"stop")
+        if self._stop_requests >= 2:
+            for slot in self._slots:
+                if slot.process.is_alive():
+                    slot.process.kill()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop_requests > 0
+
+    def _start(self, item: QueueItem) -> None:
+        # ลบ summary เก่าของ job เดียวกันเพื่อให้ _finish อ่านเฉพาะผลของรอบนี้
+        _worker_summary_path(self.base_dir, item.job_id).unlink(missing_ok=True)
+        process = self._ctx.Process(
+            target=_run_pool_child,
+            args=(
+                self.queue_dir,
+                self.backend,
+                item,
+                self.base_dir,
+                self.pipeline_runner,
+            ),
+            name=f"worker-{item.job_id}",
         )
-        summary_path = _worker_summary_path(base_dir, job_id)
-        _write_json(summary_path, summary)
-        return summary
-    except Exception as exc:  # noqa: BLE001
-        queue.mark_failed(item, JobError(code="orchestrator_failed", message=str(exc)))
-        summary = _build_worker_summary(
-            job_id=job_id,
-            run_id=run_id,
-            pipeline_path=pipeline_path,
-            decision="failed",
-            error=JobError(code="orchestrator_failed", message=str(exc)),
-            dry_run=dry_run,
+        process.start()
+        self._slots.append(_PoolSlot(item=item, process=process, started_at=_utc_now()))
+
+    def _finish(self, slot: _PoolSlot) -> None:
+        job_id, run_id, pipeline_path = _extract_job_fields(slot.item)
+        finished_at = _utc_now()
+        summary_path = _worker_summary_path(self.base_dir, job_id)
+        summary: dict[str, Any] | None = None
+        if summary_path.exists():
+            try:
+                summary = json.loads(summary_path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                summary = None
+
+        if summary is None:
+            # child ตายก่อนเขียนผล (ถูก kill หรือ crash) งานยังค้างใน running
+            code = (
+                "worker_interrupted" if self._stop_requests >= 2 else "worker_crashed"
+            )
+            error = JobError(
+                code=code,
+                message=f"worker process exited with code {slot.process.exitcode}",
+            )
+            try:
+                # คืนงานเข้าคิวตาม retry policy (backoff / dead-letter)
+                self.queue.release(slot.item, error)
+            except FileNotFoundError:
+                # child ย้ายสถานะไปแล้วก่อนตาย
+                pass
+            summary = _build_worker_summary(
+                job_id=job_id,
+                run_id=run_id,
+                pipeline_path=pipeline_path,
+                decision="failed",
+                error=error,
+                dry_run=False,
+            )
+            _write_json(summary_path, summary)
+
+        self._results.append(
+            {
+                "job_id": job_id,
+                "run_id": run_id,
+                "pipeline_path": pipeline_path,
+                "decision": summary.get("decision", "failed"),
+                "error": summary.get("error"),
+                "started_at": _utc_iso(slot.started_at),
+                "finished_at": _utc_iso(finished_at),
+                "duration_seconds": round(
+                    (finished_at - slot.started_at).total_seconds(), 3
+                ),
+                "log_path": _relative_path(
+                    self.base_dir, _worker_log_path(self.base_dir, job_id)
+                ),
+            }
         )
-        summary_path = _worker_summary_path(base_dir, job_id)
-        _write_json(summary_path, summary)
+
+    def _reap(self) -> None:
+        running: list[_PoolSlot] = []
+        for slot in self._slots:
+            if slot.process.is_alive():
+                running.append(slot)
+                continue
+            slot.process.join()
+            self._finish(slot)
+        self._slots = running
+
+    def _saturated_classes(self) -> set[str]:
+        """resource_class ที่มีงานรันอยู่เต็มเพดานแล้ว"""
+
+        running: dict[str, int] = {}
+        for slot in self._slots:
+            resource_class = (
+                "default" if slot.item.job is None else slot.item.job.resource_class
+            )
+            running[resource_class] = running.get(resource_class, 0) + 1
+        return {
+            name
+            for name, limit in self.class_limits.items()
+            if running.get(name, 0) >= limit
+        }
+
+    def _queue_full(self) -> bool:
+        """คิวมีงาน running ครบเพดานรวมแล้ว (นับงานของ worker อื่นและของเว็บด้วย)"""
+
+        if self.max_running is None:
+            return False
+        return self.queue.count_by_state().get("running", 0) >= self.max_running
+
+    def _fill(self) -> bool:
+        """เติมงานจนครบ concurrency คืน False ถ้าไม่มีงานที่รันได้ตอนนี้"""
+
+        # โหมด loop เริ่มงานตาม scheduled_for ส่วนโหมด drain รันทุกงานที่ค้าง
+        due_before = _utc_now() if self.loop else None
+        while not self.stopping and len(self._slots) < self.concurrency:
+            if self._queue_full():
+                # ความจุถูกใช้โดย process อื่น รอรอบ poll ถัดไป
+                return True
+            item = self.queue.dequeue_next(
+                due_before=due_before, exclude_classes=self._saturated_classes()
+            )
+            if item is None:
+                return False
+            self._start(item)
+        return True
+
+    def _idle_timeout(self, watcher: QueueWatcher) -> float:
+        """เวลารอเมื่อยังมี slot ว่าง: จนกว่าคิวจะเปลี่ยนหรือถึงเวลางานถัดไป"""
+
+        timeout = watcher.poll_timeout()
+        if timeout is None:
+            timeout = DEFAULT_MAX_IDLE_SECONDS
+        next_ready = self.queue.next_ready_at()
+        if next_ready is not None:
+            until_due = (next_ready - _utc_now()).total_seconds()
+            if until_due <= 0 and self._saturated_classes():
+                # งานที่ถึงเวลาแล้วแต่ยังไม่ได้เริ่มคืองานที่ติดเพดาน class
+                # รอ child จบ (sentinel) แทนการวนตื่นถี่ๆ
+                return timeout
+            timeout = min(timeout, max(until_due, MIN_WAKE_SECONDS))
+        return timeout
+
+    def _wait(self) -> None:
+        waitables: list[Any] = [slot.process.sentinel for slot in self._slots]
+        waitables.append(self._stop_reader)
+        timeout = self.poll_interval
+        watcher = self._watcher
+        if watcher is not None and len(self._slots) < self.concurrency:
+            if watcher.uses_inotify:
+                waitables.append(watcher)
+            timeout = self._idle_timeout(watcher)
+        multiprocessing.connection.wait(waitables, timeout=timeout)
+        if watcher is not None:
+            watcher.check()
+
+    def run(self) -> dict[str, Any]:
+        started_at = _utc_now()
+        handlers = {
+            sig: signal.signal(sig, self.request_stop)
+            for sig in (signal.SIGTERM, signal.SIGINT)
+        }
+        if self.loop:
+            self._watcher = QueueWatcher(
+                self.queue.watch_paths(), max_poll_seconds=self.poll_interval
+            )
+        try:
+            while True:
+                self._reap()
+                if not self.stopping:
+                    self._recovered.extend(
+                        item.job_id for item in self.queue.requeue_expired()
+                    )
+                has_more = self._fill()
+                if not self._slots and (self.stopping or not (has_more or self.loop)):
+                    break
+                self._wait()
+        finally:
+            for sig, handler in handlers.items():
+                signal.signal(sig, handler)
+            if self._watcher is not None:
+                self._watcher.close()
+            self._stop_reader.close()
+            self._stop_writer.close()
+
+        decisions = [result["decision"] for result in self._results]
+        summary = {
+            "schema_version": "v1",
+            "engine": "worker_pool",
+            "checked_at": _utc_iso(_utc_now()),
+            "started_at": _utc_iso(started_at),
+            "concurrency": self.concurrency,
+            "class_limits": self.class_limits,
+            "max_running": self.max_running,
+            "loop": self.loop,
+            "queue_backend": self.backend,
+            "stopped_by_signal": self.stopping,
+            "jobs_done": decisions.count("done"),
+            "jobs_failed": decisions.count("failed"),
+            "recovered_job_ids": self._recovered,
+            "jobs": self._results,
+        }
+        _write_json(_worker_pool_summary_path(self.base_dir, started_at), summary)
         return summary
 
 
-def run_queue_list(queue_dir: str | Path, base_dir: Path = ROOT) -> None:
+def _env_max_running() -> int | None:
+    raw = os.environ.get(MAX_RUNNING_ENV, "").strip()
+    if not raw:
+        return None
+    try:
+        return max(int(raw), 1)
+    except ValueError:
+        return None
+
+
+def run_worker_pool(
+    queue_dir: str | Path,
+    concurrency: int,
+    loop: bool,
+    base_dir: Path = ROOT,
+    pipeline_runner: Callable[[Path, str], Any] | None = None,
+    backend: QueueBackend = "file",
+    poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS,
+    class_limits: dict[str, int] | None = None,
+    max_running: int | None = None,
+) -> dict[str, Any] | None:
+    pipeline_enabled = parse_pipeline_enabled(os.environ.get("PIPELINE_ENABLED"))
+    if not pipeline_enabled:
+        print("Pipeline disabled by PIPELINE_ENABLED=false")
+        return None
+
+    if not _parse_enabled_flag(os.environ.get("WORKER_ENABLED")):
+        # ใช้เส้นทางเดิมของ run_worker เพื่อเขียน summary แบบ skipped
+        return run_worker(
+            queue_dir=queue_dir,
+            dry_run=False,
+            base_dir=base_dir,
+            pipeline_runner=pipeline_runner,
+            backend=backend,
+        )
+
+    pool = WorkerPool(
+        queue_dir=_resolve_path(base_dir, queue_dir),
+        backend=backend,
+        concurrency=concurrency,
+        loop=loop,
+        base_dir=base_dir,
+        poll_interval=poll_interval,
+        pipeline_runner=pipeline_runner,
+        class_limits=class_limits,
+        max_running=max_running if max_running is not None else _env_max_running(),
+    )
+    return pool.run()
+
+
+def run_queue_list(
+    queue_dir: str | Path,
+    base_dir: Path = ROOT,
+    backend: QueueBackend = "file",
+) -> dict[tuple[str, int], int]:
     queue_dir = _resolve_path(base_dir, queue_dir)
-    queue = FileQueue(queue_dir)
-    for item in queue.list_pending():
+    queue = open_queue(queue_dir, backend)
+    items = queue.list_pending()
+    for item in items:
         print(item.filename)
+    depths = lane_depths(items)
+    if depths:
+        print("lanes:")
+        for (resource_class, priority), count in depths.items():
+            print(f"  {resource_class:<10} priority={priority:<4} pending={count}")
+    return depths
+
+
+def run_queue_compact(
+    queue_dir: str | Path,
+    older_than_days: float,
+    retention_days: float | None,
+    base_dir: Path = ROOT,
+    backend: QueueBackend = "file",
+) -> dict[str, Any] | None:
+    """รวมงานที่จบแล้วลง archive (เฉพาะ file backend; sqlite ค้นด้วย primary key อยู่แล้ว)"""
+
+    if backend != "file":
+        print("queue compact applies to the file backend only")
+        return None
+    queue = FileQueue(_resolve_path(base_dir, queue_dir))
+    result = queue.compact(
+        older_than=timedelta(days=older_than_days),
+        retention=None if retention_days is None else timedelta(days=retention_days),
+    )
+    if result.skipped_busy:
+        print("another compaction is running, skipped")
+    summary = {
+        "archived": len(result.archived_job_ids),
+        "segment": None if result.segment is None else result.segment.name,
+        "pruned_segments": [path.name for path in result.pruned_segments],
+        "skipped_busy": result.skipped_busy,
+    }
+    print(json.dumps(summary, ensure_ascii=False))
+    return summary
+
+
+def run_metrics(
+    queue_dir: str | Path,
+    textfile: str | Path | None,
+    base_dir: Path = ROOT,
+    backend: QueueBackend = "file",
+) -> str:
+    """สร้างเมตริก Prometheus แล้วพิมพ์ออก stdout หรือเขียนเป็น textfile"""
+
+    queue = open_queue(_resolve_path(base_dir, queue_dir), backend)
+    text = render_metrics(
+        MetricsStore.from_env(base_dir), queue_depths=queue.count_by_state()
+    )
+    if textfile is None:
+        sys.stdout.write(text)
+    else:
+        write_textfile(_resolve_path(base_dir, textfile), text)
+    return text
+
+
+def _parse_class_limits(values: list[str] | None) -> dict[str, int] | None:
+    """แปลง ["cpu_heavy=1", "io=4"] เป็น dict (None = ใช้ค่าเริ่มต้น)"""
+
+    if not values:
+        return None
+    limits = dict(DEFAULT_CLASS_LIMITS)
+    for value in values:
+        name, sep, raw_limit = value.partition("=")
+        if not sep or name not in RESOURCE_CLASSES:
+            raise argparse.ArgumentTypeError(
+                f"invalid --class-limit {value!r} "
+                f"(expected CLASS=N, CLASS in {', '.join(RESOURCE_CLASSES)})"
+            )
+        try:
+            limits[name] = max(int(raw_limit), 1)
+        except ValueError as exc:
+            raise argparse.ArgumentTypeError(
+                f"invalid --class-limit {value!r}: N must be an integer"
+            ) from exc
+    return limits
 
 
 def _parse_now(now_value: str | None) -> datetime | None:
@@ -454,6 +1025,12 @@ def build_parser() -> argparse.ArgumentParser:
         default="data/queue",
         help="queue directory",
     )
+    schedule_parser.add_argument(
+        "--queue-backend",
+        choices=QUEUE_BACKENDS,
+        default="file",
+        help="queue backend (file or sqlite)",
+    )
     schedule_parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -466,11 +1043,49 @@ def build_parser() -> argparse.ArgumentParser:
         default="data/queue",
         help="queue directory",
     )
+    work_parser.add_argument(
+        "--queue-backend",
+        choices=QUEUE_BACKENDS,
+        default="file",
+        help="queue backend (file or sqlite)",
+    )
     work_parser.add_argument(
         "--dry-run",
         action="store_true",
         help="run without orchestrator execution",
     )
+    work_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="run up to N jobs in parallel child processes",
+    )
+    work_parser.add_argument(
+        "--loop",
+        action="store_true",
+        help="keep running until SIGTERM, starting jobs when they become due",
+    )
+    work_parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL_SECONDS,
+        help="max seconds between queue polls when inotify is unavailable",
+    )
+    work_parser.add_argument(
+        "--class-limit",
+        action="append",
+        default=None,
+        metavar="CLASS=N",
+        help="max concurrent jobs per resource_class on this host "
+        "(repeatable, default cpu_heavy=1)",
+    )
+    work_parser.add_argument(
+        "--max-running",
+        type=int,
+        default=None,
+        help="max running jobs across the whole queue, shared with other workers "
+        f"and web runs (default ${MAX_RUNNING_ENV}, unlimited if unset)",
+    )
 
     queue_parser = subparsers.add_parser("queue", help="queue operations")
     queue_subparsers = queue_parser.add_subparsers(dest="queue_command", required=True)
@@ -480,6 +1095,58 @@ def build_parser() -> argparse.ArgumentParser:
         default="data/queue",
         help="queue directory",
     )
+    list_parser.add_argument(
+        "--queue-backend",
+        choices=QUEUE_BACKENDS,
+        default="file",
+        help="queue backend (file or sqlite)",
+    )
+    compact_parser = queue_subparsers.add_parser(
+        "compact", help="archive finished jobs into compressed segments"
+    )
+    compact_parser.add_argument(
+        "--queue-dir",
+        default="data/queue",
+        help="queue directory",
+    )
+    compact_parser.add_argument(
+        "--queue-backend",
+        choices=QUEUE_BACKENDS,
+        default="file",
+        help="queue backend (file or sqlite)",
+    )
+    compact_parser.add_argument(
+        "--older-than-days",
+        type=float,
+        default=DEFAULT_COMPACT_AFTER_DAYS,
+        help="archive done/failed/dead jobs finished more than N days ago",
+    )
+    compact_parser.add_argument(
+        "--retention-days",
+        type=float,
+        default=None,
+        help="delete archive segments older than N days (job ids stay indexed)",
+    )
+
+    metrics_parser = subparsers.add_parser(
+        "metrics", help="export Prometheus metrics (stdout or textfile)"
+    )
+    metrics_parser.add_argument(
+        "--queue-dir",
+        default="data/queue",
+        help="queue directory",
+    )
+    metrics_parser.add_argument(
+        "--queue-backend",
+        choices=QUEUE_BACKENDS,
+        default="file",
+        help="queue backend (file or sqlite)",
+    )
+    metrics_parser.add_argument(
+        "--textfile",
+        default=None,
+        help="write to this .prom file atomically (node_exporter textfile collector)",
+    )
 
     return parser
 
@@ -496,20 +1163,63 @@ def main(argv: list[str] | None = None) -> int:
             now=now_dt,
             window_minutes=args.window_minutes,
             dry_run=args.dry_run,
+            backend=args.queue_backend,
+        )
+        return 0
+
+    if (
+        args.command == "work"
+        and not args.dry_run
+        and (args.loop or args.concurrency is not None)
+    ):
+        try:
+            class_limits = _parse_class_limits(args.class_limit)
+        except argparse.ArgumentTypeError as exc:
+            parser.error(str(exc))
+        summary = run_worker_pool(
+            queue_dir=args.queue_dir,
+            concurrency=args.concurrency or 1,
+            loop=args.loop,
+            backend=args.queue_backend,
+            poll_interval=args.poll_interval,
+            class_limits=class_limits,
+            max_running=args.max_running,
         )
+        if summary and (
+            summary.get("decision") == "failed" or summary.get("jobs_failed")
+        ):
+            return 1
         return 0
 
     if args.command == "work":
         summary = run_worker(
             queue_dir=args.queue_dir,
             dry_run=args.dry_run,
+            backend=args.queue_backend,
         )
         if summary and summary.get("decision") == "failed":
             return 1
         return 0
 
     if args.command == "queue" and args.queue_command == "list":
-        run_queue_list(queue_dir=args.queue_dir)
+        run_queue_list(queue_dir=args.queue_dir, backend=args.queue_backend)
+        return 0
+
+    if args.command == "queue" and args.queue_command == "compact":
+        run_queue_compact(
+            queue_dir=args.queue_dir,
+            older_than_days=args.older_than_days,
+            retention_days=args.retention_days,
+            backend=args.queue_backend,
+        )
+        return 0
+
+    if args.command == "metrics":
+        run_metrics(
+            queue_dir=args.queue_dir,
+            textfile=args.textfile,
+            backend=args.queue_backend,
+        )
         return 0
 
     return 1
@@ -3,9 +3,9 @@
 from __future__ import annotations
 
 import logging
-import math
 import re
-from collections import Counter
+import sqlite3
+from collections.abc import Iterable, Sequence
 from datetime import UTC, datetime
 
 import numpy as np
@@ -16,13 +16,21 @@ except ModuleNotFoundError:  # pragma: no cover - fallback path
     SentenceTransformer = None  # type: ignore[assignment]
 
 from automation_core.base_agent import BaseAgent
+from automation_core.embedding_cache import EmbeddingCache
+from automation_core.embedding_service import (
+    DEFAULT_MODEL_NAME,
+    EmbeddingClient,
+    EmbeddingServiceError,
+)
 
+from .lexical import LexicalIndex, cosine_similarity
 from .model import (
     DoctrineValidatorInput,
     DoctrineValidatorOutput,
     ErrorResponse,
     MetaInfo,
     Passage,
+    PassageCandidate,
     Passages,
     RewriteSuggestion,
     ScriptSegment,
@@ -32,12 +40,25 @@ from .model import (
     SelfCheck,
     Summary,
 )
+from .passage_search import PassageIndex, PassageMatch, top_k
 
 logger = logging.getLogger(__name__)
 
 # Pattern สำหรับดึง citation เช่น [CIT:p123]
 CITATION_PATTERN = re.compile(r"\[CIT:([^\]]+)\]")
 
+EMBEDDING_MODEL_NAME = DEFAULT_MODEL_NAME
+
+# การเสนอ passage แทน citation ที่ผิด/ขาด
+NEAREST_PASSAGES_K = 3
+SUGGEST_MIN_SIMILARITY = 0.6
+SUGGEST_STATUSES = {
+    SegmentStatus.MISMATCH,
+    SegmentStatus.HALLUCINATION,
+    SegmentStatus.MISSING_CITATION,
+    SegmentStatus.UNVERIFIABLE,
+}
+
 SENSITIVE_PHRASES = [
     "สมาธิรักษาโรค",
     "หายป่วยแน่นอน",
@@ -47,6 +68,67 @@ SENSITIVE_PHRASES = [
 ]
 
 
+class SimilarityTable:
+    """
+    cosine similarity ระหว่างประโยค (normalize แล้ว) กับทุก passage ที่คำนวณไว้ล่วงหน้า
+
+    ทุกคู่ได้จากการคำนวณครั้งเดียวผ่าน PassageIndex (embedding) หรือ LexicalIndex
+    (cosine ของ tf เมื่อไม่มี model) ส่วน ``canon`` เก็บ top-k จากดัชนีพระไตรปิฎก (ถ้ามี)
+    ของแต่ละประโยค
+    """
+
+    def __init__(
+        self,
+        sentence_rows: dict[str, int],
+        index: PassageIndex | LexicalIndex,
+        scores: np.ndarray,
+        known_passages: Iterable[str] = (),
+        canon: list[list[PassageMatch]] | None = None,
+    ) -> None:
+        self.sentence_rows = sentence_rows
+        self.index = index
+        self.scores = scores
+        self.known_passages = set(known_passages)
+        self.canon = canon
+
+    def get(self, sentence_clean: str, passage_id: str) -> float | None:
+        row = self.sentence_rows.get(sentence_clean)
+        if row is None:
+            return None
+        column = self.index.column(passage_id)
+        if column is None:
+            # passage ที่ไม่มีข้อความให้เทียบ
+            return 0.0 if passage_id in self.known_passages else None
+        return float(self.scores[row, column])
+
+    def best(self, sentence_clean: str) -> float | None:
+        row = self.sentence_rows.get(sentence_clean)
+        if row is None:
+            return None
+        return float(self.scores[row].max()) if len(self.index) else 0.0
+
+    def nearest(
+        self, sentence_clean: str, k: int, exclude: set[str]
+    ) -> list[tuple[PassageMatch, str]]:
+        """top-k passage ของประโยค (ไม่รวม ``exclude``) คู่กับแหล่ง bundle/canon"""
+
+        row = self.sentence_rows.get(sentence_clean)
+        if row is None:
+            return []
+        indices, values = top_k(self.scores[row : row + 1], k + len(exclude))
+        matches = [
+            (PassageMatch(self.index.passage_ids[column], float(score)), "bundle")
+            for column, score in zip(indices[0], values[0], strict=True)
+        ]
+        if self.canon is not None:
+            matches.extend((match, "canon") for match in self.canon[row])
+        return [
+            (match, source)
+            for match, source in matches
+            if match.passage_id not in exclude
+        ]
+
+
 class DoctrineValidatorAgent(
     BaseAgent[DoctrineValidatorInput, DoctrineValidatorOutput | ErrorResponse]
 ):
@@ -54,17 +136,38 @@ class DoctrineValidatorAgent(
 
     _embedding_model = None
     _embedding_model_failed: bool = False
+    # ติดต่อ/เริ่ม embedding service ไม่ได้แล้ว ไม่ลองซ้ำทุกครั้งที่ขอ model
+    _embedding_service_failed: bool = False
+    _embedding_cache: EmbeddingCache | None = None
+    # LexicalIndex ของชุด passages ล่าสุด (ข้อความเดิมไม่ต้องสร้างใหม่)
+    _lexical_index: (
+        tuple[tuple[tuple[str, ...], tuple[str, ...]], LexicalIndex] | None
+    ) = None
 
     @classmethod
     def _get_embedding_model(cls):
-        if SentenceTransformer is None or cls._embedding_model_failed:
+        if cls._embedding_model_failed:
             return None
 
+        if cls._embedding_model is None and not cls._embedding_service_failed:
+            # ตั้ง EMBEDDING_SERVICE_SOCKET แล้วทุก worker ใช้ model ตัวเดียวในบริการ
+            client = EmbeddingClient.from_env(EMBEDDING_MODEL_NAME)
+            if client is not None:
+                try:
+                    client.ping()
+                    cls._embedding_model = client
+                except (EmbeddingServiceError, OSError) as exc:
+                    cls._embedding_service_failed = True
+                    client.close()
+                    logger.warning(
+                        "ติดต่อ embedding service ไม่ได้ จะโหลด model ใน process: %s",
+                        exc,
+                    )
         if cls._embedding_model is None:
+            if SentenceTransformer is None:
+                return None
             try:
-                cls._embedding_model = SentenceTransformer(
-                    "paraphrase-multilingual-MiniLM-L12-v2"
-                )
+                cls._embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
             except Exception as exc:  # pragma: no cover - fallback for offline env
                 logger.warning(
                     "ไม่สามารถโหลด embedding model จะใช้ lexical similarity แทน: %s",
@@ -74,12 +177,27 @@ class DoctrineValidatorAgent(
                 cls._embedding_model = None
         return cls._embedding_model
 
-    def __init__(self) -> None:
+    @classmethod
+    def embedding_model_name(cls) -> str:
+        """ชื่อ model ที่ให้ embedding จริง (บริการอาจโหลด model อื่นไว้)"""
+
+        model = cls._get_embedding_model()
+        return getattr(model, "model_name", None) or EMBEDDING_MODEL_NAME
+
+    @classmethod
+    def _get_embedding_cache(cls) -> EmbeddingCache:
+        if cls._embedding_cache is None:
+            cls._embedding_cache = EmbeddingCache.from_env(cls.embedding_model_name())
+        return cls._embedding_cache
+
+    def __init__(self, canon_index: PassageIndex | None = None) -> None:
         super().__init__(
             name="DoctrineValidatorAgent",
             version="1.0.0",
             description="ตรวจสอบ doctrinal integrity ของสคริปต์วิดีโอธรรมะ",
         )
+        # ดัชนี embedding ของพระไตรปิฎกทั้งชุด ใช้เสนอ passage นอก research bundle
+        self.canon_index = canon_index
 
     def run(
         self, input_data: DoctrineValidatorInput
@@ -87,6 +205,15 @@ class DoctrineValidatorAgent(
         try:
             logger.info("เริ่มตรวจสอบ doctrinal integrity")
             passage_map = self._build_passage_map(input_data.passages)
+            ignored_indexes = set(input_data.ignore_segments)
+            similarity = self._build_similarity_table(
+                [
+                    segment
+                    for index, segment in enumerate(input_data.script_segments)
+                    if index not in ignored_indexes
+                ],
+                passage_map,
+            )
 
             processed_segments: list[SegmentValidation] = []
             summary_counter = {
@@ -104,8 +231,6 @@ class DoctrineValidatorAgent(
             total_teaching = 0
             teaching_with_citation = 0
 
-            ignored_indexes = set(input_data.ignore_segments)
-
             for index, segment in enumerate(input_data.script_segments):
                 if index in ignored_indexes:
                     continue
@@ -121,6 +246,7 @@ class DoctrineValidatorAgent(
                     passage_map=passage_map,
                     strictness=input_data.strictness,
                     check_sensitive=input_data.check_sensitive,
+                    similarity_table=similarity,
                 )
 
                 if segment_result.status == SegmentStatus.MISSING_CITATION:
@@ -140,11 +266,19 @@ class DoctrineValidatorAgent(
                     1 for warn in segment_result.warnings if "ไม่พบ" in warn
                 )
 
-                if segment_result.suggestions:
+                candidates: list[PassageCandidate] = []
+                if segment_result.status in SUGGEST_STATUSES and similarity is not None:
+                    candidates = self._nearest_candidates(
+                        segment, passage_map, similarity
+                    )
+                if segment_result.suggestions or candidates:
                     rewrite_suggestions.append(
                         RewriteSuggestion(
                             segment_index=index,
-                            suggestion=segment_result.suggestions,
+                            suggestion=self._suggestion_text(
+                                segment_result.suggestions, candidates
+                            ),
+                            candidates=candidates,
                         )
                     )
 
@@ -244,6 +378,7 @@ class DoctrineValidatorAgent(
         passage_map: dict[str, Passage],
         strictness: str,
         check_sensitive: bool,
+        similarity_table: SimilarityTable | None = None,
     ) -> SegmentValidation:
         citations = self._extract_citations(segment.text)
         matched_passages: list[str] = []
@@ -255,11 +390,9 @@ class DoctrineValidatorAgent(
 
         if normalized_type == SegmentType.TEACHING and not citations:
             # ถือว่าเป็น hallucination เสมอเมื่อไม่มี citation เพื่อบังคับให้มีการอ้างอิง
-            best_similarity = 0.0
-            for passage in passage_map.values():
-                similarity = self._compute_similarity(segment.text, passage)
-                if similarity > best_similarity:
-                    best_similarity = similarity
+            best_similarity = self._best_similarity(
+                segment.text, passage_map, similarity_table
+            )
 
             status = SegmentStatus.HALLUCINATION
             detail = "ไม่พบใจความใน passages"
@@ -273,11 +406,9 @@ class DoctrineValidatorAgent(
             warnings.append("segment มีเนื้อหาสอนแต่ไม่มี citation")
         elif not citations:
             # ตรวจจับ hallucination สำหรับประเภทอื่น ๆ เช่นกัน
-            best_similarity = 0.0
-            for passage in passage_map.values():
-                similarity = self._compute_similarity(segment.text, passage)
-                if similarity > best_similarity:
-                    best_similarity = similarity
+            best_similarity = self._best_similarity(
+                segment.text, passage_map, similarity_table
+            )
             if best_similarity < 0.6 and embedding_available:
                 status = SegmentStatus.HALLUCINATION
                 notes = f"ไม่พบใจความใน passages (similarity_max={best_similarity:.2f})"
@@ -312,13 +443,13 @@ class DoctrineValidatorAgent(
                 )
 
             sentence_text = self._extract_sentence_with_citation(segment.text, cit)
-            similarity = self._compute_similarity(sentence_text, passage)
-            similarity_records.append(similarity)
+            score = self._compute_similarity(sentence_text, passage, similarity_table)
+            similarity_records.append(score)
             matched_passages.append(cit)
 
-            if similarity < 0.6:
+            if score < 0.6:
                 status = SegmentStatus.MISMATCH
-            elif similarity < 0.78 and status not in {
+            elif score < 0.78 and status not in {
                 SegmentStatus.MISMATCH,
                 SegmentStatus.MISSING_CITATION,
             }:
@@ -352,6 +483,117 @@ class DoctrineValidatorAgent(
             suggestions=suggestions,
         )
 
+    def _best_similarity(
+        self,
+        text: str,
+        passage_map: dict[str, Passage],
+        similarity_table: SimilarityTable | None,
+    ) -> float:
+        if similarity_table is not None:
+            best = similarity_table.best(self._normalize(text))
+            if best is not None:
+                return best
+        best_similarity = 0.0
+        for passage in passage_map.values():
+            similarity = self._compute_similarity(text, passage, similarity_table)
+            if similarity > best_similarity:
+                best_similarity = similarity
+        return best_similarity
+
+    def _nearest_candidates(
+        self,
+        segment: ScriptSegment,
+        passage_map: dict[str, Passage],
+        similarity_table: SimilarityTable,
+    ) -> list[PassageCandidate]:
+        """passage ที่ใจความใกล้ segment ที่สุด ไม่รวม passage ที่อ้างอยู่แล้ว"""
+
+        citations = self._extract_citations(segment.text)
+        sentences = [
+            self._extract_sentence_with_citation(segment.text, cit) for cit in citations
+        ] or [segment.text]
+        exclude = set(citations)
+        best: dict[str, tuple[float, str]] = {}
+        for sentence in sentences:
+            for match, source in similarity_table.nearest(
+                self._normalize(sentence), NEAREST_PASSAGES_K, exclude
+            ):
+                if match.score < SUGGEST_MIN_SIMILARITY:
+                    continue
+                previous = best.get(match.passage_id)
+                if previous is None or match.score > previous[0]:
+                    best[match.passage_id] = (match.score, source)
+
+        ranked = sorted(best.items(), key=lambda item: item[1][0], reverse=True)
+        candidates: list[PassageCandidate] = []
+        for passage_id, (score, source) in ranked[:NEAREST_PASSAGES_K]:
+            if passage_id in passage_map:
+                source = "bundle"
+                canonical_ref = passage_map[passage_id].canonical_ref
+            else:
+                canonical_ref = self.canon_index.canonical_refs.get(passage_id)
+            candidates.append(
+                PassageCandidate(
+                    passage_id=passage_id,
+                    similarity=round(score, 4),
+                    canonical_ref=canonical_ref,
+                    source=source,
+                )
+            )
+        return candidates
+
+    def _suggestion_text(
+        self, suggestion: str | None, candidates: list[PassageCandidate]
+    ) -> str:
+        if not candidates:
+            return suggestion or ""
+        top = candidates[0]
+        reference = f" ({top.canonical_ref})" if top.canonical_ref else ""
+        hint = (
+            f"ใจความใกล้เคียง [CIT:{top.passage_id}]{reference} "
+            f"similarity={top.similarity:.2f}"
+        )
+        if top.source == "canon":
+            hint += " จากดัชนีพระไตรปิฎก (ต้องเพิ่มเข้า passages ก่อนอ้าง)"
+        return f"{suggestion}: {hint}" if suggestion else f"พิจารณาอ้างอิง {hint}"
+
+    def build_canon_index(self, passages: Iterable[Passage]) -> PassageIndex | None:
+        """
+        สร้างดัชนี embedding ของ passage ชุดใหญ่ (เช่นพระไตรปิฎกทั้งชุด)
+
+        บันทึกด้วย ``PassageIndex.save`` แล้วโหลดกลับมาส่งให้ agent ได้ คืน None
+        เมื่อไม่มี embedding model
+        """
+
+        if self._get_embedding_model() is None:
+            return None
+        row_passage_ids, row_texts, refs = self._passage_rows(passages)
+        texts = list(dict.fromkeys(row_texts))
+        _, vectors = self._encode_batch([], texts)
+        position = {text: row for row, text in enumerate(texts)}
+        return PassageIndex(
+            row_passage_ids,
+            vectors[[position[text] for text in row_texts]],
+            model_name=self.embedding_model_name(),
+            canonical_refs=refs,
+        )
+
+    def _passage_rows(
+        self, passages: Iterable[Passage]
+    ) -> tuple[list[str], list[str], dict[str, str]]:
+        row_passage_ids: list[str] = []
+        row_texts: list[str] = []
+        refs: dict[str, str] = {}
+        for passage in passages:
+            if passage.canonical_ref:
+                refs[passage.id] = passage.canonical_ref
+            for target in (passage.original_text, passage.thai_modernized):
+                clean = self._normalize(target or "")
+                if clean:
+                    row_passage_ids.append(passage.id)
+                    row_texts.append(clean)
+        return row_passage_ids, row_texts, refs
+
     def _extract_citations(self, text: str) -> list[str]:
         citations: list[str] = []
         for raw in CITATION_PATTERN.findall(text):
@@ -386,7 +628,128 @@ class DoctrineValidatorAgent(
                 return pos + 1
         return length
 
-    def _compute_similarity(self, sentence: str, passage: Passage) -> float:
+    def _build_similarity_table(
+        self, segments: Sequence[ScriptSegment], passage_map: dict[str, Passage]
+    ) -> SimilarityTable | None:
+        """
+        เตรียม similarity ของทุกประโยคกับทุก passage ด้วย encode และผลคูณเมทริกซ์ครั้งเดียว
+
+        ไม่มี embedding model จะใช้ LexicalIndex (cosine ของ tf ของคำที่ตัดแล้ว) แทน
+        ซึ่งให้คะแนนเท่ากับ ``_lexical_similarity`` ที่ใช้เมื่อเทียบทีละคู่
+        """
+
+        model = self._get_embedding_model()
+        canon_index = self.canon_index if model is not None else None
+        if not passage_map and canon_index is None:
+            return None
+
+        sentence_rows: dict[str, int] = {}
+        for segment in segments:
+            texts = [
+                self._extract_sentence_with_citation(segment.text, cit)
+                for cit in self._extract_citations(segment.text)
+            ] or [segment.text]
+            for text in texts:
+                clean = self._normalize(text)
+                if clean:
+                    sentence_rows.setdefault(clean, len(sentence_rows))
+        if not sentence_rows:
+            return None
+
+        row_passage_ids, row_texts, _ = self._passage_rows(passage_map.values())
+        if model is None:
+            lexical = self._get_lexical_index(row_passage_ids, row_texts)
+            return SimilarityTable(
+                sentence_rows,
+                lexical,
+                lexical.scores(list(sentence_rows)),
+                known_passages=passage_map,
+            )
+
+        texts = list(dict.fromkeys(row_texts))
+        sentence_vectors, target_vectors = self._encode_batch(
+            list(sentence_rows), texts
+        )
+        position = {text: row for row, text in enumerate(texts)}
+        index = PassageIndex(
+            row_passage_ids, target_vectors[[position[text] for text in row_texts]]
+        )
+
+        canon = None
+        if canon_index is not None and len(canon_index):
+            canon = canon_index.search(
+                sentence_vectors,
+                NEAREST_PASSAGES_K,
+                min_score=SUGGEST_MIN_SIMILARITY,
+            )
+        return SimilarityTable(
+            sentence_rows,
+            index,
+            index.scores(sentence_vectors),
+            known_passages=passage_map,
+            canon=canon,
+        )
+
+    @classmethod
+    def _get_lexical_index(
+        cls, row_passage_ids: list[str], row_texts: list[str]
+    ) -> LexicalIndex:
+        key = (tuple(row_passage_ids), tuple(row_texts))
+        if cls._lexical_index is None or cls._lexical_index[0] != key:
+            cls._lexical_index = (key, LexicalIndex(row_passage_ids, row_texts))
+        return cls._lexical_index[1]
+
+    def _encode_batch(
+        self, sentences: list[str], passages: list[str]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        encode ประโยคและข้อความ passage ใน model.encode ครั้งเดียว
+
+        embedding ของ passage อ่าน/เก็บใน EmbeddingCache ที่ใช้ร่วมทุกรอบ ถ้า cache
+        ใช้ไม่ได้ก็ encode ทั้งหมดโดยไม่ทำให้การตรวจล้ม
+        """
+
+        model = self._get_embedding_model()
+        cache: EmbeddingCache | None = self._get_embedding_cache()
+        cached: dict[str, np.ndarray] = {}
+        try:
+            cached = cache.get_many(passages)
+        except (OSError, sqlite3.Error, ValueError) as exc:
+            logger.warning("อ่าน embedding cache ไม่ได้: %s", exc)
+            cache = None
+
+        missing = [text for text in passages if text not in cached]
+        pending = sentences + missing
+        if pending:
+            encoded = np.asarray(model.encode(pending), dtype=np.float32)
+        else:
+            dim = len(next(iter(cached.values()))) if cached else 0
+            encoded = np.empty((0, dim), dtype=np.float32)
+        sentence_vectors = encoded[: len(sentences)]
+        fresh = encoded[len(sentences) :]
+        if cache is not None and missing:
+            try:
+                cache.put_many(missing, fresh)
+            except (OSError, sqlite3.Error, ValueError) as exc:
+                logger.warning("บันทึก embedding cache ไม่ได้: %s", exc)
+
+        fresh_rows = {text: row for row, text in enumerate(missing)}
+        if not passages:
+            return sentence_vectors, encoded[:0]
+        target_vectors = np.stack(
+            [
+                cached[text] if text in cached else fresh[fresh_rows[text]]
+                for text in passages
+            ]
+        )
+        return sentence_vectors, target_vectors
+
+    def _compute_similarity(
+        self,
+        sentence: str,
+        passage: Passage,
+        similarity: SimilarityTable | None = None,
+    ) -> float:
         target_texts = [passage.original_text]
         if passage.thai_modernized:
             target_texts.append(passage.thai_modernized)
@@ -396,6 +759,11 @@ class DoctrineValidatorAgent(
         if not sentence_clean:
             return 0.0
 
+        if similarity is not None:
+            score = similarity.get(sentence_clean, passage.id)
+            if score is not None:
+                return score
+
         best_score = 0.0
         if model is None:
             for target in target_texts:
@@ -417,22 +785,9 @@ class DoctrineValidatorAgent(
         return float(best_score)
 
     def _lexical_similarity(self, source: str, target: str) -> float:
-        """Compute cosine similarity based on token frequency."""
+        """Compute cosine similarity of Thai-segmented term frequencies."""
 
-        source_counter = Counter(source.split())
-        target_counter = Counter(target.split())
-        if not source_counter or not target_counter:
-            return 0.0
-
-        intersection = set(source_counter) & set(target_counter)
-        numerator = sum(
-            source_counter[token] * target_counter[token] for token in intersection
-        )
-        source_norm = math.sqrt(sum(value * value for value in source_counter.values()))
-        target_norm = math.sqrt(sum(value * value for value in target_counter.values()))
-        if source_norm == 0 or target_norm == 0:
-            return 0.0
-        return numerator / (source_norm * target_norm)
+        return cosine_similarity(source, target)
 
     @staticmethod
     def _cosine(vec_a: np.ndarray, vec_b: np.ndarray) -> float:
@@ -0,0 +1,152 @@
+"""
+lexical similarity (cosine ของ sublinear tf) สำหรับโหมดที่ไม่มี embedding model
+
+ข้อความถูกตัดคำด้วย ThaiTokenizer (maximal matching) แล้วเก็บเป็นเวกเตอร์ sparse
+ต่อแถวข้อความ passage พร้อม inverted index ของแต่ละคำ คะแนนของทุกประโยคกับทุก
+passage คำนวณในครั้งเดียวด้วย ``np.bincount`` บนรายการ posting ของคำในประโยค
+แล้วรวมระดับ passage ด้วยค่าสูงสุดแบบเดียวกับ PassageIndex
+
+LexicalIndex กับ ``cosine_similarity`` ใช้มาตรวัดเดียวกัน ตัด idf ออกโดยตั้งใจ เพราะ idf
+คำนวณจาก passages ทั้ง bundle คะแนนของคู่เดิมจะเปลี่ยนตาม passage อื่นที่อยู่ในรอบนั้น
+และการเทียบทีละคู่ (ไม่มี bundle) จะได้ค่าต่างจากตาราง เมื่อไม่มี idf คะแนนของคู่หนึ่ง
+จึงคงที่และเทียบกับ threshold ชุดเดียวกันได้ทั้งสองทาง (ความสอดคล้องกับ embedding
+วัดได้ด้วย ``scripts/benchmark_lexical_similarity.py``)
+"""
+
+from __future__ import annotations
+
+import math
+from collections import Counter
+from collections.abc import Sequence
+
+import numpy as np
+
+from automation_core.thai_tokenizer import ThaiTokenizer, default_tokenizer
+
+_TERM_CACHE_LIMIT = 100_000
+_term_cache: dict[str, Counter[str]] = {}
+
+
+def term_counts(text: str, tokenizer: ThaiTokenizer | None = None) -> Counter[str]:
+    """จำนวนครั้งของแต่ละคำในข้อความ (ผลของตัวตัดคำเริ่มต้นถูก cache ตามข้อความ)"""
+
+    if tokenizer is not None:
+        return Counter(tokenizer.tokenize(text))
+    counts = _term_cache.get(text)
+    if counts is None:
+        counts = Counter(default_tokenizer().tokenize(text))
+        if len(_term_cache) >= _TERM_CACHE_LIMIT:
+            _term_cache.clear()
+        _term_cache[text] = counts
+    return counts
+
+
+def _tf(count: int) -> float:
+    # sublinear tf: คำซ้ำหลายครั้งไม่ครอบงำคะแนน
+    return 1.0 + math.log(count)
+
+
+def cosine_similarity(source: str, target: str) -> float:
+    """cosine ของ tf ระหว่างสองข้อความ (ใช้เมื่อเทียบทีละคู่)"""
+
+    source_counts = term_counts(source)
+    target_counts = term_counts(target)
+    if not source_counts or not target_counts:
+        return 0.0
+    numerator = sum(
+        _tf(count) * _tf(target_counts[term])
+        for term, count in source_counts.items()
+        if term in target_counts
+    )
+    source_norm = math.sqrt(sum(_tf(c) ** 2 for c in source_counts.values()))
+    target_norm = math.sqrt(sum(_tf(c) ** 2 for c in target_counts.values()))
+    return min(1.0, numerator / (source_norm * target_norm))
+
+
+class LexicalIndex:
+    """เวกเตอร์ tf (normalize แล้ว) ของข้อความ passage จัดกลุ่มตาม passage"""
+
+    def __init__(
+        self, row_passage_ids: Sequence[str], row_texts: Sequence[str]
+    ) -> None:
+        if len(row_passage_ids) != len(row_texts):
+            raise ValueError("row_passage_ids and row_texts must have the same length")
+        groups: dict[str, int] = {}
+        for passage_id in row_passage_ids:
+            groups.setdefault(passage_id, len(groups))
+        order = sorted(
+            range(len(row_texts)), key=lambda row: groups[row_passage_ids[row]]
+        )
+        counts = np.bincount(
+            [groups[pid] for pid in row_passage_ids], minlength=len(groups)
+        )
+        self.passage_ids = list(groups)
+        self.starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+        self._columns = groups
+        self.rows = len(row_texts)
+
+        vocabulary: dict[str, int] = {}
+        term_ids: list[int] = []
+        tf: list[float] = []
+        entry_rows: list[int] = []
+        for row, source_row in enumerate(order):
+            for term, count in term_counts(row_texts[source_row]).items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                tf.append(_tf(count))
+                entry_rows.append(row)
+        self.vocabulary = vocabulary
+
+        indices = np.asarray(term_ids, dtype=np.int64)
+        rows = np.asarray(entry_rows, dtype=np.int64)
+        document_frequency = np.bincount(indices, minlength=len(vocabulary))
+        weights = np.asarray(tf, dtype=np.float64)
+        norms = np.sqrt(np.bincount(rows, weights=weights**2, minlength=self.rows))
+        weights /= np.where(norms > 0, norms, 1.0)[rows]
+
+        by_term = np.argsort(indices, kind="stable")
+        self._posting_rows = rows[by_term]
+        self._posting_weights = weights[by_term]
+        self._posting_ptr = np.concatenate(([0], np.cumsum(document_frequency)))
+
+    def __len__(self) -> int:
+        return len(self.passage_ids)
+
+    def column(self, passage_id: str) -> int | None:
+        return self._columns.get(passage_id)
+
+    def scores(self, queries: Sequence[str]) -> np.ndarray:
+        """คะแนนระดับ passage ของทุกประโยค รูป (จำนวนประโยค, จำนวน passage)"""
+
+        if not len(self) or not queries:
+            return np.zeros((len(queries), len(self)), dtype=np.float32)
+        flat_rows: list[np.ndarray] = []
+        flat_weights: list[np.ndarray] = []
+        for query_row, query in enumerate(queries):
+            terms = [
+                (self.vocabulary.get(term), _tf(count))
+                for term, count in term_counts(query).items()
+            ]
+            # คำที่ไม่มีใน passage ใดยังนับใน norm ของประโยคเหมือน cosine_similarity
+            norm = math.sqrt(sum(tf * tf for _, tf in terms))
+            if norm == 0:
+                continue
+            offset = query_row * self.rows
+            for term_id, weight in terms:
+                if term_id is None:
+                    continue
+                start, end = self._posting_ptr[term_id], self._posting_ptr[term_id + 1]
+                flat_rows.append(self._posting_rows[start:end] + offset)
+                flat_weights.append(self._posting_weights[start:end] * (weight / norm))
+
+        total = len(queries) * self.rows
+        if flat_rows:
+            row_scores = np.bincount(
+                np.concatenate(flat_rows),
+                weights=np.concatenate(flat_weights),
+                minlength=total,
+            )
+        else:
+            row_scores = np.zeros(total)
+        row_scores = row_scores.reshape(len(queries), self.rows).astype(np.float32)
+        passage_scores = np.maximum.reduceat(row_scores, self.starts, axis=1)
+        return np.clip(passage_scores, 0.0, 1.0, out=passage_scores)
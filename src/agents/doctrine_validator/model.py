@@ -142,11 +142,23 @@ class Summary(BaseModel):
     recommend_rewrite: bool
 
 
+class PassageCandidate(BaseModel):
+    """passage ที่ใจความใกล้กับ segment (จากการค้นหาแบบ embedding)"""
+
+    passage_id: str
+    similarity: float
+    canonical_ref: str | None = None
+    source: Literal["bundle", "canon"] = "bundle"
+
+
 class RewriteSuggestion(BaseModel):
     """คำแนะนำการปรับปรุง"""
 
     segment_index: int
     suggestion: str
+    candidates: list[PassageCandidate] = Field(
+        default_factory=list, description="passage ที่ควรพิจารณาอ้างอิงแทน"
+    )
 
 
 class SelfCheck(BaseModel):
@@ -0,0 +1,152 @@
+"""
+ค้นหา passage ที่ใกล้ที่สุดของทุกประโยคด้วยผลคูณเมทริกซ์ครั้งเดียว
+
+passage หนึ่งมีได้หลายข้อความ (ต้นฉบับ/ภาษาปัจจุบัน) จึงเก็บเป็นแถวที่ติดกัน
+คะแนนของ passage คือ cosine สูงสุดของแถวเหล่านั้น (``np.maximum.reduceat``)
+แล้วเลือก top-k ด้วย ``argpartition`` ไม่ต้องเรียงทั้งแถว ใช้ได้กับ passages
+ใน research bundle และกับดัชนีพระไตรปิฎกทั้งชุดที่บันทึกไว้เป็นไฟล์ ``.npz``
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+# จำนวนช่องของเมทริกซ์คะแนนต่อก้อน (~64 MB float32) กันหน่วยความจำพุ่งเมื่อ
+# ค้นหาหลายประโยคกับดัชนีขนาดใหญ่
+SCORE_BLOCK_ELEMENTS = 1 << 24
+
+
+@dataclass(frozen=True)
+class PassageMatch:
+    """passage ที่ใกล้เคียงกับประโยค"""
+
+    passage_id: str
+    score: float
+
+
+def unit_rows(matrix: np.ndarray) -> np.ndarray:
+    """normalize แต่ละแถวให้ยาว 1 (แถวศูนย์คงเป็นศูนย์)"""
+
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """คืน (ดัชนีคอลัมน์, คะแนน) ของ k อันดับแรกในแต่ละแถว เรียงจากมากไปน้อย"""
+
+    rows, columns = scores.shape
+    k = max(0, min(k, columns))
+    if k == 0:
+        return np.empty((rows, 0), dtype=np.int64), np.empty((rows, 0), scores.dtype)
+    if k < columns:
+        picked = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        picked = np.broadcast_to(np.arange(columns), (rows, columns))
+    values = np.take_along_axis(scores, picked, axis=1)
+    order = np.argsort(-values, axis=1, kind="stable")
+    return (
+        np.take_along_axis(picked, order, axis=1),
+        np.take_along_axis(values, order, axis=1),
+    )
+
+
+class PassageIndex:
+    """เมทริกซ์ embedding ของข้อความ passage ที่จัดกลุ่มตาม passage"""
+
+    def __init__(
+        self,
+        row_passage_ids: Sequence[str],
+        vectors: np.ndarray,
+        *,
+        model_name: str | None = None,
+        canonical_refs: Mapping[str, str] | None = None,
+    ) -> None:
+        vectors = unit_rows(vectors)
+        if vectors.ndim != 2 or vectors.shape[0] != len(row_passage_ids):
+            raise ValueError("vectors must have one row per passage text")
+        groups: dict[str, int] = {}
+        for passage_id in row_passage_ids:
+            groups.setdefault(passage_id, len(groups))
+        group_of_row = np.fromiter(
+            (groups[pid] for pid in row_passage_ids), np.int64, len(row_passage_ids)
+        )
+        order = np.argsort(group_of_row, kind="stable")
+        counts = np.bincount(group_of_row, minlength=len(groups))
+
+        self.passage_ids = list(groups)
+        self.vectors = np.ascontiguousarray(vectors[order])
+        self.starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+        self.model_name = model_name
+        self.canonical_refs = dict(canonical_refs or {})
+        self._columns = groups
+
+    def __len__(self) -> int:
+        return len(self.passage_ids)
+
+    def column(self, passage_id: str) -> int | None:
+        return self._columns.get(passage_id)
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """คะแนนระดับ passage ของทุกประโยค รูป (จำนวนประโยค, จำนวน passage) ไม่ต่ำกว่า 0"""
+
+        queries = unit_rows(queries)
+        if not len(self) or not len(queries):
+            return np.zeros((len(queries), len(self)), dtype=np.float32)
+        passage_scores = np.maximum.reduceat(
+            queries @ self.vectors.T, self.starts, axis=1
+        )
+        return np.maximum(passage_scores, 0.0, out=passage_scores)
+
+    def search(
+        self, queries: np.ndarray, k: int = 3, *, min_score: float = 0.0
+    ) -> list[list[PassageMatch]]:
+        """top-k passage ของแต่ละประโยค คำนวณทีละก้อนของประโยค"""
+
+        queries = unit_rows(queries)
+        step = max(1, SCORE_BLOCK_ELEMENTS // max(1, self.vectors.shape[0]))
+        results: list[list[PassageMatch]] = []
+        for start in range(0, len(queries), step):
+            indices, values = top_k(self.scores(queries[start : start + step]), k)
+            for row_indices, row_values in zip(indices, values, strict=True):
+                results.append(
+                    [
+                        PassageMatch(self.passage_ids[column], float(score))
+                        for column, score in zip(row_indices, row_values, strict=True)
+                        if score >= min_score
+                    ]
+                )
+        return results
+
+    def save(self, path: Path | str) -> None:
+        counts = np.diff(np.append(self.starts, self.vectors.shape[0]))
+        np.savez(
+            path,
+            row_passage_ids=np.repeat(np.array(self.passage_ids, dtype=str), counts),
+            vectors=self.vectors,
+            meta=np.array(
+                json.dumps(
+                    {
+                        "model_name": self.model_name,
+                        "canonical_refs": self.canonical_refs,
+                    },
+                    ensure_ascii=False,
+                )
+            ),
+        )
+
+    @classmethod
+    def load(cls, path: Path | str) -> PassageIndex:
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(
+                data["row_passage_ids"].tolist(),
+                data["vectors"],
+                model_name=meta.get("model_name"),
+                canonical_refs=meta.get("canonical_refs"),
+            )
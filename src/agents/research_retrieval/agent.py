@@ -2,12 +2,22 @@
 Research Retrieval Agent - ดึงและวิเคราะห์ข้อความอ้างอิงสำหรับคอนเทนต์ธรรมะ
 """
 
-import random
+import logging
+import os
+import sqlite3
 from datetime import datetime
+from pathlib import Path
 from typing import Any
 
 from automation_core.base_agent import BaseAgent
+from automation_core.embedding_service import (
+    DEFAULT_MODEL_NAME,
+    EmbeddingClient,
+    EmbeddingServiceError,
+)
+from automation_core.result_cache import ResultCache
 
+from .corpus_index import DEFAULT_CORPUS_DIR, CorpusIndex
 from .model import (
     CoverageAssessment,
     ErrorResponse,
@@ -20,13 +30,23 @@ from .model import (
     SelfCheck,
 )
 
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_ENTRIES = 256
+QUERY_CACHE_TTL_SECONDS = 6 * 3600
+
 
 class ResearchRetrievalAgent(
     BaseAgent[ResearchRetrievalInput, ResearchRetrievalOutput]
 ):
     """Agent สำหรับค้นหาและดึงข้อความอ้างอิงจากคลังธรรมะ"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        index: CorpusIndex | None = None,
+        corpus_dir: Path | None = None,
+        cache: ResultCache | None = None,
+    ):
         super().__init__(
             name="ResearchRetrievalAgent",
             version="1.0.0",
@@ -41,6 +61,18 @@ class ResearchRetrievalAgent(
             "recency_decay": 0.10,
         }
 
+        # ดัชนีคลังธรรมะ (None = เปิดจาก CORPUS_INDEX_DIR เมื่อค้นครั้งแรก)
+        self.index = index
+        self.corpus_dir = corpus_dir or Path(
+            os.environ.get("RESEARCH_CORPUS_DIR") or DEFAULT_CORPUS_DIR
+        )
+        # ผลค้นคืน + จัดอันดับ ตามคำค้นที่ normalize แล้วและ version ของดัชนี
+        self.cache = cache or ResultCache.from_env(
+            "research_retrieval",
+            max_entries=QUERY_CACHE_ENTRIES,
+            ttl_seconds=QUERY_CACHE_TTL_SECONDS,
+        )
+
         # คำธรรมะสำคัญที่ไม่ควรตัดออก
         self.dhamma_keywords = [
             "สติ",
@@ -77,12 +109,9 @@ class ResearchRetrievalAgent(
             # 1. สร้าง queries จากข้อมูลนำเข้า
             queries = self._generate_queries(input_data)
 
-            # 2. ค้นหาและรวบรวม passages (จำลอง)
-            all_passages = self._simulate_search(input_data, queries)
-
-            # 3. จัดอันดับและแยกประเภท
-            primary, supportive = self._categorize_passages(
-                all_passages, input_data.max_passages
+            # 2-3. ค้นหาจากดัชนีคลังธรรมะ จัดอันดับและแยกประเภท (หรือใช้ผลใน cache)
+            all_passages, primary, supportive, cache_hit = self._retrieve(
+                input_data, queries
             )
 
             # 4. สร้าง summary bullets
@@ -93,7 +122,9 @@ class ResearchRetrievalAgent(
 
             # 6. สร้าง stats และ metadata
             stats = self._calculate_stats(all_passages, primary, supportive)
-            meta = self._create_meta_info(input_data, primary, supportive)
+            meta = self._create_meta_info(
+                input_data, primary, supportive, cache_hit=cache_hit
+            )
 
             # 7. สร้าง warnings
             warnings = self._generate_warnings(coverage, primary, supportive)
@@ -164,112 +195,100 @@ class ResearchRetrievalAgent(
 
         return " ".join(filtered_words)
 
-    def _simulate_search(
-        self, input_data: ResearchRetrievalInput, queries: list[QueryUsed]
-    ) -> list[dict[str, Any]]:
-        """จำลองการค้นหาจาก vector store (ในระบบจริงจะเรียก API)"""
-        # สำหรับ demo ใช้ mock data
-        random.seed(42)  # สำหรับผลลัพธ์ที่ tutorialistic
-
-        mock_passages = []
-
-        # สร้าง mock passages ตาม topic
-        topic_lower = input_data.topic_title.lower()
-
-        if "นอน" in topic_lower or "หลับ" in topic_lower:
-            mock_passages.extend(self._create_sleep_related_passages())
-        if "เครียด" in topic_lower or "กังวล" in topic_lower:
-            mock_passages.extend(self._create_stress_related_passages())
-
-        # เพิ่ม passages ทั่วไป
-        mock_passages.extend(self._create_general_passages())
-
-        # คำนวณ relevance scores
-        for passage in mock_passages:
-            passage["relevance_final"] = self._calculate_relevance(passage, input_data)
-
-        # กรองตาม required_tags
-        if input_data.required_tags:
-            tagged_passages = [
-                p
-                for p in mock_passages
-                if any(
-                    tag in p.get("doctrinal_tags", [])
-                    for tag in input_data.required_tags
-                )
-            ]
-            # ถ้าไม่พบ passages ที่ตรงกับ required_tags ใช้ผลลัพธ์ทั้งหมด
-            if tagged_passages:
-                mock_passages = tagged_passages
+    def _get_index(self) -> CorpusIndex:
+        """เปิดดัชนีและนำไฟล์คลังที่เพิ่ม/แก้ไขเข้าดัชนี (ไฟล์เดิมไม่ถูกอ่านซ้ำ)"""
+        if self.index is None:
+            encoder = EmbeddingClient.from_env(DEFAULT_MODEL_NAME)
+            if encoder is not None:
+                try:
+                    encoder.ping()
+                except (EmbeddingServiceError, OSError) as exc:
+                    logger.warning("ไม่ใช้ embedding ในการค้นคลัง: %s", exc)
+                    encoder = None
+            self.index = CorpusIndex.from_env(encoder)
+        try:
+            self.index.sync(self.corpus_dir)
+        except (OSError, sqlite3.Error, ValueError) as exc:
+            logger.warning("อัปเดตดัชนีคลังธรรมะไม่ได้ ใช้ดัชนีเดิม: %s", exc)
+        return self.index
 
-        # จัดเรียงตาม relevance และจำกัดจำนวน
-        mock_passages.sort(key=lambda x: x["relevance_final"], reverse=True)
-        return mock_passages[: int(input_data.max_passages * 1.4)]
+    def _retrieve(
+        self, input_data: ResearchRetrievalInput, queries: list[QueryUsed]
+    ) -> tuple[list[dict[str, Any]], list[Passage], list[Passage], bool]:
+        """
+        ค้นและแยก primary/supportive โดยใช้ผลเดิมเมื่อคำค้นหลัง normalize ตรงกัน
+
+        key ของ cache คือคำค้นทั้งหมด (normalize แล้ว) แท็กที่ต้องมี แหล่งที่ห้ามใช้
+        จำนวน passages และ version ของดัชนี ดัชนีเปลี่ยนเมื่อใดผลเก่าก็ไม่ถูกใช้
+        ชื่อหัวข้อไม่ใช้ในการค้น หัวข้อต่างกันที่คำค้นเดียวกันจึงใช้ผลร่วมกันได้
+        """
+        index = self._get_index()
+        search_queries = [query.query for query in queries]
+        key = ResultCache.key(
+            search_queries,
+            sorted(input_data.required_tags),
+            sorted(input_data.forbidden_sources),
+            input_data.max_passages,
+            index.version,
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            return (
+                cached["candidates"],
+                [Passage(**p) for p in cached["primary"]],
+                [Passage(**p) for p in cached["supportive"]],
+                True,
+            )
 
-    def _create_sleep_related_passages(self) -> list[dict[str, Any]]:
-        """สร้าง mock passages เกี่ยวกับการนอนหลับ"""
-        return [
-            {
-                "id": "sleep_01",
-                "source_name": "มหาปริณิพพานสูตร",
-                "collection": "canon",
-                "canonical_ref": "DN 16",
-                "original_text": "ภิกษุทั้งหลาย เมื่อใดที่ภิกษุมีสติสัมปชัญญะ ผู้นั้นมีความสุข มีความสงบ การพักผ่อนของผู้นั้นเป็นการพักผ่อนที่แท้จริง",
-                "doctrinal_tags": ["สติ", "สัมปชัญญะ", "ความสงบ"],
-                "license": "public_domain",
-                "reason": "เน้นการมีสติก่อนพักผ่อน",
-            },
+        all_passages = self._search_corpus(input_data, search_queries, index)
+        primary, supportive = self._categorize_passages(
+            all_passages, input_data.max_passages
+        )
+        self.cache.put(
+            key,
             {
-                "id": "sleep_02",
-                "source_name": "มหาสติปัฏฐานสูตร",
-                "collection": "canon",
-                "canonical_ref": "DN 22",
-                "original_text": "ภิกษุทั้งหลาย ภิกษุย่อมรู้แจ้งว่า กำลังหายใจเข้า กำลังหายใจออก เมื่อใจสงบแล้ว ร่างกายก็สงบตาม",
-                "doctrinal_tags": ["อานาปานสติ", "สติ", "ความสงบ"],
-                "license": "public_domain",
-                "reason": "วิธีใช้ลมหายใจเพื่อความสงบ",
+                "candidates": all_passages,
+                "primary": [p.model_dump() for p in primary],
+                "supportive": [p.model_dump() for p in supportive],
             },
-        ]
+        )
+        return all_passages, primary, supportive, False
 
-    def _create_stress_related_passages(self) -> list[dict[str, Any]]:
-        """สร้าง mock passages เกี่ยวกับความเครียด"""
-        return [
-            {
-                "id": "stress_01",
-                "source_name": "ธัมมจักกัปปวัตตนสูตร",
-                "collection": "canon",
-                "canonical_ref": "SN 56.11",
-                "original_text": "นี้คือทุกข์ นี้คือสมุทัยของทุกข์ นี้คือนิโรธของทุกข์ นี้คือมรรคที่นำไปสู่นิโรธทุกข์",
-                "doctrinal_tags": ["อริยสัจ", "ทุกข์", "นิโรธ"],
-                "license": "public_domain",
-                "reason": "หลักพื้นฐานของการเข้าใจและจัดการความทุกข์",
-            },
-        ]
+    def _search_corpus(
+        self,
+        input_data: ResearchRetrievalInput,
+        queries: list[str],
+        index: CorpusIndex,
+    ) -> list[dict[str, Any]]:
+        """ค้น passages จากดัชนี hybrid (BM25 + embedding) ของคลังธรรมะในเครื่อง"""
+        hits = index.search(
+            queries,
+            int(input_data.max_passages * 1.4),
+            required_tags=input_data.required_tags,
+        )
 
-    def _create_general_passages(self) -> list[dict[str, Any]]:
-        """สร้าง mock passages ทั่วไป"""
-        return [
-            {
-                "id": "general_01",
-                "source_name": "บทความ: ปล่อยวางในชีวิตประจำวัน",
-                "collection": "modern_article",
-                "canonical_ref": None,
-                "original_text": "การปล่อยวางไม่ใช่การยอมแพ้ แต่เป็นการเข้าใจว่าสิ่งต่างๆ มีการเปลี่ยนแปลงอยู่เสมอ เมื่อเราไม่ยึดติด ใจก็จะเบาและสงบ",
-                "doctrinal_tags": ["ปล่อยวาง", "อนิจจัง"],
-                "license": "public_domain",
-                "reason": "ตัวอย่างเชิงปฏิบัติ",
-            },
-        ]
+        passages = []
+        forbidden = set(input_data.forbidden_sources)
+        for hit in hits:
+            passage = dict(hit.passage)
+            if passage.get("source_name") in forbidden:
+                continue
+            passage["semantic_sim"] = hit.score
+            passage["relevance_final"] = self._calculate_relevance(passage, input_data)
+            passages.append(passage)
+
+        passages.sort(key=lambda x: x["relevance_final"], reverse=True)
+        return passages
 
     def _calculate_relevance(
         self, passage: dict[str, Any], input_data: ResearchRetrievalInput
     ) -> float:
         """คำนวณคะแนนความเกี่ยวข้อง"""
-        # Semantic similarity (mock)
-        semantic_sim = random.uniform(0.4, 0.9)
+        # Semantic similarity จากคะแนนค้นคืนของดัชนี (0-1)
+        semantic_sim = passage.get("semantic_sim", 0.0)
 
-        # Keyword boost
-        query_words = input_data.raw_query.lower().split()
+        # Keyword boost (คำค้นหลัง normalize เพื่อให้ผลขึ้นกับ key ของ cache เท่านั้น)
+        query_words = self._normalize_query(input_data.raw_query).split()
         text_words = passage["original_text"].lower().split()
         keyword_matches = sum(1 for word in query_words if word in text_words)
         keyword_boost = (
@@ -336,7 +355,7 @@ class ResearchRetrievalAgent(
                 license=passage_data.get("license", "public_domain"),
                 risk_flags=passage_data.get("risk_flags", []),
                 reason=passage_data.get("reason", "เกี่ยวข้องกับหัวข้อ"),
-                position_score=random.uniform(0.3, 0.9),
+                position_score=passage_data.get("position_score"),
             )
 
             if is_primary and len(primary_passages) < primary_limit:
@@ -471,6 +490,7 @@ class ResearchRetrievalAgent(
         input_data: ResearchRetrievalInput,
         primary: list[Passage],
         supportive: list[Passage],
+        cache_hit: bool = False,
     ) -> MetaInfo:
         """สร้างข้อมูล metadata"""
         applied_filters = []
@@ -492,6 +512,7 @@ class ResearchRetrievalAgent(
             applied_filters=applied_filters,
             refinement_iterations=len(input_data.refinement_hints) + 1,
             self_check=self_check,
+            cache_hit=cache_hit,
         )
 
     def _generate_warnings(
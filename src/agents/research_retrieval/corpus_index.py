@@ -0,0 +1,848 @@
+"""
+ดัชนีคลังธรรมะในเครื่องแบบ hybrid (BM25 + embedding) สำหรับ ResearchRetrieval
+
+คลังข้อความคือไฟล์ JSON/Markdown ใต้ ``data/corpus/`` (พระสูตร บทความ) แต่ละไฟล์
+ถูกแยกเป็น passage แล้วเก็บในโฟลเดอร์ดัชนี:
+
+    index.sqlite3   ข้อมูล passage (payload JSON), ไฟล์ต้นทาง, segment และ version
+    seg-*.npz       inverted index ของแต่ละรอบการเพิ่ม (posting + tf + ความยาวเอกสาร
+                    + แท็ก) เพิ่ม passage ใหม่ได้โดยไม่สร้างของเดิมใหม่ และรวม segment
+                    เมื่อมีเกิน ``MAX_SEGMENTS``
+    embeddings*.f32 เมทริกซ์ embedding float32 ต่อท้ายตามลำดับเอกสาร อ่านแบบ
+                    memory-mapped (มีเมื่อสร้างดัชนีพร้อม encoder ดัชนีที่สร้างโดยไม่มี
+                    encoder จะถูกเข้ารหัสย้อนหลังทั้งหมดใน sync/add ครั้งแรกที่มี encoder)
+                    ชื่อไฟล์ปัจจุบันอยู่ใน meta ``matrix``
+
+การค้นคำนวณ BM25 ด้วย posting ของคำในคำค้นเท่านั้น (numpy) กรอง ``required_tags``
+ก่อนจัดอันดับด้วย bitmap ของแท็ก หารด้วยคะแนนของเอกสารความยาวเฉลี่ยที่มีทุกคำในคำค้น
+(ค่า 0-1 ที่ไม่ขึ้นกับเอกสารอื่นในผล) แล้วรวมกับ cosine ของ embedding
+
+passage ที่ถูกแทนที่หรือไฟล์ที่ถูกลบจะถูกทำเครื่องหมายลบ ค่าสถิติของ BM25 (จำนวน
+เอกสาร, df, ความยาวเฉลี่ย) นับเฉพาะเอกสารที่ยังใช้อยู่ ผลค้นจึงเท่ากับดัชนีที่สร้างใหม่
+ส่วน posting ของเอกสารที่ลบจะอยู่ใน segment จนกว่าจะรวม segment ซึ่งจะ compact
+ทั้ง segment, ตาราง documents และเมทริกซ์ embedding (เลขเอกสารถูกเรียงใหม่ให้ต่อเนื่อง)
+
+ตัวแปรแวดล้อม:
+    RESEARCH_CORPUS_DIR  โฟลเดอร์คลังข้อความ (ค่าเริ่มต้น <repo>/data/corpus)
+    CORPUS_INDEX_DIR     โฟลเดอร์ดัชนี (ค่าเริ่มต้น <repo>/data/corpus_index)
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from automation_core.thai_tokenizer import default_tokenizer
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_CORPUS_DIR = REPO_ROOT / "data" / "corpus"
+DEFAULT_INDEX_DIR = REPO_ROOT / "data" / "corpus_index"
+CORPUS_SUFFIXES = (".json", ".md")
+MAX_SEGMENTS = 8
+MATRIX_FILENAME = "embeddings.f32"
+BM25_K1 = 1.5
+BM25_B = 0.75
+# น้ำหนักของ BM25 (normalize แล้ว) เมื่อมี embedding ให้รวมกับ cosine
+LEXICAL_WEIGHT = 0.5
+_LOOKUP_CHUNK = 500
+_COMPACT_CHUNK = 65536
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS documents (
+    doc INTEGER PRIMARY KEY,
+    passage_id TEXT NOT NULL,
+    source TEXT NOT NULL DEFAULT '',
+    deleted INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_passage ON documents (passage_id, deleted);
+CREATE INDEX IF NOT EXISTS documents_source ON documents (source, deleted);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (name TEXT PRIMARY KEY, first_doc INTEGER);
+"""
+
+_FRONT_MATTER = re.compile(r"\A---\s*\n(.*?)\n---\s*\n", re.S)
+
+
+def _terms(text: str) -> Counter[str]:
+    return Counter(default_tokenizer().tokenize(text))
+
+
+def _passage_text(passage: dict[str, Any]) -> str:
+    return " ".join(
+        text
+        for text in (passage.get("original_text"), passage.get("thai_modernized"))
+        if text
+    )
+
+
+def _position_scores(count: int) -> list[float]:
+    # passage ต้นเอกสารสำคัญกว่า: 0.9 ไล่ลงถึง 0.3 ที่ท้ายเอกสาร
+    if count <= 1:
+        return [0.9] * count
+    return [round(0.9 - 0.6 * i / (count - 1), 3) for i in range(count)]
+
+
+def _split_tags(value: Any) -> list[str]:
+    if isinstance(value, str):
+        return [tag.strip() for tag in value.split(",") if tag.strip()]
+    return [str(tag) for tag in value or []]
+
+
+def parse_corpus_file(path: Path) -> list[dict[str, Any]]:
+    """
+    แยก passage จากไฟล์คลังข้อความ
+
+    JSON: list ของ passage หรือ ``{"passages": [...]}`` (key อื่นระดับบนเป็นค่า
+    เริ่มต้นของทุก passage) Markdown: front matter ``key: value`` ระหว่าง ``---``
+    แล้วแต่ละย่อหน้าเป็นหนึ่ง passage (บรรทัดหัวข้อ ``#`` ไม่นับ)
+    """
+
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".json":
+        data = json.loads(text)
+        defaults: dict[str, Any] = {}
+        if isinstance(data, dict):
+            defaults = {k: v for k, v in data.items() if k != "passages"}
+            data = data.get("passages", [])
+        items = [{**defaults, **item} for item in data]
+    else:
+        defaults = {}
+        match = _FRONT_MATTER.match(text)
+        if match:
+            for line in match.group(1).splitlines():
+                key, _, value = line.partition(":")
+                if key.strip() and value.strip():
+                    defaults[key.strip()] = value.strip()
+            text = text[match.end() :]
+        paragraphs = [
+            " ".join(line.strip() for line in block.splitlines()).strip()
+            for block in re.split(r"\n\s*\n", text)
+            if block.strip() and not block.lstrip().startswith("#")
+        ]
+        prefix = defaults.pop("id", path.stem)
+        items = [
+            {**defaults, "id": f"{prefix}_{i:03d}", "original_text": paragraph}
+            for i, paragraph in enumerate(paragraphs, 1)
+        ]
+
+    passages = []
+    positions = _position_scores(len(items))
+    for item, position in zip(items, positions, strict=True):
+        if not item.get("id") or not str(item.get("original_text", "")).strip():
+            continue
+        passages.append(
+            {
+                "id": str(item["id"]),
+                "source_name": item.get("source_name") or path.stem,
+                "collection": item.get("collection") or "modern_article",
+                "canonical_ref": item.get("canonical_ref"),
+                "original_text": item["original_text"],
+                "thai_modernized": item.get("thai_modernized"),
+                "doctrinal_tags": _split_tags(
+                    item.get("doctrinal_tags", item.get("tags"))
+                ),
+                "license": item.get("license") or "public_domain",
+                "risk_flags": _split_tags(item.get("risk_flags")),
+                "reason": item.get("reason") or "เกี่ยวข้องกับหัวข้อ",
+                "position_score": item.get("position_score", position),
+            }
+        )
+    return passages
+
+
+@dataclass
+class _Segment:
+    first_doc: int
+    doc_lengths: np.ndarray
+    terms: dict[str, int]
+    ptr: np.ndarray
+    docs: np.ndarray
+    tfs: np.ndarray
+    tags: dict[str, np.ndarray]
+
+    @classmethod
+    def build(cls, first_doc: int, documents: Sequence[tuple[Counter, list[str]]]):
+        vocabulary: dict[str, int] = {}
+        term_ids: list[int] = []
+        docs: list[int] = []
+        tfs: list[int] = []
+        tags: dict[str, list[int]] = {}
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        for offset, (counts, doc_tags) in enumerate(documents):
+            doc = first_doc + offset
+            lengths[offset] = sum(counts.values())
+            for term, count in counts.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                docs.append(doc)
+                tfs.append(count)
+            for tag in doc_tags:
+                tags.setdefault(tag, []).append(doc)
+        return cls._from_triples(
+            first_doc,
+            lengths,
+            list(vocabulary),
+            np.asarray(term_ids, dtype=np.int64),
+            np.asarray(docs, dtype=np.int64),
+            np.asarray(tfs, dtype=np.float32),
+            {tag: np.asarray(d, dtype=np.int64) for tag, d in tags.items()},
+        )
+
+    @classmethod
+    def _from_triples(cls, first_doc, lengths, terms, term_ids, docs, tfs, tags):
+        order = np.argsort(term_ids, kind="stable")
+        counts = np.bincount(term_ids, minlength=len(terms))
+        return cls(
+            first_doc=first_doc,
+            doc_lengths=lengths,
+            terms={term: i for i, term in enumerate(terms)},
+            ptr=np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+            docs=docs[order].astype(np.int32),
+            tfs=tfs[order],
+            tags=tags,
+        )
+
+    @classmethod
+    def merge(cls, segments: Sequence[_Segment], live: np.ndarray) -> _Segment:
+        """
+        รวม segment ที่ต่อกันเป็นช่วงเดียว ทิ้ง posting/แท็กของเอกสารที่ ``live`` เป็น
+        False และเรียงเลขเอกสารที่เหลือใหม่ให้ต่อเนื่องจาก first_doc
+        """
+
+        first_doc = segments[0].first_doc
+        renumber = np.full(len(live), -1, dtype=np.int64)
+        kept = np.flatnonzero(live[first_doc:]) + first_doc
+        renumber[kept] = first_doc + np.arange(len(kept))
+        vocabulary: dict[str, int] = {}
+        term_ids, docs, tfs = [], [], []
+        tags: dict[str, list[np.ndarray]] = {}
+        for segment in segments:
+            mapping = np.asarray(
+                [vocabulary.setdefault(t, len(vocabulary)) for t in segment.terms],
+                dtype=np.int64,
+            )
+            local = np.repeat(np.arange(len(segment.terms)), np.diff(segment.ptr))
+            new_docs = renumber[segment.docs]
+            keep = new_docs >= 0
+            term_ids.append(mapping[local[keep]] if len(mapping) else local)
+            docs.append(new_docs[keep])
+            tfs.append(segment.tfs[keep])
+            for tag, tag_docs in segment.tags.items():
+                new_tag_docs = renumber[tag_docs]
+                tags.setdefault(tag, []).append(new_tag_docs[new_tag_docs >= 0])
+        lengths = np.concatenate([s.doc_lengths for s in segments])
+        return cls._from_triples(
+            first_doc,
+            lengths[live[first_doc : first_doc + len(lengths)]],
+            list(vocabulary),
+            np.concatenate(term_ids),
+            np.concatenate(docs),
+            np.concatenate(tfs),
+            {
+                tag: merged
+                for tag, parts in tags.items()
+                if len(merged := np.concatenate(parts))
+            },
+        )
+
+    def save(self, path: Path) -> None:
+        tag_names = list(self.tags)
+        tag_counts = [len(self.tags[t]) for t in tag_names]
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(
+            tmp,
+            first_doc=np.int64(self.first_doc),
+            doc_lengths=self.doc_lengths,
+            terms=np.asarray(list(self.terms), dtype=str),
+            ptr=self.ptr,
+            docs=self.docs,
+            tfs=self.tfs,
+            tag_names=np.asarray(tag_names, dtype=str),
+            tag_ptr=np.concatenate(([0], np.cumsum(tag_counts))).astype(np.int64),
+            tag_docs=np.concatenate(
+                [self.tags[t] for t in tag_names] or [np.zeros(0, dtype=np.int64)]
+            ),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> _Segment:
+        with np.load(path, allow_pickle=False) as data:
+            tag_ptr = data["tag_ptr"]
+            tag_docs = data["tag_docs"]
+            return cls(
+                first_doc=int(data["first_doc"]),
+                doc_lengths=data["doc_lengths"],
+                terms={str(t): i for i, t in enumerate(data["terms"])},
+                ptr=data["ptr"],
+                docs=data["docs"],
+                tfs=data["tfs"],
+                tags={
+                    str(tag): tag_docs[tag_ptr[i] : tag_ptr[i + 1]]
+                    for i, tag in enumerate(data["tag_names"])
+                },
+            )
+
+    def postings(self, term: str) -> tuple[np.ndarray, np.ndarray] | None:
+        term_id = self.terms.get(term)
+        if term_id is None:
+            return None
+        start, end = self.ptr[term_id], self.ptr[term_id + 1]
+        return self.docs[start:end], self.tfs[start:end]
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    passage: dict[str, Any]
+    score: float
+    lexical: float
+    semantic: float | None
+
+
+class CorpusIndex:
+    """ดัชนี hybrid ของคลังข้อความบนดิสก์ อ่านได้หลาย process เขียนทีละ process"""
+
+    def __init__(self, index_dir: Path | str, encoder: Any | None = None) -> None:
+        self.index_dir = Path(index_dir)
+        self.db_path = self.index_dir / "index.sqlite3"
+        self.encoder = encoder
+        self._loaded_version: int | None = None
+        # เพิ่มทุกครั้งที่ compact (เลขเอกสารเปลี่ยน) ใช้ตรวจ payload ที่อ่านภายหลัง
+        self._loaded_generation = 0
+        self._segments: list[_Segment] = []
+        self._doc_lengths = np.zeros(0, dtype=np.float32)
+        self._live = np.zeros(0, dtype=bool)
+        self._live_count = 0
+        self._average_length = 1.0
+        self._tags: dict[str, np.ndarray] = {}
+        self._matrix: np.memmap | None = None
+
+    @classmethod
+    def from_env(cls, encoder: Any | None = None) -> CorpusIndex:
+        return cls(os.environ.get("CORPUS_INDEX_DIR") or DEFAULT_INDEX_DIR, encoder)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    @staticmethod
+    def _meta(conn: sqlite3.Connection, key: str, default: str = "") -> str:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    @staticmethod
+    def _set_meta(conn: sqlite3.Connection, key: str, value: Any) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value))
+        )
+
+    def _matrix_path(self, conn: sqlite3.Connection) -> Path:
+        return self.index_dir / self._meta(conn, "matrix", MATRIX_FILENAME)
+
+    def sync(self, corpus_dir: Path | str) -> int:
+        """
+        นำไฟล์ที่เพิ่ม/แก้ไขตั้งแต่ครั้งก่อนเข้าดัชนี และลบ passage ของไฟล์ที่หายไป
+
+        เทียบ mtime/ขนาดของไฟล์กับที่บันทึกไว้ ไฟล์ที่ไม่เปลี่ยนไม่ถูกอ่านซ้ำ
+        คืนจำนวน passage ที่เพิ่มเข้า
+        """
+
+        corpus_dir = Path(corpus_dir)
+        files = (
+            sorted(
+                p
+                for p in corpus_dir.rglob("*")
+                if p.suffix in CORPUS_SUFFIXES and p.is_file()
+            )
+            if corpus_dir.is_dir()
+            else []
+        )
+        current = {str(p.relative_to(corpus_dir)): (p, p.stat()) for p in files}
+        conn = self._connect()
+        try:
+            known = {
+                path: (mtime, size)
+                for path, mtime, size in conn.execute(
+                    "SELECT path, mtime_ns, size FROM sources"
+                )
+            }
+            changed = [
+                source
+                for source, (_, stat) in current.items()
+                if known.get(source) != (stat.st_mtime_ns, stat.st_size)
+            ]
+            removed = [source for source in known if source not in current]
+            if not changed and not removed and not self._needs_backfill(conn):
+                return 0
+
+            items = [
+                (source, passage)
+                for source in changed
+                for passage in parse_corpus_file(current[source][0])
+            ]
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for source in changed + removed:
+                    conn.execute(
+                        "UPDATE documents SET deleted = 1 WHERE source = ?", (source,)
+                    )
+                conn.executemany(
+                    "DELETE FROM sources WHERE path = ?", [(s,) for s in removed]
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO sources (path, mtime_ns, size) "
+                    "VALUES (?, ?, ?)",
+                    [
+                        (s, current[s][1].st_mtime_ns, current[s][1].st_size)
+                        for s in changed
+                    ],
+                )
+                obsolete = self._append(conn, items)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        self._remove_files(obsolete)
+        return len(items)
+
+    def add(self, passages: Iterable[dict[str, Any]], source: str = "") -> int:
+        """เพิ่ม passage (passage ที่ id ซ้ำจะแทนที่ของเดิม)"""
+
+        items = [(source, passage) for passage in passages]
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                obsolete = self._append(conn, items)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        self._remove_files(obsolete)
+        return len(items)
+
+    def _remove_files(self, names: list[str]) -> None:
+        # segment ที่ถูกรวมแล้ว ลบหลัง commit (ผู้อ่านที่โหลดไว้ยังใช้ของในหน่วยความจำ)
+        for name in names:
+            (self.index_dir / name).unlink(missing_ok=True)
+
+    def _append(
+        self, conn: sqlite3.Connection, items: list[tuple[str, dict[str, Any]]]
+    ) -> list[str]:
+        """เขียน passage ใน transaction ที่เปิดไว้ คืนชื่อไฟล์ที่ไม่ใช้แล้ว"""
+
+        # เลขเอกสารต่อเนื่องเสมอ (compact เรียงเลขใหม่) จำนวนแถวจึงเป็นเลขถัดไป
+        first_doc = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        version = int(self._meta(conn, "version", "0")) + 1
+        self._set_meta(conn, "version", version)
+
+        dim = int(self._meta(conn, "dim", "-1"))
+        if self._needs_backfill(conn):
+            dim = self._backfill(conn, first_doc)
+        if not items:
+            return []
+
+        if dim < 0:
+            dim = 0
+            if self.encoder is not None:
+                dim = -1  # กำหนดจากผล encode แรก
+                self._set_meta(conn, "model_name", self._encoder_name())
+        elif dim and self._meta(conn, "model_name") != self._encoder_name():
+            raise ValueError(
+                f"index embeddings use {self._meta(conn, 'model_name')}, "
+                f"encoder is {self._encoder_name()}"
+            )
+
+        texts = [_passage_text(passage) for _, passage in items]
+        if dim:
+            vectors = self._encode(texts)
+            dim = vectors.shape[1]
+            with open(self._matrix_path(conn), "ab") as handle:
+                # ตัดแถวที่เขียนค้างจากรอบที่ล้มก่อนต่อท้าย
+                handle.truncate(first_doc * dim * 4)
+                handle.write(np.ascontiguousarray(vectors).tobytes())
+        self._set_meta(conn, "dim", dim)
+
+        ids = [str(passage["id"]) for _, passage in items]
+        for start in range(0, len(ids), _LOOKUP_CHUNK):
+            chunk = ids[start : start + _LOOKUP_CHUNK]
+            conn.execute(
+                "UPDATE documents SET deleted = 1 WHERE passage_id IN "
+                f"({','.join('?' * len(chunk))})",
+                chunk,
+            )
+        conn.executemany(
+            "INSERT INTO documents (doc, passage_id, source, payload) "
+            "VALUES (?, ?, ?, ?)",
+            [
+                (first_doc + i, ids[i], source, json.dumps(passage, ensure_ascii=False))
+                for i, (source, passage) in enumerate(items)
+            ],
+        )
+
+        segment = _Segment.build(
+            first_doc,
+            [
+                (_terms(text), list(passage.get("doctrinal_tags") or []))
+                for text, (_, passage) in zip(texts, items, strict=True)
+            ],
+        )
+        names = [
+            (name, first)
+            for name, first in conn.execute(
+                "SELECT name, first_doc FROM segments ORDER BY first_doc"
+            )
+        ]
+        obsolete: list[str] = []
+        if len(names) + 1 > MAX_SEGMENTS:
+            total = first_doc + len(items)
+            live = np.ones(total, dtype=bool)
+            live[
+                [
+                    row[0]
+                    for row in conn.execute(
+                        "SELECT doc FROM documents WHERE deleted = 1"
+                    )
+                ]
+            ] = False
+            segment = _Segment.merge(
+                [_Segment.load(self.index_dir / name) for name, _ in names] + [segment],
+                live,
+            )
+            conn.execute("DELETE FROM segments")
+            obsolete = [name for name, _ in names]
+            obsolete += self._compact(conn, live, dim, version)
+        name = f"seg-{version:06d}.npz"
+        segment.save(self.index_dir / name)
+        conn.execute(
+            "INSERT INTO segments (name, first_doc) VALUES (?, ?)",
+            (name, segment.first_doc),
+        )
+        return obsolete
+
+    def _compact(
+        self, conn: sqlite3.Connection, live: np.ndarray, dim: int, version: int
+    ) -> list[str]:
+        """
+        ลบเอกสารที่ถูกลบออกจากตาราง documents และเมทริกซ์ embedding แล้วเรียงเลข
+        เอกสารใหม่ให้ตรงกับ segment ที่รวมแล้ว คืนชื่อเมทริกซ์เดิมที่ไม่ใช้แล้ว
+
+        เมทริกซ์ใหม่เขียนเป็นไฟล์ใหม่และสลับชื่อใน meta ภายใน transaction เดียวกัน
+        ถ้าล้มก่อน commit ดัชนียังชี้ไฟล์เดิมที่ตรงกับเลขเอกสารเดิม
+        """
+
+        kept = np.flatnonzero(live)
+        if len(kept) == len(live):
+            return []
+        conn.execute("DELETE FROM documents WHERE deleted = 1")
+        # เลขใหม่ไม่เกินเลขเดิม ไล่จากน้อยไปมากจึงไม่ชน primary key
+        conn.executemany(
+            "UPDATE documents SET doc = ? WHERE doc = ?",
+            [(new, int(old)) for new, old in enumerate(kept) if new != old],
+        )
+        generation = int(self._meta(conn, "generation", "0")) + 1
+        self._set_meta(conn, "generation", generation)
+        old_path = self._matrix_path(conn)
+        if dim <= 0 or not old_path.exists():
+            return []
+        new_path = self.index_dir / f"embeddings-{version:06d}.f32"
+        matrix = np.memmap(old_path, dtype=np.float32, mode="r", shape=(len(live), dim))
+        with open(new_path, "wb") as handle:
+            for start in range(0, len(kept), _COMPACT_CHUNK):
+                rows = kept[start : start + _COMPACT_CHUNK]
+                handle.write(np.ascontiguousarray(matrix[rows]).tobytes())
+        del matrix
+        self._set_meta(conn, "matrix", new_path.name)
+        return [old_path.name]
+
+    def _encoder_name(self) -> str:
+        return str(getattr(self.encoder, "model_name", None) or "unknown")
+
+    def _encode(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.asarray(self.encoder.encode(list(texts)), dtype=np.float32)
+        vectors = vectors.reshape(len(texts), -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=vectors, where=norms > 0)
+
+    def _needs_backfill(self, conn: sqlite3.Connection) -> bool:
+        # dim 0 = ดัชนีถูกสร้างโดยไม่มี encoder
+        return self.encoder is not None and self._meta(conn, "dim") == "0"
+
+    def _backfill(self, conn: sqlite3.Connection, total: int) -> int:
+        """
+        เข้ารหัส passage เดิมทั้งหมดของดัชนีที่สร้างโดยไม่มี encoder คืน dim
+        (-1 เมื่อไม่มี passage ที่ยังใช้อยู่ ให้กำหนดจากผล encode ถัดไป)
+
+        แถวของเอกสารที่ถูกลบเป็นศูนย์
+        """
+
+        rows = conn.execute(
+            "SELECT doc, payload FROM documents WHERE deleted = 0 ORDER BY doc"
+        ).fetchall()
+        logger.warning(
+            "ดัชนีคลังธรรมะสร้างโดยไม่มี embedding: เข้ารหัส %d passage เดิมด้วย %s",
+            len(rows),
+            self._encoder_name(),
+        )
+        self._set_meta(conn, "model_name", self._encoder_name())
+        if not rows:
+            self._set_meta(conn, "dim", -1)
+            return -1
+        vectors = self._encode([_passage_text(json.loads(p)) for _, p in rows])
+        matrix = np.zeros((total, vectors.shape[1]), dtype=np.float32)
+        matrix[[doc for doc, _ in rows]] = vectors
+        with open(self._matrix_path(conn), "wb") as handle:
+            handle.write(matrix.tobytes())
+        self._set_meta(conn, "dim", vectors.shape[1])
+        return vectors.shape[1]
+
+    @property
+    def version(self) -> int:
+        """เลขที่เพิ่มทุกครั้งที่ดัชนีเปลี่ยน (ใช้เป็นส่วนหนึ่งของ cache key ได้)"""
+
+        if not self.db_path.exists():
+            return 0
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            return int(self._meta(conn, "version", "0"))
+        except sqlite3.OperationalError:
+            return 0
+        finally:
+            conn.close()
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return int(self._live.sum())
+
+    def _ensure_loaded(self) -> None:
+        version = self.version
+        if version == self._loaded_version:
+            return
+        if not self.db_path.exists():
+            self._loaded_version = version
+            return
+        conn = self._connect()
+        try:
+            names = [
+                row[0]
+                for row in conn.execute("SELECT name FROM segments ORDER BY first_doc")
+            ]
+            total = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            deleted = np.fromiter(
+                (
+                    row[0]
+                    for row in conn.execute(
+                        "SELECT doc FROM documents WHERE deleted = 1"
+                    )
+                ),
+                dtype=np.int64,
+            )
+            dim = int(self._meta(conn, "dim", "0"))
+            model_name = self._meta(conn, "model_name")
+            matrix_path = self._matrix_path(conn)
+            generation = int(self._meta(conn, "generation", "0"))
+        finally:
+            conn.close()
+
+        segments = [_Segment.load(self.index_dir / name) for name in names]
+        lengths = np.zeros(total, dtype=np.float32)
+        tags: dict[str, np.ndarray] = {}
+        for segment in segments:
+            end = segment.first_doc + len(segment.doc_lengths)
+            lengths[segment.first_doc : end] = segment.doc_lengths
+            for tag, docs in segment.tags.items():
+                bitmap = tags.setdefault(tag, np.zeros(total, dtype=bool))
+                bitmap[docs] = True
+        live = np.ones(total, dtype=bool)
+        live[deleted] = False
+
+        matrix = None
+        if dim > 0 and matrix_path.exists() and model_name == self._encoder_name():
+            matrix = np.memmap(
+                matrix_path, dtype=np.float32, mode="r", shape=(total, dim)
+            )
+        self._segments = segments
+        self._doc_lengths = lengths
+        self._live = live
+        self._live_count = int(live.sum())
+        self._average_length = float(lengths[live].mean()) if live.any() else 1.0
+        self._loaded_generation = generation
+        self._tags = tags
+        self._matrix = matrix
+        self._loaded_version = version
+
+    def tag_mask(self, tags: Sequence[str]) -> np.ndarray | None:
+        """bitmap ของเอกสารที่มีแท็กใดแท็กหนึ่ง (None = ไม่มีเอกสารที่มีแท็กนั้นเลย)"""
+
+        self._ensure_loaded()
+        return self._tag_mask(tags)
+
+    def _tag_mask(self, tags: Sequence[str]) -> np.ndarray | None:
+        mask = np.zeros(len(self._live), dtype=bool)
+        for tag in tags:
+            bitmap = self._tags.get(tag)
+            if bitmap is not None:
+                mask |= bitmap
+        mask &= self._live
+        return mask if mask.any() else None
+
+    def bm25(self, query: str, mask: np.ndarray | None = None) -> np.ndarray:
+        """คะแนน BM25 ของทุกเอกสาร (เอกสารที่ถูกลบหรืออยู่นอก mask ได้ 0)"""
+
+        self._ensure_loaded()
+        return self._bm25(query, mask)[0]
+
+    def _bm25(self, query: str, mask: np.ndarray | None) -> tuple[np.ndarray, float]:
+        """
+        คะแนน BM25 และคะแนนอ้างอิงของคำค้น: คะแนนของเอกสารความยาวเฉลี่ยที่มีทุกคำ
+        ในคำค้นคำละครั้ง (คำที่ไม่มีในคลังใช้ idf ของคำที่ไม่พบเลย)
+
+        จำนวนเอกสาร, df และความยาวเฉลี่ยนับเฉพาะเอกสารที่ยังไม่ถูกลบ
+        """
+
+        scores = np.zeros(len(self._live), dtype=np.float32)
+        if not self._live_count:
+            return scores, 0.0
+        total = self._live_count
+        average = self._average_length or 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths / average)
+        reference = 0.0
+        for term, query_tf in _terms(query).items():
+            postings = [
+                hit
+                for segment in self._segments
+                if (hit := segment.postings(term)) is not None
+            ]
+            frequency = sum(
+                int(np.count_nonzero(self._live[docs])) for docs, _ in postings
+            )
+            idf = math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            reference += query_tf * idf
+            for docs, tfs in postings:
+                scores[docs] += (
+                    query_tf * idf * tfs * (BM25_K1 + 1) / (tfs + norm[docs])
+                )
+        allowed = self._live if mask is None else mask
+        scores[~allowed] = 0.0
+        return scores, reference
+
+    def search(
+        self,
+        queries: Sequence[str],
+        k: int,
+        *,
+        required_tags: Sequence[str] = (),
+    ) -> list[SearchHit]:
+        """
+        ค้น passage ที่ดีที่สุด ``k`` อัน จากหลายคำค้น (ใช้คะแนนสูงสุดของแต่ละคำค้น)
+
+        ``required_tags`` กรองเฉพาะเอกสารที่มีแท็กใดแท็กหนึ่ง ถ้าไม่มีเอกสารใดมีแท็ก
+        เลยจะค้นทั้งคลังแทน
+        """
+
+        self._ensure_loaded()
+        if not len(self._live) or k <= 0 or not queries:
+            return []
+        mask = self._tag_mask(required_tags) if required_tags else None
+        allowed = self._live if mask is None else mask
+
+        # หารด้วยคะแนนอ้างอิงของคำค้น (ไม่ใช่ค่าสูงสุดในผล) อันดับหนึ่งจึงได้ 1.0
+        # เฉพาะเมื่อตรงกับคำค้นจริง
+        lexical = np.zeros((len(queries), len(self._live)), dtype=np.float32)
+        for row, query in enumerate(queries):
+            scores, reference = self._bm25(query, allowed)
+            if reference > 0:
+                lexical[row] = scores / reference
+        np.clip(lexical, 0.0, 1.0, out=lexical)
+        semantic = None
+        combined = lexical
+        if self._matrix is not None and self.encoder is not None:
+            vectors = self._encode(queries)
+            if allowed.mean() > 0.5:
+                # อ่านทั้งเมทริกซ์ต่อเนื่องจาก memmap ถูกกว่าการคัดแถวจำนวนมาก
+                semantic = vectors @ self._matrix.T
+                semantic[:, ~allowed] = 0.0
+            else:
+                rows = np.flatnonzero(allowed)
+                semantic = np.zeros_like(lexical)
+                semantic[:, rows] = vectors @ self._matrix[rows].T
+            np.clip(semantic, 0.0, 1.0, out=semantic)
+            combined = LEXICAL_WEIGHT * lexical + (1 - LEXICAL_WEIGHT) * semantic
+
+        best_query = combined.argmax(axis=0)
+        scores = combined.max(axis=0)
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            keep = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[keep]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        payloads = self._payloads(candidates.tolist())
+        if payloads is None:
+            # ดัชนีถูก compact ระหว่างค้น เลขเอกสารที่ได้ไม่ตรงแล้ว ค้นใหม่ด้วยดัชนีใหม่
+            return self.search(queries, k, required_tags=required_tags)
+        return [
+            SearchHit(
+                passage=payloads[int(doc)],
+                score=float(scores[doc]),
+                lexical=float(lexical[best_query[doc], doc]),
+                semantic=(
+                    float(semantic[best_query[doc], doc])
+                    if semantic is not None
+                    else None
+                ),
+            )
+            for doc in candidates
+        ]
+
+    def _payloads(self, docs: list[int]) -> dict[int, dict[str, Any]] | None:
+        """payload ของเอกสาร หรือ None ถ้าดัชนีถูก compact หลังจากโหลดไว้"""
+
+        if not docs:
+            return {}
+        conn = self._connect()
+        try:
+            # อ่าน generation และ payload ใน snapshot เดียวกัน
+            conn.execute("BEGIN")
+            generation = int(self._meta(conn, "generation", "0"))
+            if generation != self._loaded_generation:
+                return None
+            payloads = {}
+            for start in range(0, len(docs), _LOOKUP_CHUNK):
+                chunk = docs[start : start + _LOOKUP_CHUNK]
+                payloads.update(
+                    (doc, json.loads(payload))
+                    for doc, payload in conn.execute(
+                        "SELECT doc, payload FROM documents WHERE doc IN "
+                        f"({','.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                )
+            return payloads
+        finally:
+            conn.close()
@@ -158,6 +158,7 @@ class MetaInfo(BaseModel):
     applied_filters: list[str] = Field(description="ตัวกรองที่ใช้")
     refinement_iterations: int = Field(description="จำนวนรอบการปรับแต่ง")
     self_check: SelfCheck = Field(description="การตรวจสอบตัวเอง")
+    cache_hit: bool = Field(default=False, description="ใช้ผลค้นคืนและจัดอันดับจาก cache")
 
 
 class ResearchRetrievalOutput(BaseModel):
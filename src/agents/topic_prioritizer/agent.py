@@ -8,6 +8,8 @@ Agent นี้รับหัวข้อจาก TrendScout และสร
 import logging
 from datetime import datetime
 
+import numpy as np
+
 from automation_core.base_agent import BaseAgent
 
 from .model import (
@@ -25,6 +27,16 @@ from .model import (
 
 logger = logging.getLogger(__name__)
 
+SCORE_DIMENSIONS = ("composite", "freshness", "search_intent", "evergreen", "brand_fit")
+# น้ำหนักปรับคะแนนตามกลยุทธ์ (บวกตามลำดับนี้)
+STRATEGY_ADJUSTMENTS = {
+    "fast_growth": {"freshness": 10, "search_intent": 5},
+    "evergreen_balance": {"evergreen": 8, "brand_fit": 4},
+    "depth_series": {"brand_fit": 8, "evergreen": 6},
+}
+SERIES_BONUS = 6
+SERIES_ROLE_PREFIXES = ("พุทธจิตวิทยา", "ชาดกชุด", "10 วันภาวนา")
+
 
 class TopicPrioritizerAgent(BaseAgent[PriorityInput, PriorityOutput]):
     """
@@ -101,13 +113,21 @@ class TopicPrioritizerAgent(BaseAgent[PriorityInput, PriorityOutput]):
     def _calculate_priority_scores(
         self, input_data: PriorityInput
     ) -> list[tuple[CandidateTopic, float, str, str]]:
-        """คำนวณคะแนนความสำคัญสำหรับแต่ละหัวข้อ"""
+        """
+        คำนวณคะแนนความสำคัญสำหรับทุกหัวข้อแบบ vector (numpy) แล้วเรียงจากมากไปน้อย
+
+        หัวข้อที่คะแนนเท่ากันคงลำดับเดิมของ input (เหมือน ``list.sort`` ที่ stable)
+        """
 
-        scored_topics = []
-        max_predicted_views = (
-            max(topic.predicted_14d_views for topic in input_data.candidate_topics)
-            if input_data.candidate_topics
-            else 1
+        topics = input_data.candidate_topics
+        if not topics:
+            return []
+
+        columns = self._score_columns(topics)
+        views = columns["views"]
+        series_prefixes = tuple(input_data.rules.force_series_prefixes)
+        series = np.array(
+            [topic.title.startswith(series_prefixes) for topic in topics], dtype=bool
         )
 
         historical_context = input_data.historical_context
@@ -116,108 +136,120 @@ class TopicPrioritizerAgent(BaseAgent[PriorityInput, PriorityOutput]):
             if historical_context
             else self.default_pillar_performance
         )
+        pillar_factor = np.array(
+            [pillar_performance.get(topic.pillar, 1.0) for topic in topics]
+        )
 
-        for topic in input_data.candidate_topics:
-            # คำนวณ base score
-            composite = topic.scores.get("composite", 0.5)
-            normalized_views = min(1.0, topic.predicted_14d_views / max_predicted_views)
-            base_score = composite * 70 + normalized_views * 30
-
-            # ปรับตามกลยุทธ์
-            adjustments = 0.0
-            if input_data.strategy_focus == "fast_growth":
-                adjustments += topic.scores.get("freshness", 0.5) * 10
-                adjustments += topic.scores.get("search_intent", 0.5) * 5
-            elif input_data.strategy_focus == "evergreen_balance":
-                adjustments += topic.scores.get("evergreen", 0.5) * 8
-                adjustments += topic.scores.get("brand_fit", 0.5) * 4
-            elif input_data.strategy_focus == "depth_series":
-                adjustments += topic.scores.get("brand_fit", 0.5) * 8
-                adjustments += topic.scores.get("evergreen", 0.5) * 6
-                # Series bonus
-                if any(
-                    topic.title.startswith(prefix)
-                    for prefix in input_data.rules.force_series_prefixes
-                ):
-                    adjustments += 6
-
-            # ปรับตาม pillar performance
-            pillar_factor = pillar_performance.get(topic.pillar, 1.0)
-            final_score = (base_score + adjustments) * pillar_factor
-            final_score = max(0, min(100, final_score))  # Clip ให้อยู่ใน 0-100
-
-            # จำแนกประเภทเนื้อหา
-            content_type = self._classify_content_type(topic, input_data)
-
-            # กำหนดบทบาทที่คาดหวัง
-            expected_role = self._determine_expected_role(
-                topic, input_data.strategy_focus, final_score
-            )
+        # คำนวณ base score
+        max_predicted_views = views.max() or 1
+        normalized_views = np.minimum(1.0, views / max_predicted_views)
+        base_score = columns["composite"] * 70 + normalized_views * 30
+
+        # ปรับตามกลยุทธ์
+        adjustments = np.zeros(len(topics))
+        strategy = input_data.strategy_focus
+        for dimension, weight in STRATEGY_ADJUSTMENTS.get(strategy, {}).items():
+            adjustments = adjustments + columns[dimension] * weight
+        if strategy == "depth_series":
+            # Series bonus
+            adjustments = adjustments + np.where(series, SERIES_BONUS, 0.0)
+
+        # ปรับตาม pillar performance แล้ว clip ให้อยู่ใน 0-100
+        final_scores = np.clip((base_score + adjustments) * pillar_factor, 0, 100)
+
+        content_types = self._classify_content_types(columns, series, input_data)
+        expected_roles = self._determine_expected_roles(
+            topics, columns, strategy, final_scores
+        )
 
-            scored_topics.append((topic, final_score, content_type, expected_role))
+        # เรียงลำดับตามคะแนน (stable)
+        order = np.argsort(-final_scores, kind="stable")
+        return [
+            (topics[i], score, content_type, expected_role)
+            for i, score, content_type, expected_role in zip(
+                order.tolist(),
+                final_scores[order].tolist(),
+                content_types[order].tolist(),
+                expected_roles[order].tolist(),
+                strict=True,
+            )
+        ]
 
-        # เรียงลำดับตามคะแนน
-        scored_topics.sort(key=lambda x: x[1], reverse=True)
+    @staticmethod
+    def _score_columns(topics: list[CandidateTopic]) -> dict[str, np.ndarray]:
+        """แปลงคะแนนของทุกหัวข้อเป็นคอลัมน์ numpy (มิติที่ไม่มีใช้ 0.5)"""
 
-        return scored_topics
+        rows = np.array(
+            [
+                [topic.scores.get(dimension, 0.5) for dimension in SCORE_DIMENSIONS]
+                for topic in topics
+            ],
+            dtype=float,
+        )
+        columns = dict(zip(SCORE_DIMENSIONS, rows.T, strict=True))
+        columns["views"] = np.array(
+            [topic.predicted_14d_views for topic in topics], dtype=np.int64
+        )
+        return columns
 
-    def _classify_content_type(
-        self, topic: CandidateTopic, input_data: PriorityInput
-    ) -> str:
-        """จำแนกประเภทเนื้อหา (longform หรือ shorts)"""
+    def _classify_content_types(
+        self,
+        columns: dict[str, np.ndarray],
+        series: np.ndarray,
+        input_data: PriorityInput,
+    ) -> np.ndarray:
+        """จำแนกประเภทเนื้อหา (longform หรือ shorts) ของทุกหัวข้อ"""
 
         historical_context = input_data.historical_context
         recent_longform_avg = (
             historical_context.recent_longform_avg_views if historical_context else 3200
         )
 
-        # ตรวจสอบเงื่อนไข force_series_prefixes
-        if any(
-            topic.title.startswith(prefix)
-            for prefix in input_data.rules.force_series_prefixes
-        ):
-            return "longform"
-
-        # ตรวจสอบความลึกและยอดวิว
-        evergreen = topic.scores.get("evergreen", 0.5)
-        brand_fit = topic.scores.get("brand_fit", 0.5)
-        search_intent = topic.scores.get("search_intent", 0.5)
-
-        if (
-            evergreen > 0.65 or brand_fit > 0.85
-        ) and topic.predicted_14d_views >= recent_longform_avg:
-            return "longform"
-        elif search_intent > 0.7 and evergreen < 0.55:
-            return "shorts"
-        else:
-            # Default decision based on predicted views
-            return (
-                "longform"
-                if topic.predicted_14d_views >= recent_longform_avg
-                else "shorts"
-            )
+        evergreen = columns["evergreen"]
+        brand_fit = columns["brand_fit"]
+        search_intent = columns["search_intent"]
+        enough_views = columns["views"] >= recent_longform_avg
+
+        # ซีรีส์บังคับ > ความลึกและยอดวิว > เน้นค้นหา > ตัดสินจากยอดวิวคาดการณ์
+        return np.select(
+            [
+                series,
+                ((evergreen > 0.65) | (brand_fit > 0.85)) & enough_views,
+                (search_intent > 0.7) & (evergreen < 0.55),
+                enough_views,
+            ],
+            ["longform", "longform", "shorts", "longform"],
+            default="shorts",
+        )
 
-    def _determine_expected_role(
-        self, topic: CandidateTopic, strategy: str, score: float
-    ) -> str:
-        """กำหนดบทบาทที่คาดหวัง"""
-
-        freshness = topic.scores.get("freshness", 0.5)
-        evergreen = topic.scores.get("evergreen", 0.5)
-
-        if strategy == "fast_growth" and freshness > 0.7:
-            return "traffic_spike"
-        elif evergreen > 0.7:
-            return "evergreen_seed"
-        elif any(
-            topic.title.startswith(prefix)
-            for prefix in ["พุทธจิตวิทยา", "ชาดกชุด", "10 วันภาวนา"]
-        ):
-            return "series_part"
-        elif score > 70:
-            return "audience_engagement"
-        else:
-            return "balance_filler"
+    def _determine_expected_roles(
+        self,
+        topics: list[CandidateTopic],
+        columns: dict[str, np.ndarray],
+        strategy: str,
+        scores: np.ndarray,
+    ) -> np.ndarray:
+        """กำหนดบทบาทที่คาดหวังของทุกหัวข้อ"""
+
+        series_part = np.array(
+            [topic.title.startswith(SERIES_ROLE_PREFIXES) for topic in topics],
+            dtype=bool,
+        )
+        return np.select(
+            [
+                (columns["freshness"] > 0.7) & (strategy == "fast_growth"),
+                columns["evergreen"] > 0.7,
+                series_part,
+                scores > 70,
+            ],
+            [
+                "traffic_spike",
+                "evergreen_seed",
+                "series_part",
+                "audience_engagement",
+            ],
+            default="balance_filler",
+        )
 
     def _assign_calendar(
         self,
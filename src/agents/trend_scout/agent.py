@@ -7,18 +7,24 @@ Agent นี้รับข้อมูลเทรนด์จากหลา
 
 import hashlib
 import logging
+import os
 import random
 import time
-from datetime import UTC, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
 from typing import Any
 
+import numpy as np
 from googleapiclient.discovery import build
 from pytrends.request import TrendReq
 
 from automation_core.base_agent import BaseAgent
 from automation_core.config import config
+from automation_core.result_cache import ResultCache
 from automation_core.utils.scoring import (
-    calculate_composite_score,
+    composite_scores,
+    top_k_indices,
     validate_score_range,
 )
 from automation_core.utils.text import (
@@ -36,9 +42,20 @@ from .model import (
     TrendScoutOutput,
     YTTrendingItem,
 )
+from .series_store import TrendFeatures, TrendSeriesStore
 
 logger = logging.getLogger(__name__)
 
+REPO_ROOT = Path(__file__).resolve().parents[3]
+TRENDS_GEO = "TH"
+# pytrends รับคำค้นได้ไม่เกิน 5 คำต่อ payload
+PYTRENDS_MAX_TERMS = 5
+YOUTUBE_WINDOW_DAYS = 30
+# ผลจาก API เก็บบนดิสก์ 1 วัน: รันซ้ำในวันเดียวกันไม่เรียก API อีก
+FETCH_CACHE_TTL_SECONDS = 24 * 3600
+DEFAULT_FETCH_CACHE_DIR = REPO_ROOT / "data" / "trend_cache"
+MAX_TOPICS = 15
+
 
 class TrendScoutAgent(BaseAgent[TrendScoutInput, TrendScoutOutput]):
     """
@@ -51,7 +68,11 @@ class TrendScoutAgent(BaseAgent[TrendScoutInput, TrendScoutOutput]):
     4. จัดอันดับและคัดเลือกหัวข้อที่ดีที่สุด
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        fetch_cache: ResultCache | None = None,
+        series_store: TrendSeriesStore | None = None,
+    ):
         super().__init__(
             name="TrendScoutAgent",
             version="1.0.0",
@@ -69,6 +90,18 @@ class TrendScoutAgent(BaseAgent[TrendScoutInput, TrendScoutOutput]):
         # ตรวจสอบว่าใช้ API จริงหรือไม่
         self.use_real_apis = config.trend_scout_use_real_apis
 
+        # cache ผลจาก Google Trends/YouTube และคลังอนุกรมคะแนนรายวัน
+        # (TREND_CACHE_DIR, ค่าเริ่มต้น data/trend_cache)
+        cache_dir = Path(os.environ.get("TREND_CACHE_DIR") or DEFAULT_FETCH_CACHE_DIR)
+        self.fetch_cache = fetch_cache or ResultCache(
+            max_entries=512,
+            ttl_seconds=FETCH_CACHE_TTL_SECONDS,
+            path=cache_dir / "responses.sqlite3",
+        )
+        self.series_store = series_store or TrendSeriesStore(
+            cache_dir / "series.sqlite3"
+        )
+
         # เสาหลักเนื้อหาของช่อง (ตาม v1 specification)
         self.content_pillars = [
             "ธรรมะประยุกต์",
@@ -92,12 +125,9 @@ class TrendScoutAgent(BaseAgent[TrendScoutInput, TrendScoutOutput]):
             if self.use_real_apis:
                 logger.info("กำลังดึงข้อมูลจาก APIs จริง...")
 
-                # ดึง Google Trends
-                google_trends = self._fetch_google_trends(input_data.keywords)
+                # ดึง Google Trends และ YouTube Trending พร้อมกัน
+                google_trends, yt_trending = self._fetch_sources(input_data.keywords)
                 input_data.google_trends.extend(google_trends)
-
-                # ดึง YouTube Trending
-                yt_trending = self._fetch_youtube_trending(input_data.keywords)
                 input_data.youtube_trending_raw.extend(yt_trending)
 
             # 1. รวบรวมคำสำคัญจากแหล่งต่างๆ
@@ -108,12 +138,13 @@ class TrendScoutAgent(BaseAgent[TrendScoutInput, TrendScoutOutput]):
             candidate_topics = self._generate_candidate_topics(all_keywords)
             logger.debug(f"สร้างหัวข้อผู้สมัครได้ {len(candidate_topics)} หัวข้อ")
 
-            # 3. คำนวณคะแนนและจัดอันดับ
-            scored_topics = self._score_and_rank_topics(candidate_topics, input_data)
-            logger.debug(f"ให้คะแนนและจัดอันดับได้ {len(scored_topics)} หัวข้อ")
-
+            # 3. คำนวณคะแนนและจัดอันดับ (ใช้แนวโน้มระยะยาวจากคลังอนุกรม Google Trends)
+            trend_features = self.series_store.features(all_keywords, TRENDS_GEO)
             # 4. คัดเลือกหัวข้อที่ดีที่สุด (สูงสุด 15 หัวข้อ)
-            final_topics = scored_topics[:15]
+            final_topics = self._score_and_rank_topics(
+                candidate_topics, input_data, trend_features, limit=MAX_TOPICS
+            )
+            logger.debug(f"ให้คะแนนและจัดอันดับได้ {len(final_topics)} หัวข้อ")
 
             # 5. สร้าง metadata
             meta_info = self._create_meta_info(candidate_topics, final_topics)
@@ -247,73 +278,61 @@ class TrendScoutAgent(BaseAgent[TrendScoutInput, TrendScoutOutput]):
         return " ".join(keywords[:3])  # ใช้แค่ 3 คำแรก
 
     def _score_and_rank_topics(
-        self, candidates: list[dict[str, Any]], input_data: TrendScoutInput
+        self,
+        candidates: list[dict[str, Any]],
+        input_data: TrendScoutInput,
+        trend_features: dict[str, TrendFeatures] | None = None,
+        limit: int | None = None,
     ) -> list[TopicEntry]:
-        """คำนวณคะแนนและจัดอันดับหัวข้อ"""
-
-        scored_topics = []
-
-        for candidate in candidates:
-            scores = self._calculate_topic_scores(candidate, input_data)
-
-            # คำนวณคะแนนรวม
-            composite_score = calculate_composite_score(
-                {
-                    "search_intent": scores["search_intent"],
-                    "freshness": scores["freshness"],
-                    "evergreen": scores["evergreen"],
-                    "brand_fit": scores["brand_fit"],
-                },
-                self.score_weights,
-            )
-
-            scores["composite"] = composite_score
-
-            # เลือก content pillar
-            pillar = self._select_content_pillar(candidate)
+        """
+        คำนวณคะแนนและจัดอันดับหัวข้อ
 
-            # คาดการณ์จำนวนการดู
-            predicted_views = self._predict_views(scores, candidate)
+        คะแนนแต่ละมิติเก็บเป็นคอลัมน์ numpy คะแนนรวมคำนวณแบบ vector และเลือก ``limit``
+        อันดับแรกด้วย argpartition แล้วจึงสร้าง TopicEntry เฉพาะหัวข้อที่ถูกเลือก
+        (ไม่ระบุ = ทุกหัวข้อ)
+        """
 
-            # สร้าง topic dict ก่อน แล้วค่อยสร้าง TopicEntry หลังจัดอันดับ
-            topic_data = {
-                "title": candidate["title"],
-                "pillar": pillar,
-                "predicted_14d_views": predicted_views,
-                "scores": scores,
-                "reason": self._generate_reason(scores, candidate),
-                "raw_keywords": candidate["raw_keywords"],
-                "similar_to": [],
-                "risk_flags": [],
-            }
+        if not candidates:
+            return []
 
-            scored_topics.append(topic_data)
+        dimensions = list(self.score_weights)
+        columns = np.empty((len(dimensions), len(candidates)))
+        for j, candidate in enumerate(candidates):
+            scores = self._calculate_topic_scores(candidate, input_data, trend_features)
+            columns[:, j] = [scores[dimension] for dimension in dimensions]
 
-        # จัดอันดับตามคะแนนรวม
-        sorted_topics_data = sorted(
-            scored_topics, key=lambda t: t["scores"]["composite"], reverse=True
+        # คำนวณคะแนนรวมของทุกหัวข้อพร้อมกัน
+        composite = composite_scores(
+            dict(zip(dimensions, columns, strict=True)), self.score_weights
         )
 
-        # สร้าง TopicEntry พร้อมอันดับ
+        # จัดอันดับตามคะแนนรวม แล้วสร้าง TopicEntry พร้อมอันดับ
         final_topics = []
-        for i, topic_data in enumerate(sorted_topics_data, 1):
-            topic = TopicEntry(
-                rank=i,
-                title=topic_data["title"],
-                pillar=topic_data["pillar"],
-                predicted_14d_views=topic_data["predicted_14d_views"],
-                scores=TopicScore(**topic_data["scores"]),
-                reason=topic_data["reason"],
-                raw_keywords=topic_data["raw_keywords"],
-                similar_to=topic_data["similar_to"],
-                risk_flags=topic_data["risk_flags"],
+        for rank, i in enumerate(top_k_indices(composite, limit).tolist(), 1):
+            candidate = candidates[i]
+            scores = dict(zip(dimensions, columns[:, i].tolist(), strict=True))
+            scores["composite"] = float(composite[i])
+            final_topics.append(
+                TopicEntry(
+                    rank=rank,
+                    title=candidate["title"],
+                    pillar=self._select_content_pillar(candidate),
+                    predicted_14d_views=self._predict_views(scores, candidate),
+                    scores=TopicScore(**scores),
+                    reason=self._generate_reason(scores, candidate),
+                    raw_keywords=candidate["raw_keywords"],
+                    similar_to=[],
+                    risk_flags=[],
+                )
             )
-            final_topics.append(topic)
 
         return final_topics
 
     def _calculate_topic_scores(
-        self, candidate: dict[str, Any], input_data: TrendScoutInput
+        self,
+        candidate: dict[str, Any],
+        input_data: TrendScoutInput,
+        trend_features: dict[str, TrendFeatures] | None = None,
     ) -> dict[str, float]:
         """คำนวณคะแนนในแต่ละมิติ"""
 
@@ -329,7 +348,9 @@ class TrendScoutAgent(BaseAgent[TrendScoutInput, TrendScoutOutput]):
         )
 
         # Freshness Score (ความใหม่)
-        freshness = self._calculate_freshness_score(keywords, input_data, title_hash)
+        freshness = self._calculate_freshness_score(
+            keywords, input_data, title_hash, trend_features
+        )
 
         # Evergreen Score (ความคงทน)
         evergreen = self._calculate_evergreen_score(title, title_hash)
@@ -369,7 +390,11 @@ class TrendScoutAgent(BaseAgent[TrendScoutInput, TrendScoutOutput]):
         return min(base_score, 1.0)
 
     def _calculate_freshness_score(
-        self, keywords: list[str], input_data: TrendScoutInput, seed: int
+        self,
+        keywords: list[str],
+        input_data: TrendScoutInput,
+        seed: int,
+        trend_features: dict[str, TrendFeatures] | None = None,
     ) -> float:
         """คำนวณคะแนนความใหม่"""
 
@@ -382,6 +407,18 @@ class TrendScoutAgent(BaseAgent[TrendScoutInput, TrendScoutOutput]):
                 if any(kw.lower() in video.title.lower() for kw in keywords):
                     base_score += 0.3
 
+        # เพิ่มคะแนนถ้าความนิยมช่วงหลังสูงกว่าช่วงก่อนหน้า (จากคลังอนุกรม)
+        if trend_features:
+            momentum = max(
+                (
+                    trend_features[kw].momentum
+                    for kw in keywords
+                    if kw in trend_features
+                ),
+                default=1.0,
+            )
+            base_score += min(0.3, max(0.0, momentum - 1.0) * 0.3)
+
         return min(base_score, 1.0)
 
     def _calculate_evergreen_score(self, title: str, seed: int) -> float:
@@ -545,27 +582,143 @@ class TrendScoutAgent(BaseAgent[TrendScoutInput, TrendScoutOutput]):
             ),
         )
 
+    def _fetch_sources(
+        self, keywords: list[str]
+    ) -> tuple[list[GoogleTrendItem], list[YTTrendingItem]]:
+        """ดึง Google Trends และ YouTube พร้อมกัน (เวลารวมเท่าแหล่งที่ช้าที่สุด)"""
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            trends = pool.submit(self._fetch_google_trends, keywords)
+            videos = pool.submit(self._fetch_youtube_trending, keywords)
+            return trends.result(), videos.result()
+
     def _fetch_google_trends(self, keywords: list[str]) -> list[GoogleTrendItem]:
-        """Fetch real Google Trends data with exponential backoff retry"""
+        """
+        Fetch Google Trends interest for any number of keywords
+
+        ดึงเฉพาะช่วงวันที่คลังอนุกรม (series_store) ยังไม่มีแล้วเติมเข้าคลัง ผลคือคะแนน
+        30 วันล่าสุดจากคลัง คำค้นเกิน 5 คำถูกแบ่งเป็นหลาย payload ที่ดึงพร้อมกัน ทุก
+        payload หลังแรกมีคำแรกเป็นตัวเทียบ (anchor) เพื่อปรับสเกลให้เทียบกับ payload แรกได้
+        """
+        keywords = list(dict.fromkeys(keywords))
+        today = self.series_store.today()
+        jobs = [
+            (start, self._trend_payloads(terms))
+            for start, terms in self.series_store.plan(keywords, TRENDS_GEO).items()
+        ]
+        requests = [
+            (payload, f"{start.isoformat()} {today.isoformat()}")
+            for start, payloads in jobs
+            for payload in payloads
+        ]
+        if len(requests) <= 1:
+            responses = [self._fetch_trend_payload(*request) for request in requests]
+        else:
+            with ThreadPoolExecutor(max_workers=len(requests)) as pool:
+                responses = list(
+                    pool.map(
+                        lambda request: self._fetch_trend_payload(*request), requests
+                    )
+                )
+
+        offset = 0
+        for _, payloads in jobs:
+            group = responses[offset : offset + len(payloads)]
+            offset += len(payloads)
+            if not group[0]:
+                continue
+            series = self._merge_trend_payloads(
+                payloads, [response and response["series"] for response in group]
+            )
+            start = date.fromisoformat(group[0]["start"])
+            self.series_store.merge(series, TRENDS_GEO, start)
+
+        windows = self.series_store.windows(keywords, TRENDS_GEO)
+        return [
+            GoogleTrendItem(
+                term=keyword, score_series=windows[keyword], region=TRENDS_GEO
+            )
+            for keyword in keywords
+            if keyword in windows
+        ]
+
+    def _trend_payloads(self, keywords: list[str]) -> list[list[str]]:
+        """แบ่งคำค้นเป็น payload ละไม่เกิน PYTRENDS_MAX_TERMS คำ"""
+        if len(keywords) <= PYTRENDS_MAX_TERMS:
+            return [keywords]
+        anchor = keywords[0]
+        rest = keywords[PYTRENDS_MAX_TERMS:]
+        step = PYTRENDS_MAX_TERMS - 1
+        return [keywords[:PYTRENDS_MAX_TERMS]] + [
+            [anchor, *rest[i : i + step]] for i in range(0, len(rest), step)
+        ]
+
+    def _merge_trend_payloads(
+        self,
+        payloads: list[list[str]],
+        responses: list[dict[str, list[int]] | None],
+    ) -> dict[str, list[int]]:
+        """รวมผลทุก payload โดยปรับสเกลด้วยค่าเฉลี่ยของ anchor ใน payload แรก"""
+        base = responses[0] or {}
+        merged = dict(base)
+        anchor = payloads[0][0]
+        for payload, response in zip(payloads[1:], responses[1:], strict=True):
+            if not response:
+                continue
+            factor = 1.0
+            base_anchor = base.get(anchor)
+            chunk_anchor = response.get(anchor)
+            if base_anchor and chunk_anchor and sum(chunk_anchor) > 0:
+                factor = sum(base_anchor) / sum(chunk_anchor)
+            for keyword in payload[1:]:
+                if keyword in response:
+                    merged[keyword] = [
+                        min(100, round(score * factor)) for score in response[keyword]
+                    ]
+        return merged
+
+    def _fetch_trend_payload(
+        self, keywords: list[str], timeframe: str
+    ) -> dict[str, Any] | None:
+        """
+        Fetch one pytrends payload with exponential backoff retry (cached by day)
+
+        ผลคือ ``{"start": วันแรก (ISO), "series": {คำ: คะแนนรายวัน}}`` หรือ None ถ้าล้มเหลว
+        """
+        cache_key = ResultCache.key(
+            "google_trends", sorted(keywords), timeframe, TRENDS_GEO
+        )
+        cached = self.fetch_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         max_retries = 3
         base_delay = 5  # seconds
 
         for attempt in range(max_retries):
             try:
                 pytrends = TrendReq(hl="th-TH", tz=420)
-                pytrends.build_payload(keywords, timeframe="today 30-d", geo="TH")
+                pytrends.build_payload(keywords, timeframe=timeframe, geo=TRENDS_GEO)
                 interest_over_time = pytrends.interest_over_time()
 
-                trends = []
-                for keyword in keywords:
-                    if keyword in interest_over_time.columns:
-                        scores = [int(s) for s in interest_over_time[keyword].tolist()]
-                        trends.append(
-                            GoogleTrendItem(
-                                term=keyword, score_series=scores, region="TH"
-                            )
-                        )
-                return trends
+                # แถวละวัน: ใช้วันที่จาก index ถ้ามี ไม่เช่นนั้นถือว่าแถวสุดท้ายคือวันสิ้นสุด
+                first_day = (
+                    interest_over_time.index[0] if len(interest_over_time) else None
+                )
+                if isinstance(first_day, datetime):
+                    start = first_day.date()
+                else:
+                    end = date.fromisoformat(timeframe.split()[-1])
+                    start = end - timedelta(days=max(0, len(interest_over_time) - 1))
+                response = {
+                    "start": start.isoformat(),
+                    "series": {
+                        keyword: [int(s) for s in interest_over_time[keyword].tolist()]
+                        for keyword in keywords
+                        if keyword in interest_over_time.columns
+                    },
+                }
+                self.fetch_cache.put(cache_key, response)
+                return response
             except Exception as e:
                 # Check for rate limit error (usually 429)
                 if "429" in str(e) and attempt < max_retries - 1:
@@ -577,8 +730,8 @@ class TrendScoutAgent(BaseAgent[TrendScoutInput, TrendScoutOutput]):
                     continue
 
                 logger.warning(f"Google Trends API failed: {e}")
-                return []
-        return []
+                return None
+        return None
 
     def _fetch_youtube_trending(
         self, niche_keywords: list[str]
@@ -589,6 +742,13 @@ class TrendScoutAgent(BaseAgent[TrendScoutInput, TrendScoutOutput]):
             logger.warning("YOUTUBE_API_KEY not set in config")
             return []
 
+        cache_key = ResultCache.key(
+            "youtube_trending", sorted(niche_keywords), TRENDS_GEO, YOUTUBE_WINDOW_DAYS
+        )
+        cached = self.fetch_cache.get(cache_key)
+        if cached is not None:
+            return [YTTrendingItem(**item) for item in cached]
+
         try:
             youtube = build("youtube", "v3", developerKey=api_key)
 
@@ -600,10 +760,12 @@ class TrendScoutAgent(BaseAgent[TrendScoutInput, TrendScoutOutput]):
                     part="snippet",
                     maxResults=10,
                     order="viewCount",
-                    regionCode="TH",
+                    regionCode=TRENDS_GEO,
                     relevanceLanguage="th",
                     type="video",
-                    publishedAfter=(datetime.now(UTC) - timedelta(days=30))
+                    publishedAfter=(
+                        datetime.now(UTC) - timedelta(days=YOUTUBE_WINDOW_DAYS)
+                    )
                     .replace(microsecond=0)
                     .isoformat()
                     .replace("+00:00", "Z"),
@@ -611,36 +773,40 @@ class TrendScoutAgent(BaseAgent[TrendScoutInput, TrendScoutOutput]):
                 .execute()
             )
 
-            trending = []
-            for item in search_response.get("items", []):
-                video_id = item["id"]["videoId"]
-
-                # Get video statistics
-                video_response = (
-                    youtube.videos()
-                    .list(part="statistics,snippet", id=video_id)
-                    .execute()
-                )
+            video_ids = [
+                item["id"]["videoId"] for item in search_response.get("items", [])
+            ]
+            if not video_ids:
+                self.fetch_cache.put(cache_key, [])
+                return []
 
-                if video_response["items"]:
-                    video = video_response["items"][0]
-                    stats = video["statistics"]
-                    snippet = video["snippet"]
+            # Get statistics of all videos in one request
+            video_response = (
+                youtube.videos()
+                .list(part="statistics,snippet", id=",".join(video_ids))
+                .execute()
+            )
 
-                    published_at = datetime.fromisoformat(
-                        snippet["publishedAt"].replace("Z", "+00:00")
-                    )
-                    age_days = (datetime.now(UTC) - published_at).days
-
-                    trending.append(
-                        YTTrendingItem(
-                            title=snippet["title"],
-                            views_est=int(stats.get("viewCount", 0)),
-                            age_days=age_days,
-                            keywords=extract_keywords(snippet["title"]),
-                        )
+            trending = []
+            for video in video_response.get("items", []):
+                stats = video["statistics"]
+                snippet = video["snippet"]
+
+                published_at = datetime.fromisoformat(
+                    snippet["publishedAt"].replace("Z", "+00:00")
+                )
+                age_days = (datetime.now(UTC) - published_at).days
+
+                trending.append(
+                    YTTrendingItem(
+                        title=snippet["title"],
+                        views_est=int(stats.get("viewCount", 0)),
+                        age_days=age_days,
+                        keywords=extract_keywords(snippet["title"]),
                     )
+                )
 
+            self.fetch_cache.put(cache_key, [item.model_dump() for item in trending])
             return trending
         except Exception as e:
             logger.warning(f"YouTube API failed: {e}")
@@ -0,0 +1,219 @@
+"""
+คลังอนุกรมเวลาคะแนน Google Trends รายวันของ TrendScout (SQLite)
+
+แต่ละคำค้น + ประเทศ เก็บเป็นแถวเดียว: วันแรกของอนุกรม และคะแนนรายวันเป็น array
+float32 ต่อเนื่อง เก็บย้อนหลังได้ถึง ``MAX_HISTORY_DAYS`` วัน
+
+Google Trends normalize คะแนนใหม่ทุกคำขอ (ค่าสูงสุดในช่วงเวลาที่ขอ = 100) การดึงรอบถัดไป
+จึงขอเฉพาะวันที่ยังไม่มี บวกวันที่มีแล้ว ``OVERLAP_DAYS`` วันเพื่อปรับสเกลของข้อมูลใหม่ให้
+ต่อกับของเดิม (วันสุดท้ายที่เก็บถูกแทนที่เสมอ เพราะเป็นข้อมูลของวันที่ยังไม่จบ)
+ข้อมูลที่ขาดช่วงนานเกิน ``MAX_FETCH_DAYS`` จะเริ่มอนุกรมใหม่ด้วยหน้าต่าง ``WINDOW_DAYS`` วัน
+
+การอ่าน/เขียนที่ล้มเหลวถูกบันทึกเป็น warning และถือว่ายังไม่มีข้อมูล
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ความยาวหน้าต่างที่ส่งให้ agent (เท่ากับ "today 30-d" ของ pytrends)
+WINDOW_DAYS = 30
+# วันที่มีแล้วที่ขอซ้ำเพื่อเทียบสเกล
+OVERLAP_DAYS = 7
+# pytrends ให้ข้อมูลรายวันเมื่อช่วงที่ขอไม่เกินราว 270 วัน
+MAX_FETCH_DAYS = 180
+MAX_HISTORY_DAYS = 730
+# ช่วงเวลาของ feature ระยะยาว: ค่าเฉลี่ยล่าสุดเทียบกับช่วงก่อนหน้า
+RECENT_DAYS = 7
+BASELINE_DAYS = 90
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    term TEXT NOT NULL,
+    geo TEXT NOT NULL,
+    start_day TEXT NOT NULL,
+    scores BLOB NOT NULL,
+    PRIMARY KEY (term, geo)
+);
+"""
+
+
+@dataclass(frozen=True)
+class TrendFeatures:
+    """feature ระยะยาวของคำค้นหนึ่งคำ คำนวณจากอนุกรมทั้งหมดในคลัง"""
+
+    days: int
+    recent_mean: float
+    baseline_mean: float
+    # recent_mean / baseline_mean (1.0 = คงที่, >1 = กำลังมา)
+    momentum: float
+
+
+class TrendSeriesStore:
+    """อนุกรมคะแนนรายวันต่อคำค้นที่เติมทีละส่วน"""
+
+    def __init__(
+        self, path: Path | str, today: Callable[[], date] = date.today
+    ) -> None:
+        self.path = Path(path)
+        self.today = today
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def load(
+        self, terms: Iterable[str], geo: str
+    ) -> dict[str, tuple[date, np.ndarray]]:
+        """วันแรกและ array คะแนนของคำที่มีในคลัง"""
+
+        terms = list(dict.fromkeys(terms))
+        if not terms or not self.path.exists():
+            return {}
+        try:
+            conn = self._connect()
+            try:
+                rows = []
+                for i in range(0, len(terms), 500):
+                    chunk = terms[i : i + 500]
+                    rows += conn.execute(
+                        "SELECT term, start_day, scores FROM series "
+                        f"WHERE geo = ? AND term IN ({','.join('?' * len(chunk))})",
+                        (geo, *chunk),
+                    ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as exc:
+            logger.warning("อ่านคลังอนุกรม Google Trends ไม่ได้: %s", exc)
+            return {}
+        return {
+            term: (date.fromisoformat(start), np.frombuffer(blob, dtype=np.float32))
+            for term, start, blob in rows
+        }
+
+    def plan(self, terms: Sequence[str], geo: str) -> dict[date, list[str]]:
+        """
+        วันเริ่มที่ต้องดึงของแต่ละคำ (จัดกลุ่มตามวันเริ่ม) คำที่มีข้อมูลถึงวันนี้แล้วไม่อยู่ในผล
+        """
+
+        today = self.today()
+        stored = self.load(terms, geo)
+        groups: dict[date, list[str]] = {}
+        for term in dict.fromkeys(terms):
+            start = today - timedelta(days=WINDOW_DAYS - 1)
+            if term in stored:
+                first, scores = stored[term]
+                last = first + timedelta(days=len(scores) - 1)
+                if last >= today:
+                    continue
+                resume = last - timedelta(days=OVERLAP_DAYS)
+                if (today - resume).days < MAX_FETCH_DAYS:
+                    start = resume
+            groups.setdefault(start, []).append(term)
+        return groups
+
+    def merge(self, series: dict[str, Sequence[float]], geo: str, start: date) -> None:
+        """เติมคะแนนรายวันที่เริ่มวัน ``start`` ต่อท้ายอนุกรมเดิม (ปรับสเกลด้วยช่วงที่ซ้อนกัน)"""
+
+        stored = self.load(series, geo)
+        rows = []
+        for term, values in series.items():
+            if not len(values):
+                continue
+            first, scores = start, np.asarray(values, dtype=np.float32)
+            if term in stored:
+                first, scores = _splice(*stored[term], start, scores)
+            first += timedelta(days=max(0, len(scores) - MAX_HISTORY_DAYS))
+            scores = scores[-MAX_HISTORY_DAYS:]
+            rows.append((term, geo, first.isoformat(), scores.tobytes()))
+        if not rows:
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO series (term, geo, start_day, scores) "
+                        "VALUES (?, ?, ?, ?)",
+                        rows,
+                    )
+            finally:
+                conn.close()
+        except (OSError, sqlite3.Error) as exc:
+            logger.warning("บันทึกคลังอนุกรม Google Trends ไม่ได้: %s", exc)
+
+    def windows(
+        self, terms: Sequence[str], geo: str, days: int = WINDOW_DAYS
+    ) -> dict[str, list[int]]:
+        """
+        คะแนน ``days`` วันล่าสุดของแต่ละคำเป็นจำนวนเต็ม 0-100 ทุกคำใช้สเกลเดียวกัน
+        (หารด้วยค่าสูงสุดร่วมเมื่อเกิน 100)
+        """
+
+        tails = {
+            term: scores[-days:] for term, (_, scores) in self.load(terms, geo).items()
+        }
+        peak = max((float(tail.max()) for tail in tails.values()), default=0.0)
+        scale = 100.0 / peak if peak > 100 else 1.0
+        return {
+            term: np.clip(np.rint(tail * scale), 0, 100).astype(int).tolist()
+            for term, tail in tails.items()
+        }
+
+    def features(self, terms: Iterable[str], geo: str) -> dict[str, TrendFeatures]:
+        """feature ระยะยาวของคำที่มีข้อมูลอย่างน้อย RECENT_DAYS * 2 วัน"""
+
+        result = {}
+        for term, (_, scores) in self.load(terms, geo).items():
+            history = scores[-(RECENT_DAYS + BASELINE_DAYS) :]
+            recent = history[-RECENT_DAYS:]
+            baseline = history[:-RECENT_DAYS]
+            if len(baseline) < RECENT_DAYS:
+                continue
+            recent_mean = float(recent.mean())
+            baseline_mean = float(baseline.mean())
+            if baseline_mean > 0:
+                momentum = recent_mean / baseline_mean
+            else:
+                momentum = 1.0 if recent_mean == 0 else 2.0
+            result[term] = TrendFeatures(
+                days=len(scores),
+                recent_mean=recent_mean,
+                baseline_mean=baseline_mean,
+                momentum=momentum,
+            )
+        return result
+
+
+def _splice(
+    first: date, stored: np.ndarray, start: date, values: np.ndarray
+) -> tuple[date, np.ndarray]:
+    """ต่อ ``values`` (เริ่มวัน ``start``) เข้ากับอนุกรมเดิมที่เริ่มวัน ``first``"""
+
+    offset = (start - first).days
+    # วันที่เก็บแล้ว (ยกเว้นวันสุดท้าย) ที่ข้อมูลใหม่ครอบคลุม ใช้เทียบสเกล
+    overlap = len(stored) - 1 - offset
+    if offset < 0 or overlap <= 0:
+        # ไม่มีช่วงซ้อนให้เทียบสเกล: เริ่มอนุกรมใหม่
+        return start, values
+    if len(values) <= overlap:
+        return first, stored
+
+    old = float(stored[offset : offset + overlap].sum())
+    new = float(values[:overlap].sum())
+    factor = old / new if old > 0 and new > 0 else 1.0
+    return first, np.concatenate([stored[:-1], values[overlap:] * factor]).astype(
+        np.float32
+    )
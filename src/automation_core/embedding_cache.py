@@ -0,0 +1,161 @@
+"""
+cache ของ embedding บนดิสก์ ใช้ร่วมกันข้ามรอบและข้าม process
+
+เวกเตอร์เก็บเป็นเมทริกซ์ float32 ต่อท้ายไฟล์เดียว (``<model>.f32``) อ่านแบบ
+memory-mapped จึงไม่ต้องโหลดทั้งไฟล์ ส่วนดัชนี hash ของข้อความ -> แถว เก็บใน
+SQLite (``<model>.sqlite3``) ผู้เขียนหลาย process จองแถวใน transaction
+``BEGIN IMMEDIATE`` เดียวกัน จึงไม่ชนกัน และดัชนีชี้เฉพาะแถวที่เขียนเสร็จแล้ว
+
+ตัวแปรแวดล้อม:
+    EMBEDDING_CACHE_DIR  โฟลเดอร์เก็บ cache (ค่าเริ่มต้น <repo>/data/embedding_cache)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_CACHE_DIR = REPO_ROOT / "data" / "embedding_cache"
+# SQLite จำกัดจำนวน parameter ต่อคำสั่ง จึงค้นทีละชุด
+_LOOKUP_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER NOT NULL);
+"""
+
+
+def _slug(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name).strip("_") or "model"
+
+
+class EmbeddingCache:
+    """เก็บ/อ่าน embedding ของข้อความตาม hash (model + ข้อความ)"""
+
+    def __init__(self, cache_dir: Path | str, model_name: str) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.model_name = model_name
+        slug = _slug(model_name)
+        self.matrix_path = self.cache_dir / f"{slug}.f32"
+        self.index_path = self.cache_dir / f"{slug}.sqlite3"
+        self._matrix: np.memmap | None = None
+
+    @classmethod
+    def from_env(cls, model_name: str) -> EmbeddingCache:
+        return cls(
+            os.environ.get("EMBEDDING_CACHE_DIR") or DEFAULT_CACHE_DIR, model_name
+        )
+
+    def key(self, text: str) -> str:
+        material = f"{self.model_name}\0{text}".encode()
+        return hashlib.sha256(material).hexdigest()[:32]
+
+    def _connect(self) -> sqlite3.Connection:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.index_path, timeout=30.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _stored_dim(self, conn: sqlite3.Connection) -> int | None:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        return int(row[0]) if row else None
+
+    def _rows_view(self, needed_rows: int, dim: int) -> np.memmap:
+        # map ใหม่เมื่อไฟล์โตเกินส่วนที่ map ไว้ (process อื่นเพิ่งต่อท้าย)
+        if self._matrix is None or self._matrix.shape[0] < needed_rows:
+            rows = self.matrix_path.stat().st_size // (dim * 4)
+            self._matrix = np.memmap(
+                self.matrix_path, dtype=np.float32, mode="r", shape=(rows, dim)
+            )
+        return self._matrix
+
+    def get_many(self, texts: Sequence[str]) -> dict[str, np.ndarray]:
+        """คืนเวกเตอร์ของข้อความที่มีใน cache (ข้อความที่ไม่มีจะไม่อยู่ใน dict)"""
+
+        if not texts or not self.index_path.exists():
+            return {}
+        by_key = {self.key(text): text for text in texts}
+        keys = list(by_key)
+        conn = self._connect()
+        try:
+            dim = self._stored_dim(conn)
+            found: list[tuple[str, int]] = []
+            for start in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[start : start + _LOOKUP_CHUNK]
+                placeholders = ", ".join("?" * len(chunk))
+                found.extend(
+                    conn.execute(
+                        f"SELECT key, row FROM vectors WHERE key IN ({placeholders})",
+                        chunk,
+                    ).fetchall()
+                )
+        finally:
+            conn.close()
+        if not found or dim is None:
+            return {}
+        rows = np.array([row for _, row in found], dtype=np.int64)
+        matrix = self._rows_view(int(rows.max()) + 1, dim)
+        vectors = np.array(matrix[rows], dtype=np.float32)
+        return {by_key[key]: vectors[i] for i, (key, _) in enumerate(found)}
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray) -> None:
+        """เพิ่มเวกเตอร์ของข้อความที่ยังไม่มีใน cache"""
+
+        if not len(texts):
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(texts):
+            raise ValueError("vectors must have one row per text")
+        dim = vectors.shape[1]
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                stored = self._stored_dim(conn)
+                if stored is None:
+                    conn.execute("INSERT INTO meta VALUES ('dim', ?)", (str(dim),))
+                elif stored != dim:
+                    raise ValueError(f"cache dim {stored} != vector dim {dim}")
+                keys = [self.key(text) for text in texts]
+                existing = set()
+                for start in range(0, len(keys), _LOOKUP_CHUNK):
+                    chunk = keys[start : start + _LOOKUP_CHUNK]
+                    placeholders = ", ".join("?" * len(chunk))
+                    existing.update(
+                        row[0]
+                        for row in conn.execute(
+                            f"SELECT key FROM vectors WHERE key IN ({placeholders})",
+                            chunk,
+                        )
+                    )
+                fresh = {}
+                for index, key in enumerate(keys):
+                    if key not in existing:
+                        fresh.setdefault(key, index)
+                if fresh:
+                    row_bytes = dim * 4
+                    with open(self.matrix_path, "ab+") as handle:
+                        size = handle.seek(0, os.SEEK_END)
+                        first_row = size // row_bytes
+                        # ตัดแถวที่เขียนค้างจาก process ที่ล้มกลางทางทิ้ง
+                        handle.truncate(first_row * row_bytes)
+                        handle.write(vectors[list(fresh.values())].tobytes())
+                        handle.flush()
+                    conn.executemany(
+                        "INSERT INTO vectors VALUES (?, ?)",
+                        [(key, first_row + i) for i, key in enumerate(fresh)],
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
@@ -0,0 +1,444 @@
+"""
+บริการ embedding ที่ใช้ร่วมกันทุก worker ผ่าน Unix socket
+
+เดิมทุก process ที่รัน DoctrineValidator โหลด sentence-transformers ของตัวเอง
+บริการนี้โหลด model ครั้งเดียวใน subprocess แล้วรวมคำขอจากทุก worker เป็น batch
+(micro-batching: รอคำขอเพิ่มไม่เกิน ``max_wait`` วินาทีหรือจนครบ ``max_batch``
+ข้อความ) ก่อนเรียก ``encode`` ครั้งเดียว
+
+โปรโตคอล: ทุกข้อความขึ้นต้นด้วยความยาว 4 ไบต์ (big-endian) ตามด้วย JSON
+    คำขอ   {"op": "encode", "texts": [...]} หรือ {"op": "ping"}
+    คำตอบ  {"rows": n, "dim": d} ตามด้วย float32 n*d ค่า, หรือ {"error": "..."}
+
+ตัวแปรแวดล้อม:
+    EMBEDDING_SERVICE_SOCKET  path ของ socket (ไม่ตั้ง = โหลด model ใน process เอง)
+    EMBEDDING_SERVICE_MODEL   ชื่อ model ของบริการ (``hashing`` = ตัวแทนสำหรับทดสอบ)
+
+client เริ่มบริการให้เองเมื่อยังไม่มี (มีได้ตัวเดียวต่อ socket ด้วย lock ไฟล์)
+และบริการปิดตัวเองเมื่อว่างเกิน ``--idle-timeout`` วินาที stderr ของบริการที่
+client เริ่มถูกเขียนต่อท้าย ``<socket>.log``
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Protocol
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SOCKET_ENV = "EMBEDDING_SERVICE_SOCKET"
+MODEL_ENV = "EMBEDDING_SERVICE_MODEL"
+DEFAULT_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
+HASHING_MODEL = "hashing"
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_SECONDS = 0.005
+DEFAULT_IDLE_TIMEOUT_SECONDS = 600.0
+_HEADER = struct.Struct(">I")
+
+
+class Encoder(Protocol):
+    def encode(self, texts: Sequence[str]) -> Any: ...
+
+
+class HashingEmbedder:
+    """
+    embedder ตัวแทนแบบ deterministic (ไม่ต้องมี model): hash แต่ละคำลงช่อง
+    ของเวกเตอร์พร้อมเครื่องหมาย แล้ว normalize ข้อความที่มีคำร่วมกันจึงได้
+    cosine สูง ใช้ในการทดสอบและเครื่องที่ไม่มี sentence-transformers
+    """
+
+    def __init__(self, dim: int = 384) -> None:
+        self.dim = dim
+        self.model_name = f"{HASHING_MODEL}-{dim}"
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        from automation_core.thai_tokenizer import default_tokenizer
+
+        tokenizer = default_tokenizer()
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenizer.tokenize(text):
+                digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+                value = int.from_bytes(digest, "big")
+                matrix[row, value % self.dim] += 1.0 if value >> 63 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(matrix, norms, out=matrix, where=norms > 0)
+
+
+def load_encoder(model_name: str) -> Encoder:
+    if model_name == HASHING_MODEL:
+        return HashingEmbedder()
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+async def _read_message(reader: asyncio.StreamReader) -> dict[str, Any]:
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return json.loads(await reader.readexactly(length))
+
+
+def _frame(payload: dict[str, Any]) -> bytes:
+    body = json.dumps(payload).encode()
+    return _HEADER.pack(len(body)) + body
+
+
+class EmbeddingService:
+    """รวมคำขอจากหลาย connection เป็น batch แล้ว encode ครั้งเดียว"""
+
+    def __init__(
+        self,
+        encoder: Encoder,
+        *,
+        model_name: str,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_wait: float = DEFAULT_MAX_WAIT_SECONDS,
+    ) -> None:
+        self.encoder = encoder
+        self.model_name = model_name
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self.batches = 0
+        self.last_activity = time.monotonic()
+        self.connections = 0
+        self._pending: asyncio.Queue[tuple[list[str], asyncio.Future]] | None = None
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        if self._pending is None:
+            raise RuntimeError("service is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._pending.put((texts, future))
+        return await future
+
+    async def _batch_loop(self) -> None:
+        assert self._pending is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._pending.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._pending.get(), remaining)
+                except TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            texts = [text for request, _ in batch for text in request]
+            try:
+                vectors = await asyncio.to_thread(self.encoder.encode, texts)
+                vectors = np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+            except Exception as exc:  # noqa: BLE001 - ส่งต่อให้ทุกคำขอใน batch
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            self.batches += 1
+            offset = 0
+            for request, future in batch:
+                if not future.done():
+                    future.set_result(vectors[offset : offset + len(request)])
+                offset += len(request)
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    request = await _read_message(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                self.last_activity = time.monotonic()
+                if request.get("op") == "ping":
+                    writer.write(
+                        _frame({"pid": os.getpid(), "model_name": self.model_name})
+                    )
+                else:
+                    try:
+                        vectors = await self.embed(list(request.get("texts") or []))
+                    except Exception as exc:  # noqa: BLE001
+                        writer.write(_frame({"error": f"{type(exc).__name__}: {exc}"}))
+                    else:
+                        rows, dim = vectors.shape if vectors.size else (0, 0)
+                        writer.write(_frame({"rows": rows, "dim": dim}))
+                        writer.write(np.ascontiguousarray(vectors).tobytes())
+                await writer.drain()
+                self.last_activity = time.monotonic()
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def serve(
+        self,
+        socket_path: Path,
+        *,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT_SECONDS,
+        ready: threading.Event | None = None,
+        stop: asyncio.Event | None = None,
+    ) -> None:
+        self._pending = asyncio.Queue()
+        socket_path.unlink(missing_ok=True)
+        server = await asyncio.start_unix_server(self._handle, path=str(socket_path))
+        os.chmod(socket_path, 0o600)
+        batcher = asyncio.create_task(self._batch_loop())
+        stop = stop or asyncio.Event()
+        if ready is not None:
+            ready.set()
+        try:
+            while not stop.is_set():
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(stop.wait(), 1.0)
+                idle = time.monotonic() - self.last_activity
+                if idle_timeout > 0 and not self.connections and idle > idle_timeout:
+                    logger.info("embedding service idle for %.0fs, exiting", idle)
+                    break
+        finally:
+            server.close()
+            await server.wait_closed()
+            batcher.cancel()
+            socket_path.unlink(missing_ok=True)
+
+
+def _lock_path(socket_path: Path) -> Path:
+    return socket_path.with_name(socket_path.name + ".lock")
+
+
+def run_service(
+    socket_path: Path,
+    model_name: str,
+    *,
+    max_batch: int = DEFAULT_MAX_BATCH,
+    max_wait: float = DEFAULT_MAX_WAIT_SECONDS,
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT_SECONDS,
+) -> int:
+    """รันบริการจนว่างเกินเวลา คืน 0 ทันทีถ้ามีบริการอื่นถือ socket นี้อยู่แล้ว"""
+
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(_lock_path(socket_path), "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0
+        service = EmbeddingService(
+            load_encoder(model_name),
+            model_name=model_name,
+            max_batch=max_batch,
+            max_wait=max_wait,
+        )
+
+        async def serve() -> None:
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(signum, stop.set)
+            await service.serve(socket_path, idle_timeout=idle_timeout, stop=stop)
+
+        asyncio.run(serve())
+    return 0
+
+
+class EmbeddingServiceError(RuntimeError):
+    """ติดต่อบริการ embedding ไม่ได้หรือบริการตอบ error"""
+
+
+class EmbeddingClient:
+    """
+    client ของบริการ ใช้แทน SentenceTransformer ได้ (มี ``encode``)
+
+    หนึ่ง connection ต่อ process (ใช้ร่วมกันทุก thread ผ่าน lock) ต่อใหม่อัตโนมัติ
+    เมื่อ connection หลุด และเริ่มบริการเองถ้า ``autostart`` เปิดอยู่
+    """
+
+    def __init__(
+        self,
+        socket_path: Path | str,
+        model_name: str,
+        *,
+        autostart: bool = True,
+        connect_timeout: float = 120.0,
+    ) -> None:
+        self.socket_path = Path(socket_path)
+        self.model_name = model_name
+        self.autostart = autostart
+        self.connect_timeout = connect_timeout
+        self._sock: socket.socket | None = None
+        self._lock = threading.Lock()
+        self._start_error: str | None = None
+
+    @classmethod
+    def from_env(cls, default_model: str) -> EmbeddingClient | None:
+        socket_path = os.environ.get(SOCKET_ENV, "").strip()
+        if not socket_path:
+            return None
+        return cls(socket_path, os.environ.get(MODEL_ENV, "").strip() or default_model)
+
+    @property
+    def log_path(self) -> Path:
+        """ไฟล์ stderr ของบริการที่ client นี้เริ่ม (ดูสาเหตุเมื่อบริการเริ่มไม่ขึ้น)"""
+
+        return self.socket_path.with_name(self.socket_path.name + ".log")
+
+    def _spawn(self) -> subprocess.Popen:
+        src_dir = str(Path(__file__).resolve().parents[1])
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            p for p in (src_dir, env.get("PYTHONPATH")) if p
+        )
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, "ab") as log_file:
+            return subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "automation_core.embedding_service",
+                    "--socket",
+                    str(self.socket_path),
+                    "--model",
+                    self.model_name,
+                ],
+                env=env,
+                stdin=subprocess.DEVNULL,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+
+    def _connect(self) -> socket.socket:
+        if self._start_error is not None:
+            # บริการเคยเริ่มไม่ขึ้นแล้ว: ไม่เริ่มซ้ำและไม่รอ timeout อีก
+            raise EmbeddingServiceError(self._start_error)
+        deadline = time.monotonic() + self.connect_timeout
+        process: subprocess.Popen | None = None
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(str(self.socket_path))
+                return sock
+            except (FileNotFoundError, ConnectionRefusedError) as exc:
+                sock.close()
+                if not self.autostart:
+                    raise EmbeddingServiceError(
+                        f"embedding service not running at {self.socket_path}"
+                    ) from exc
+                if process is None:
+                    process = self._spawn()
+                # exit 0 = มีบริการอื่นถือ lock อยู่แล้ว รอ socket ของบริการนั้นต่อ
+                elif process.poll() not in (None, 0):
+                    self._start_error = (
+                        f"embedding service exited with code {process.returncode}"
+                        f" (see {self.log_path})"
+                    )
+                    raise EmbeddingServiceError(self._start_error) from exc
+                if time.monotonic() > deadline:
+                    self._start_error = (
+                        f"embedding service did not start at {self.socket_path}"
+                        f" (see {self.log_path})"
+                    )
+                    raise EmbeddingServiceError(self._start_error) from exc
+                time.sleep(0.05)
+
+    def _request(self, payload: dict[str, Any]) -> tuple[dict[str, Any], bytes]:
+        with self._lock:
+            for attempt in range(2):
+                if self._sock is None:
+                    self._sock = self._connect()
+                try:
+                    self._sock.sendall(_frame(payload))
+                    header = json.loads(self._recv(self._recv_length()))
+                    body = b""
+                    if "rows" in header:
+                        body = self._recv(header["rows"] * header["dim"] * 4)
+                    return header, body
+                except (ConnectionError, OSError):
+                    self.close_locked()
+                    if attempt:
+                        raise
+        raise AssertionError("unreachable")
+
+    def _recv_length(self) -> int:
+        return _HEADER.unpack(self._recv(_HEADER.size))[0]
+
+    def _recv(self, size: int) -> bytes:
+        assert self._sock is not None
+        chunks = bytearray()
+        while len(chunks) < size:
+            chunk = self._sock.recv(min(size - len(chunks), 1 << 20))
+            if not chunk:
+                raise ConnectionResetError("embedding service closed the connection")
+            chunks.extend(chunk)
+        return bytes(chunks)
+
+    def ping(self) -> dict[str, Any]:
+        """ตรวจว่าบริการพร้อม และใช้ชื่อ model ที่บริการโหลดอยู่จริง"""
+
+        info = self._request({"op": "ping"})[0]
+        self.model_name = info.get("model_name") or self.model_name
+        return info
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        header, body = self._request({"op": "encode", "texts": list(texts)})
+        if "error" in header:
+            raise EmbeddingServiceError(header["error"])
+        return np.frombuffer(body, dtype=np.float32).reshape(
+            header["rows"], header["dim"]
+        )
+
+    def close_locked(self) -> None:
+        if self._sock is not None:
+            with contextlib.suppress(OSError):
+                self._sock.close()
+            self._sock = None
+
+    def close(self) -> None:
+        with self._lock:
+            self.close_locked()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Shared embedding service")
+    parser.add_argument("--socket", type=Path, required=True)
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument(
+        "--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_SECONDS * 1000
+    )
+    parser.add_argument(
+        "--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT_SECONDS
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    return run_service(
+        args.socket,
+        args.model,
+        max_batch=args.max_batch,
+        max_wait=args.max_wait_ms / 1000,
+        idle_timeout=args.idle_timeout,
+    )
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
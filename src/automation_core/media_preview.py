@@ -0,0 +1,319 @@
+"""
+ข้อมูลพรีวิวสื่อสำหรับหน้ารีวิว: waveform peaks ของเสียง และ sprite ภาพย่อของวิดีโอ
+
+peaks คำนวณจาก WAV แบบอ่านทีละบล็อกขนาดคงที่ด้วย numpy (ไม่โหลดทั้งไฟล์)
+ได้ค่า min/max ต่อช่วงตัวอย่างหลายความละเอียด เก็บเป็น int8 สลับ min,max
+(รูปแบบเดียวกับ audiowaveform) ส่วน sprite ใช้ ffmpeg ผ่านเดียวต่อวิดีโอ
+(fps + scale + tile) ได้ภาพเดียวที่มีภาพย่อเรียงเป็นตาราง
+
+ผลลัพธ์ถูก cache ด้วย sha256 ของไฟล์ต้นทาง (รวมพารามิเตอร์) ไฟล์เดิมจึงไม่ถูก
+ถอดรหัสซ้ำไม่ว่าจะรีวิวกี่ครั้งหรือกี่รอบ sha256 ของแต่ละไฟล์ถูกจำไว้ตาม
+(path, ขนาด, mtime_ns) การเปิดหน้ารีวิวซ้ำจึงไม่ต้องอ่านไฟล์ต้นทางทั้งไฟล์ใหม่
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import subprocess
+import wave
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+PEAKS_VERSION = 1
+# ตัวอย่างต่อ 1 peak ของแต่ละระดับ (ระดับถัดไปต้องหารด้วยระดับแรกลงตัว)
+DEFAULT_PEAK_LEVELS = (256, 1024, 4096, 16384)
+DEFAULT_BLOCK_FRAMES = 1 << 16
+DEFAULT_SPRITE_INTERVAL_SECONDS = 2.0
+DEFAULT_SPRITE_TILE_WIDTH = 160
+DEFAULT_SPRITE_COLUMNS = 10
+# กันภาพ sprite ใหญ่เกินไปสำหรับวิดีโอยาว (ยืด interval แทน)
+MAX_SPRITE_TILES = 400
+
+Runner = Callable[..., subprocess.CompletedProcess]
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while chunk := handle.read(block_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _decode_pcm(raw: bytes, sample_width: int, channels: int) -> np.ndarray:
+    """PCM แบบ little-endian -> float32 ช่วง [-1, 1] รูปทรง (frames, channels)"""
+
+    if sample_width == 1:
+        samples = np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32)
+    elif sample_width == 3:
+        triplets = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = triplets[:, 0] | (triplets[:, 1] << 8) | (triplets[:, 2] << 16)
+        samples = np.where(values >= 1 << 23, values - (1 << 24), values).astype(
+            np.float32
+        )
+    elif sample_width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32)
+    else:
+        raise ValueError(f"unsupported WAV sample width: {sample_width}")
+    scale = float(1 << (8 * sample_width - 1))
+    return (samples / scale).reshape(-1, channels)
+
+
+def _bucket_extremes(
+    lows: np.ndarray, highs: np.ndarray, size: int
+) -> tuple[np.ndarray, np.ndarray]:
+    starts = np.arange(0, len(lows), size)
+    return np.minimum.reduceat(lows, starts), np.maximum.reduceat(highs, starts)
+
+
+def _to_int8(values: np.ndarray) -> np.ndarray:
+    return np.clip(np.round(values * 127.0), -128, 127).astype(np.int8)
+
+
+def compute_wav_peaks(
+    wav_path: Path,
+    levels: Sequence[int] = DEFAULT_PEAK_LEVELS,
+    block_frames: int = DEFAULT_BLOCK_FRAMES,
+) -> dict[str, Any]:
+    """
+    คำนวณ min/max peaks หลายระดับจาก WAV (PCM 8/16/24/32 บิต) แบบ streaming
+
+    ทุกช่องเสียงรวมเป็นช่องเดียว (min/max ข้ามทุกช่อง) ระดับแรกคำนวณจากตัวอย่าง
+    ระดับที่หยาบกว่าย่อจากระดับแรกอีกที จึงอ่านไฟล์เพียงรอบเดียว
+    """
+
+    base = levels[0]
+    if any(level % base for level in levels):
+        raise ValueError("every peak level must be a multiple of the first level")
+    # บล็อกต้องเป็นพหุคูณของ base เพื่อไม่ให้ช่วง peak คร่อมระหว่างบล็อก
+    block_frames = max(base, block_frames // base * base)
+    low_parts: list[np.ndarray] = []
+    high_parts: list[np.ndarray] = []
+    carry = np.empty((0,), dtype=np.float32), np.empty((0,), dtype=np.float32)
+    with wave.open(str(wav_path), "rb") as wav_file:
+        if wav_file.getcomptype() != "NONE":
+            raise ValueError("compressed WAV is not supported")
+        channels = wav_file.getnchannels()
+        sample_width = wav_file.getsampwidth()
+        sample_rate = wav_file.getframerate()
+        total_frames = 0
+        while raw := wav_file.readframes(block_frames):
+            frames = _decode_pcm(raw, sample_width, channels)
+            total_frames += len(frames)
+            lows = np.concatenate((carry[0], frames.min(axis=1)))
+            highs = np.concatenate((carry[1], frames.max(axis=1)))
+            full = len(lows) // base * base
+            if full:
+                low_parts.append(lows[:full].reshape(-1, base).min(axis=1))
+                high_parts.append(highs[:full].reshape(-1, base).max(axis=1))
+            carry = lows[full:], highs[full:]
+    if len(carry[0]):
+        low_parts.append(carry[0].min(keepdims=True))
+        high_parts.append(carry[1].max(keepdims=True))
+
+    base_lows = np.concatenate(low_parts) if low_parts else np.empty(0, np.float32)
+    base_highs = np.concatenate(high_parts) if high_parts else np.empty(0, np.float32)
+    result_levels = []
+    for level in levels:
+        if level == base or not len(base_lows):
+            lows, highs = base_lows, base_highs
+        else:
+            lows, highs = _bucket_extremes(base_lows, base_highs, level // base)
+        interleaved = np.empty(len(lows) * 2, dtype=np.int8)
+        interleaved[0::2] = _to_int8(lows)
+        interleaved[1::2] = _to_int8(highs)
+        result_levels.append({"samples_per_peak": level, "data": interleaved.tolist()})
+    return {
+        "version": PEAKS_VERSION,
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "bits": 8,
+        "duration_seconds": total_frames / sample_rate if sample_rate else 0.0,
+        "levels": result_levels,
+    }
+
+
+def probe_video(
+    video_path: Path, ffprobe_bin: str = "ffprobe", run: Runner = subprocess.run
+) -> dict[str, float]:
+    """ความยาวและขนาดภาพของวิดีโอจาก ffprobe (อ่าน header ไม่ถอดรหัสภาพ)"""
+
+    cmd = [
+        ffprobe_bin,
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "stream=width,height:format=duration",
+        "-of",
+        "json",
+        str(video_path),
+    ]
+    try:
+        completed = run(cmd, check=True, capture_output=True, text=True)
+    except FileNotFoundError as exc:
+        raise RuntimeError("ffprobe not found in PATH") from exc
+    except subprocess.CalledProcessError as exc:
+        raise RuntimeError(f"ffprobe failed: {exc.stderr or ''}".strip()) from exc
+    data = json.loads(completed.stdout or "{}")
+    streams = data.get("streams") or [{}]
+    return {
+        "duration_seconds": float(data.get("format", {}).get("duration") or 0.0),
+        "width": float(streams[0].get("width") or 0),
+        "height": float(streams[0].get("height") or 0),
+    }
+
+
+def build_thumbnail_sprite(
+    video_path: Path,
+    output_path: Path,
+    *,
+    interval_seconds: float = DEFAULT_SPRITE_INTERVAL_SECONDS,
+    tile_width: int = DEFAULT_SPRITE_TILE_WIDTH,
+    columns: int = DEFAULT_SPRITE_COLUMNS,
+    ffmpeg_bin: str = "ffmpeg",
+    ffprobe_bin: str = "ffprobe",
+    run: Runner = subprocess.run,
+) -> dict[str, Any]:
+    """สร้าง sprite ภาพย่อด้วย ffmpeg ผ่านเดียว คืนข้อมูลตำแหน่ง tile สำหรับ UI"""
+
+    info = probe_video(video_path, ffprobe_bin=ffprobe_bin, run=run)
+    duration = info["duration_seconds"]
+    if duration <= 0:
+        raise ValueError(f"video has no duration: {video_path}")
+    interval = max(interval_seconds, duration / MAX_SPRITE_TILES)
+    count = max(1, math.ceil(duration / interval))
+    columns = max(1, min(columns, count))
+    rows = math.ceil(count / columns)
+    aspect = info["height"] / info["width"] if info["width"] else 9 / 16
+    # libx264/mjpeg ต้องการขนาดเป็นเลขคู่
+    tile_height = max(2, round(tile_width * aspect / 2) * 2)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    cmd = [
+        ffmpeg_bin,
+        "-y",
+        "-v",
+        "error",
+        "-i",
+        str(video_path),
+        "-vf",
+        f"fps=1/{interval:g},scale={tile_width}:{tile_height},tile={columns}x{rows}",
+        "-frames:v",
+        "1",
+        str(output_path),
+    ]
+    try:
+        run(cmd, check=True, capture_output=True, text=True)
+    except FileNotFoundError as exc:
+        raise RuntimeError("ffmpeg not found in PATH") from exc
+    except subprocess.CalledProcessError as exc:
+        tail = "\n".join((exc.stderr or "").splitlines()[-20:])
+        raise RuntimeError(f"ffmpeg failed:\n{tail}".strip()) from exc
+    return {
+        "interval_seconds": interval,
+        "tile_width": tile_width,
+        "tile_height": tile_height,
+        "columns": columns,
+        "rows": rows,
+        "count": count,
+        "duration_seconds": duration,
+    }
+
+
+def _write_json_atomic(path: Path, payload: dict[str, Any]) -> None:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class MediaPreviewCache:
+    """cache ของ peaks/sprite ตาม sha256 ของไฟล์ต้นทาง"""
+
+    def __init__(self, cache_dir: Path | str) -> None:
+        self.cache_dir = Path(cache_dir)
+        self._digests: dict[str, str] = {}
+
+    def _source_digest(self, source: Path) -> str:
+        """
+        sha256 ของไฟล์ต้นทาง อ่านทั้งไฟล์เฉพาะเมื่อ (path, ขนาด, mtime_ns) ยังไม่เคยเห็น
+
+        ผลถูกจำทั้งในหน่วยความจำและเป็นไฟล์ ``<stat key>.source.json`` ใน cache_dir
+        ให้ process อื่นใช้ร่วมกัน
+        """
+
+        info = source.stat()
+        marker = json.dumps([str(source.resolve()), info.st_size, info.st_mtime_ns])
+        stat_key = hashlib.sha256(marker.encode("utf-8")).hexdigest()[:24]
+        digest = self._digests.get(stat_key)
+        if digest is not None:
+            return digest
+        pointer = self.cache_dir / f"{stat_key}.source.json"
+        try:
+            digest = json.loads(pointer.read_text(encoding="utf-8"))["sha256"]
+        except (OSError, ValueError, KeyError, TypeError):
+            digest = file_sha256(source)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            _write_json_atomic(pointer, {"sha256": digest})
+        self._digests[stat_key] = digest
+        return digest
+
+    def _key(self, source: Path, params: dict[str, Any]) -> str:
+        material = json.dumps(
+            {"sha256": self._source_digest(source), **params}, sort_keys=True
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()[:24]
+
+    def peaks(
+        self, wav_path: Path, levels: Sequence[int] = DEFAULT_PEAK_LEVELS
+    ) -> Path:
+        key = self._key(
+            wav_path, {"kind": "peaks", "v": PEAKS_VERSION, "levels": list(levels)}
+        )
+        path = self.cache_dir / f"{key}.peaks.json"
+        if not path.is_file():
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            _write_json_atomic(path, compute_wav_peaks(wav_path, levels))
+        return path
+
+    def sprite(
+        self,
+        video_path: Path,
+        *,
+        interval_seconds: float = DEFAULT_SPRITE_INTERVAL_SECONDS,
+        tile_width: int = DEFAULT_SPRITE_TILE_WIDTH,
+        columns: int = DEFAULT_SPRITE_COLUMNS,
+        run: Runner = subprocess.run,
+    ) -> tuple[Path, Path]:
+        """คืน (ภาพ sprite, ไฟล์ JSON ตำแหน่ง tile)"""
+
+        params = {
+            "kind": "sprite",
+            "interval": interval_seconds,
+            "tile_width": tile_width,
+            "columns": columns,
+        }
+        key = self._key(video_path, params)
+        image_path = self.cache_dir / f"{key}.sprite.jpg"
+        meta_path = self.cache_dir / f"{key}.sprite.json"
+        if not (image_path.is_file() and meta_path.is_file()):
+            tmp_image = self.cache_dir / f".{key}.{os.getpid()}.sprite.jpg"
+            meta = build_thumbnail_sprite(
+                video_path,
+                tmp_image,
+                interval_seconds=interval_seconds,
+                tile_width=tile_width,
+                columns=columns,
+                run=run,
+            )
+            os.replace(tmp_image, image_path)
+            _write_json_atomic(meta_path, meta)
+        return image_path, meta_path
@@ -0,0 +1,245 @@
+"""
+เมตริกของคิวและ pipeline ในรูปแบบ Prometheus text exposition (v0.0.4)
+
+ค่าที่สะสม (histogram) เก็บใน SQLite ไฟล์เดียว เพราะผู้บันทึกมีหลาย process
+(cron worker, child ของ worker pool, เว็บแอป) การเพิ่มค่าใช้ UPSERT ครั้งเดียว
+จึงไม่ชนกันและไฟล์ไม่โตตามจำนวนงาน ส่วน gauge (ความลึกคิว) อ่านจากคิวตอน scrape
+
+ตัวแปรแวดล้อม:
+    METRICS_ENABLED  ปิดการบันทึกด้วย false/0/no/off (ค่าเริ่มต้นเปิด)
+    METRICS_DIR      โฟลเดอร์เก็บ metrics.sqlite3 (ค่าเริ่มต้น <root>/output/metrics)
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import sqlite3
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+
+from automation_core.utils.env import parse_pipeline_enabled
+
+METRICS_DB_FILENAME = "metrics.sqlite3"
+METRIC_PREFIX = "dhamma_"
+
+DURATION_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+WAIT_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+SPEED_RATIO_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+CHARS_PER_SECOND_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+@dataclass(frozen=True)
+class HistogramSpec:
+    """คำอธิบาย histogram 1 ตัว (ชื่อไม่รวม prefix)"""
+
+    name: str
+    help: str
+    buckets: tuple[float, ...]
+
+
+HISTOGRAMS: dict[str, HistogramSpec] = {
+    spec.name: spec
+    for spec in (
+        HistogramSpec(
+            "job_wait_seconds",
+            "Seconds from a job becoming due (enqueue or scheduled_for) to start",
+            WAIT_BUCKETS,
+        ),
+        HistogramSpec(
+            "job_run_seconds", "Wall time of one queued job", DURATION_BUCKETS
+        ),
+        HistogramSpec(
+            "pipeline_step_seconds",
+            "Wall time of one orchestrator step",
+            DURATION_BUCKETS,
+        ),
+        HistogramSpec(
+            "render_speed_ratio",
+            "Seconds of media encoded per wall-clock second",
+            SPEED_RATIO_BUCKETS,
+        ),
+        HistogramSpec(
+            "tts_chars_per_second",
+            "Script characters synthesized per wall-clock second",
+            CHARS_PER_SECOND_BUCKETS,
+        ),
+    )
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    suffix TEXT NOT NULL,
+    le TEXT NOT NULL DEFAULT '',
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels, suffix, le)
+)
+"""
+
+_UPSERT_SQL = """
+INSERT INTO samples (name, labels, suffix, le, value) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (name, labels, suffix, le) DO UPDATE SET value = value + excluded.value
+"""
+
+
+def metrics_enabled() -> bool:
+    return parse_pipeline_enabled(os.environ.get("METRICS_ENABLED"))
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(
+    labels: Mapping[str, str], extra: Mapping[str, str] | None = None
+) -> str:
+    merged = {**labels, **(extra or {})}
+    if not merged:
+        return ""
+    body = ",".join(f'{key}="{_escape_label(str(val))}"' for key, val in merged.items())
+    return "{" + body + "}"
+
+
+class MetricsStore:
+    """ที่เก็บ histogram แบบสะสมที่หลาย process เขียนพร้อมกันได้"""
+
+    def __init__(self, metrics_dir: Path | str) -> None:
+        self.metrics_dir = Path(metrics_dir)
+        self.db_path = self.metrics_dir / METRICS_DB_FILENAME
+
+    @classmethod
+    def from_env(cls, root_dir: Path) -> MetricsStore:
+        return cls(os.environ.get("METRICS_DIR") or root_dir / "output" / "metrics")
+
+    def _connect(self) -> sqlite3.Connection:
+        self.metrics_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(_SCHEMA)
+        return conn
+
+    def observe(
+        self, name: str, value: float, labels: Mapping[str, str] | None = None
+    ) -> None:
+        """บันทึกค่า 1 ค่าลง histogram (เพิ่ม bucket ที่ครอบค่า, _sum และ _count)"""
+
+        spec = HISTOGRAMS[name]
+        label_key = json.dumps(dict(sorted((labels or {}).items())), ensure_ascii=False)
+        rows = [(name, label_key, "_sum", "", float(value))]
+        rows.append((name, label_key, "_count", "", 1.0))
+        # เก็บเฉพาะ bucket ที่ค่าตกลง (ไม่สะสม) แล้วค่อยสะสมตอน render
+        bucket = next((b for b in spec.buckets if value <= b), math.inf)
+        rows.append((name, label_key, "_bucket", _format_value(bucket), 1.0))
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(_UPSERT_SQL, rows)
+        finally:
+            conn.close()
+
+    def samples(self) -> list[tuple[str, str, str, str, float]]:
+        if not self.db_path.exists():
+            return []
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT name, labels, suffix, le, value FROM samples"
+            ).fetchall()
+        finally:
+            conn.close()
+
+
+def record_observation(
+    root_dir: Path,
+    name: str,
+    value: float,
+    labels: Mapping[str, str] | None = None,
+) -> None:
+    """บันทึกเมตริกแบบ best-effort: ปิดอยู่หรือเขียนไม่ได้ก็ไม่ทำให้งานหลักล้ม"""
+
+    if not metrics_enabled() or not math.isfinite(value) or value < 0:
+        return
+    try:
+        MetricsStore.from_env(root_dir).observe(name, value, labels)
+    except (OSError, sqlite3.Error):
+        return
+
+
+def _render_histograms(store: MetricsStore) -> list[str]:
+    grouped: dict[str, dict[str, dict[str, dict[str, float]]]] = {}
+    for name, label_key, suffix, le, value in store.samples():
+        if name not in HISTOGRAMS:
+            continue
+        series = grouped.setdefault(name, {}).setdefault(label_key, {})
+        series.setdefault(suffix, {})[le] = value
+
+    lines: list[str] = []
+    for name, spec in HISTOGRAMS.items():
+        metric = f"{METRIC_PREFIX}{name}"
+        lines.append(f"# HELP {metric} {spec.help}")
+        lines.append(f"# TYPE {metric} histogram")
+        for label_key, series in sorted(grouped.get(name, {}).items()):
+            labels = json.loads(label_key)
+            per_bucket = series.get("_bucket", {})
+            cumulative = 0.0
+            for bound in (*spec.buckets, math.inf):
+                cumulative += per_bucket.get(_format_value(bound), 0.0)
+                le_label = {"le": _format_value(bound)}
+                lines.append(
+                    f"{metric}_bucket{_format_labels(labels, le_label)} "
+                    f"{_format_value(cumulative)}"
+                )
+            lines.append(
+                f"{metric}_sum{_format_labels(labels)} "
+                f"{_format_value(series.get('_sum', {}).get('', 0.0))}"
+            )
+            lines.append(
+                f"{metric}_count{_format_labels(labels)} "
+                f"{_format_value(series.get('_count', {}).get('', 0.0))}"
+            )
+    return lines
+
+
+def render_metrics(
+    store: MetricsStore,
+    queue_depths: Mapping[str, int] | None = None,
+) -> str:
+    """
+    สร้างข้อความ Prometheus จาก histogram ที่สะสมไว้และความลึกคิว ณ ตอนนี้
+
+    Args:
+        store: ที่เก็บ histogram
+        queue_depths: จำนวนงานต่อสถานะคิว (pending/running/...)
+    """
+
+    lines: list[str] = []
+    if queue_depths is not None:
+        metric = f"{METRIC_PREFIX}queue_jobs"
+        lines.append(f"# HELP {metric} Jobs in the queue per state")
+        lines.append(f"# TYPE {metric} gauge")
+        for state, count in queue_depths.items():
+            lines.append(f'{metric}{{state="{state}"}} {count}')
+    lines.extend(_render_histograms(store))
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path: Path, text: str) -> None:
+    """เขียนไฟล์ .prom แบบ atomic สำหรับ node_exporter textfile collector"""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{path.name}.tmp.{os.getpid()}")
+    temp_path.write_text(text, encoding="utf-8")
+    os.replace(temp_path, path)
@@ -0,0 +1,132 @@
+"""
+ช่องทางรายงานความคืบหน้าแบบ machine-readable (JSON Lines)
+
+process แม่ (เช่น web runner) เปิด pipe แล้วส่งปลายเขียนให้ลูกผ่าน
+``PROGRESS_FD=<fd>`` ลูกเขียน event ละ 1 บรรทัดลง fd นั้น แม่อ่านได้ตรงๆ
+โดยไม่ต้องเดาจากข้อความใน stdout หรืออ่านไฟล์ผลลัพธ์ซ้ำ
+
+ไม่มี PROGRESS_FD (รันจาก CLI/cron ตามปกติ) ทุกเมธอดเป็น no-op
+
+รูปแบบ event (ทุก event มี ``event`` และ ``ts`` เป็น epoch วินาที):
+    step_started   index, total, step_id, percent
+    step_finished  index, total, step_id, percent, status, duration_seconds, artifacts
+    progress       percent, stage
+    artifact       path
+    run_finished   status, duration_seconds, summary_path
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections.abc import Iterable
+from typing import Any
+
+PROGRESS_FD_ENV = "PROGRESS_FD"
+PROGRESS_EVENTS = (
+    "step_started",
+    "step_finished",
+    "progress",
+    "artifact",
+    "run_finished",
+)
+
+
+def _percent(done: int, total: int) -> int:
+    if total <= 0:
+        return 0
+    return max(0, min(100, round(done * 100 / total)))
+
+
+class ProgressReporter:
+    """เขียน event ความคืบหน้าลง fd ที่ process แม่เตรียมไว้"""
+
+    def __init__(self, fd: int | None) -> None:
+        self.fd = fd
+
+    @classmethod
+    def from_env(cls) -> ProgressReporter:
+        raw = os.environ.get(PROGRESS_FD_ENV, "").strip()
+        try:
+            return cls(int(raw)) if raw else cls(None)
+        except ValueError:
+            return cls(None)
+
+    @property
+    def enabled(self) -> bool:
+        return self.fd is not None
+
+    def emit(self, event: str, **fields: Any) -> None:
+        if self.fd is None:
+            return
+        record = {"event": event, "ts": round(time.time(), 3), **fields}
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        try:
+            # บรรทัดเดียวต่อ os.write จึงไม่ปนกันแม้มีหลาย thread
+            os.write(self.fd, line.encode("utf-8"))
+        except OSError:
+            # แม่ปิด pipe ไปแล้ว (หรือ fd ใช้ไม่ได้) เลิกรายงาน ไม่ให้งานหลักล้ม
+            self.fd = None
+
+    def step_started(self, index: int, total: int, step_id: str) -> None:
+        self.emit(
+            "step_started",
+            index=index,
+            total=total,
+            step_id=step_id,
+            percent=_percent(index - 1, total),
+        )
+
+    def step_finished(
+        self,
+        index: int,
+        total: int,
+        step_id: str,
+        status: str,
+        duration_seconds: float,
+        artifacts: Iterable[str] = (),
+    ) -> None:
+        self.emit(
+            "step_finished",
+            index=index,
+            total=total,
+            step_id=step_id,
+            percent=_percent(index, total),
+            status=status,
+            duration_seconds=round(duration_seconds, 3),
+            artifacts=[str(path) for path in artifacts],
+        )
+
+    def progress(self, percent: int, stage: str = "") -> None:
+        self.emit("progress", percent=max(0, min(100, int(percent))), stage=stage)
+
+    def artifact(self, path: str | os.PathLike[str]) -> None:
+        self.emit("artifact", path=os.fspath(path))
+
+    def run_finished(
+        self,
+        status: str,
+        duration_seconds: float,
+        summary_path: str | os.PathLike[str] | None = None,
+    ) -> None:
+        self.emit(
+            "run_finished",
+            status=status,
+            duration_seconds=round(duration_seconds, 3),
+            summary_path=None if summary_path is None else os.fspath(summary_path),
+        )
+
+
+def parse_progress_line(line: bytes | str) -> dict[str, Any] | None:
+    """แปลง 1 บรรทัดเป็น event คืน None ถ้าไม่ใช่ event ที่รู้จัก"""
+
+    if isinstance(line, bytes):
+        line = line.decode("utf-8", errors="replace")
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(record, dict) or record.get("event") not in PROGRESS_EVENTS:
+        return None
+    return record
@@ -6,14 +6,29 @@ from __future__ import annotations
 
 import json
 import os
+from collections.abc import Collection, Iterable
 from dataclasses import dataclass
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
-from typing import Any, Literal
+from typing import Any, Literal, Protocol
 
 from pydantic import BaseModel, Field, ValidationError
 
-QueueState = Literal["pending", "running", "done", "failed"]
+from automation_core.queue_archive import (
+    ArchiveBusyError,
+    CompactionResult,
+    QueueArchive,
+)
+
+QueueState = Literal["pending", "running", "done", "failed", "dead"]
+QueueBackend = Literal["file", "sqlite"]
+QUEUE_BACKENDS: tuple[QueueBackend, ...] = ("file", "sqlite")
+DEFAULT_LEASE_SECONDS = 300.0
+ResourceClass = Literal["default", "cpu_heavy", "io", "light"]
+RESOURCE_CLASSES: tuple[ResourceClass, ...] = ("default", "cpu_heavy", "io", "light")
+# pipeline_path ของงานที่ผู้เรียกรันเองใน process (enqueue_running) เช่นรอบที่สั่ง
+# จากเว็บ ไม่ใช่ไฟล์ pipeline worker จึงรันซ้ำไม่ได้
+EXTERNAL_PIPELINE_PREFIX = "web:"
 
 
 class JobError(BaseModel):
@@ -36,6 +51,29 @@ class JobSpec(BaseModel):
     status: QueueState
     attempts: int = 0
     last_error: JobError | None = None
+    retry_at: str | None = None
+    # งานเก่าที่ไม่มีสองฟิลด์นี้จะได้ค่าเริ่มต้น (lane ปกติ) จึงยังโหลดได้ตามเดิม
+    priority: int = 0
+    resource_class: ResourceClass = "default"
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """นโยบาย retry ของงานที่ lease หมดอายุ (exponential backoff)"""
+
+    max_attempts: int = 3
+    base_delay_seconds: float = 60.0
+    max_delay_seconds: float = 3600.0
+
+    def delay_for(self, attempts: int) -> timedelta:
+        """ระยะรอก่อน retry ครั้งถัดไป หลังจากพยายามไปแล้ว attempts ครั้ง"""
+
+        exponent = max(attempts - 1, 0)
+        seconds = min(self.base_delay_seconds * (2**exponent), self.max_delay_seconds)
+        return timedelta(seconds=seconds)
+
+    def should_retry(self, attempts: int) -> bool:
+        return attempts < self.max_attempts
 
 
 @dataclass(frozen=True)
@@ -46,6 +84,9 @@ class QueueItem:
     path: Path
     job: JobSpec | None
     job_id: str
+    # attempts ตอนที่จองงาน ใช้เป็น claim token ของ lease: ถ้างานถูก requeue แล้ว
+    # worker อื่น dequeue ไป ค่านี้จะไม่ตรงกับในคิวและเจ้าของเดิมแตะงานไม่ได้อีก
+    attempt: int | None = None
 
 
 def _parse_iso_datetime(value: str) -> datetime:
@@ -57,9 +98,62 @@ def _parse_iso_datetime(value: str) -> datetime:
     return dt
 
 
+_COMPACT_UTC_FORMAT = "%Y%m%dT%H%M%SZ"
+_COMPACT_UTC_LENGTH = len("20260101T000000Z")
+
+
 def _format_compact_utc(value: str) -> str:
     dt = _parse_iso_datetime(value).astimezone(UTC)
-    return dt.strftime("%Y%m%dT%H%M%SZ")
+    return dt.strftime(_COMPACT_UTC_FORMAT)
+
+
+def _parse_compact_utc(value: str) -> datetime:
+    return datetime.strptime(value, _COMPACT_UTC_FORMAT).replace(tzinfo=UTC)
+
+
+def _format_utc(value: datetime) -> str:
+    return value.astimezone(UTC).isoformat().replace("+00:00", "Z")
+
+
+def is_external_job(job: JobSpec | None) -> bool:
+    """งานที่ผู้เรียกรันเอง (ไม่ใช่ไฟล์ pipeline) worker ต้องไม่รันงานนี้"""
+
+    return job is not None and job.pipeline_path.startswith(EXTERNAL_PIPELINE_PREFIX)
+
+
+def _should_retry(policy: RetryPolicy, job: JobSpec | None) -> bool:
+    """งานที่ release แล้วกลับไป pending ได้หรือไม่ (งานภายนอกไป dead ทันที)"""
+
+    if job is None or is_external_job(job):
+        return False
+    return policy.should_retry(job.attempts)
+
+
+def _is_ready(job: JobSpec | None, now: datetime) -> bool:
+    """งานพร้อมให้ dequeue หรือยัง (ยังไม่ถึง retry_at ให้ข้ามไปก่อน)"""
+
+    if job is None or not job.retry_at:
+        return True
+    return _parse_iso_datetime(job.retry_at) <= now
+
+
+def _lane_key(job: JobSpec | None) -> tuple[int, str]:
+    """(priority, resource_class) ของงาน payload เสียถือเป็น lane ปกติ"""
+
+    if job is None:
+        return 0, "default"
+    return job.priority, job.resource_class
+
+
+def lane_depths(items: Iterable[QueueItem]) -> dict[tuple[str, int], int]:
+    """นับจำนวนงานต่อ lane (resource_class, priority) เรียง class แล้ว priority สูงก่อน"""
+
+    counts: dict[tuple[str, int], int] = {}
+    for item in items:
+        priority, resource_class = _lane_key(item.job)
+        key = (resource_class, priority)
+        counts[key] = counts.get(key, 0) + 1
+    return dict(sorted(counts.items(), key=lambda entry: (entry[0][0], -entry[0][1])))
 
 
 def _job_id_from_filename(filename: str) -> str:
@@ -71,14 +165,29 @@ def _job_id_from_filename(filename: str) -> str:
 
 
 class FileQueue:
-    """คิวไฟล์แบบ deterministic"""
-
-    def __init__(self, queue_dir: Path | str) -> None:
+    """คิวไฟล์แบบ deterministic
+
+    lease ของงานใน running ใช้ mtime ของไฟล์ งานที่ไม่มี heartbeat เกิน
+    lease_seconds ถือว่า worker ตายแล้วและจะถูก requeue ตาม retry_policy
+    """
+
+    def __init__(
+        self,
+        queue_dir: Path | str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        retry_policy: RetryPolicy | None = None,
+    ) -> None:
         self.queue_dir = Path(queue_dir)
         self.pending_dir = self.queue_dir / "pending"
         self.running_dir = self.queue_dir / "running"
         self.done_dir = self.queue_dir / "done"
         self.failed_dir = self.queue_dir / "failed"
+        self.dead_dir = self.queue_dir / "dead"
+        self.archive = QueueArchive(self.queue_dir / "archive")
+        self.lease_seconds = lease_seconds
+        self.retry_policy = retry_policy or RetryPolicy()
+        # แคชงาน pending ตามชื่อไฟล์ + mtime เลือก priority ได้โดยไม่ต้องอ่านไฟล์ซ้ำ
+        self._pending_cache: dict[str, tuple[int, JobSpec | None]] = {}
 
     def _ensure_dirs(self) -> None:
         for path in [
@@ -86,6 +195,7 @@ class FileQueue:
             self.running_dir,
             self.done_dir,
             self.failed_dir,
+            self.dead_dir,
         ]:
             path.mkdir(parents=True, exist_ok=True)
 
@@ -133,15 +243,36 @@ class FileQueue:
             self.running_dir,
             self.done_dir,
             self.failed_dir,
+            self.dead_dir,
         ]:
             if path.exists():
                 matches.extend(path.glob(pattern))
         return matches
 
+    def count_by_state(self) -> dict[str, int]:
+        """จำนวนงานต่อสถานะ (นับชื่อไฟล์ ไม่อ่านเนื้อหา)"""
+
+        counts: dict[str, int] = {}
+        for state_dir in [
+            self.pending_dir,
+            self.running_dir,
+            self.done_dir,
+            self.failed_dir,
+            self.dead_dir,
+        ]:
+            try:
+                with os.scandir(state_dir) as entries:
+                    counts[state_dir.name] = sum(
+                        1 for entry in entries if entry.name.endswith(".json")
+                    )
+            except FileNotFoundError:
+                counts[state_dir.name] = 0
+        return counts
+
     def exists(self, job_id: str) -> bool:
-        """ตรวจว่ามีงานอยู่ในคิวทุกสถานะหรือไม่"""
+        """ตรวจว่ามีงานอยู่ในคิวทุกสถานะหรือไม่ (รวมงานที่ถูก compact ลงคลังแล้ว)"""
 
-        return bool(self._find_by_job_id(job_id))
+        return bool(self._find_by_job_id(job_id)) or self.archive.contains(job_id)
 
     def enqueue(self, job: JobSpec, dry_run: bool = False) -> bool:
         """
@@ -179,6 +310,40 @@ class FileQueue:
         else:
             return True
 
+    def enqueue_running(self, job: JobSpec) -> QueueItem | None:
+        """
+        บันทึกงานที่ผู้เรียกจะรันเองทันทีลง running โดยตรงพร้อมเริ่ม lease
+
+        ใช้กับงานที่ไม่ได้ผ่าน worker (เช่นงานที่สั่งจากเว็บ) เพื่อให้นับรวมใน
+        ความจุเดียวกับงานตามตาราง worker ตัวอื่นจะไม่หยิบงานนี้ไปรันซ้ำ
+        ผู้เรียกต้อง heartbeat และ mark_done/mark_failed เอง
+
+        Returns:
+            QueueItem ของงาน หรือ None ถ้ามี job_id นี้อยู่แล้ว
+        """
+
+        self._ensure_dirs()
+        if self.exists(job.job_id):
+            return None
+        running_job = job.model_copy(
+            update={"status": "running", "attempts": job.attempts + 1}
+        )
+        filename = self._build_filename(running_job)
+        target_path = self.running_dir / filename
+        payload = json.dumps(running_job.model_dump(), ensure_ascii=False, indent=2)
+        try:
+            with open(target_path, "x", encoding="utf-8") as f:
+                f.write(payload)
+        except FileExistsError:
+            return None
+        return QueueItem(
+            filename=filename,
+            path=target_path,
+            job=running_job,
+            job_id=running_job.job_id,
+            attempt=running_job.attempts,
+        )
+
     def list_pending(self) -> list[QueueItem]:
         """คืนรายการงานในสถานะ pending ตามลำดับ FIFO"""
 
@@ -195,25 +360,127 @@ class FileQueue:
             )
         return items
 
-    def peek_next(self) -> QueueItem | None:
-        """ดูงานถัดไปแบบไม่ย้ายสถานะ"""
-
-        pending = self.list_pending()
-        if not pending:
+    def _load_pending(self, path: Path) -> JobSpec | None:
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except FileNotFoundError:
             return None
-        return pending[0]
+        cached = self._pending_cache.get(path.name)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        job = self._load_job(path)
+        self._pending_cache[path.name] = (mtime_ns, job)
+        return job
+
+    def _next_ready(
+        self,
+        due_before: datetime | None = None,
+        exclude_classes: Collection[str] = (),
+    ) -> QueueItem | None:
+        now = datetime.now(UTC)
+        due_compact = None
+        if due_before is not None:
+            due_compact = due_before.astimezone(UTC).strftime("%Y%m%dT%H%M%SZ")
+        best: QueueItem | None = None
+        best_priority = 0
+        seen: set[str] = set()
+        for path in self._list_dir(self.pending_dir):
+            # ชื่อไฟล์ขึ้นต้นด้วยเวลา scheduled_for จึงหยุดได้ทันทีโดยไม่ต้องอ่านไฟล์
+            if due_compact is not None and path.name[: len(due_compact)] > due_compact:
+                break
+            seen.add(path.name)
+            job = self._load_pending(path)
+            if not _is_ready(job, now):
+                continue
+            priority, resource_class = _lane_key(job)
+            if resource_class in exclude_classes:
+                continue
+            # ไฟล์เรียงตามเวลาอยู่แล้ว จึงแทนที่เฉพาะเมื่อ priority สูงกว่าจริง
+            if best is None or priority > best_priority:
+                best = QueueItem(
+                    filename=path.name,
+                    path=path,
+                    job=job,
+                    job_id=_job_id_from_filename(path.name),
+                )
+                best_priority = priority
+        # ทิ้งแคชของไฟล์ที่อยู่ในช่วงที่สแกนแต่หายไปแล้ว (ถูก dequeue ไป)
+        for name in self._pending_cache.keys() - seen:
+            if due_compact is None or name[: len(due_compact)] <= due_compact:
+                del self._pending_cache[name]
+        return best
+
+    def next_ready_at(self) -> datetime | None:
+        """
+        เวลาที่เร็วที่สุดที่งาน pending จะพร้อมรัน (ดู scheduled_for และ retry_at)
+
+        scheduled_for อ่านจากชื่อไฟล์ (ความละเอียดวินาทีเท่ากับ backend SQLite)
+        อ่านเนื้อหาผ่านแคชเฉพาะงานต้นคิวเพื่อดู retry_at และหยุดทันทีที่ชื่อไฟล์
+        ช้ากว่าเวลาที่ดีที่สุดที่พบแล้ว
+        """
+
+        earliest: datetime | None = None
+        for path in self._list_dir(self.pending_dir):
+            try:
+                scheduled = _parse_compact_utc(path.name[:_COMPACT_UTC_LENGTH])
+            except ValueError:
+                scheduled = None
+            if earliest is not None and scheduled is not None and scheduled >= earliest:
+                break
+            job = self._load_pending(path)
+            if job is None:
+                continue
+            if scheduled is None:
+                scheduled = _parse_iso_datetime(job.scheduled_for)
+            ready_at = scheduled
+            if job.retry_at:
+                ready_at = max(ready_at, _parse_iso_datetime(job.retry_at))
+            if earliest is None or ready_at < earliest:
+                earliest = ready_at
+        return earliest
+
+    def watch_paths(self) -> list[Path]:
+        """พาธที่เปลี่ยนเมื่อมีงานเข้า pending (ใช้กับ QueueWatcher)"""
+
+        self._ensure_dirs()
+        return [self.pending_dir]
+
+    def peek_next(
+        self,
+        due_before: datetime | None = None,
+        exclude_classes: Collection[str] = (),
+    ) -> QueueItem | None:
+        """ดูงานถัดไปที่พร้อมรันแบบไม่ย้ายสถานะ"""
+
+        return self._next_ready(due_before, exclude_classes)
+
+    def dequeue_next(
+        self,
+        due_before: datetime | None = None,
+        exclude_classes: Collection[str] = (),
+    ) -> QueueItem | None:
+        """
+        ย้ายงานถัดไปที่พร้อมรันจาก pending ไป running และเริ่ม lease
 
-    def dequeue_next(self) -> QueueItem | None:
-        """ย้ายงานถัดไปจาก pending ไป running"""
+        เลือกงานที่ priority สูงสุดก่อน ถ้าเท่ากันเลือกตาม scheduled_for (FIFO)
 
-        pending = self.list_pending()
-        if not pending:
+        Args:
+            due_before: ถ้าระบุ จะเลือกเฉพาะงานที่ scheduled_for ไม่เกินเวลานี้
+            exclude_classes: resource_class ที่ห้ามเลือก (เช่น ชนเพดาน concurrency แล้ว)
+        """
+
+        item = self._next_ready(due_before, exclude_classes)
+        if item is None:
             return None
-        item = pending[0]
         self._ensure_dirs()
         dest_path = self.running_dir / item.filename
+        # จองด้วยชื่อชั่วคราวก่อน ไฟล์ใน running จึงมี attempts ใหม่ตั้งแต่ปรากฏ
+        # เจ้าของ lease เก่าจะไม่เห็น attempts เดิมของตัวเองในช่วงที่เขียนอยู่
+        claimed_path = dest_path.with_suffix(
+            f"{dest_path.suffix}.dequeue.{os.getpid()}"
+        )
         try:
-            os.replace(item.path, dest_path)
+            os.replace(item.path, claimed_path)
         except FileNotFoundError:
             # งานถูก dequeue โดย worker ตัวอื่นไปแล้ว
             return None
@@ -224,41 +491,88 @@ class FileQueue:
                     "status": "running",
                     "attempts": job.attempts + 1,
                     "last_error": None,
+                    "retry_at": None,
                 }
             )
             self._write_job(dest_path, job)
+            claimed_path.unlink()
+        else:
+            os.replace(claimed_path, dest_path)
+            # เริ่ม lease จากเวลาที่ dequeue แม้ payload จะเสีย
+            os.utime(dest_path)
         return QueueItem(
             filename=item.filename,
             path=dest_path,
             job=job,
             job_id=item.job_id,
+            attempt=job.attempts if job is not None else None,
         )
 
+    def _check_claim(self, path: Path, item: QueueItem) -> None:
+        """โยน FileNotFoundError ถ้างานใน path ไม่ใช่รอบที่ item จองไว้ (lease หลุด)"""
+
+        if item.attempt is None:
+            return
+        current = self._load_job(path)
+        if current is None or current.attempts != item.attempt:
+            raise FileNotFoundError(f"lease lost: {item.filename}")
+
+    def _claim_running(self, item: QueueItem, action: str) -> Path:
+        """
+        rename ไฟล์ใน running ของ item ไปชื่อชั่วคราวเพื่อจองก่อนย้ายสถานะ
+
+        ตรวจ claim ก่อน rename เพื่อไม่ไปแตะงานของ worker ที่ dequeue ต่อ แล้วตรวจ
+        ซ้ำหลัง rename กันกรณีงานถูกสลับระหว่างสองขั้น ถ้าไม่ตรงจะคืนไฟล์ที่เดิม
+        """
+
+        src_path = self.running_dir / item.filename
+        self._check_claim(src_path, item)
+        claimed_path = src_path.with_suffix(f"{src_path.suffix}.{action}.{os.getpid()}")
+        os.replace(src_path, claimed_path)
+        try:
+            self._check_claim(claimed_path, item)
+        except FileNotFoundError:
+            os.replace(claimed_path, src_path)
+            raise
+        return claimed_path
+
     def mark_done(self, item: QueueItem) -> QueueItem:
-        """ย้ายงานจาก running ไป done"""
+        """
+        ย้ายงานจาก running ไป done
+
+        Raises:
+            FileNotFoundError: งานไม่อยู่ใน running แล้วหรือถูก dequeue รอบใหม่ไปแล้ว
+        """
 
         self._ensure_dirs()
-        src_path = self.running_dir / item.filename
+        claimed_path = self._claim_running(item, "done")
         dest_path = self.done_dir / item.filename
-        os.replace(src_path, dest_path)
         job = item.job
         if job is not None:
             job = job.model_copy(update={"status": "done", "last_error": None})
             self._write_job(dest_path, job)
+            claimed_path.unlink()
+        else:
+            os.replace(claimed_path, dest_path)
         return QueueItem(
             filename=item.filename,
             path=dest_path,
             job=job,
             job_id=item.job_id,
+            attempt=item.attempt,
         )
 
     def mark_failed(self, item: QueueItem, error: JobError | None = None) -> QueueItem:
-        """ย้ายงานจาก running ไป failed"""
+        """
+        ย้ายงานจาก running ไป failed
+
+        Raises:
+            FileNotFoundError: งานไม่อยู่ใน running แล้วหรือถูก dequeue รอบใหม่ไปแล้ว
+        """
 
         self._ensure_dirs()
-        src_path = self.running_dir / item.filename
+        claimed_path = self._claim_running(item, "failed")
         dest_path = self.failed_dir / item.filename
-        os.replace(src_path, dest_path)
         job = item.job
         if job is not None:
             update: dict[str, Any] = {"status": "failed"}
@@ -266,9 +580,225 @@ class FileQueue:
                 update["last_error"] = error
             job = job.model_copy(update=update)
             self._write_job(dest_path, job)
+            claimed_path.unlink()
+        else:
+            os.replace(claimed_path, dest_path)
         return QueueItem(
             filename=item.filename,
             path=dest_path,
             job=job,
             job_id=item.job_id,
+            attempt=item.attempt,
         )
+
+    def compact(
+        self,
+        older_than: timedelta,
+        retention: timedelta | None = None,
+        now: datetime | None = None,
+    ) -> CompactionResult:
+        """
+        รวมไฟล์ใน done/failed/dead ที่จบนานกว่า older_than ลง segment ใน archive/
+
+        ลำดับคือเขียน segment -> append index -> ลบไฟล์ต้นฉบับ ถ้าหยุดกลางทาง
+        รอบถัดไปจะทำต่อได้โดยไม่ทำให้ job_id หาย ถ้าระบุ retention
+        จะลบ segment ที่เก่ากว่านั้นด้วย (job_id ยังอยู่ใน index)
+        """
+
+        now = now or datetime.now(UTC)
+        try:
+            lock_path = self.archive.acquire()
+        except ArchiveBusyError:
+            return CompactionResult(
+                archived_job_ids=[], segment=None, pruned_segments=[], skipped_busy=True
+            )
+        try:
+            cutoff = now.timestamp() - older_than.total_seconds()
+            records: list[dict[str, Any]] = []
+            sources: list[Path] = []
+            for state_dir in [self.done_dir, self.failed_dir, self.dead_dir]:
+                for path in self._list_dir(state_dir):
+                    try:
+                        if path.stat().st_mtime > cutoff:
+                            continue
+                        text = path.read_text(encoding="utf-8")
+                    except FileNotFoundError:
+                        continue
+                    sources.append(path)
+                    job_id = _job_id_from_filename(path.name)
+                    if self.archive.contains(job_id):
+                        # ถูก archive ไปแล้วในรอบที่หยุดกลางทาง เหลือแค่ลบไฟล์
+                        continue
+                    try:
+                        record = json.loads(text)
+                    except json.JSONDecodeError:
+                        record = None
+                    if not isinstance(record, dict):
+                        record = {"raw": text}
+                    record.setdefault("status", state_dir.name)
+                    record["job_id"] = job_id
+                    record["filename"] = path.name
+                    records.append(record)
+
+            segment: Path | None = None
+            if records:
+                segment, _ = self.archive.append_segment(records, now)
+            for path in sources:
+                path.unlink(missing_ok=True)
+
+            pruned: list[Path] = []
+            if retention is not None:
+                pruned = self.archive.prune(retention, now)
+            return CompactionResult(
+                archived_job_ids=[str(record["job_id"]) for record in records],
+                segment=segment,
+                pruned_segments=pruned,
+            )
+        finally:
+            lock_path.unlink(missing_ok=True)
+
+    def heartbeat(self, item: QueueItem) -> bool:
+        """
+        ต่ออายุ lease ของงานที่กำลังรัน คืน False ถ้างานไม่อยู่ใน running แล้ว
+        หรือถูก requeue แล้ว dequeue รอบใหม่ไป (attempt ไม่ตรงกับ item)
+        """
+
+        path = self.running_dir / item.filename
+        try:
+            self._check_claim(path, item)
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def release(self, item: QueueItem, error: JobError) -> QueueItem:
+        """
+        คืนงานที่รันไม่จบ (worker ตาย/lease หมดอายุ) ตาม retry_policy
+
+        ถ้ายังไม่เกิน max_attempts จะกลับไป pending พร้อม retry_at แบบ
+        exponential backoff ไม่เช่นนั้นย้ายไป dead (dead-letter) งานภายนอก
+        (``EXTERNAL_PIPELINE_PREFIX``) ย้ายไป dead เสมอ
+        """
+
+        self._ensure_dirs()
+        # rename ไปชื่อชั่วคราวก่อนเพื่อจองงาน ป้องกัน release ซ้อนกันหลาย process
+        claimed_path = self._claim_running(item, "release")
+
+        job = item.job
+        now = datetime.now(UTC)
+        if job is not None and _should_retry(self.retry_policy, job):
+            dest_path = self.pending_dir / item.filename
+            job = job.model_copy(
+                update={
+                    "status": "pending",
+                    "last_error": error,
+                    "retry_at": _format_utc(
+                        now + self.retry_policy.delay_for(job.attempts)
+                    ),
+                }
+            )
+        else:
+            dest_path = self.dead_dir / item.filename
+            if job is not None:
+                job = job.model_copy(update={"status": "dead", "last_error": error})
+
+        if job is not None:
+            self._write_job(dest_path, job)
+            claimed_path.unlink()
+        else:
+            os.replace(claimed_path, dest_path)
+        return QueueItem(
+            filename=item.filename,
+            path=dest_path,
+            job=job,
+            job_id=item.job_id,
+            attempt=item.attempt,
+        )
+
+    def requeue_expired(self, now: datetime | None = None) -> list[QueueItem]:
+        """คืนงานใน running ที่ lease หมดอายุ (ไม่มี heartbeat เกิน lease_seconds)"""
+
+        now = now or datetime.now(UTC)
+        cutoff = now.timestamp() - self.lease_seconds
+        released: list[QueueItem] = []
+        for path in self._list_dir(self.running_dir):
+            try:
+                if path.stat().st_mtime > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            job = self._load_job(path)
+            item = QueueItem(
+                filename=path.name,
+                path=path,
+                job=job,
+                job_id=_job_id_from_filename(path.name),
+                attempt=job.attempts if job is not None else None,
+            )
+            error = JobError(
+                code="lease_expired",
+                message=f"no heartbeat for {self.lease_seconds:.0f}s",
+            )
+            try:
+                released.append(self.release(item, error))
+            except FileNotFoundError:
+                # worker เจ้าของงานหรือ process อื่นย้ายสถานะไปก่อนแล้ว
+                continue
+        return released
+
+
+class JobQueue(Protocol):
+    """อินเทอร์เฟซร่วมของคิวทุก backend"""
+
+    queue_dir: Path
+    lease_seconds: float
+
+    def exists(self, job_id: str) -> bool: ...
+
+    def count_by_state(self) -> dict[str, int]: ...
+
+    def enqueue(self, job: JobSpec, dry_run: bool = False) -> bool: ...
+
+    def enqueue_running(self, job: JobSpec) -> QueueItem | None: ...
+
+    def list_pending(self) -> list[QueueItem]: ...
+
+    def peek_next(
+        self,
+        due_before: datetime | None = None,
+        exclude_classes: Collection[str] = (),
+    ) -> QueueItem | None: ...
+
+    def dequeue_next(
+        self,
+        due_before: datetime | None = None,
+        exclude_classes: Collection[str] = (),
+    ) -> QueueItem | None: ...
+
+    def next_ready_at(self) -> datetime | None: ...
+
+    def watch_paths(self) -> list[Path]: ...
+
+    def mark_done(self, item: QueueItem) -> QueueItem: ...
+
+    def mark_failed(
+        self, item: QueueItem, error: JobError | None = None
+    ) -> QueueItem: ...
+
+    def heartbeat(self, item: QueueItem) -> bool: ...
+
+    def release(self, item: QueueItem, error: JobError) -> QueueItem: ...
+
+    def requeue_expired(self, now: datetime | None = None) -> list[QueueItem]: ...
+
+
+def open_queue(queue_dir: Path | str, backend: QueueBackend = "file") -> JobQueue:
+    """สร้างคิวตาม backend ที่เลือก (file หรือ sqlite)"""
+
+    if backend == "file":
+        return FileQueue(queue_dir)
+    if backend == "sqlite":
+        from automation_core.sqlite_queue import SqliteQueue
+
+        return SqliteQueue(queue_dir)
+    raise ValueError(f"unknown queue backend: {backend}")
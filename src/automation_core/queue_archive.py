@@ -0,0 +1,207 @@
+"""
+คลังเก็บงานที่จบแล้วของ FileQueue (compaction/archival)
+
+งานใน done/failed/dead ที่เก่ากว่าเกณฑ์จะถูกรวมเป็น segment แบบ gzip
+(JSON Lines, เขียนครั้งเดียวไม่แก้ไขอีก) และบันทึก job_id ลง index แบบ append-only
+เพื่อให้ FileQueue.exists() ยังตอบได้เร็วและ enqueue ยังคง idempotent
+แม้ไฟล์ต้นฉบับจะถูกลบไปแล้ว
+
+โครงสร้าง:
+    <queue-dir>/archive/
+        index.tsv                                   job_id<TAB>status<TAB>segment<TAB>archived_at
+        segment_<YYYYMMDDTHHMMSSZ>_<pid>.jsonl.gz
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+ARCHIVE_INDEX_FILENAME = "index.tsv"
+ARCHIVE_LOCK_FILENAME = "compact.lock"
+SEGMENT_PREFIX = "segment_"
+SEGMENT_SUFFIX = ".jsonl.gz"
+# lock ที่ค้างนานกว่านี้ถือว่า process ที่ถือไว้ตายไปแล้ว
+STALE_LOCK_SECONDS = 3600.0
+
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    """ตำแหน่งของงาน 1 งานในคลัง"""
+
+    job_id: str
+    status: str
+    segment: str
+    archived_at: str
+
+
+@dataclass(frozen=True)
+class CompactionResult:
+    """ผลการ compact 1 รอบ"""
+
+    archived_job_ids: list[str]
+    segment: Path | None
+    pruned_segments: list[Path]
+    skipped_busy: bool = False
+
+
+class ArchiveBusyError(RuntimeError):
+    """มี process อื่นกำลัง compact คิวเดียวกันอยู่"""
+
+
+def _segment_time(name: str) -> datetime | None:
+    stamp = name[len(SEGMENT_PREFIX) :].split("_", 1)[0]
+    try:
+        return datetime.strptime(stamp, "%Y%m%dT%H%M%SZ").replace(tzinfo=UTC)
+    except ValueError:
+        return None
+
+
+class QueueArchive:
+    """segment แบบ append-only + index job_id ที่โหลดเพิ่มทีละส่วน"""
+
+    def __init__(self, archive_dir: Path | str) -> None:
+        self.archive_dir = Path(archive_dir)
+        self.index_path = self.archive_dir / ARCHIVE_INDEX_FILENAME
+        self._entries: dict[str, ArchiveEntry] = {}
+        self._index_offset = 0
+        self._index_inode: int | None = None
+
+    def _refresh(self) -> None:
+        """อ่านเฉพาะบรรทัดที่ถูก append เพิ่มตั้งแต่ครั้งก่อน"""
+
+        try:
+            stat = self.index_path.stat()
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._index_inode or stat.st_size < self._index_offset:
+            # index ถูกสร้างใหม่ทั้งไฟล์ อ่านใหม่ตั้งแต่ต้น
+            self._entries.clear()
+            self._index_offset = 0
+            self._index_inode = stat.st_ino
+        if stat.st_size == self._index_offset:
+            return
+        with open(self.index_path, "rb") as handle:
+            handle.seek(self._index_offset)
+            data = handle.read()
+        # บรรทัดสุดท้ายที่ยังเขียนไม่จบ (ไม่มี newline) ไว้อ่านรอบหน้า
+        complete, _, _ = data.rpartition(b"\n")
+        if not complete and not data.endswith(b"\n"):
+            return
+        self._index_offset += len(complete) + 1
+        for line in complete.decode("utf-8").splitlines():
+            parts = line.split("\t")
+            if len(parts) != 4:
+                continue
+            entry = ArchiveEntry(*parts)
+            self._entries[entry.job_id] = entry
+
+    def contains(self, job_id: str) -> bool:
+        self._refresh()
+        return job_id in self._entries
+
+    def entry(self, job_id: str) -> ArchiveEntry | None:
+        self._refresh()
+        return self._entries.get(job_id)
+
+    def load(self, job_id: str) -> dict[str, Any] | None:
+        """อ่าน payload ของงานจาก segment คืน None ถ้า segment ถูกลบตาม retention"""
+
+        entry = self.entry(job_id)
+        if entry is None:
+            return None
+        segment_path = self.archive_dir / entry.segment
+        try:
+            with gzip.open(segment_path, "rt", encoding="utf-8") as handle:
+                for line in handle:
+                    record = json.loads(line)
+                    if record.get("job_id") == job_id:
+                        return record
+        except FileNotFoundError:
+            return None
+        return None
+
+    def segments(self) -> list[Path]:
+        if not self.archive_dir.exists():
+            return []
+        return sorted(self.archive_dir.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+
+    def acquire(self) -> Path:
+        """จอง lock สำหรับ compact (ใช้ O_EXCL จึงทำงานได้ทั้ง Linux และ Windows)"""
+
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        lock_path = self.archive_dir / ARCHIVE_LOCK_FILENAME
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                age = datetime.now(UTC).timestamp() - lock_path.stat().st_mtime
+            except FileNotFoundError:
+                age = 0.0
+            if age < STALE_LOCK_SECONDS:
+                raise ArchiveBusyError(str(lock_path)) from None
+            lock_path.unlink(missing_ok=True)
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(str(os.getpid()))
+        return lock_path
+
+    def append_segment(
+        self, records: Iterable[dict[str, Any]], now: datetime
+    ) -> tuple[Path, list[ArchiveEntry]]:
+        """เขียน segment ใหม่ 1 ไฟล์ แล้ว append job_id ลง index (segment ก่อน index เสมอ)"""
+
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        stamp = now.astimezone(UTC).strftime("%Y%m%dT%H%M%SZ")
+        segment_path = self.archive_dir / (
+            f"{SEGMENT_PREFIX}{stamp}_{os.getpid()}{SEGMENT_SUFFIX}"
+        )
+        temp_path = segment_path.with_name(f"{segment_path.name}.tmp")
+        archived_at = now.astimezone(UTC).isoformat().replace("+00:00", "Z")
+        entries: list[ArchiveEntry] = []
+        with gzip.open(temp_path, "wt", encoding="utf-8") as handle:
+            for record in records:
+                handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+                entries.append(
+                    ArchiveEntry(
+                        job_id=str(record["job_id"]),
+                        status=str(record.get("status", "")),
+                        segment=segment_path.name,
+                        archived_at=archived_at,
+                    )
+                )
+        os.replace(temp_path, segment_path)
+
+        lines = "".join(
+            f"{entry.job_id}\t{entry.status}\t{entry.segment}\t{entry.archived_at}\n"
+            for entry in entries
+        )
+        with open(self.index_path, "a", encoding="utf-8") as handle:
+            handle.write(lines)
+            handle.flush()
+            os.fsync(handle.fileno())
+        return segment_path, entries
+
+    def prune(self, retention: timedelta, now: datetime) -> list[Path]:
+        """
+        ลบ segment ที่เก่ากว่า retention
+
+        index ยังเก็บ job_id ไว้ตามเดิม งานที่ถูกลบ payload ไปแล้ว
+        จึงยังไม่ถูก enqueue ซ้ำ
+        """
+
+        cutoff = now - retention
+        removed: list[Path] = []
+        for segment_path in self.segments():
+            created = _segment_time(segment_path.name)
+            if created is None or created >= cutoff:
+                continue
+            segment_path.unlink(missing_ok=True)
+            removed.append(segment_path)
+        return removed
@@ -0,0 +1,128 @@
+"""
+ตัวเฝ้าดูการเปลี่ยนแปลงของคิวสำหรับ worker แบบ loop
+
+ใช้ inotify (ผ่าน ctypes ไม่ต้องพึ่งแพ็กเกจเพิ่ม) เมื่อรันบน Linux
+ถ้าใช้ไม่ได้จะ fallback เป็น polling แบบ adaptive: เริ่มถี่แล้วค่อยๆ ห่างขึ้น
+(exponential backoff) เมื่อไม่มีอะไรเปลี่ยน และกลับมาถี่ทันทีเมื่อพบการเปลี่ยนแปลง
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import sys
+from pathlib import Path
+
+# ค่าคงที่จาก <sys/inotify.h>
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+
+DEFAULT_MIN_POLL_SECONDS = 0.25
+DEFAULT_MAX_POLL_SECONDS = 5.0
+
+
+def _open_inotify(paths: list[Path]) -> int | None:
+    """เปิด inotify fd และเพิ่ม watch ให้ทุกพาธที่มีอยู่ คืน None ถ้าใช้ไม่ได้"""
+
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        init1 = libc.inotify_init1
+        add_watch = libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+
+    fd = init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        return None
+    watched = 0
+    for path in paths:
+        if not path.exists():
+            continue
+        if add_watch(fd, os.fsencode(path), _WATCH_MASK) >= 0:
+            watched += 1
+    if watched == 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class QueueWatcher:
+    """แจ้งเมื่อพาธของคิวเปลี่ยน (inotify หรือ adaptive polling)"""
+
+    def __init__(
+        self,
+        paths: list[Path],
+        min_poll_seconds: float = DEFAULT_MIN_POLL_SECONDS,
+        max_poll_seconds: float = DEFAULT_MAX_POLL_SECONDS,
+        use_inotify: bool = True,
+    ) -> None:
+        self.paths = list(paths)
+        self.min_poll_seconds = min_poll_seconds
+        self.max_poll_seconds = max(max_poll_seconds, min_poll_seconds)
+        self._fd = _open_inotify(self.paths) if use_inotify else None
+        self._interval = self.min_poll_seconds
+        self._signature = self._snapshot()
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._fd is not None
+
+    def fileno(self) -> int:
+        """fd สำหรับ select/multiprocessing.connection.wait (เฉพาะโหมด inotify)"""
+
+        if self._fd is None:
+            raise ValueError("watcher is in polling mode")
+        return self._fd
+
+    def poll_timeout(self) -> float | None:
+        """ระยะรอก่อนเช็ครอบถัดไปในโหมด polling (None เมื่อใช้ inotify)"""
+
+        if self._fd is not None:
+            return None
+        return self._interval
+
+    def _snapshot(self) -> tuple[tuple[int, int] | None, ...]:
+        signature: list[tuple[int, int] | None] = []
+        for path in self.paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                signature.append(None)
+                continue
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def check(self) -> bool:
+        """อ่าน event ที่ค้างอยู่ คืน True ถ้ามีการเปลี่ยนแปลงตั้งแต่ครั้งก่อน"""
+
+        if self._fd is not None:
+            changed = False
+            while True:
+                try:
+                    data = os.read(self._fd, 65536)
+                except BlockingIOError:
+                    break
+                if not data:
+                    break
+                changed = True
+            return changed
+
+        signature = self._snapshot()
+        changed = signature != self._signature
+        self._signature = signature
+        if changed:
+            self._interval = self.min_poll_seconds
+        else:
+            self._interval = min(self._interval * 2, self.max_poll_seconds)
+        return changed
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
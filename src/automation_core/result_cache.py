@@ -0,0 +1,166 @@
+"""
+cache ผลลัพธ์แบบ LRU + TTL ในหน่วยความจำ พร้อมเก็บลงดิสก์ (SQLite) ได้
+
+ใช้เก็บผลที่คำนวณซ้ำได้แต่แพง (ผลค้นคืน, ผลเรียก API) ค่าต้องแปลงเป็น JSON ได้
+key สร้างจากส่วนประกอบใดๆ ด้วย ``ResultCache.key`` (hash ของ JSON ที่เรียง key แล้ว)
+
+เมื่อระบุ ``path`` รายการจะถูกเขียนลงไฟล์ด้วย ทุก process ที่ชี้ไฟล์เดียวกันจึงใช้ผล
+ร่วมกันได้ การอ่าน/เขียนดิสก์ที่ล้มเหลวไม่ทำให้ผู้เรียกล้ม (ถือเป็น cache miss)
+
+ตัวแปรแวดล้อม:
+    RESULT_CACHE_DIR  โฟลเดอร์เก็บ cache บนดิสก์ (ไม่ตั้ง = เก็บในหน่วยความจำเท่านั้น)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL,
+    value TEXT NOT NULL
+);
+"""
+# ลบรายการหมดอายุบนดิสก์ทุกๆ กี่ครั้งที่เขียน
+_PRUNE_EVERY = 100
+
+
+class ResultCache:
+    """LRU ที่แต่ละรายการหมดอายุหลัง ``ttl_seconds``"""
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 3600.0,
+        path: Path | str | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = Path(path) if path else None
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    @classmethod
+    def from_env(
+        cls, name: str, *, max_entries: int = 256, ttl_seconds: float = 3600.0
+    ) -> ResultCache:
+        directory = os.environ.get("RESULT_CACHE_DIR")
+        path = Path(directory) / f"{name}.sqlite3" if directory else None
+        return cls(max_entries, ttl_seconds, path)
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        material = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, key: str) -> Any | None:
+        """ค่าที่ยังไม่หมดอายุ หรือ None"""
+
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                entry = self._load(key, now)
+                if entry is not None:
+                    self._remember(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        entry = (self.clock() + self.ttl_seconds, value)
+        with self._lock:
+            self._remember(key, entry)
+            self._store(key, entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self.path is not None and self.path.exists():
+                try:
+                    conn = self._connect()
+                    try:
+                        with conn:
+                            conn.execute("DELETE FROM entries")
+                    finally:
+                        conn.close()
+                except sqlite3.Error as exc:
+                    logger.warning("ล้าง result cache ไม่ได้: %s", exc)
+
+    def _remember(self, key: str, entry: tuple[float, Any]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _connect(self) -> sqlite3.Connection:
+        assert self.path is not None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _load(self, key: str, now: float) -> tuple[float, Any] | None:
+        if self.path is None or not self.path.exists():
+            return None
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT expires_at, value FROM entries "
+                    "WHERE key = ? AND expires_at > ?",
+                    (key, now),
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as exc:
+            logger.warning("อ่าน result cache ไม่ได้: %s", exc)
+            return None
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _store(self, key: str, entry: tuple[float, Any]) -> None:
+        if self.path is None:
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO entries (key, expires_at, value) "
+                        "VALUES (?, ?, ?)",
+                        (key, entry[0], json.dumps(entry[1], ensure_ascii=False)),
+                    )
+                    self._writes += 1
+                    if self._writes % _PRUNE_EVERY == 0:
+                        conn.execute(
+                            "DELETE FROM entries WHERE expires_at <= ?", (self.clock(),)
+                        )
+            finally:
+                conn.close()
+        except (OSError, sqlite3.Error) as exc:
+            logger.warning("บันทึก result cache ไม่ได้: %s", exc)
@@ -0,0 +1,403 @@
+"""
+ดัชนีรอบ pipeline (run index) แบบ SQLite สำหรับหน้าแดชบอร์ดและรายงาน
+
+orchestrator บันทึกรอบลงดัชนีทันทีหลังเขียน ``pipeline_summary.json`` (รวมรอบที่ step
+ล้มด้วย) ผู้อ่านจึงค้นประวัติแบบแบ่งหน้า กรองตามวันที่/สถานะ/pipeline และดูสถิติรวม
+ได้ด้วยคำสั่ง SQL ที่ใช้ index แทนการไล่เปิด ``output/<run_id>/`` ทีละโฟลเดอร์
+
+ดัชนีเป็นข้อมูลรอง (sidecar) ไฟล์ JSON ยังเป็นต้นฉบับ ถ้าดัชนีหายหรือเพิ่งเปิดใช้
+ให้สร้างใหม่ด้วย ``RunIndex.rebuild(output_dir)``
+
+ตัวแปรแวดล้อม:
+    RUN_INDEX_DIR  โฟลเดอร์เก็บ runs.sqlite3 (ค่าเริ่มต้น <root>/output/index)
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import sqlite3
+import stat
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+RUN_INDEX_FILENAME = "runs.sqlite3"
+SUMMARY_FILENAME = "pipeline_summary.json"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    pipeline TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    ended_at TEXT,
+    duration_seconds REAL,
+    total_steps INTEGER NOT NULL DEFAULT 0,
+    successful INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    output_dir TEXT NOT NULL DEFAULT '',
+    summary_path TEXT NOT NULL DEFAULT '',
+    artifact_bytes INTEGER NOT NULL DEFAULT 0,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs (started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_runs_status ON runs (status, started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_runs_pipeline ON runs (pipeline, started_at DESC);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id TEXT NOT NULL,
+    step_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    duration_seconds REAL,
+    output TEXT,
+    size_bytes INTEGER,
+    PRIMARY KEY (run_id, step_id)
+);
+"""
+
+_RUN_COLUMNS = (
+    "run_id",
+    "pipeline",
+    "status",
+    "started_at",
+    "ended_at",
+    "duration_seconds",
+    "total_steps",
+    "successful",
+    "failed",
+    "output_dir",
+    "summary_path",
+    "artifact_bytes",
+)
+
+# สถานะ step ที่ทำให้ทั้งรอบไม่ใช่ success (เรียงตามความรุนแรง)
+_STOP_STATUSES = ("error", "rejected", "held")
+
+
+@dataclass(frozen=True)
+class StepRecord:
+    step_id: str
+    position: int
+    status: str
+    duration_seconds: float | None
+    output: str | None
+    size_bytes: int | None
+
+
+@dataclass(frozen=True)
+class RunRecord:
+    run_id: str
+    pipeline: str
+    status: str
+    started_at: str
+    ended_at: str | None
+    duration_seconds: float | None
+    total_steps: int
+    successful: int
+    failed: int
+    output_dir: str
+    summary_path: str
+    artifact_bytes: int
+    steps: list[StepRecord] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class RunPage:
+    items: list[RunRecord]
+    total: int
+    page: int
+    per_page: int
+
+    @property
+    def pages(self) -> int:
+        return max(1, math.ceil(self.total / self.per_page))
+
+
+@dataclass(frozen=True)
+class RunStats:
+    total: int
+    by_status: dict[str, int]
+    avg_duration_seconds: float | None
+    max_duration_seconds: float | None
+    artifact_bytes: int
+    # step_id -> (จำนวนครั้ง, เวลาเฉลี่ย)
+    step_avg_seconds: dict[str, tuple[int, float]]
+
+
+def _run_status(results: Mapping[str, Any]) -> str:
+    statuses = {str(entry.get("status")) for entry in results.values()}
+    for status in _STOP_STATUSES:
+        if status in statuses:
+            return status
+    return "success"
+
+
+def _file_size(value: Any, root_dir: Path | None) -> int | None:
+    if not isinstance(value, str) or not value or value == "skipped":
+        return None
+    # output ของ step ส่วนใหญ่เป็น path สัมพัทธ์กับ root ของ repo ไม่ใช่ cwd
+    path = Path(value)
+    if root_dir is not None and not path.is_absolute():
+        path = root_dir / path
+    try:
+        info = path.stat()
+    except (OSError, ValueError):
+        return None
+    # นับเฉพาะไฟล์ โฟลเดอร์ต้องไล่ทั้งต้นไม้ซึ่งช้าเกินไปสำหรับการบันทึก
+    return None if stat.S_ISDIR(info.st_mode) else info.st_size
+
+
+def _filters(
+    status: str | None,
+    pipeline: str | None,
+    since: str | None,
+    until: str | None,
+) -> tuple[str, list[Any]]:
+    clauses: list[str] = []
+    params: list[Any] = []
+    if status:
+        clauses.append("status = ?")
+        params.append(status)
+    if pipeline:
+        clauses.append("pipeline = ?")
+        params.append(pipeline)
+    # started_at เป็น ISO 8601 จึงเทียบเป็นสตริงได้ตรงตามเวลา
+    if since:
+        clauses.append("started_at >= ?")
+        params.append(since)
+    if until:
+        clauses.append("started_at < ?")
+        params.append(until)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+class RunIndex:
+    """ดัชนีรอบ pipeline ที่ orchestrator เขียนและเว็บ/สคริปต์รายงานอ่าน"""
+
+    def __init__(self, index_dir: Path | str) -> None:
+        self.index_dir = Path(index_dir)
+        self.db_path = self.index_dir / RUN_INDEX_FILENAME
+
+    @classmethod
+    def from_env(cls, root_dir: Path) -> RunIndex:
+        return cls(os.environ.get("RUN_INDEX_DIR") or root_dir / "output" / "index")
+
+    def _connect(self) -> sqlite3.Connection:
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def record_summary(
+        self,
+        summary: Mapping[str, Any],
+        summary_path: Path | str,
+        root_dir: Path | str | None = None,
+    ) -> None:
+        """
+        บันทึก (หรือแทนที่) รอบจากเนื้อหา pipeline_summary.json
+
+        ``root_dir`` คือโฟลเดอร์ที่ path สัมพัทธ์ของ output แต่ละ step อ้างถึง
+        (root ของ repo) ใช้หาขนาดไฟล์ ถ้าไม่ระบุจะเทียบกับ cwd
+        """
+
+        root = Path(root_dir) if root_dir is not None else None
+
+        results: Mapping[str, Any] = summary.get("results") or {}
+        step_seconds: Mapping[str, Any] = summary.get("step_seconds") or {}
+        steps = []
+        for position, (step_id, entry) in enumerate(results.items(), 1):
+            output = entry.get("output")
+            seconds = step_seconds.get(step_id)
+            steps.append(
+                (
+                    str(summary["run_id"]),
+                    step_id,
+                    position,
+                    str(entry.get("status", "unknown")),
+                    None if seconds is None else float(seconds),
+                    None if output is None else str(output),
+                    _file_size(output, root),
+                )
+            )
+        run = (
+            str(summary["run_id"]),
+            str(summary.get("pipeline") or ""),
+            _run_status(results),
+            str(summary.get("started_at") or ""),
+            summary.get("ended_at"),
+            summary.get("duration_seconds"),
+            int(summary.get("total_steps") or len(results)),
+            int(summary.get("successful") or 0),
+            int(summary.get("failed") or 0),
+            str(summary.get("output_dir") or ""),
+            str(summary_path),
+            sum(step[6] or 0 for step in steps),
+            time.time(),
+        )
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM steps WHERE run_id = ?", (run[0],))
+                conn.execute(
+                    f"INSERT OR REPLACE INTO runs ({', '.join(_RUN_COLUMNS)}, "
+                    f"indexed_at) VALUES ({', '.join('?' * (len(_RUN_COLUMNS) + 1))})",
+                    run,
+                )
+                conn.executemany(
+                    "INSERT INTO steps VALUES (?, ?, ?, ?, ?, ?, ?)", steps
+                )
+        finally:
+            conn.close()
+
+    def rebuild(self, output_dir: Path | str) -> int:
+        """สร้างดัชนีจาก output/<run_id>/pipeline_summary.json ที่มีอยู่ คืนจำนวนรอบ"""
+
+        output_dir = Path(output_dir)
+        count = 0
+        for summary_path in sorted(output_dir.glob(f"*/{SUMMARY_FILENAME}")):
+            try:
+                summary = json.loads(summary_path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                continue
+            if isinstance(summary, dict) and summary.get("run_id"):
+                # path ของ output อยู่ในรูป output/<run_id>/... สัมพัทธ์กับ root
+                self.record_summary(summary, summary_path, output_dir.parent)
+                count += 1
+        return count
+
+    def query(
+        self,
+        *,
+        page: int = 1,
+        per_page: int = DEFAULT_PAGE_SIZE,
+        status: str | None = None,
+        pipeline: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> RunPage:
+        """รอบล่าสุดก่อน แบ่งหน้า (page เริ่มที่ 1) since/until เป็น ISO date/datetime"""
+
+        page = max(1, page)
+        per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+        if not self.db_path.exists():
+            return RunPage(items=[], total=0, page=page, per_page=per_page)
+        where, params = _filters(status, pipeline, since, until)
+        conn = self._connect()
+        try:
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM runs {where}", params
+            ).fetchone()
+            rows = conn.execute(
+                f"SELECT {', '.join(_RUN_COLUMNS)} FROM runs {where} "
+                "ORDER BY started_at DESC, run_id DESC LIMIT ? OFFSET ?",
+                [*params, per_page, (page - 1) * per_page],
+            ).fetchall()
+        finally:
+            conn.close()
+        return RunPage(
+            items=[RunRecord(*row) for row in rows],
+            total=total[0],
+            page=page,
+            per_page=per_page,
+        )
+
+    def get(self, run_id: str) -> RunRecord | None:
+        """รอบเดียวพร้อมรายละเอียดทุก step"""
+
+        if not self.db_path.exists():
+            return None
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                f"SELECT {', '.join(_RUN_COLUMNS)} FROM runs WHERE run_id = ?",
+                (run_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            steps = conn.execute(
+                "SELECT step_id, position, status, duration_seconds, output, "
+                "size_bytes FROM steps WHERE run_id = ? ORDER BY position",
+                (run_id,),
+            ).fetchall()
+        finally:
+            conn.close()
+        return RunRecord(*row, steps=[StepRecord(*step) for step in steps])
+
+    def pipelines(self) -> list[str]:
+        if not self.db_path.exists():
+            return []
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT DISTINCT pipeline FROM runs ORDER BY pipeline"
+            ).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+    def stats(
+        self,
+        *,
+        status: str | None = None,
+        pipeline: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> RunStats:
+        """สถิติรวมของรอบที่ตรงเงื่อนไข (ตัวกรองเดียวกับ query)"""
+
+        empty = RunStats(0, {}, None, None, 0, {})
+        if not self.db_path.exists():
+            return empty
+        where, params = _filters(status, pipeline, since, until)
+        conn = self._connect()
+        try:
+            by_status = dict(
+                conn.execute(
+                    f"SELECT status, COUNT(*) FROM runs {where} GROUP BY status",
+                    params,
+                ).fetchall()
+            )
+            total, avg_seconds, max_seconds, artifact_bytes = conn.execute(
+                "SELECT COUNT(*), AVG(duration_seconds), MAX(duration_seconds), "
+                f"COALESCE(SUM(artifact_bytes), 0) FROM runs {where}",
+                params,
+            ).fetchone()
+            step_rows = conn.execute(
+                "SELECT step_id, COUNT(*), AVG(duration_seconds) FROM steps "
+                f"WHERE duration_seconds IS NOT NULL AND run_id IN "
+                f"(SELECT run_id FROM runs {where}) GROUP BY step_id",
+                params,
+            ).fetchall()
+        finally:
+            conn.close()
+        return RunStats(
+            total=total,
+            by_status=by_status,
+            avg_duration_seconds=avg_seconds,
+            max_duration_seconds=max_seconds,
+            artifact_bytes=artifact_bytes,
+            step_avg_seconds={
+                step_id: (count, avg) for step_id, count, avg in step_rows
+            },
+        )
+
+
+def index_run_summary(
+    root_dir: Path, summary: Mapping[str, Any], summary_path: Path | str
+) -> None:
+    """บันทึกรอบลงดัชนีแบบ best-effort: เขียนไม่ได้ก็ไม่ทำให้ pipeline ล้ม"""
+
+    try:
+        RunIndex.from_env(root_dir).record_summary(summary, summary_path, root_dir)
+    except (OSError, sqlite3.Error, KeyError, TypeError, ValueError):
+        return
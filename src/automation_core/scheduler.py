@@ -5,7 +5,10 @@
 from __future__ import annotations
 
 import hashlib
-from dataclasses import dataclass
+import json
+import os
+from bisect import bisect_left, bisect_right
+from dataclasses import asdict, dataclass
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
 from typing import Any
@@ -14,7 +17,7 @@ from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import yaml
 from pydantic import BaseModel, Field, ValidationError, field_validator
 
-from automation_core.queue import FileQueue, JobSpec
+from automation_core.queue import JobQueue, JobSpec, ResourceClass
 
 DEFAULT_TIMEZONE = "Asia/Bangkok"
 
@@ -30,6 +33,8 @@ class ScheduleEntry(BaseModel):
     pipeline_path: str = Field(..., min_length=1)
     run_id_prefix: str | None = None
     params: dict[str, Any] | None = None
+    priority: int = 0
+    resource_class: ResourceClass = "default"
 
     @field_validator("pipeline_path")
     @classmethod
@@ -70,6 +75,7 @@ class ScheduleResult:
     timezone: str
     enqueued_job_ids: list[str]
     skipped_entries: list[ScheduleSkip]
+    not_due_count: int = 0
 
 
 def parse_iso_datetime(value: str) -> datetime:
@@ -138,16 +144,14 @@ def build_job_spec(
         status="pending",
         attempts=0,
         last_error=None,
+        priority=entry.priority,
+        resource_class=entry.resource_class,
     )
 
 
-def load_schedule_plan(plan_path: Path) -> RawSchedulePlan:
-    """อ่านและตรวจโครงสร้างแผนเวลาเบื้องต้น"""
-
+def _parse_schedule_plan(text: str) -> RawSchedulePlan:
     try:
-        raw = yaml.safe_load(plan_path.read_text(encoding="utf-8"))
-    except FileNotFoundError as exc:
-        raise SchedulePlanError(f"ไม่พบไฟล์แผน: {plan_path}") from exc
+        raw = yaml.safe_load(text)
     except Exception as exc:  # noqa: BLE001
         raise SchedulePlanError(f"อ่านแผนไม่สำเร็จ: {exc}") from exc
 
@@ -165,37 +169,112 @@ def load_schedule_plan(plan_path: Path) -> RawSchedulePlan:
     return plan
 
 
-def schedule_due_jobs(
-    plan_path: Path,
-    queue: FileQueue,
-    now_utc: datetime,
-    window_minutes: int,
-    dry_run: bool,
-    scheduler_enabled: bool,
-    created_at_utc: datetime | None = None,
-) -> ScheduleResult:
-    """เลือกงานที่ถึงกำหนดและ enqueue ตามเงื่อนไข"""
+def _read_plan_bytes(plan_path: Path) -> bytes:
+    try:
+        return plan_path.read_bytes()
+    except FileNotFoundError as exc:
+        raise SchedulePlanError(f"ไม่พบไฟล์แผน: {plan_path}") from exc
+    except OSError as exc:
+        raise SchedulePlanError(f"อ่านแผนไม่สำเร็จ: {exc}") from exc
+
+
+def load_schedule_plan(plan_path: Path) -> RawSchedulePlan:
+    """อ่านและตรวจโครงสร้างแผนเวลาเบื้องต้น"""
+
+    data = _read_plan_bytes(plan_path)
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        raise SchedulePlanError(f"อ่านแผนไม่สำเร็จ: {exc}") from exc
+    return _parse_schedule_plan(text)
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+# รูปแบบของแผนที่คอมไพล์แล้วบนดิสก์ เปลี่ยนเมื่อโครงสร้างเปลี่ยน (ไฟล์เก่าถูกคอมไพล์ใหม่)
+COMPILED_PLAN_VERSION = "v2"
+
+
+def _epoch_micros(value: datetime) -> int:
+    """แปลงเวลาเป็นไมโครวินาทีแบบจำนวนเต็ม (เทียบค่าได้ตรงกับ datetime)"""
 
-    plan = load_schedule_plan(plan_path)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+@dataclass(frozen=True)
+class CompiledEntry:
+    """รายการแผนที่ตรวจและคำนวณ job_id/run_id ไว้ล่วงหน้าแล้ว"""
+
+    scheduled_us: int
+    scheduled_for: str
+    publish_at: str
+    pipeline_path: str
+    job_id: str
+    run_id: str
+    params: dict[str, Any] | None
+    priority: int = 0
+    resource_class: ResourceClass = "default"
+    # ลำดับในไฟล์แผน ใช้รายงานผลตามลำดับเดิมของแผน
+    position: int = 0
+
+
+@dataclass(frozen=True)
+class CompiledPlan:
+    """แผนที่คอมไพล์แล้ว เรียงตามเวลา scheduled_for (UTC) เพื่อ bisect"""
+
+    plan_hash: str
+    timezone: str
+    entries: tuple[CompiledEntry, ...]
+    scheduled_us: tuple[int, ...]
+    # (ลำดับในไฟล์แผน, เหตุผล) ของรายการที่ตรวจไม่ผ่าน
+    invalid_entries: tuple[tuple[int, ScheduleSkip], ...]
+
+    def due_slice(self, start: datetime, end: datetime) -> tuple[int, int]:
+        """ช่วง index ของรายการที่ start <= scheduled_for <= end"""
+
+        lo = bisect_left(self.scheduled_us, _epoch_micros(start))
+        hi = bisect_right(self.scheduled_us, _epoch_micros(end))
+        return lo, max(lo, hi)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "schema_version": COMPILED_PLAN_VERSION,
+            "plan_hash": self.plan_hash,
+            "timezone": self.timezone,
+            "entries": [asdict(entry) for entry in self.entries],
+            "invalid_entries": [
+                {"position": position, **asdict(skip)}
+                for position, skip in self.invalid_entries
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> CompiledPlan:
+        entries = tuple(CompiledEntry(**entry) for entry in data["entries"])
+        return cls(
+            plan_hash=data["plan_hash"],
+            timezone=data["timezone"],
+            entries=entries,
+            scheduled_us=tuple(entry.scheduled_us for entry in entries),
+            invalid_entries=tuple(
+                (skip.pop("position"), ScheduleSkip(**skip))
+                for skip in map(dict, data["invalid_entries"])
+            ),
+        )
+
+
+def compile_schedule_plan(plan_text: str, plan_hash: str) -> CompiledPlan:
+    """ตรวจแผนทั้งไฟล์ครั้งเดียว แล้วคืนรายการที่เรียงตามเวลาแล้ว"""
+
+    plan = _parse_schedule_plan(plan_text)
     tz_name = plan.timezone or DEFAULT_TIMEZONE
     try:
         local_tz = ZoneInfo(tz_name)
     except ZoneInfoNotFoundError as exc:
         raise SchedulePlanError(f"timezone ไม่ถูกต้อง: {tz_name}") from exc
 
-    if now_utc.tzinfo is None:
-        now_utc = now_utc.replace(tzinfo=UTC)
-    else:
-        now_utc = now_utc.astimezone(UTC)
-
-    if created_at_utc is None:
-        created_at_utc = now_utc
-
-    window_end = now_utc + timedelta(minutes=max(window_minutes, 0))
-    enqueued_job_ids: list[str] = []
-    skipped_entries: list[ScheduleSkip] = []
-
-    for raw_entry in plan.entries:
+    entries: list[CompiledEntry] = []
+    invalid_entries: list[tuple[int, ScheduleSkip]] = []
+    for position, raw_entry in enumerate(plan.entries):
         publish_at = ""
         pipeline_path = ""
         try:
@@ -204,60 +283,311 @@ def schedule_due_jobs(
             pipeline_path = entry.pipeline_path
             scheduled_local = parse_publish_at(entry.publish_at, local_tz)
             scheduled_utc = scheduled_local.astimezone(UTC)
-            job = build_job_spec(entry, scheduled_utc, local_tz, created_at_utc)
+            # ใช้ build_job_spec เพื่อให้ job_id/run_id ตรงกับเส้นทางเดิมทุกประการ
+            job = build_job_spec(entry, scheduled_utc, local_tz, scheduled_utc)
         except (ValidationError, ValueError, TypeError) as exc:
-            skipped_entries.append(
-                ScheduleSkip(
-                    publish_at=publish_at,
-                    pipeline_path=pipeline_path,
-                    run_id="",
-                    code="job_invalid",
-                    message=str(exc),
+            invalid_entries.append(
+                (
+                    position,
+                    ScheduleSkip(
+                        publish_at=publish_at,
+                        pipeline_path=pipeline_path,
+                        run_id="",
+                        code="job_invalid",
+                        message=str(exc),
+                    ),
                 )
             )
             continue
+        entries.append(
+            CompiledEntry(
+                scheduled_us=_epoch_micros(scheduled_utc),
+                scheduled_for=job.scheduled_for,
+                publish_at=entry.publish_at,
+                pipeline_path=entry.pipeline_path,
+                job_id=job.job_id,
+                run_id=job.run_id,
+                params=entry.params,
+                priority=entry.priority,
+                resource_class=entry.resource_class,
+                position=position,
+            )
+        )
 
-        if not scheduler_enabled:
-            skipped_entries.append(
-                ScheduleSkip(
-                    publish_at=entry.publish_at,
-                    pipeline_path=entry.pipeline_path,
-                    run_id=job.run_id,
-                    code="scheduler_disabled",
-                    message="SCHEDULER_ENABLED=false",
+    entries.sort(key=lambda item: (item.scheduled_us, item.job_id))
+    return CompiledPlan(
+        plan_hash=plan_hash,
+        timezone=tz_name,
+        entries=tuple(entries),
+        scheduled_us=tuple(entry.scheduled_us for entry in entries),
+        invalid_entries=tuple(invalid_entries),
+    )
+
+
+class SchedulePlanCache:
+    """
+    แคชแผนที่คอมไพล์แล้ว (key = sha256 ของไฟล์) และ job_id ที่ enqueue ไปแล้ว
+
+    เก็บในหน่วยความจำเสมอ และถ้าระบุ cache_dir จะเขียนลงดิสก์ด้วย
+    เพื่อให้ cron ที่เปิด process ใหม่ทุก tick ใช้ร่วมกันได้
+    """
+
+    def __init__(self, cache_dir: Path | None = None) -> None:
+        self.cache_dir = cache_dir
+        self._plans: dict[str, CompiledPlan] = {}
+        # queue key -> (stamp ตอนตรวจกับคิวล่าสุด, job_id -> scheduled_us)
+        self._enqueued: dict[str, tuple[str, dict[str, int]]] = {}
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return hashlib.sha256(str(path.resolve()).encode("utf-8")).hexdigest()[:16]
+
+    def _plan_cache_path(self, plan_path: Path) -> Path | None:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"plan_{self._key(plan_path)}.json"
+
+    def _enqueued_cache_path(self, queue_dir: Path) -> Path | None:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"enqueued_{self._key(queue_dir)}.json"
+
+    def _read_json(self, path: Path | None) -> Any:
+        if path is None:
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _write_json(self, path: Path | None, payload: Any) -> None:
+        if path is None:
+            return
+        try:
+            text = json.dumps(payload, ensure_ascii=False)
+        except (TypeError, ValueError):
+            # params บางค่าจาก YAML (เช่น date) แปลงเป็น JSON ไม่ได้ ใช้แคชในหน่วยความจำแทน
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(f"{path.suffix}.tmp.{os.getpid()}")
+        temp_path.write_text(text, encoding="utf-8")
+        os.replace(temp_path, path)
+
+    def load(self, plan_path: Path) -> CompiledPlan:
+        """คืนแผนที่คอมไพล์แล้ว คอมไพล์ใหม่เฉพาะเมื่อเนื้อหาไฟล์เปลี่ยน"""
+
+        data = _read_plan_bytes(plan_path)
+        plan_hash = hashlib.sha256(data).hexdigest()
+        key = self._key(plan_path)
+
+        cached = self._plans.get(key)
+        if cached is not None and cached.plan_hash == plan_hash:
+            return cached
+
+        cache_path = self._plan_cache_path(plan_path)
+        stored = self._read_json(cache_path)
+        if (
+            isinstance(stored, dict)
+            and stored.get("schema_version") == COMPILED_PLAN_VERSION
+            and stored.get("plan_hash") == plan_hash
+        ):
+            try:
+                compiled = CompiledPlan.from_dict(stored)
+            except (KeyError, TypeError):
+                compiled = None
+            if compiled is not None:
+                self._plans[key] = compiled
+                return compiled
+
+        try:
+            text = data.decode("utf-8")
+        except UnicodeDecodeError as exc:
+            raise SchedulePlanError(f"อ่านแผนไม่สำเร็จ: {exc}") from exc
+        compiled = compile_schedule_plan(text, plan_hash)
+        self._plans[key] = compiled
+        self._write_json(cache_path, compiled.to_dict())
+        return compiled
+
+    def enqueued_ids(self, queue: JobQueue, stamp: str) -> dict[str, int]:
+        """
+        job_id ที่เคย enqueue สำเร็จ -> เวลา scheduled_for (ไมโครวินาที)
+
+        เชื่อรายการที่จำไว้โดยไม่ถามคิว ยกเว้น stamp (แผน + คิว ดู
+        ``_schedule_stamp``) เปลี่ยนไปจากรอบที่ตรวจล่าสุด จึงตรวจ ``exists()``
+        ครั้งเดียวและตัดงานที่ไม่อยู่ในคิวแล้วออก
+        """
+
+        key = self._key(queue.queue_dir)
+        if key not in self._enqueued:
+            stored = self._read_json(self._enqueued_cache_path(queue.queue_dir))
+            if isinstance(stored, dict) and isinstance(stored.get("jobs"), dict):
+                self._enqueued[key] = (
+                    str(stored.get("stamp", "")),
+                    {str(k): int(v) for k, v in stored["jobs"].items()},
                 )
-            )
-            continue
+            else:
+                self._enqueued[key] = ("", {})
+        verified_stamp, known = self._enqueued[key]
+        if verified_stamp != stamp:
+            known = {
+                job_id: due for job_id, due in known.items() if queue.exists(job_id)
+            }
+            self._store_enqueued(queue.queue_dir, stamp, known)
+        return known
+
+    def remember_enqueued(
+        self,
+        queue: JobQueue,
+        job_ids: dict[str, int],
+        now_utc: datetime,
+        stamp: str,
+    ) -> None:
+        """จำ job_id ที่ enqueue แล้ว และทิ้งรายการที่เลยเวลาไปแล้ว (ไม่มีทางเข้า window อีก)"""
+
+        known = self.enqueued_ids(queue, stamp)
+        cutoff = _epoch_micros(now_utc)
+        pruned = {
+            job_id: scheduled
+            for job_id, scheduled in {**known, **job_ids}.items()
+            if scheduled >= cutoff
+        }
+        if pruned == known:
+            return
+        self._store_enqueued(queue.queue_dir, stamp, pruned)
+
+    def _store_enqueued(
+        self, queue_dir: Path, stamp: str, jobs: dict[str, int]
+    ) -> None:
+        self._enqueued[self._key(queue_dir)] = (stamp, jobs)
+        self._write_json(
+            self._enqueued_cache_path(queue_dir), {"stamp": stamp, "jobs": jobs}
+        )
+
+
+def _schedule_stamp(plan: CompiledPlan, queue: JobQueue) -> str:
+    """
+    ตัวบอกว่าแผนหรือคิวเปลี่ยนหรือไม่: hash ของแผน + mtime ของ ``watch_paths()``
+
+    อ่านก่อน enqueue ในรอบนั้น การเขียนของรอบนี้เอง (หรือ worker ที่ dequeue)
+    จึงทำให้รอบถัดไปตรวจรายการที่จำไว้กับคิวอีกครั้ง
+    """
+
+    parts = [plan.plan_hash]
+    for path in queue.watch_paths():
+        try:
+            parts.append(str(path.stat().st_mtime_ns))
+        except FileNotFoundError:
+            parts.append("0")
+    return "|".join(parts)
 
-        if not (now_utc <= scheduled_utc <= window_end):
-            skipped_entries.append(
+
+_DEFAULT_PLAN_CACHE = SchedulePlanCache()
+
+
+def schedule_due_jobs(
+    plan_path: Path,
+    queue: JobQueue,
+    now_utc: datetime,
+    window_minutes: int,
+    dry_run: bool,
+    scheduler_enabled: bool,
+    created_at_utc: datetime | None = None,
+    plan_cache: SchedulePlanCache | None = None,
+) -> ScheduleResult:
+    """
+    เลือกงานที่ถึงกำหนดและ enqueue ตามเงื่อนไข
+
+    แผนถูกคอมไพล์และแคชตาม hash ของไฟล์ ไม่ต้องตรวจ/คำนวณ job_id ใหม่ทุก tick
+    ช่วง [now, now+window] หาด้วย bisect แล้ววนเฉพาะรายการในช่วงนั้น รายการนอก
+    window นับรวมใน ``not_due_count`` และรายงานเป็น ``entry_not_due`` รายการเดียว
+    skip ที่เหลือ (job_invalid, scheduler_disabled, already_enqueued) เรียงตามลำดับในแผน
+    """
+
+    cache = plan_cache or _DEFAULT_PLAN_CACHE
+    plan = cache.load(plan_path)
+
+    if now_utc.tzinfo is None:
+        now_utc = now_utc.replace(tzinfo=UTC)
+    else:
+        now_utc = now_utc.astimezone(UTC)
+
+    if created_at_utc is None:
+        created_at_utc = now_utc
+
+    window_end = now_utc + timedelta(minutes=max(window_minutes, 0))
+    enqueued: list[tuple[int, str]] = []
+    skipped: list[tuple[int, ScheduleSkip]] = list(plan.invalid_entries)
+
+    def _skip(entry: CompiledEntry, code: str, message: str) -> None:
+        skipped.append(
+            (
+                entry.position,
                 ScheduleSkip(
                     publish_at=entry.publish_at,
                     pipeline_path=entry.pipeline_path,
-                    run_id=job.run_id,
-                    code="entry_not_due",
-                    message="not within window",
-                )
+                    run_id=entry.run_id,
+                    code=code,
+                    message=message,
+                ),
             )
+        )
+
+    lo, hi = plan.due_slice(now_utc, window_end)
+    not_due_count = len(plan.entries) - (hi - lo)
+    stamp = _schedule_stamp(plan, queue)
+    remembered = cache.enqueued_ids(queue, stamp) if scheduler_enabled else {}
+    newly_enqueued: dict[str, int] = {}
+    created_at = format_utc(created_at_utc)
+    for entry in plan.entries[lo:hi]:
+        if not scheduler_enabled:
+            _skip(entry, "scheduler_disabled", "SCHEDULER_ENABLED=false")
+            continue
+
+        if entry.job_id in remembered:
+            _skip(entry, "already_enqueued", "job already exists")
             continue
 
+        job = JobSpec(
+            schema_version="v1",
+            job_id=entry.job_id,
+            created_at=created_at,
+            scheduled_for=entry.scheduled_for,
+            pipeline_path=entry.pipeline_path,
+            run_id=entry.run_id,
+            params=entry.params,
+            status="pending",
+            attempts=0,
+            last_error=None,
+            priority=entry.priority,
+            resource_class=entry.resource_class,
+        )
         # ใช้ enqueue() แบบเดียวกันทั้ง dry_run และ actual run
         # เพื่อให้ dry_run ให้ผลลัพธ์ที่ตรงกับ actual run
         if queue.enqueue(job, dry_run=dry_run):
-            enqueued_job_ids.append(job.job_id)
+            enqueued.append((entry.position, entry.job_id))
         else:
-            skipped_entries.append(
-                ScheduleSkip(
-                    publish_at=entry.publish_at,
-                    pipeline_path=entry.pipeline_path,
-                    run_id=job.run_id,
-                    code="already_enqueued",
-                    message="job already exists",
-                )
+            _skip(entry, "already_enqueued", "job already exists")
+        if not dry_run:
+            newly_enqueued[entry.job_id] = entry.scheduled_us
+
+    if not dry_run and scheduler_enabled:
+        cache.remember_enqueued(queue, newly_enqueued, now_utc, stamp)
+
+    enqueued_job_ids = [job_id for _, job_id in sorted(enqueued)]
+    skipped_entries = [skip for _, skip in sorted(skipped, key=lambda pair: pair[0])]
+    if not_due_count:
+        skipped_entries.append(
+            ScheduleSkip(
+                publish_at="",
+                pipeline_path="",
+                run_id="",
+                code="entry_not_due",
+                message=f"{not_due_count} entries not within window",
             )
-
+        )
     return ScheduleResult(
-        timezone=tz_name,
+        timezone=plan.timezone,
         enqueued_job_ids=enqueued_job_ids,
         skipped_entries=skipped_entries,
+        not_due_count=not_due_count,
     )
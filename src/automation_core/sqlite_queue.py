@@ -0,0 +1,543 @@
+"""
+คิวงานแบบ SQLite สำหรับ worker หลาย process
+
+ใช้สคีมา JobSpec เดียวกับ FileQueue และมีเมธอดชุดเดียวกัน
+(enqueue/peek_next/dequeue_next/mark_done/mark_failed/list_pending)
+แต่ย้ายสถานะด้วยคำสั่ง SQL เดียวแบบ atomic แทนการ rename ไฟล์
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Collection
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from pydantic import ValidationError
+
+from automation_core.queue import (
+    DEFAULT_LEASE_SECONDS,
+    JobError,
+    JobSpec,
+    QueueItem,
+    QueueState,
+    RetryPolicy,
+    _format_compact_utc,
+    _format_utc,
+    _parse_compact_utc,
+    _should_retry,
+)
+
+SQLITE_QUEUE_FILENAME = "queue.sqlite3"
+DEFAULT_BUSY_TIMEOUT_SECONDS = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    scheduled_for TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL,
+    available_at REAL NOT NULL DEFAULT 0,
+    lease_expires_at REAL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    resource_class TEXT NOT NULL DEFAULT 'default'
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_scheduled
+    ON jobs (status, scheduled_for, job_id);
+"""
+
+# สร้างหลัง migration เพราะฐานข้อมูลเก่ายังไม่มีคอลัมน์ priority
+_LANE_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_jobs_status_priority
+    ON jobs (status, priority DESC, scheduled_for, job_id)
+"""
+
+_NO_DUE_LIMIT = "99991231T235959Z"
+
+# คอลัมน์ที่เพิ่มภายหลัง สำหรับฐานข้อมูลที่สร้างก่อนรองรับ lease/retry
+_MIGRATION_COLUMNS = {
+    "available_at": "REAL NOT NULL DEFAULT 0",
+    "lease_expires_at": "REAL",
+    "priority": "INTEGER NOT NULL DEFAULT 0",
+    "resource_class": "TEXT NOT NULL DEFAULT 'default'",
+}
+
+# เลือกและจองงานถัดไปใน statement เดียว ป้องกัน worker สองตัวได้งานเดียวกัน
+_CLAIM_SQL = """
+UPDATE jobs
+SET status = 'running', attempts = attempts + 1, lease_expires_at = :lease
+WHERE job_id = (
+    SELECT job_id FROM jobs
+    WHERE status = 'pending' AND available_at <= :now AND scheduled_for <= :due
+    {class_filter}
+    ORDER BY priority DESC, scheduled_for, job_id
+    LIMIT 1
+)
+AND status = 'pending'
+RETURNING job_id, filename, attempts, payload
+"""
+
+
+def _class_filter(exclude_classes: Collection[str]) -> tuple[str, dict[str, str]]:
+    """เงื่อนไข SQL + parameter สำหรับตัด resource_class ที่ชนเพดานออก"""
+
+    if not exclude_classes:
+        return "", {}
+    params = {f"cls{index}": name for index, name in enumerate(sorted(exclude_classes))}
+    placeholders = ", ".join(f":{key}" for key in params)
+    return f"AND resource_class NOT IN ({placeholders})", params
+
+
+def _due_key(due_before: datetime | None) -> str:
+    # scheduled_for เก็บแบบ compact UTC จึงเทียบเป็นสตริงได้ตรงตามเวลา
+    if due_before is None:
+        return _NO_DUE_LIMIT
+    return due_before.astimezone(UTC).strftime("%Y%m%dT%H%M%SZ")
+
+
+class SqliteQueue:
+    """คิวแบบ SQLite (WAL) ที่ dequeue พร้อมกันหลาย process ได้อย่างปลอดภัย"""
+
+    def __init__(
+        self,
+        queue_dir: Path | str,
+        db_filename: str = SQLITE_QUEUE_FILENAME,
+        busy_timeout: float = DEFAULT_BUSY_TIMEOUT_SECONDS,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        retry_policy: RetryPolicy | None = None,
+    ) -> None:
+        self.queue_dir = Path(queue_dir)
+        self.db_path = self.queue_dir / db_filename
+        self.busy_timeout = busy_timeout
+        self.lease_seconds = lease_seconds
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        # connection ของ sqlite3 ใช้ข้าม fork/thread ไม่ได้
+        # จึงแยกต่อ thread และเปิดใหม่เมื่อ pid เปลี่ยน
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for name, definition in _MIGRATION_COLUMNS.items():
+            if name not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+        conn.execute(_LANE_INDEX)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def close(self) -> None:
+        """ปิด connection ของ thread ปัจจุบัน"""
+
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+        self._local.pid = None
+
+    def _load_job(self, payload: str) -> JobSpec | None:
+        try:
+            return JobSpec.model_validate(json.loads(payload))
+        except (json.JSONDecodeError, ValidationError):
+            return None
+
+    def _build_filename(self, job: JobSpec) -> str:
+        scheduled_compact = _format_compact_utc(job.scheduled_for)
+        return f"{scheduled_compact}_{job.job_id}.json"
+
+    def _to_item(
+        self,
+        job_id: str,
+        filename: str,
+        payload: str,
+        attempt: int | None = None,
+    ) -> QueueItem:
+        return QueueItem(
+            filename=filename,
+            path=self.db_path,
+            job=self._load_job(payload),
+            job_id=job_id,
+            attempt=attempt,
+        )
+
+    @staticmethod
+    def _claim_filter(item: QueueItem) -> tuple[str, tuple[Any, ...]]:
+        """เงื่อนไข SQL ให้แก้ได้เฉพาะแถวที่ยัง running ในรอบที่ item จองไว้"""
+
+        if item.attempt is None:
+            return "job_id = ? AND status = 'running'", (item.job_id,)
+        return (
+            "job_id = ? AND status = 'running' AND attempts = ?",
+            (item.job_id, item.attempt),
+        )
+
+    def _update_state(
+        self,
+        item: QueueItem,
+        status: QueueState,
+        update: dict[str, Any],
+    ) -> QueueItem:
+        conn = self._connect()
+        claim_sql, claim_params = self._claim_filter(item)
+        job = item.job
+        if job is not None:
+            job = job.model_copy(update={"status": status, **update})
+            payload = json.dumps(job.model_dump(), ensure_ascii=False)
+            cursor = conn.execute(
+                f"UPDATE jobs SET status = ?, payload = ? WHERE {claim_sql}",
+                (status, payload, *claim_params),
+            )
+        else:
+            cursor = conn.execute(
+                f"UPDATE jobs SET status = ? WHERE {claim_sql}",
+                (status, *claim_params),
+            )
+        if cursor.rowcount != 1:
+            raise FileNotFoundError(f"job is not running: {item.job_id}")
+        return QueueItem(
+            filename=item.filename,
+            path=self.db_path,
+            job=job,
+            job_id=item.job_id,
+            attempt=item.attempt,
+        )
+
+    def count_by_state(self) -> dict[str, int]:
+        """จำนวนงานต่อสถานะ"""
+
+        counts = dict.fromkeys(("pending", "running", "done", "failed", "dead"), 0)
+        for status, count in self._connect().execute(
+            "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+        ):
+            counts[status] = count
+        return counts
+
+    def exists(self, job_id: str) -> bool:
+        """ตรวจว่ามีงานอยู่ในคิวทุกสถานะหรือไม่"""
+
+        row = (
+            self._connect()
+            .execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,))
+            .fetchone()
+        )
+        return row is not None
+
+    def enqueue(self, job: JobSpec, dry_run: bool = False) -> bool:
+        """
+        เพิ่มงานลงคิวแบบ idempotent
+
+        Args:
+            job: งานที่ต้องการเพิ่มลงคิว
+            dry_run: ถ้าเป็น True จะตรวจสอบเงื่อนไขเหมือนปกติแต่ไม่เขียนฐานข้อมูล
+
+        Returns:
+            True ถ้างานถูกเพิ่มลงคิว (หรือจะถูกเพิ่มถ้าไม่ใช่ dry_run)
+            False ถ้างานมีอยู่แล้วในคิว
+        """
+
+        if dry_run:
+            return not self.exists(job.job_id)
+
+        pending_job = job.model_copy(update={"status": "pending", "last_error": None})
+        payload = json.dumps(pending_job.model_dump(), ensure_ascii=False)
+        # INSERT OR IGNORE บน primary key ทำให้ idempotent โดยไม่ต้องตรวจก่อน
+        cursor = self._connect().execute(
+            "INSERT OR IGNORE INTO jobs "
+            "(job_id, filename, scheduled_for, status, attempts, payload, "
+            "priority, resource_class) "
+            "VALUES (?, ?, ?, 'pending', ?, ?, ?, ?)",
+            (
+                pending_job.job_id,
+                self._build_filename(pending_job),
+                _format_compact_utc(pending_job.scheduled_for),
+                pending_job.attempts,
+                payload,
+                pending_job.priority,
+                pending_job.resource_class,
+            ),
+        )
+        return cursor.rowcount == 1
+
+    def enqueue_running(self, job: JobSpec) -> QueueItem | None:
+        """
+        บันทึกงานที่ผู้เรียกจะรันเองทันทีลงสถานะ running พร้อมเริ่ม lease
+
+        Returns:
+            QueueItem ของงาน หรือ None ถ้ามี job_id นี้อยู่แล้ว
+        """
+
+        running_job = job.model_copy(
+            update={"status": "running", "attempts": job.attempts + 1}
+        )
+        payload = json.dumps(running_job.model_dump(), ensure_ascii=False)
+        filename = self._build_filename(running_job)
+        cursor = self._connect().execute(
+            "INSERT OR IGNORE INTO jobs "
+            "(job_id, filename, scheduled_for, status, attempts, payload, "
+            "lease_expires_at, priority, resource_class) "
+            "VALUES (?, ?, ?, 'running', ?, ?, ?, ?, ?)",
+            (
+                running_job.job_id,
+                filename,
+                _format_compact_utc(running_job.scheduled_for),
+                running_job.attempts,
+                payload,
+                time.time() + self.lease_seconds,
+                running_job.priority,
+                running_job.resource_class,
+            ),
+        )
+        if cursor.rowcount != 1:
+            return None
+        return QueueItem(
+            filename=filename,
+            path=self.db_path,
+            job=running_job,
+            job_id=running_job.job_id,
+            attempt=running_job.attempts,
+        )
+
+    def list_pending(self) -> list[QueueItem]:
+        """คืนรายการงานในสถานะ pending ตามลำดับ FIFO"""
+
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT job_id, filename, payload FROM jobs "
+                "WHERE status = 'pending' ORDER BY scheduled_for, job_id"
+            )
+            .fetchall()
+        )
+        return [self._to_item(*row) for row in rows]
+
+    def peek_next(
+        self,
+        due_before: datetime | None = None,
+        exclude_classes: Collection[str] = (),
+    ) -> QueueItem | None:
+        """ดูงานถัดไปที่พร้อมรันแบบไม่ย้ายสถานะ"""
+
+        class_filter, class_params = _class_filter(exclude_classes)
+        row = (
+            self._connect()
+            .execute(
+                "SELECT job_id, filename, payload FROM jobs "
+                "WHERE status = 'pending' AND available_at <= :now "
+                f"AND scheduled_for <= :due {class_filter} "
+                "ORDER BY priority DESC, scheduled_for, job_id LIMIT 1",
+                {"now": time.time(), "due": _due_key(due_before), **class_params},
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return self._to_item(*row)
+
+    def dequeue_next(
+        self,
+        due_before: datetime | None = None,
+        exclude_classes: Collection[str] = (),
+    ) -> QueueItem | None:
+        """
+        จองงานถัดไปที่พร้อมรันจาก pending ไป running ด้วย statement เดียว
+
+        เลือกงานที่ priority สูงสุดก่อน ถ้าเท่ากันเลือกตาม scheduled_for (FIFO)
+
+        Args:
+            due_before: ถ้าระบุ จะเลือกเฉพาะงานที่ scheduled_for ไม่เกินเวลานี้
+            exclude_classes: resource_class ที่ห้ามเลือก (เช่น ชนเพดาน concurrency แล้ว)
+        """
+
+        conn = self._connect()
+        now = time.time()
+        class_filter, class_params = _class_filter(exclude_classes)
+        row = conn.execute(
+            _CLAIM_SQL.format(class_filter=class_filter),
+            {
+                "now": now,
+                "lease": now + self.lease_seconds,
+                "due": _due_key(due_before),
+                **class_params,
+            },
+        ).fetchone()
+        if row is None:
+            return None
+        job_id, filename, attempts, payload = row
+        job = self._load_job(payload)
+        if job is not None:
+            job = job.model_copy(
+                update={
+                    "status": "running",
+                    "attempts": attempts,
+                    "last_error": None,
+                    "retry_at": None,
+                }
+            )
+            conn.execute(
+                "UPDATE jobs SET payload = ? WHERE job_id = ?",
+                (json.dumps(job.model_dump(), ensure_ascii=False), job_id),
+            )
+        return QueueItem(
+            filename=filename,
+            path=self.db_path,
+            job=job,
+            job_id=job_id,
+            attempt=attempts,
+        )
+
+    def mark_done(self, item: QueueItem) -> QueueItem:
+        """ย้ายงานจาก running ไป done"""
+
+        return self._update_state(item, "done", {"last_error": None})
+
+    def mark_failed(self, item: QueueItem, error: JobError | None = None) -> QueueItem:
+        """ย้ายงานจาก running ไป failed"""
+
+        update: dict[str, Any] = {}
+        if error is not None:
+            update["last_error"] = error
+        return self._update_state(item, "failed", update)
+
+    def next_ready_at(self) -> datetime | None:
+        """เวลาที่เร็วที่สุดที่งาน pending จะพร้อมรัน (ดู scheduled_for และ retry_at)"""
+
+        conn = self._connect()
+        candidates: list[datetime] = []
+        (first_scheduled,) = conn.execute(
+            "SELECT MIN(scheduled_for) FROM jobs "
+            "WHERE status = 'pending' AND available_at = 0"
+        ).fetchone()
+        if first_scheduled is not None:
+            candidates.append(_parse_compact_utc(first_scheduled))
+        # งานที่รอ retry มีจำนวนน้อย คำนวณทีละแถวได้
+        for scheduled_for, available_at in conn.execute(
+            "SELECT scheduled_for, available_at FROM jobs "
+            "WHERE status = 'pending' AND available_at > 0"
+        ):
+            candidates.append(
+                max(
+                    _parse_compact_utc(scheduled_for),
+                    datetime.fromtimestamp(available_at, UTC),
+                )
+            )
+        return min(candidates, default=None)
+
+    def watch_paths(self) -> list[Path]:
+        """โฟลเดอร์คิวและไฟล์ WAL ซึ่งเปลี่ยนทุกครั้งที่มีการเขียน"""
+
+        self._connect()
+        return [self.queue_dir, self.db_path.with_name(f"{self.db_path.name}-wal")]
+
+    def heartbeat(self, item: QueueItem) -> bool:
+        """
+        ต่ออายุ lease ของงานที่กำลังรัน คืน False ถ้างานไม่อยู่ใน running แล้ว
+        หรือถูก requeue แล้ว dequeue รอบใหม่ไป (attempts ไม่ตรงกับ item)
+        """
+
+        claim_sql, claim_params = self._claim_filter(item)
+        cursor = self._connect().execute(
+            f"UPDATE jobs SET lease_expires_at = ? WHERE {claim_sql}",
+            (time.time() + self.lease_seconds, *claim_params),
+        )
+        return cursor.rowcount == 1
+
+    def _release(
+        self, item: QueueItem, error: JobError, expired_before: float | None
+    ) -> QueueItem:
+        job = item.job
+        now = datetime.now(UTC)
+        available_at = 0.0
+        if job is not None and _should_retry(self.retry_policy, job):
+            status: QueueState = "pending"
+            retry_at = now + self.retry_policy.delay_for(job.attempts)
+            available_at = retry_at.timestamp()
+            job = job.model_copy(
+                update={
+                    "status": status,
+                    "last_error": error,
+                    "retry_at": _format_utc(retry_at),
+                }
+            )
+        else:
+            status = "dead"
+            if job is not None:
+                job = job.model_copy(update={"status": status, "last_error": error})
+
+        claim_sql, claim_params = self._claim_filter(item)
+        sql = (
+            "UPDATE jobs SET status = ?, available_at = ?, lease_expires_at = NULL"
+            + (", payload = ?" if job is not None else "")
+            + f" WHERE {claim_sql}"
+        )
+        params: list[Any] = [status, available_at]
+        if job is not None:
+            params.append(json.dumps(job.model_dump(), ensure_ascii=False))
+        params.extend(claim_params)
+        if expired_before is not None:
+            # กันกรณี worker ส่ง heartbeat เข้ามาหลังจากเราอ่านแถวนี้
+            sql += " AND lease_expires_at <= ?"
+            params.append(expired_before)
+        cursor = self._connect().execute(sql, params)
+        if cursor.rowcount != 1:
+            raise FileNotFoundError(f"job is not running: {item.job_id}")
+        return QueueItem(
+            filename=item.filename,
+            path=self.db_path,
+            job=job,
+            job_id=item.job_id,
+            attempt=item.attempt,
+        )
+
+    def release(self, item: QueueItem, error: JobError) -> QueueItem:
+        """
+        คืนงานที่รันไม่จบ (worker ตาย/lease หมดอายุ) ตาม retry_policy
+
+        ถ้ายังไม่เกิน max_attempts จะกลับไป pending พร้อม retry_at แบบ
+        exponential backoff ไม่เช่นนั้นเปลี่ยนสถานะเป็น dead (dead-letter) งานภายนอก
+        (``EXTERNAL_PIPELINE_PREFIX``) เป็น dead เสมอ
+        """
+
+        return self._release(item, error, expired_before=None)
+
+    def requeue_expired(self, now: datetime | None = None) -> list[QueueItem]:
+        """คืนงานใน running ที่ lease หมดอายุ"""
+
+        cutoff = (now or datetime.now(UTC)).timestamp()
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT job_id, filename, payload, attempts FROM jobs "
+                "WHERE status = 'running' AND lease_expires_at <= ?",
+                (cutoff,),
+            )
+            .fetchall()
+        )
+        error = JobError(
+            code="lease_expired",
+            message=f"no heartbeat for {self.lease_seconds:.0f}s",
+        )
+        released: list[QueueItem] = []
+        for row in rows:
+            try:
+                released.append(self._release(self._to_item(*row), error, cutoff))
+            except FileNotFoundError:
+                continue
+        return released
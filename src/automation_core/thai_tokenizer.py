@@ -0,0 +1,136 @@
+"""
+ตัดคำภาษาไทยด้วยพจนานุกรมแบบ maximal matching
+
+ข้อความไทยไม่เว้นวรรคระหว่างคำ การ ``split()`` จึงได้ทั้งวลีเป็นหนึ่ง token
+ตัวตัดคำนี้เลือกการแบ่งที่มีอักษรนอกพจนานุกรมน้อยที่สุด แล้วจึงมีจำนวนคำน้อยที่สุด
+(dynamic programming บนตำแหน่งที่ตัดได้) ไม่ตัดกลางพยางค์ที่มีสระหน้า/สระบน-ล่าง/
+วรรณยุกต์ และรวมช่วงที่ไม่รู้จักที่ติดกันเป็น token เดียว ส่วนข้อความที่ไม่ใช่ไทย
+ตัดตามตัวอักษร/ตัวเลขเหมือนเดิม
+
+พจนานุกรมเริ่มต้นอยู่ที่ ``thai_words.txt`` (บรรทัดละคำ) เพิ่มคำเฉพาะทางได้โดยส่ง
+รายการคำเข้า ``ThaiTokenizer`` เอง
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+from functools import lru_cache
+from pathlib import Path
+
+THAI_WORDS_PATH = Path(__file__).with_name("thai_words.txt")
+
+# ช่วงอักษรไทย (ไม่รวม ๆ และเลขไทย) กับคำที่ไม่ใช่ไทย
+_TOKEN_PATTERN = re.compile(r"[ก-ๅ็-๎]+|[^\W฀-๿_]+")
+# สระหน้า: ต้องอยู่คู่กับพยัญชนะที่ตามมา
+_LEADING_VOWELS = frozenset("เแโใไ")
+# สระบน/ล่าง วรรณยุกต์ การันต์ และสระหลังที่ต้องติดกับอักษรก่อนหน้า
+_FOLLOWING_MARKS = frozenset("ะัาำิีึืฺุูๅ็่้๊๋์ํ๎")
+_CACHE_LIMIT = 50_000
+
+
+class ThaiTokenizer:
+    """ตัดคำไทยตามพจนานุกรม พร้อม cache ผลของแต่ละช่วงข้อความไทย"""
+
+    def __init__(self, words: Iterable[str]) -> None:
+        self.words = frozenset(w.strip() for w in words if w.strip())
+        # prefix ทุกตัวของทุกคำ: หยุดไล่ความยาวได้ทันทีที่ไม่มีคำใดขึ้นต้นแบบนี้
+        self._prefixes = frozenset(w[:i] for w in self.words for i in range(1, len(w)))
+        self._cache: dict[str, tuple[str, ...]] = {}
+
+    @classmethod
+    def from_file(cls, path: Path | str) -> ThaiTokenizer:
+        lines = Path(path).read_text(encoding="utf-8").splitlines()
+        return cls(line for line in lines if not line.startswith("#"))
+
+    def tokenize(self, text: str) -> list[str]:
+        """แยก token จากข้อความ (ตัวพิมพ์เล็ก, ตัดเครื่องหมายวรรคตอนทิ้ง)"""
+
+        tokens: list[str] = []
+        for match in _TOKEN_PATTERN.finditer(text.lower()):
+            chunk = match.group()
+            if "ก" <= chunk[0] <= "๎":
+                tokens.extend(self.segment(chunk))
+            else:
+                tokens.append(chunk)
+        return tokens
+
+    def segment(self, run: str) -> tuple[str, ...]:
+        """ตัดช่วงอักษรไทยล้วนเป็นคำ"""
+
+        cached = self._cache.get(run)
+        if cached is None:
+            cached = self._segment(run)
+            if len(self._cache) >= _CACHE_LIMIT:
+                self._cache.clear()
+            self._cache[run] = cached
+        return cached
+
+    def _segment(self, run: str) -> tuple[str, ...]:
+        n = len(run)
+        breakable = [True] * (n + 1)
+        for i in range(1, n):
+            breakable[i] = (
+                run[i] not in _FOLLOWING_MARKS and run[i - 1] not in _LEADING_VOWELS
+            )
+
+        # best[i] = (จำนวนอักษรนอกพจนานุกรม, จำนวน token) ของการตัด run[:i]
+        infinity = (n + 1, n + 1)
+        best = [infinity] * (n + 1)
+        previous = [0] * (n + 1)
+        known = [False] * (n + 1)
+        best[0] = (0, 0)
+        for start in range(n):
+            if best[start] == infinity or not breakable[start]:
+                continue
+            unknown, count = best[start]
+            for end in range(start + 1, n + 1):
+                piece = run[start:end]
+                if (
+                    breakable[end]
+                    and piece in self.words
+                    and (unknown, count + 1) < best[end]
+                ):
+                    best[end] = (unknown, count + 1)
+                    previous[end] = start
+                    known[end] = True
+                if piece not in self._prefixes:
+                    break
+            # ไม่พบในพจนานุกรม: ข้ามไปหนึ่งกลุ่มอักษร
+            end = start + 1
+            while not breakable[end]:
+                end += 1
+            candidate = (unknown + end - start, count + 1)
+            if candidate < best[end]:
+                best[end] = candidate
+                previous[end] = start
+                known[end] = False
+
+        pieces: list[tuple[str, bool]] = []
+        end = n
+        while end > 0:
+            start = previous[end]
+            pieces.append((run[start:end], known[end]))
+            end = start
+        pieces.reverse()
+
+        tokens: list[str] = []
+        unknown_run = ""
+        for piece, is_word in pieces:
+            if is_word:
+                if unknown_run:
+                    tokens.append(unknown_run)
+                    unknown_run = ""
+                tokens.append(piece)
+            else:
+                unknown_run += piece
+        if unknown_run:
+            tokens.append(unknown_run)
+        return tuple(tokens)
+
+
+@lru_cache(maxsize=1)
+def default_tokenizer() -> ThaiTokenizer:
+    """ตัวตัดคำที่ใช้พจนานุกรมเริ่มต้น (โหลดครั้งเดียวต่อ process)"""
+
+    return ThaiTokenizer.from_file(THAI_WORDS_PATH)
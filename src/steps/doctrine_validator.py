@@ -23,6 +23,7 @@ from agents.doctrine_validator.model import (
     Passages,
     ScriptSegment,
 )
+from agents.doctrine_validator.passage_search import PassageIndex
 from automation_core.base_step import BaseStep
 
 logger = logging.getLogger(__name__)
@@ -48,6 +49,7 @@ class DoctrineValidatorContext(TypedDict, total=False):
     strictness: str  # "normal" or "strict"
     check_sensitive: bool
     ignore_segments: list[int]
+    canon_index_file: str  # ดัชนี embedding ของพระไตรปิฎก (.npz) สำหรับเสนอ passage
 
     # Output location
     output_dir: str
@@ -63,6 +65,7 @@ class DoctrineValidatorStep(BaseStep):
             version="1.0.0",
         )
         self.agent = DoctrineValidatorAgent()
+        self._canon_index_file: str | None = None
 
     def execute(self, context: DoctrineValidatorContext) -> dict:
         """Execute doctrinal validation"""
@@ -92,6 +95,7 @@ class DoctrineValidatorStep(BaseStep):
             self.logger.error(f"Failed to create agent input: {e}")
             return {"status": "error", "error": str(e)}
 
+        self._load_canon_index(context.get("canon_index_file"))
         self.logger.info(f"Validating {len(script_segments)} segments")
         result = self.agent.run(agent_input)
 
@@ -144,6 +148,27 @@ class DoctrineValidatorStep(BaseStep):
             "warnings": all_warnings,
         }
 
+    def _load_canon_index(self, path: str | None) -> None:
+        """โหลดดัชนีพระไตรปิฎกครั้งเดียวต่อไฟล์ (ดัชนีผิด model จะไม่ถูกใช้)"""
+        if not path or path == self._canon_index_file:
+            return
+        self._canon_index_file = path
+        try:
+            index = PassageIndex.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.warning(f"Failed to load canon index: {e}")
+            self.agent.canon_index = None
+            return
+        expected = self.agent.embedding_model_name()
+        if index.model_name != expected:
+            self.logger.warning(
+                f"Canon index built with {index.model_name}, expected "
+                f"{expected}; ignoring"
+            )
+            self.agent.canon_index = None
+            return
+        self.agent.canon_index = index
+
     def _get_script_data(
         self, context: DoctrineValidatorContext
     ) -> tuple[str, list[ScriptSegment] | None]:
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import hashlib
 import json
+from datetime import date, timedelta
 from pathlib import Path
 
+import numpy as np
+
 
 def write_post_templates(base_dir: Path) -> None:
     """
@@ -66,3 +70,97 @@ def write_metadata(
         json.dumps(metadata, ensure_ascii=False, indent=2), encoding="utf-8"
     )
     return metadata_path
+
+
+class StandInTrendReq:
+    """
+    ตัวแทน ``pytrends.request.TrendReq`` แบบ offline: ความนิยมดิบของแต่ละคำในแต่ละวัน
+    คงที่ตาม hash ของ (คำ, วัน) และถูก normalize ต่อ payload ให้ค่าสูงสุดเป็น 100
+    แบบ Google Trends payload และ timeframe ที่ขอเก็บไว้ใน ``payloads``/``timeframes``
+    """
+
+    payloads: list[list[str]] = []
+    timeframes: list[str] = []
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._keywords: list[str] = []
+        self._days: list[date] = []
+
+    def build_payload(self, kw_list, timeframe="today 30-d", geo="") -> None:
+        type(self).payloads.append(list(kw_list))
+        type(self).timeframes.append(timeframe)
+        self._keywords = list(kw_list)
+        if timeframe.startswith("today"):
+            end = date.today()
+            start = end - timedelta(days=int(timeframe.split()[1].split("-")[0]) - 1)
+        else:
+            start, end = (date.fromisoformat(part) for part in timeframe.split())
+        self._days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+    @staticmethod
+    def raw_series(keyword: str, days: list[date]) -> np.ndarray:
+        return np.array(
+            [
+                10
+                + int(hashlib.sha256(f"{keyword}|{day}".encode()).hexdigest()[:6], 16)
+                % 990
+                for day in days
+            ],
+            dtype=float,
+        )
+
+    def interest_over_time(self):
+        import pandas as pd
+
+        raw = {
+            keyword: self.raw_series(keyword, self._days) for keyword in self._keywords
+        }
+        peak = max(series.max() for series in raw.values())
+        return pd.DataFrame(
+            {keyword: np.rint(series * 100 / peak) for keyword, series in raw.items()},
+            index=pd.DatetimeIndex(self._days, name="date"),
+        )
+
+
+class StandInYouTube:
+    """ตัวแทน client ของ YouTube Data API (ผลจาก ``build``) ที่นับจำนวนคำขอ"""
+
+    def __init__(self, titles: list[str]) -> None:
+        self.titles = titles
+        self.requests = 0
+
+    def _response(self, payload):
+        request = type("Request", (), {})()
+
+        def execute():
+            self.requests += 1
+            return payload
+
+        request.execute = execute
+        return request
+
+    def search(self):
+        resource = type("Search", (), {})()
+        resource.list = lambda **kwargs: self._response(
+            {"items": [{"id": {"videoId": f"v{i}"}} for i in range(len(self.titles))]}
+        )
+        return resource
+
+    def videos(self):
+        resource = type("Videos", (), {})()
+        resource.list = lambda **kwargs: self._response(
+            {
+                "items": [
+                    {
+                        "id": f"v{i}",
+                        "statistics": {"viewCount": str(1000 * (i + 1))},
+                        "snippet": {
+                            "title": title,
+                            "publishedAt": "2024-01-01T00:00:00Z",
+                        },
+                    }
+                    for i, title in enumerate(self.titles)
+                ]
+            }
+        )
+        return resource
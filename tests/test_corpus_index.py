@@ -0,0 +1,245 @@
+"""ทดสอบดัชนีคลังธรรมะ (BM25 + embedding) ของ ResearchRetrieval"""
+
+import json
+
+import numpy as np
+import pytest
+
+from agents.research_retrieval import ResearchRetrievalAgent, ResearchRetrievalInput
+from agents.research_retrieval import corpus_index as corpus_module
+from agents.research_retrieval.corpus_index import CorpusIndex, parse_corpus_file
+from automation_core.embedding_service import HashingEmbedder
+
+
+def _passage(pid, text, tags=(), source_name="ทดสอบ"):
+    return {
+        "id": pid,
+        "source_name": source_name,
+        "original_text": text,
+        "doctrinal_tags": list(tags),
+    }
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    corpus_dir = tmp_path / "corpus"
+    corpus_dir.mkdir()
+    (corpus_dir / "suttas.json").write_text(
+        json.dumps(
+            {
+                "collection": "canon",
+                "passages": [
+                    _passage("breath", "มีสติรู้ลมหายใจเข้าออก", ["อานาปานสติ"]),
+                    _passage("anicca", "สิ่งทั้งปวงไม่เที่ยง", ["อนิจจัง"]),
+                ],
+            },
+            ensure_ascii=False,
+        ),
+        encoding="utf-8",
+    )
+    return corpus_dir
+
+
+def test_parse_markdown_front_matter_and_paragraphs(tmp_path):
+    path = tmp_path / "article.md"
+    path.write_text(
+        "---\nid: art\nsource_name: บทความ\ntags: สติ, ปล่อยวาง\n---\n"
+        "# หัวข้อ\n\nย่อหน้าแรก\nต่อบรรทัด\n\nย่อหน้าสอง\n",
+        encoding="utf-8",
+    )
+
+    passages = parse_corpus_file(path)
+
+    assert [p["id"] for p in passages] == ["art_001", "art_002"]
+    assert passages[0]["original_text"] == "ย่อหน้าแรก ต่อบรรทัด"
+    assert passages[0]["doctrinal_tags"] == ["สติ", "ปล่อยวาง"]
+    assert passages[0]["position_score"] > passages[1]["position_score"]
+
+
+def test_sync_only_reads_changed_files(corpus, tmp_path):
+    index = CorpusIndex(tmp_path / "index")
+
+    assert index.sync(corpus) == 2
+    version = index.version
+    assert index.sync(corpus) == 0
+    assert index.version == version
+
+    (corpus / "extra.md").write_text("การปล่อยวางความกังวล", encoding="utf-8")
+    assert index.sync(corpus) == 1
+    assert len(index) == 3
+
+    (corpus / "suttas.json").write_text(
+        json.dumps([_passage("anicca", "ทุกสิ่งเปลี่ยนแปลงไม่เที่ยง")]),
+        encoding="utf-8",
+    )
+    (corpus / "extra.md").unlink()
+    index.sync(corpus)
+
+    assert len(index) == 1
+    (hit,) = index.search(["ไม่เที่ยง"], 5)
+    assert hit.passage["original_text"] == "ทุกสิ่งเปลี่ยนแปลงไม่เที่ยง"
+    assert index.search(["ลมหายใจ"], 5) == []
+
+
+def test_required_tags_prefilter(corpus, tmp_path):
+    index = CorpusIndex(tmp_path / "index")
+    index.sync(corpus)
+
+    hits = index.search(["มีสติรู้ลมหายใจ ไม่เที่ยง"], 5, required_tags=["อนิจจัง"])
+    assert [h.passage["id"] for h in hits] == ["anicca"]
+    # ไม่มีเอกสารใดมีแท็กนี้: ค้นทั้งคลังแทน
+    hits = index.search(["ลมหายใจ"], 5, required_tags=["ไม่มีแท็กนี้"])
+    assert [h.passage["id"] for h in hits] == ["breath"]
+
+
+def test_merged_segments_score_like_single_build(tmp_path, monkeypatch):
+    monkeypatch.setattr(corpus_module, "MAX_SEGMENTS", 2)
+    passages = [
+        _passage(f"p{i}", text, [f"t{i % 2}"])
+        for i, text in enumerate(
+            ["มีสติรู้ลมหายใจ", "ใจสงบเมื่อมีสติ", "ปล่อยวางความคิด", "ลมหายใจยาว"]
+        )
+    ]
+    incremental = CorpusIndex(tmp_path / "incremental")
+    for passage in passages:
+        incremental.add([passage])
+    single = CorpusIndex(tmp_path / "single")
+    single.add(passages)
+
+    assert len(list((tmp_path / "incremental").glob("seg-*.npz"))) <= 2
+    np.testing.assert_allclose(
+        incremental.bm25("มีสติกับลมหายใจ"), single.bm25("มีสติกับลมหายใจ"), rtol=1e-6
+    )
+    assert incremental.tag_mask(["t1"]).tolist() == [False, True, False, True]
+
+
+def _write_json(path, passages):
+    path.write_text(json.dumps(passages, ensure_ascii=False), encoding="utf-8")
+
+
+def test_edited_index_scores_like_a_rebuilt_one(tmp_path, monkeypatch):
+    monkeypatch.setattr(corpus_module, "MAX_SEGMENTS", 3)
+    corpus_dir = tmp_path / "corpus"
+    corpus_dir.mkdir()
+    _write_json(
+        corpus_dir / "pair.json",
+        [_passage("b1", "calm mind"), _passage("b2", "kindness mind")],
+    )
+    _write_json(
+        corpus_dir / "bulk.json",
+        [_passage(f"n{i}", "calm day", ["bulk"]) for i in range(50)],
+    )
+    edited = CorpusIndex(tmp_path / "edited", encoder=HashingEmbedder())
+    edited.sync(corpus_dir)
+    # แก้ไฟล์เดิมจน "calm" เหลือแค่ b1: passage เก่า 50 ตัวเป็นเอกสารที่ถูกลบ
+    _write_json(
+        corpus_dir / "bulk.json",
+        [_passage(f"n{i}", "quiet day", ["bulk"]) for i in range(50)],
+    )
+    edited.sync(corpus_dir)
+    rebuilt = CorpusIndex(tmp_path / "rebuilt", encoder=HashingEmbedder())
+    rebuilt.sync(corpus_dir)
+
+    def _lexical(index):
+        return {
+            hit.passage["id"]: hit.lexical for hit in index.search(["calm kindness"], 2)
+        }
+
+    assert _lexical(edited) == pytest.approx({"b1": 0.5, "b2": 0.5}, abs=1e-6)
+    assert _lexical(edited) == pytest.approx(_lexical(rebuilt), abs=1e-6)
+
+    # รวม segment แล้ว: เอกสารที่ลบหายจาก segment, ตาราง documents และเมทริกซ์
+    for round_ in range(2):
+        _write_json(
+            corpus_dir / "bulk.json",
+            [_passage(f"n{i}", f"quiet day {round_}", ["bulk"]) for i in range(50)],
+        )
+        edited.sync(corpus_dir)
+    index_dir = tmp_path / "edited"
+    assert len(list(index_dir.glob("seg-*.npz"))) == 1
+    (matrix,) = index_dir.glob("embeddings*.f32")
+    assert matrix.stat().st_size == 52 * 384 * 4
+    assert len(edited) == 52
+    assert int(edited.tag_mask(["bulk"]).sum()) == 50
+    rebuilt = CorpusIndex(tmp_path / "rebuilt_again", encoder=HashingEmbedder())
+    rebuilt.sync(corpus_dir)
+    for query in ["calm kindness", "quiet day 1"]:
+        got = [(h.passage["id"], h.score) for h in edited.search([query], 5)]
+        want = [(h.passage["id"], h.score) for h in rebuilt.search([query], 5)]
+        assert [pid for pid, _ in got] == [pid for pid, _ in want]
+        np.testing.assert_allclose(
+            [score for _, score in got], [score for _, score in want], rtol=1e-5
+        )
+
+
+def test_embeddings_are_memory_mapped_and_combined(corpus, tmp_path):
+    index = CorpusIndex(tmp_path / "index", encoder=HashingEmbedder())
+    index.sync(corpus)
+
+    assert (tmp_path / "index" / "embeddings.f32").stat().st_size == 2 * 384 * 4
+    (hit, *_) = index.search(["รู้ลมหายใจ"], 2)
+    assert hit.passage["id"] == "breath"
+    assert 0 < hit.semantic <= 1
+
+    # encoder ไม่ตรงกับ model ของดัชนี: ใช้ BM25 อย่างเดียว
+    (hit,) = CorpusIndex(tmp_path / "index").search(["รู้ลมหายใจ"], 2)
+    assert hit.semantic is None
+
+
+def test_index_built_offline_is_backfilled_when_an_encoder_appears(
+    corpus, tmp_path, caplog
+):
+    CorpusIndex(tmp_path / "index").sync(corpus)
+    assert not (tmp_path / "index" / "embeddings.f32").exists()
+
+    index = CorpusIndex(tmp_path / "index", encoder=HashingEmbedder())
+    # คลังไม่เปลี่ยน แต่ยังต้องเข้ารหัส passage เดิม
+    assert index.sync(corpus) == 0
+    assert "เข้ารหัส 2 passage เดิม" in caplog.text
+    assert (tmp_path / "index" / "embeddings.f32").stat().st_size == 2 * 384 * 4
+    (hit, *_) = index.search(["รู้ลมหายใจ"], 2)
+    assert 0 < hit.semantic <= 1
+
+    # passage ใหม่ต่อท้ายเมทริกซ์ที่เติมแล้ว
+    (corpus / "extra.md").write_text("การปล่อยวางความกังวล", encoding="utf-8")
+    assert index.sync(corpus) == 1
+    assert (tmp_path / "index" / "embeddings.f32").stat().st_size == 3 * 384 * 4
+    (hit, *_) = index.search(["ปล่อยวาง"], 1)
+    assert hit.passage["id"] == "extra_001"
+
+
+def test_lexical_score_is_not_relative_to_the_best_hit(corpus, tmp_path):
+    index = CorpusIndex(tmp_path / "index")
+    index.sync(corpus)
+
+    (full,) = index.search(["ไม่เที่ยง"], 1)
+    # คำค้นครึ่งหนึ่งไม่มีในคลัง: อันดับหนึ่งต้องไม่ได้คะแนนเต็ม
+    (partial,) = index.search(["ไม่เที่ยง ปล่อยวาง"], 1)
+
+    assert full.passage["id"] == partial.passage["id"] == "anicca"
+    assert full.lexical == pytest.approx(1.0, abs=0.05)
+    assert 0 < partial.score < 0.75
+
+
+def test_agent_retrieves_from_corpus_and_skips_forbidden_sources(corpus, tmp_path):
+    agent = ResearchRetrievalAgent(
+        index=CorpusIndex(tmp_path / "index"), corpus_dir=corpus
+    )
+
+    result = agent.run(
+        ResearchRetrievalInput(
+            topic_title="ลมหายใจ",
+            raw_query="มีสติรู้ลมหายใจ",
+            forbidden_sources=["อื่น"],
+        )
+    )
+    assert [p.id for p in result.primary + result.supportive] == ["breath"]
+
+    result = agent.run(
+        ResearchRetrievalInput(
+            topic_title="ลมหายใจ",
+            raw_query="มีสติรู้ลมหายใจ",
+            forbidden_sources=["ทดสอบ"],
+        )
+    )
+    assert result.primary + result.supportive == []
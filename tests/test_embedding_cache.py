@@ -0,0 +1,130 @@
+"""ทดสอบ embedding cache บนดิสก์ และการ encode แบบ batch ของ DoctrineValidator"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from agents.doctrine_validator import agent as agent_module
+from agents.doctrine_validator.agent import DoctrineValidatorAgent
+from agents.doctrine_validator.model import (
+    DoctrineValidatorInput,
+    DoctrineValidatorOutput,
+    Passage,
+    Passages,
+    ScriptSegment,
+)
+from automation_core.embedding_cache import EmbeddingCache
+from automation_core.embedding_service import HashingEmbedder
+
+
+class _RecordingEmbedder(HashingEmbedder):
+    """HashingEmbedder ที่เก็บรายการข้อความของ encode แต่ละครั้งไว้ใน ``calls``"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: list[list[str]] = []
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        return super().encode(texts)
+
+
+def test_cache_round_trip_across_instances(tmp_path: Path):
+    vectors = np.arange(12, dtype=np.float32).reshape(3, 4)
+    EmbeddingCache(tmp_path, "model/a").put_many(["ก", "ข", "ค"], vectors)
+
+    reader = EmbeddingCache(tmp_path, "model/a")
+    found = reader.get_many(["ข", "ไม่มี", "ค"])
+
+    assert set(found) == {"ข", "ค"}
+    np.testing.assert_array_equal(found["ค"], vectors[2])
+    # model อื่นไม่เห็น cache ของกันและกัน
+    assert EmbeddingCache(tmp_path, "model/b").get_many(["ข"]) == {}
+
+    # ข้อความเดิมไม่ต่อท้ายซ้ำ และ reader ที่ map ไว้แล้วยังเห็นแถวใหม่
+    EmbeddingCache(tmp_path, "model/a").put_many(
+        ["ข", "ง"], np.ones((2, 4), dtype=np.float32)
+    )
+    assert reader.matrix_path.stat().st_size == 4 * 4 * 4
+    np.testing.assert_array_equal(reader.get_many(["ง"])["ง"], np.ones(4))
+    np.testing.assert_array_equal(reader.get_many(["ข"])["ข"], vectors[1])
+
+
+def test_cache_rejects_dim_change_and_drops_partial_rows(tmp_path: Path):
+    cache = EmbeddingCache(tmp_path, "m")
+    cache.put_many(["a"], np.ones((1, 4), dtype=np.float32))
+    with pytest.raises(ValueError):
+        cache.put_many(["b"], np.ones((1, 3), dtype=np.float32))
+
+    # จำลอง process ที่ล้มระหว่างเขียนแถว
+    with open(cache.matrix_path, "ab") as handle:
+        handle.write(b"\x00" * 6)
+    cache.put_many(["c"], np.full((1, 4), 2.0, dtype=np.float32))
+
+    assert cache.matrix_path.stat().st_size == 2 * 4 * 4
+    np.testing.assert_array_equal(cache.get_many(["c"])["c"], np.full(4, 2.0))
+
+
+@pytest.fixture()
+def embedder(tmp_path: Path, monkeypatch):
+    model = _RecordingEmbedder()
+    monkeypatch.setenv("EMBEDDING_CACHE_DIR", str(tmp_path / "cache"))
+    # ไม่ได้ติดตั้ง sentence_transformers ก็ยังทดสอบเส้นทาง embedding ได้
+    monkeypatch.setattr(agent_module, "SentenceTransformer", object)
+    monkeypatch.setattr(DoctrineValidatorAgent, "_embedding_model_failed", False)
+    monkeypatch.setattr(DoctrineValidatorAgent, "_embedding_model", model)
+    monkeypatch.setattr(DoctrineValidatorAgent, "_embedding_cache", None)
+    return model
+
+
+def _request(segment_count: int) -> DoctrineValidatorInput:
+    passages = [
+        Passage(
+            id=f"p{i}",
+            original_text=f"ข้อความต้นฉบับเรื่องสติ {i}",
+            thai_modernized=f"ภาษาปัจจุบันเรื่องสติ {i}",
+            license="public_domain",
+        )
+        for i in range(10)
+    ]
+    segments = [
+        ScriptSegment(
+            segment_type="teaching",
+            text=f"ประโยคที่ {i} อ้างอิงคำสอน [CIT:p{i % 10}]",
+            est_seconds=10,
+        )
+        for i in range(segment_count)
+    ]
+    return DoctrineValidatorInput(
+        script_segments=segments, passages=Passages(primary=passages)
+    )
+
+
+def test_validation_encodes_once_and_reuses_passage_cache(embedder):
+    result = DoctrineValidatorAgent().run(_request(40))
+
+    assert isinstance(result, DoctrineValidatorOutput)
+    assert len(embedder.calls) == 1
+    assert len(embedder.calls[0]) == 40 + 20
+
+    # รอบที่สอง passage มาจาก cache เหลือ encode เฉพาะประโยค
+    DoctrineValidatorAgent._embedding_cache = None
+    DoctrineValidatorAgent().run(_request(40))
+    assert len(embedder.calls) == 2
+    assert len(embedder.calls[1]) == 40
+
+
+def test_batched_scores_match_pairwise_similarity(embedder):
+    agent = DoctrineValidatorAgent()
+    request = _request(12)
+    passage_map = agent._build_passage_map(request.passages)
+    table = agent._build_similarity_table(request.script_segments, passage_map)
+    assert table is not None
+
+    for segment in request.script_segments:
+        for cit in agent._extract_citations(segment.text):
+            sentence = agent._extract_sentence_with_citation(segment.text, cit)
+            batched = agent._compute_similarity(sentence, passage_map[cit], table)
+            pairwise = agent._compute_similarity(sentence, passage_map[cit])
+            assert batched == pytest.approx(pairwise, abs=1e-5)
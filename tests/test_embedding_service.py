@@ -0,0 +1,156 @@
+"""ทดสอบบริการ embedding ที่ใช้ร่วมกันหลาย worker ผ่าน Unix socket"""
+
+import asyncio
+import os
+import signal
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from agents.doctrine_validator import agent as agent_module
+from agents.doctrine_validator.agent import DoctrineValidatorAgent
+from automation_core.embedding_service import (
+    EmbeddingClient,
+    EmbeddingService,
+    EmbeddingServiceError,
+    HashingEmbedder,
+)
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self) -> None:
+        super().__init__(dim=32)
+        self.batch_sizes: list[int] = []
+
+    def encode(self, texts):
+        self.batch_sizes.append(len(texts))
+        time.sleep(0.02)
+        return super().encode(texts)
+
+
+@pytest.fixture
+def socket_path():
+    # path ของ Unix socket ยาวได้ไม่เกิน ~100 ไบต์ จึงไม่ใช้ tmp_path
+    with tempfile.TemporaryDirectory(prefix="emb") as directory:
+        yield Path(directory) / "embed.sock"
+
+
+@pytest.fixture
+def running_service(socket_path):
+    service = EmbeddingService(
+        CountingEmbedder(), model_name="counting", max_batch=64, max_wait=0.05
+    )
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    stop = asyncio.Event()
+    thread = threading.Thread(
+        target=loop.run_until_complete,
+        args=(service.serve(socket_path, idle_timeout=0, ready=ready, stop=stop),),
+    )
+    thread.start()
+    assert ready.wait(5)
+    yield service
+    loop.call_soon_threadsafe(stop.set)
+    thread.join(5)
+    loop.close()
+
+
+def test_hashing_embedder_is_deterministic_and_lexical():
+    embedder = HashingEmbedder()
+    vectors = embedder.encode(["การมีสติรู้ลมหายใจ", "มีสติกับลมหายใจ", "ให้ทาน"])
+
+    np.testing.assert_array_equal(
+        vectors, embedder.encode(["การมีสติรู้ลมหายใจ", "มีสติกับลมหายใจ", "ให้ทาน"])
+    )
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-6)
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+
+
+def test_concurrent_clients_are_micro_batched(socket_path, running_service):
+    texts = [f"ข้อความที่ {i} เรื่องสติ" for i in range(8)]
+
+    def encode(text):
+        client = EmbeddingClient(socket_path, "counting", autostart=False)
+        try:
+            return client.encode([text])
+        finally:
+            client.close()
+
+    with ThreadPoolExecutor(max_workers=len(texts)) as pool:
+        results = list(pool.map(encode, texts))
+
+    expected = HashingEmbedder(dim=32).encode(texts)
+    np.testing.assert_allclose(np.vstack(results), expected, rtol=1e-6)
+    assert sum(running_service.encoder.batch_sizes) == len(texts)
+    assert len(running_service.encoder.batch_sizes) < len(texts)
+
+
+def test_client_reports_missing_service_without_autostart(socket_path):
+    client = EmbeddingClient(socket_path, "hashing", autostart=False)
+
+    with pytest.raises(EmbeddingServiceError):
+        client.encode(["สติ"])
+
+
+def test_agent_uses_autostarted_service(socket_path, monkeypatch, tmp_path):
+    monkeypatch.setenv("EMBEDDING_SERVICE_SOCKET", str(socket_path))
+    monkeypatch.setenv("EMBEDDING_SERVICE_MODEL", "hashing")
+    monkeypatch.setenv("EMBEDDING_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(DoctrineValidatorAgent, "_embedding_model", None)
+    monkeypatch.setattr(DoctrineValidatorAgent, "_embedding_model_failed", False)
+    monkeypatch.setattr(DoctrineValidatorAgent, "_embedding_cache", None)
+    monkeypatch.setattr(agent_module, "SentenceTransformer", None)
+
+    model = DoctrineValidatorAgent._get_embedding_model()
+    try:
+        assert isinstance(model, EmbeddingClient)
+        assert DoctrineValidatorAgent.embedding_model_name() == "hashing"
+        # worker ที่สองต่อบริการเดิม ไม่เริ่ม process ใหม่
+        other = EmbeddingClient(socket_path, "hashing", autostart=False)
+        assert other.ping()["pid"] == model.ping()["pid"]
+        other.close()
+        np.testing.assert_allclose(
+            model.encode(["ลมหายใจ"]), HashingEmbedder().encode(["ลมหายใจ"]), rtol=1e-6
+        )
+    finally:
+        pid = model.ping()["pid"]
+        model.close()
+        os.kill(pid, signal.SIGTERM)
+
+
+def test_failed_service_start_is_reported_once(socket_path, monkeypatch):
+    # model ที่โหลดไม่ได้: บริการออกทันที client ต้องไม่รอจนครบ connect_timeout
+    monkeypatch.setenv("HF_HUB_OFFLINE", "1")
+    monkeypatch.setenv("EMBEDDING_SERVICE_SOCKET", str(socket_path))
+    monkeypatch.setenv("EMBEDDING_SERVICE_MODEL", "missing-test-model")
+    monkeypatch.setattr(DoctrineValidatorAgent, "_embedding_model", None)
+    monkeypatch.setattr(DoctrineValidatorAgent, "_embedding_model_failed", False)
+    monkeypatch.setattr(DoctrineValidatorAgent, "_embedding_service_failed", False)
+    monkeypatch.setattr(agent_module, "SentenceTransformer", None)
+    spawned = []
+    spawn = EmbeddingClient._spawn
+
+    def counting_spawn(self):
+        spawned.append(self.socket_path)
+        return spawn(self)
+
+    monkeypatch.setattr(EmbeddingClient, "_spawn", counting_spawn)
+
+    started = time.monotonic()
+    assert DoctrineValidatorAgent._get_embedding_model() is None
+    assert DoctrineValidatorAgent._get_embedding_model() is None
+    assert time.monotonic() - started < 60
+    assert len(spawned) == 1
+    assert socket_path.with_name("embed.sock.log").read_text().strip()
+
+    client = EmbeddingClient(socket_path, "missing-test-model", connect_timeout=60)
+    with pytest.raises(EmbeddingServiceError, match="exited with code"):
+        client.ping()
+    with pytest.raises(EmbeddingServiceError, match="exited with code"):
+        client.ping()
+    assert len(spawned) == 2
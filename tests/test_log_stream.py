@@ -0,0 +1,210 @@
+"""ทดสอบ ring buffer ของ log และ SSE stream ที่ resume ด้วย Last-Event-ID"""
+
+import asyncio
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import config
+from app.core.log_buffer import LogBuffer
+from app.core.log_sink import AsyncLogSink, prune_run_logs
+from app.core.runner import RUNNER, ProcessJob
+from automation_core.progress import (
+    PROGRESS_FD_ENV,
+    ProgressReporter,
+    parse_progress_line,
+)
+
+
+def test_buffer_is_bounded_and_reports_skipped_lines():
+    buffer = LogBuffer(max_lines=3)
+    for index in range(5):
+        buffer.append(f"line {index}")
+
+    assert list(buffer) == ["line 2", "line 3", "line 4"]
+    assert buffer.last_seq == 5
+    assert buffer.since(3) == ([(4, "line 3"), (5, "line 4")], 0)
+    # ผู้อ่านที่เห็นถึง seq 1 พลาด seq 2 ไปแล้ว
+    assert buffer.since(1) == ([(3, "line 2"), (4, "line 3"), (5, "line 4")], 1)
+    assert buffer.since(5) == ([], 0)
+
+
+def test_append_wakes_every_waiter():
+    async def scenario() -> list[int]:
+        buffer = LogBuffer()
+        changed = buffer.changed()
+        waiters = [asyncio.create_task(changed.wait()) for _ in range(3)]
+        await asyncio.sleep(0)
+        buffer.append("hello")
+        await asyncio.wait_for(asyncio.gather(*waiters), timeout=1.0)
+        return [seq for seq, _ in buffer.since(0)[0]]
+
+    assert asyncio.run(scenario()) == [1]
+
+
+def test_sink_batches_off_the_loop_and_rotates(tmp_path: Path):
+    path = tmp_path / "run.log"
+
+    async def scenario() -> bool:
+        sink = AsyncLogSink(path, max_bytes=64, backups=2, flush_interval=60)
+        for index in range(10):
+            sink.write(f"line {index:02d}")
+        # ยังไม่ถึงขนาดหรือเวลา flush จึงยังไม่แตะดิสก์
+        touched = path.exists()
+        await sink.flush()
+        for index in range(10, 20):
+            sink.write(f"line {index:02d}")
+        await sink.flush()
+        return touched
+
+    assert asyncio.run(scenario()) is False
+    assert path.read_text(encoding="utf-8") == "".join(
+        f"line {index:02d}\n" for index in range(10, 20)
+    )
+    assert (
+        (path.parent / "run.log.1").read_text(encoding="utf-8").startswith("line 00\n")
+    )
+    assert not (path.parent / "run.log.3").exists()
+
+
+def test_old_run_logs_are_pruned_by_count_and_age(tmp_path: Path):
+    now = 1_800_000_000.0
+    for age_days, name in [(0, "r4"), (1, "r3"), (2, "r2"), (40, "r1")]:
+        for suffix in (".log", ".log.1"):
+            path = tmp_path / f"{name}{suffix}"
+            path.write_text("x", encoding="utf-8")
+            os.utime(path, (now - age_days * 86400, now - age_days * 86400))
+    (tmp_path / "notes.txt").write_text("keep", encoding="utf-8")
+
+    # r1 เก่าเกิน 30 วัน, r2 เกินจำนวนรอบที่เก็บ ส่วนรอบปัจจุบัน (r4) ไม่นับรวม
+    removed = prune_run_logs(
+        tmp_path, keep_files=1, keep_days=30, exclude="r4.log", now=now
+    )
+
+    assert removed == 4
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "notes.txt",
+        "r3.log",
+        "r3.log.1",
+        "r4.log",
+        "r4.log.1",
+    ]
+
+
+def test_sink_prunes_sibling_run_logs_on_first_write(tmp_path: Path):
+    for index in range(5):
+        (tmp_path / f"old{index}.log").write_text("x", encoding="utf-8")
+
+    sink = AsyncLogSink(tmp_path / "new.log", keep_files=2)
+    sink.write("first")
+    (tmp_path / "late.log").write_text("x", encoding="utf-8")
+    sink.write("second")
+
+    names = {p.name for p in tmp_path.iterdir()}
+    assert "new.log" in names
+    # ลบครั้งเดียวตอนเขียนครั้งแรก: เหลือรอบเก่า 2 รอบ + ไฟล์ที่เกิดทีหลัง
+    assert len(names - {"new.log", "late.log"}) == 2
+    assert "late.log" in names
+
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+
+
+def test_progress_events_update_job_without_embedding_results(tmp_path: Path):
+    result = tmp_path / "result.json"
+    result.write_text('{"secret_payload": 1}', encoding="utf-8")
+    child = (
+        f"import sys; sys.path.insert(0, {str(SRC_DIR)!r})\n"
+        "from automation_core.progress import ProgressReporter\n"
+        "reporter = ProgressReporter.from_env()\n"
+        "reporter.step_started(1, 2, 'trend_scout')\n"
+        "print('progress=99 analyzing')\n"
+        f"reporter.step_finished(1, 2, 'trend_scout', 'success', 0.5, [{str(result)!r}])\n"
+    )
+    job = ProcessJob("log_stream_test", [sys.executable, "-c", child])
+    job.log_dir = tmp_path / "logs"
+
+    asyncio.run(job.start())
+
+    lines = list(job.log)
+    assert job.status == "completed"
+    assert job.steps["trend_scout"]["status"] == "success"
+    assert job.artifacts == [str(result)]
+    assert job.stage == "1/2 trend_scout"
+    assert f"ARTIFACT: {result}" in lines
+    assert not any("secret_payload" in line for line in lines)
+    # ข้อความใน stdout เป็นแค่ log ไม่ถูกตีความเป็นความคืบหน้าอีก
+    assert "STDOUT: progress=99 analyzing" in lines
+    # log ของรอบนี้อยู่ในไฟล์ของ run_id และถูก flush ครบตอนจบงาน
+    assert job.log_file_path == tmp_path / "logs" / f"{job.run_id}.log"
+    on_disk = job.log_file_path.read_text(encoding="utf-8").splitlines()
+    assert on_disk[-1] == "งานเสร็จสมบูรณ์"
+
+
+def test_progress_reporter_is_noop_without_fd(monkeypatch):
+    monkeypatch.delenv(PROGRESS_FD_ENV, raising=False)
+    reporter = ProgressReporter.from_env()
+    reporter.step_started(1, 3, "a")
+
+    assert reporter.enabled is False
+    assert parse_progress_line(b"saved result: x") is None
+    assert parse_progress_line('{"event": "unknown"}') is None
+    assert parse_progress_line('{"event": "artifact", "path": "a"}\n') == {
+        "event": "artifact",
+        "path": "a",
+    }
+
+
+def test_pipeline_steps_do_not_inherit_progress_fd(monkeypatch):
+    path = Path(__file__).parent.parent / "scripts" / "run_pipeline.py"
+    spec = importlib.util.spec_from_file_location("run_pipeline", path)
+    run_pipeline = importlib.util.module_from_spec(spec)
+    assert spec.loader is not None
+    spec.loader.exec_module(run_pipeline)
+    monkeypatch.setenv(PROGRESS_FD_ENV, "99")
+
+    # fd ไม่ถูกส่งต่อให้ step ลูก จึงต้องไม่ส่งเลข fd ต่อด้วย
+    cmd = [sys.executable, "-c", "import os; print(os.environ.get('PROGRESS_FD'))"]
+    env = run_pipeline.step_env({"STEP_FLAG": "1"})
+    assert PROGRESS_FD_ENV not in env
+    assert env["STEP_FLAG"] == "1"
+    assert run_pipeline.run_cmd(cmd)[2] == ["None"]
+    assert run_pipeline.run_cmd(cmd, env={"PROGRESS_FD": "99", **env})[2] == ["None"]
+
+
+@pytest.fixture
+def logged_in_client():
+    from app.main import app
+
+    client = TestClient(app)
+    client.post(
+        "/login",
+        data={"username": config.ADMIN_USERNAME, "password": config.ADMIN_PASSWORD},
+    )
+    return client
+
+
+def test_stream_resumes_from_last_event_id(logged_in_client: TestClient):
+    job = RUNNER.get("log_stream_resume")
+    try:
+        for index in range(4):
+            job.log.append(f"line {index}")
+        job.status = "completed"
+
+        response = logged_in_client.get(
+            "/agents/log_stream_resume/logs/stream",
+            headers={"Last-Event-ID": "2"},
+        )
+    finally:
+        RUNNER.jobs.pop("log_stream_resume", None)
+
+    assert response.status_code == 200
+    body = response.text
+    assert "line 1" not in body
+    assert 'id: 3\nevent: log\ndata: "line 2"' in body
+    assert 'id: 4\nevent: log\ndata: "line 3"' in body
+    assert body.count("event: status") == 1
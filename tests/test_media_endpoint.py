@@ -0,0 +1,83 @@
+"""ทดสอบ endpoint ดูตัวอย่างไฟล์สื่อ (Range, ETag, allowlist)"""
+
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import config
+from app.core.media import MediaPathError, resolve_media_path
+
+VIDEO_REL = "output/run_media/artifacts/clip.mp4"
+
+
+@pytest.fixture
+def media_root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    video = tmp_path / VIDEO_REL
+    video.parent.mkdir(parents=True)
+    video.write_bytes(bytes(range(256)) * 4096)
+    (tmp_path / "secrets.mp4").write_bytes(b"not allowed")
+    monkeypatch.setattr(config, "MEDIA_ROOT", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def client() -> TestClient:
+    from app.main import app
+
+    client = TestClient(app)
+    client.post(
+        "/login",
+        data={"username": config.ADMIN_USERNAME, "password": config.ADMIN_PASSWORD},
+    )
+    return client
+
+
+def test_range_request_returns_partial_content(media_root: Path, client: TestClient):
+    response = client.get(f"/media/{VIDEO_REL}", headers={"Range": "bytes=256-511"})
+
+    assert response.status_code == 206
+    assert response.headers["content-type"] == "video/mp4"
+    assert response.headers["content-range"] == f"bytes 256-511/{256 * 4096}"
+    assert response.content == bytes(range(256))
+
+
+def test_etag_revalidation_returns_not_modified(media_root: Path, client: TestClient):
+    first = client.head(f"/media/{VIDEO_REL}")
+    assert first.status_code == 200
+    assert first.headers["accept-ranges"] == "bytes"
+
+    again = client.get(
+        f"/media/{VIDEO_REL}", headers={"If-None-Match": first.headers["etag"]}
+    )
+    assert again.status_code == 304
+    assert again.content == b""
+    since = client.get(
+        f"/media/{VIDEO_REL}",
+        headers={"If-Modified-Since": first.headers["last-modified"]},
+    )
+    assert since.status_code == 304
+
+
+def test_media_requires_login_and_allowlisted_path(
+    media_root: Path, client: TestClient
+):
+    from app.main import app
+
+    assert TestClient(app).get(f"/media/{VIDEO_REL}").status_code == 401
+    assert client.get("/media/secrets.mp4").status_code == 403
+    assert client.get("/media/output/run_media/artifacts/x.mp4").status_code == 404
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "/etc/passwd",
+        "output/run_media/artifacts/../../../secrets.mp4",
+        "output/run_media/summary.json",
+        "output/run_media/artifacts/run.log",
+    ],
+)
+def test_resolve_media_path_rejects_outside_allowlist(media_root: Path, value: str):
+    with pytest.raises(MediaPathError):
+        resolve_media_path(value, media_root)
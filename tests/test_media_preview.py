@@ -0,0 +1,169 @@
+"""ทดสอบ waveform peaks, sprite ภาพย่อ และ cache ตาม hash ของไฟล์"""
+
+import json
+import subprocess
+import wave
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import config
+from automation_core import media_preview
+from automation_core.media_preview import MediaPreviewCache, compute_wav_peaks
+
+
+def _write_wav(path: Path, samples: np.ndarray, width: int = 2, rate: int = 8000):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if width == 3:
+        ints = np.asarray(samples, dtype=np.int32).reshape(-1)
+        raw = np.stack([ints & 0xFF, (ints >> 8) & 0xFF, (ints >> 16) & 0xFF], 1)
+        data = raw.astype(np.uint8).tobytes()
+    else:
+        data = np.asarray(samples, dtype="<i2").tobytes()
+    channels = samples.shape[1] if samples.ndim == 2 else 1
+    with wave.open(str(path), "wb") as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(width)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(data)
+
+
+def test_peaks_are_streamed_per_block_and_multi_resolution(tmp_path: Path):
+    # 1000 เฟรม: ช่วงแรกเงียบ ช่วงหลังดัง ช่องขวาเป็นลบของช่องซ้าย
+    left = np.zeros(1000, dtype=np.int16)
+    left[600:] = 16384
+    wav_path = tmp_path / "voice.wav"
+    _write_wav(wav_path, np.stack([left, -left], axis=1))
+
+    # block เล็กกว่าไฟล์มาก เพื่อให้ผ่านการต่อ carry ข้ามบล็อก
+    peaks = compute_wav_peaks(wav_path, levels=(100, 400), block_frames=130)
+
+    assert peaks["channels"] == 2
+    assert peaks["duration_seconds"] == pytest.approx(1000 / 8000)
+    fine, coarse = peaks["levels"]
+    assert fine["samples_per_peak"] == 100
+    assert fine["data"] == [0, 0] * 6 + [-64, 64] * 4
+    # 1000 / 400 -> 3 ช่วง (ช่วงสุดท้ายไม่เต็ม)
+    assert coarse["data"] == [0, 0, -64, 64, -64, 64]
+
+
+def test_peaks_decode_24_bit_samples(tmp_path: Path):
+    wav_path = tmp_path / "hi_res.wav"
+    _write_wav(wav_path, np.array([-(1 << 23), (1 << 23) - 1, 0, 0]), width=3)
+
+    assert compute_wav_peaks(wav_path, levels=(2,))["levels"][0]["data"] == [
+        -127,
+        127,
+        0,
+        0,
+    ]
+
+
+def _fake_ffmpeg(calls: list[list[str]]):
+    def run(cmd, **kwargs):
+        calls.append(cmd)
+        if cmd[0] == "ffprobe":
+            payload = {
+                "streams": [{"width": 1280, "height": 720}],
+                "format": {"duration": "95.0"},
+            }
+            return subprocess.CompletedProcess(cmd, 0, stdout=json.dumps(payload))
+        Path(cmd[-1]).write_bytes(b"jpeg")
+        return subprocess.CompletedProcess(cmd, 0, stdout="")
+
+    return run
+
+
+def test_sprite_uses_one_ffmpeg_pass_and_cache_reuses_by_hash(tmp_path: Path):
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"fake video")
+    calls: list[list[str]] = []
+    cache = MediaPreviewCache(tmp_path / "cache")
+
+    image_path, meta_path = cache.sprite(video, run=_fake_ffmpeg(calls))
+    again = cache.sprite(video, run=_fake_ffmpeg(calls))
+
+    assert again == (image_path, meta_path)
+    assert [cmd[0] for cmd in calls] == ["ffprobe", "ffmpeg"]
+    assert "fps=1/2,scale=160:90,tile=10x5" in calls[1]
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    assert (meta["count"], meta["rows"], meta["tile_height"]) == (48, 5, 90)
+
+    # เนื้อหาเปลี่ยน hash เปลี่ยน ต้องสร้างใหม่
+    video.write_bytes(b"another render")
+    assert cache.sprite(video, run=_fake_ffmpeg(calls))[0] != image_path
+
+
+def test_peaks_cache_skips_recompute_for_same_content(tmp_path: Path, monkeypatch):
+    wav_path = tmp_path / "voice.wav"
+    _write_wav(wav_path, np.zeros((512, 1), dtype=np.int16))
+    cache = MediaPreviewCache(tmp_path / "cache")
+    first = cache.peaks(wav_path)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("peaks should come from cache")
+
+    monkeypatch.setattr(media_preview, "compute_wav_peaks", fail)
+    copy = tmp_path / "copy.wav"
+    copy.write_bytes(wav_path.read_bytes())
+
+    assert cache.peaks(copy) == first
+
+
+def test_source_is_hashed_only_when_its_stat_changes(tmp_path: Path, monkeypatch):
+    wav_path = tmp_path / "voice.wav"
+    _write_wav(wav_path, np.zeros((512, 1), dtype=np.int16))
+    hashed: list[Path] = []
+    real_sha256 = media_preview.file_sha256
+
+    def counting_sha256(path, *args, **kwargs):
+        hashed.append(path)
+        return real_sha256(path, *args, **kwargs)
+
+    monkeypatch.setattr(media_preview, "file_sha256", counting_sha256)
+    first = MediaPreviewCache(tmp_path / "cache").peaks(wav_path)
+    # cache ใหม่ (เช่นอีก process) ใช้ sha256 ที่บันทึกไว้ตาม stat ของไฟล์
+    assert MediaPreviewCache(tmp_path / "cache").peaks(wav_path) == first
+    assert hashed == [wav_path]
+
+    _write_wav(wav_path, np.full((600, 1), 1000, dtype=np.int16))
+    assert MediaPreviewCache(tmp_path / "cache").peaks(wav_path) != first
+    assert hashed == [wav_path, wav_path]
+
+
+def test_review_page_serves_cached_previews(tmp_path: Path, monkeypatch):
+    from app.main import app
+
+    run_dir = tmp_path / "output" / "run_review" / "artifacts"
+    run_dir.mkdir(parents=True)
+    peaks_rel = "output/media_cache/abc123.peaks.json"
+    (tmp_path / peaks_rel).parent.mkdir(parents=True)
+    (tmp_path / peaks_rel).write_text('{"levels": []}', encoding="utf-8")
+    (run_dir / "review_media_summary.json").write_text(
+        json.dumps(
+            {
+                "run_id": "run_review",
+                "wav_path": "data/voiceovers/run_review/voice.wav",
+                "mp4_path": None,
+                "peaks_path": peaks_rel,
+                "sprite_path": None,
+                "sprite": None,
+            }
+        ),
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(config, "MEDIA_ROOT", str(tmp_path))
+    client = TestClient(app)
+    client.post(
+        "/login",
+        data={"username": config.ADMIN_USERNAME, "password": config.ADMIN_PASSWORD},
+    )
+
+    page = client.get("/review/run_review")
+
+    assert page.status_code == 200
+    assert peaks_rel in page.text
+    assert client.get(f"/media/{peaks_rel}").json() == {"levels": []}
+    assert client.get("/review/missing_run").status_code == 404
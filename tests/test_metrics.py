@@ -0,0 +1,131 @@
+"""ทดสอบเมตริก Prometheus ของคิวและ pipeline"""
+
+import importlib.util
+from datetime import UTC, datetime
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+from fastapi.testclient import TestClient
+
+from automation_core.metrics import MetricsStore, record_observation, render_metrics
+from automation_core.queue import FileQueue, JobSpec
+
+
+def _utc_iso(value: datetime) -> str:
+    return value.astimezone(UTC).isoformat().replace("+00:00", "Z")
+
+
+def _build_job(job_id: str, run_id: str) -> JobSpec:
+    now = datetime.now(UTC)
+    return JobSpec(
+        schema_version="v1",
+        job_id=job_id,
+        created_at=_utc_iso(now),
+        scheduled_for=_utc_iso(now),
+        pipeline_path="pipeline.web.yml",
+        run_id=run_id,
+        params=None,
+        status="pending",
+        attempts=0,
+        last_error=None,
+    )
+
+
+def _load_runner() -> ModuleType:
+    runner_path = Path(__file__).parent.parent / "scripts" / "scheduler_runner.py"
+    spec = importlib.util.spec_from_file_location("scheduler_runner", runner_path)
+    module = importlib.util.module_from_spec(spec)
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(autouse=True)
+def _set_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("METRICS_DIR", raising=False)
+    monkeypatch.delenv("METRICS_ENABLED", raising=False)
+    monkeypatch.setenv("PIPELINE_ENABLED", "true")
+    monkeypatch.setenv("WORKER_ENABLED", "true")
+
+
+def test_histogram_render_is_cumulative(tmp_path: Path):
+    store = MetricsStore(tmp_path / "metrics")
+    for value in (0.5, 3, 3, 7200):
+        store.observe("job_run_seconds", value, {"pipeline": "pipeline.web.yml"})
+
+    text = render_metrics(store, queue_depths={"pending": 2, "running": 1})
+
+    assert "# TYPE dhamma_queue_jobs gauge" in text
+    assert 'dhamma_queue_jobs{state="pending"} 2' in text
+    labels = 'pipeline="pipeline.web.yml"'
+    assert f'dhamma_job_run_seconds_bucket{{{labels},le="1"}} 1' in text
+    assert f'dhamma_job_run_seconds_bucket{{{labels},le="5"}} 3' in text
+    assert f'dhamma_job_run_seconds_bucket{{{labels},le="3600"}} 3' in text
+    assert f'dhamma_job_run_seconds_bucket{{{labels},le="+Inf"}} 4' in text
+    assert f"dhamma_job_run_seconds_sum{{{labels}}} 7206.5" in text
+    assert f"dhamma_job_run_seconds_count{{{labels}}} 4" in text
+    assert "# TYPE dhamma_tts_chars_per_second histogram" in text
+
+
+def test_record_observation_respects_kill_switch(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setenv("METRICS_ENABLED", "false")
+    record_observation(tmp_path, "job_wait_seconds", 1.0)
+    assert not (tmp_path / "output" / "metrics").exists()
+
+    monkeypatch.setenv("METRICS_ENABLED", "true")
+    monkeypatch.setenv("METRICS_DIR", str(tmp_path / "custom"))
+    record_observation(tmp_path, "job_wait_seconds", 1.0)
+    assert (tmp_path / "custom" / "metrics.sqlite3").exists()
+
+
+def test_worker_records_job_metrics_and_exports_textfile(tmp_path: Path):
+    runner = _load_runner()
+    queue = FileQueue(tmp_path / "queue")
+    queue.enqueue(_build_job("job-1", "run_1"))
+
+    runner.run_worker(
+        queue_dir=tmp_path / "queue",
+        dry_run=False,
+        base_dir=tmp_path,
+        pipeline_runner=lambda *_args: None,
+    )
+    runner.run_metrics(
+        queue_dir=tmp_path / "queue",
+        textfile=tmp_path / "textfile" / "dhamma.prom",
+        base_dir=tmp_path,
+    )
+
+    text = (tmp_path / "textfile" / "dhamma.prom").read_text(encoding="utf-8")
+    assert 'dhamma_queue_jobs{state="done"} 1' in text
+    assert 'dhamma_queue_jobs{state="pending"} 0' in text
+    assert (
+        'dhamma_job_run_seconds_count{outcome="done",pipeline="pipeline.web.yml"} 1'
+        in text
+    )
+    assert 'dhamma_job_wait_seconds_count{pipeline="pipeline.web.yml"} 1' in text
+
+
+def test_metrics_endpoint(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    from app import config
+    from app.main import app
+
+    queue = FileQueue(tmp_path / "queue")
+    queue.enqueue(_build_job("job-1", "run_1"))
+    MetricsStore(tmp_path / "metrics").observe(
+        "pipeline_step_seconds", 2.0, {"step": "video.render", "outcome": "success"}
+    )
+    monkeypatch.setattr(config, "QUEUE_DIR", str(tmp_path / "queue"))
+    monkeypatch.setattr(config, "METRICS_DIR", str(tmp_path / "metrics"))
+
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'dhamma_queue_jobs{state="pending"} 1' in response.text
+    assert (
+        'dhamma_pipeline_step_seconds_count{outcome="success",step="video.render"} 1'
+        in response.text
+    )
@@ -0,0 +1,161 @@
+"""ทดสอบการค้นหา passage ที่ใกล้ที่สุดแบบเมทริกซ์ และการเสนอ passage ใน RewriteSuggestion"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from agents.doctrine_validator import agent as agent_module
+from agents.doctrine_validator import passage_search
+from agents.doctrine_validator.agent import DoctrineValidatorAgent
+from agents.doctrine_validator.model import (
+    DoctrineValidatorInput,
+    Passage,
+    Passages,
+    ScriptSegment,
+    SegmentStatus,
+)
+from agents.doctrine_validator.passage_search import PassageIndex, top_k
+from automation_core.embedding_service import HashingEmbedder
+
+
+def test_top_k_orders_each_row_descending():
+    scores = np.array([[0.1, 0.9, 0.5, 0.7], [0.4, 0.3, 0.2, 0.1]], dtype=np.float32)
+
+    indices, values = top_k(scores, 2)
+
+    assert indices.tolist() == [[1, 3], [0, 1]]
+    np.testing.assert_allclose(values, [[0.9, 0.7], [0.4, 0.3]])
+    assert top_k(scores, 10)[0].shape == (2, 4)
+
+
+def test_search_over_large_index_matches_brute_force(monkeypatch):
+    rng = np.random.default_rng(7)
+    passages = 12_000
+    # passage ละสองข้อความ (ต้นฉบับ/ภาษาปัจจุบัน) เรียงสลับกันเพื่อทดสอบการจัดกลุ่ม
+    row_ids = [f"p{i}" for i in range(passages)] * 2
+    vectors = rng.standard_normal((len(row_ids), 64)).astype(np.float32)
+    index = PassageIndex(row_ids, vectors)
+    queries = vectors[[5, passages + 42, 999]] + 0.01
+
+    # บังคับให้คำนวณทีละก้อนเล็ก ผลต้องเท่ากับการคำนวณทั้งหมดในครั้งเดียว
+    monkeypatch.setattr(passage_search, "SCORE_BLOCK_ELEMENTS", len(row_ids) * 2)
+    results = index.search(queries, k=3)
+
+    assert [matches[0].passage_id for matches in results] == ["p5", "p42", "p999"]
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    brute = np.maximum(q @ unit[:passages].T, q @ unit[passages:].T)
+    for row, matches in enumerate(results):
+        expected = np.argsort(-brute[row])[:3]
+        assert [m.passage_id for m in matches] == [f"p{i}" for i in expected]
+        assert matches[0].score == pytest.approx(brute[row, expected[0]], abs=1e-5)
+
+
+def test_index_round_trips_through_npz(tmp_path: Path):
+    index = PassageIndex(
+        ["a", "b", "a"],
+        np.eye(3, dtype=np.float32),
+        model_name="m",
+        canonical_refs={"a": "MN 118"},
+    )
+    path = tmp_path / "canon.npz"
+    index.save(path)
+
+    loaded = PassageIndex.load(path)
+
+    assert loaded.passage_ids == ["a", "b"]
+    assert (loaded.model_name, loaded.canonical_refs) == ("m", {"a": "MN 118"})
+    np.testing.assert_array_equal(loaded.scores(np.eye(3)), index.scores(np.eye(3)))
+
+
+@pytest.fixture()
+def embedder(tmp_path: Path, monkeypatch):
+    model = HashingEmbedder(dim=256)
+    monkeypatch.setenv("EMBEDDING_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(agent_module, "SentenceTransformer", object)
+    monkeypatch.setattr(DoctrineValidatorAgent, "_embedding_model_failed", False)
+    monkeypatch.setattr(DoctrineValidatorAgent, "_embedding_model", model)
+    monkeypatch.setattr(DoctrineValidatorAgent, "_embedding_cache", None)
+    return model
+
+
+# ข้อความของแต่ละ passage ไม่มีคำร่วมกัน (HashingEmbedder ให้ cosine ตามคำที่ใช้ร่วม)
+_TEXTS = [
+    "ศีล",
+    "สมาธิ",
+    "ปัญญา",
+    "ทาน",
+    "เมตตา",
+    "กรุณา",
+    "มุทิตา",
+    "อุเบกขา",
+    "อนิจจัง",
+    "ทุกขัง",
+    "อนัตตา",
+    "ขันติ",
+    "วิริยะ",
+    "สัจจะ",
+    "ปล่อยวาง",
+    "ลมหายใจ",
+    "ความโกรธ",
+    "ความโลภ",
+    "ความหลง",
+    "กตัญญู",
+]
+
+
+def _passages() -> Passages:
+    return Passages(
+        primary=[
+            Passage(id=f"p{i}", original_text=text, canonical_ref=f"SN {i}")
+            for i, text in enumerate(_TEXTS)
+        ]
+    )
+
+
+def test_wrong_and_missing_citations_get_nearest_passages(embedder):
+    segments = [
+        # อ้าง p1 แต่ใจความตรงกับ p7
+        ScriptSegment(segment_type="teaching", text=f"{_TEXTS[7]} [CIT:p1]"),
+        # ไม่มี citation แต่ใจความตรงกับ p3
+        ScriptSegment(segment_type="teaching", text=_TEXTS[3]),
+        # อ้างถูกต้อง ไม่ต้องเสนอ
+        ScriptSegment(segment_type="teaching", text=f"{_TEXTS[5]} [CIT:p5]"),
+    ]
+
+    result = DoctrineValidatorAgent().run(
+        DoctrineValidatorInput(script_segments=segments, passages=_passages())
+    )
+
+    assert [s.status for s in result.segments] == [
+        SegmentStatus.MISMATCH,
+        SegmentStatus.HALLUCINATION,
+        SegmentStatus.OK,
+    ]
+    by_segment = {s.segment_index: s for s in result.rewrite_suggestions}
+    assert set(by_segment) == {0, 1}
+    mismatch = by_segment[0].candidates
+    assert [c.passage_id for c in mismatch] == ["p7"]
+    assert (mismatch[0].canonical_ref, mismatch[0].source) == ("SN 7", "bundle")
+    assert "[CIT:p7]" in by_segment[0].suggestion
+    assert by_segment[1].candidates[0].passage_id == "p3"
+    assert by_segment[1].suggestion.startswith("เพิ่ม citation")
+
+
+def test_canon_index_suggests_passages_outside_bundle(embedder):
+    agent = DoctrineValidatorAgent()
+    agent.canon_index = agent.build_canon_index(
+        [Passage(id="c9", original_text="ความไม่ประมาท", canonical_ref="DN 16")]
+    )
+    segments = [ScriptSegment(segment_type="teaching", text="ความไม่ประมาท")]
+
+    result = agent.run(
+        DoctrineValidatorInput(script_segments=segments, passages=_passages())
+    )
+
+    (suggestion,) = result.rewrite_suggestions
+    (candidate,) = suggestion.candidates
+    assert (candidate.passage_id, candidate.source) == ("c9", "canon")
+    assert candidate.canonical_ref == "DN 16"
+    assert "ดัชนีพระไตรปิฎก" in suggestion.suggestion
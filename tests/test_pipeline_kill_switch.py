@@ -139,6 +139,8 @@ steps:
             "test_enabled",
         ],
     )
+    # รอบที่ล้มเขียน summary/ดัชนีใต้ ROOT จึงชี้ไปที่ tmp_path
+    monkeypatch.setattr("orchestrator.ROOT", tmp_path)
 
     # Set PIPELINE_ENABLED=true (explicitly enabled)
     monkeypatch.setenv("PIPELINE_ENABLED", "true")
@@ -189,6 +191,8 @@ steps:
             "test_default",
         ],
     )
+    # รอบที่ล้มเขียน summary/ดัชนีใต้ ROOT จึงชี้ไปที่ tmp_path
+    monkeypatch.setattr("orchestrator.ROOT", tmp_path)
 
     # Ensure PIPELINE_ENABLED is NOT set (remove if exists)
     monkeypatch.delenv("PIPELINE_ENABLED", raising=False)
@@ -228,7 +232,7 @@ def test_web_runner_parse_pipeline_enabled():
     assert _parse_pipeline_enabled("1") is True
 
 
-def test_web_runner_no_subprocess_spawn_when_disabled(monkeypatch):
+def test_web_runner_no_subprocess_spawn_when_disabled(monkeypatch, tmp_path):
     """
     CRITICAL: When PIPELINE_ENABLED=false, ProcessJob.start() should
     NOT call asyncio.create_subprocess_exec()
@@ -240,8 +244,10 @@ def test_web_runner_no_subprocess_spawn_when_disabled(monkeypatch):
     from unittest.mock import AsyncMock, patch
 
     sys.path.insert(0, str(Path(__file__).parent.parent))
+    from app.core import runner
     from app.core.runner import ProcessJob
 
+    monkeypatch.setattr(runner, "LOG_DIR", tmp_path / "logs")
     monkeypatch.setenv("PIPELINE_ENABLED", "false")
 
     job = ProcessJob("test_agent", ["python", "-c", "print('test')"])
@@ -276,7 +282,7 @@ def test_web_runner_no_subprocess_spawn_when_disabled(monkeypatch):
         assert job.progress == 100
 
 
-def test_web_runner_subprocess_spawn_when_enabled(monkeypatch):
+def test_web_runner_subprocess_spawn_when_enabled(monkeypatch, tmp_path):
     """
     CONTROL: When PIPELINE_ENABLED=true (or not set), ProcessJob.start()
     SHOULD call asyncio.create_subprocess_exec() to spawn subprocess
@@ -287,8 +293,11 @@ def test_web_runner_subprocess_spawn_when_enabled(monkeypatch):
     from unittest.mock import AsyncMock, patch
 
     sys.path.insert(0, str(Path(__file__).parent.parent))
+    from app.core import runner
     from app.core.runner import ProcessJob
 
+    # log ของรอบนี้ต้องไม่ตกค้างใน output/logs ของ repo
+    monkeypatch.setattr(runner, "LOG_DIR", tmp_path / "logs")
     # Ensure PIPELINE_ENABLED is true
     monkeypatch.setenv("PIPELINE_ENABLED", "true")
 
@@ -317,7 +326,7 @@ def test_web_runner_subprocess_spawn_when_enabled(monkeypatch):
         )
 
 
-def test_web_runner_no_log_file_created_when_disabled(monkeypatch):
+def test_web_runner_no_log_file_created_when_disabled(monkeypatch, tmp_path):
     """
     When PIPELINE_ENABLED=false, runner must NOT create a new log file
     under output/logs/ for that agent.
@@ -327,25 +336,18 @@ def test_web_runner_no_log_file_created_when_disabled(monkeypatch):
     from pathlib import Path
 
     sys.path.insert(0, str(Path(__file__).parent.parent))
-    from app.core.runner import LOG_DIR, ProcessJob
+    from app.core import runner
+    from app.core.runner import ProcessJob
 
+    monkeypatch.setattr(runner, "LOG_DIR", tmp_path / "logs")
     monkeypatch.setenv("PIPELINE_ENABLED", "false")
 
     agent_key = "no_log_when_disabled"
-    log_path = LOG_DIR / f"{agent_key}.log"
-    # Ensure clean state
-    try:
-        if log_path.exists():
-            log_path.unlink()
-    except Exception:
-        pass
-
     job = ProcessJob(agent_key, ["python", "-c", "print('noop')"])
 
     # Run disabled start
     asyncio.run(job.start())
 
-    # Assert log file was NOT created
-    assert not log_path.exists(), (
-        f"Log file should not be created when disabled, but found: {log_path}"
-    )
+    # Assert no log file was created (log ต่อรอบอยู่ใน LOG_DIR/<agent>/)
+    created = list((tmp_path / "logs").rglob("*.log*"))
+    assert not created, f"Log file should not be created when disabled: {created}"
@@ -8,10 +8,17 @@
 - ถ้าต้องการ parallel processing ให้ใช้ external locking (เช่น flock)
 """
 
+import json
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
 
-from automation_core.queue import FileQueue, JobError, JobSpec
+from automation_core.queue import (
+    FileQueue,
+    JobError,
+    JobSpec,
+    RetryPolicy,
+    lane_depths,
+)
 
 
 def _utc_iso(value: datetime) -> str:
@@ -148,3 +155,149 @@ def test_enqueue_dry_run_mode(tmp_path: Path):
 
     # enqueue จริงอีกครั้ง ก็ควรคืน False
     assert queue.enqueue(job, dry_run=False) is False
+
+
+def test_expired_lease_requeued_with_backoff_then_dead(tmp_path: Path):
+    policy = RetryPolicy(max_attempts=2, base_delay_seconds=30)
+    queue = FileQueue(tmp_path / "queue", lease_seconds=60, retry_policy=policy)
+    now = datetime.now(UTC)
+    queue.enqueue(_build_job("job-lease", now, "run_lease"))
+
+    first = queue.dequeue_next()
+    assert first is not None
+    assert queue.heartbeat(first) is True
+    # lease ยังไม่หมดอายุ
+    assert queue.requeue_expired(now) == []
+
+    released = queue.requeue_expired(now + timedelta(seconds=120))
+    assert [item.job_id for item in released] == ["job-lease"]
+    requeued = queue.list_pending()[0].job
+    assert requeued.status == "pending"
+    assert requeued.last_error.code == "lease_expired"
+    assert requeued.retry_at is not None
+    assert queue.dequeue_next() is None
+    assert queue.heartbeat(first) is False
+
+    # จำลองว่าเวลา backoff ผ่านไปแล้ว
+    retry_path = queue.list_pending()[0].path
+    queue._write_job(retry_path, requeued.model_copy(update={"retry_at": None}))
+    second = queue.dequeue_next()
+    assert second is not None
+    assert second.job.attempts == 2
+
+    dead = queue.release(second, JobError(code="worker_crashed", message="boom"))
+    assert dead.job.status == "dead"
+    assert (queue.dead_dir / dead.filename).exists()
+    assert queue.enqueue(_build_job("job-lease", now, "run_lease")) is False
+
+
+def test_retry_policy_exponential_backoff():
+    policy = RetryPolicy(max_attempts=4, base_delay_seconds=10, max_delay_seconds=25)
+
+    assert policy.delay_for(1) == timedelta(seconds=10)
+    assert policy.delay_for(2) == timedelta(seconds=20)
+    assert policy.delay_for(3) == timedelta(seconds=25)
+    assert policy.should_retry(3) is True
+    assert policy.should_retry(4) is False
+
+
+def test_due_before_and_next_ready_at(tmp_path: Path):
+    queue = FileQueue(tmp_path / "queue")
+    now = datetime(2026, 1, 1, 0, 0, tzinfo=UTC)
+    queue.enqueue(_build_job("job-now", now, "run_now"))
+    queue.enqueue(_build_job("job-later", now + timedelta(minutes=5), "run_later"))
+
+    assert queue.next_ready_at() == now
+    first = queue.dequeue_next(due_before=now)
+    assert first is not None
+    assert first.job_id == "job-now"
+    assert queue.dequeue_next(due_before=now + timedelta(minutes=4)) is None
+    assert queue.next_ready_at() == now + timedelta(minutes=5)
+    assert queue.dequeue_next().job_id == "job-later"
+    assert queue.next_ready_at() is None
+
+
+class _CountingLoads(FileQueue):
+    def __init__(self, queue_dir: Path) -> None:
+        super().__init__(queue_dir)
+        self.loads = 0
+
+    def _load_job(self, path: Path):
+        self.loads += 1
+        return super()._load_job(path)
+
+
+def test_next_ready_at_reads_only_head_items(tmp_path: Path):
+    queue = _CountingLoads(tmp_path / "queue")
+    now = datetime(2026, 1, 1, 0, 0, tzinfo=UTC)
+    for index in range(20):
+        queue.enqueue(_build_job(f"job-{index}", now + timedelta(minutes=index), "r"))
+
+    assert queue.next_ready_at() == now
+    assert queue.loads == 1
+    # ไฟล์ไม่เปลี่ยน ใช้แคชโดยไม่อ่านซ้ำ
+    assert queue.next_ready_at() == now
+    assert queue.loads == 1
+
+    # งานต้นคิวรอ retry: อ่านต่อเฉพาะงานที่ชื่อไฟล์ยังเร็วกว่าเวลาที่ดีที่สุด
+    head = queue.list_pending()[0]
+    queue._write_job(
+        head.path,
+        head.job.model_copy(
+            update={"retry_at": _utc_iso(now + timedelta(minutes=2, seconds=30))}
+        ),
+    )
+    queue.loads = 0
+    assert queue.next_ready_at() == now + timedelta(minutes=1)
+    assert queue.loads == 2
+
+
+def test_priority_and_resource_class_lanes(tmp_path: Path):
+    queue = FileQueue(tmp_path / "queue")
+    now = datetime(2026, 1, 1, 0, 0, tzinfo=UTC)
+    queue.enqueue(
+        _build_job("job-render", now, "run_render").model_copy(
+            update={"resource_class": "cpu_heavy"}
+        )
+    )
+    queue.enqueue(_build_job("job-normal", now + timedelta(minutes=1), "run_normal"))
+    queue.enqueue(
+        _build_job("job-urgent", now + timedelta(minutes=2), "run_urgent").model_copy(
+            update={"priority": 10, "resource_class": "light"}
+        )
+    )
+    queue.enqueue(
+        _build_job("job-future", now + timedelta(hours=1), "run_future").model_copy(
+            update={"priority": 99}
+        )
+    )
+
+    assert lane_depths(queue.list_pending()) == {
+        ("cpu_heavy", 0): 1,
+        ("default", 99): 1,
+        ("default", 0): 1,
+        ("light", 10): 1,
+    }
+
+    due = now + timedelta(minutes=5)
+    # priority สูงกว่าได้ก่อน แต่เฉพาะงานที่ถึงเวลาแล้ว
+    assert queue.dequeue_next(due_before=due).job_id == "job-urgent"
+    # class ที่ชนเพดานถูกข้าม แม้จะถึงเวลาก่อน
+    skipped = queue.dequeue_next(due_before=due, exclude_classes={"cpu_heavy"})
+    assert skipped.job_id == "job-normal"
+    assert queue.dequeue_next(due_before=due, exclude_classes={"cpu_heavy"}) is None
+    assert queue.dequeue_next(due_before=due).job_id == "job-render"
+
+
+def test_legacy_v1_payload_defaults_to_normal_lane(tmp_path: Path):
+    queue = FileQueue(tmp_path / "queue")
+    queue.watch_paths()
+    legacy = _build_job("job-legacy", datetime(2026, 1, 1, tzinfo=UTC), "run_old")
+    payload = legacy.model_dump(exclude={"priority", "resource_class", "retry_at"})
+    (queue.pending_dir / "20260101T000000Z_job-legacy.json").write_text(
+        json.dumps(payload), encoding="utf-8"
+    )
+
+    item = queue.dequeue_next()
+    assert item.job.priority == 0
+    assert item.job.resource_class == "default"
@@ -0,0 +1,104 @@
+"""ทดสอบการ compact งานที่จบแล้วลง archive ของ FileQueue"""
+
+import os
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from automation_core.queue import FileQueue, JobError, JobSpec
+from automation_core.queue_archive import QueueArchive
+
+
+def _utc_iso(value: datetime) -> str:
+    return value.astimezone(UTC).isoformat().replace("+00:00", "Z")
+
+
+def _build_job(job_id: str, scheduled_for: datetime, run_id: str) -> JobSpec:
+    return JobSpec(
+        schema_version="v1",
+        job_id=job_id,
+        created_at=_utc_iso(datetime.now(UTC)),
+        scheduled_for=_utc_iso(scheduled_for),
+        pipeline_path="pipeline.web.yml",
+        run_id=run_id,
+        params={"topic_seed": "สติ"},
+        status="pending",
+        attempts=0,
+        last_error=None,
+    )
+
+
+def _age(path: Path, days: float) -> None:
+    stamp = datetime.now(UTC).timestamp() - days * 86400
+    os.utime(path, (stamp, stamp))
+
+
+def test_compact_archives_old_jobs_and_keeps_idempotency(tmp_path: Path):
+    queue = FileQueue(tmp_path / "queue")
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    for index in range(3):
+        queue.enqueue(_build_job(f"job-{index}", start, f"run_{index}"))
+    done = queue.mark_done(queue.dequeue_next())
+    failed = queue.mark_failed(
+        queue.dequeue_next(), JobError(code="test_error", message="fail")
+    )
+    recent = queue.mark_done(queue.dequeue_next())
+    _age(done.path, 10)
+    _age(failed.path, 10)
+
+    result = queue.compact(older_than=timedelta(days=7))
+
+    assert sorted(result.archived_job_ids) == [done.job_id, failed.job_id]
+    assert result.segment is not None and result.segment.exists()
+    assert not done.path.exists()
+    assert not failed.path.exists()
+    assert recent.path.exists()
+
+    assert queue.exists(done.job_id) is True
+    assert queue.enqueue(_build_job(done.job_id, start, "run_again")) is False
+    record = QueueArchive(queue.queue_dir / "archive").load(failed.job_id)
+    assert record["status"] == "failed"
+    assert record["last_error"]["code"] == "test_error"
+    assert record["params"] == {"topic_seed": "สติ"}
+
+    # รอบถัดไปไม่มีอะไรเก่าพอ จึงไม่สร้าง segment ว่าง
+    assert queue.compact(older_than=timedelta(days=7)).segment is None
+
+
+def test_retention_prunes_segments_but_keeps_ids(tmp_path: Path):
+    queue = FileQueue(tmp_path / "queue")
+    queue.enqueue(_build_job("job-old", datetime(2026, 1, 1, tzinfo=UTC), "run_old"))
+    _age(queue.mark_done(queue.dequeue_next()).path, 1)
+
+    yesterday = datetime.now(UTC) - timedelta(days=1)
+    first = queue.compact(older_than=timedelta(0), now=yesterday)
+    assert first.archived_job_ids == ["job-old"]
+
+    result = queue.compact(older_than=timedelta(0), retention=timedelta(days=30))
+
+    assert result.pruned_segments == []
+    later = queue.compact(
+        older_than=timedelta(0),
+        retention=timedelta(days=30),
+        now=datetime.now(UTC) + timedelta(days=60),
+    )
+    assert later.pruned_segments == [first.segment]
+    assert queue.exists("job-old") is True
+    assert queue.archive.load("job-old") is None
+
+
+def test_resumes_after_interrupted_compaction(tmp_path: Path):
+    queue = FileQueue(tmp_path / "queue")
+    queue.enqueue(_build_job("job-1", datetime(2026, 1, 1, tzinfo=UTC), "run_1"))
+    done = queue.mark_done(queue.dequeue_next())
+    # จำลองว่า process ก่อนหน้าเขียน index แล้วแต่ตายก่อนลบไฟล์ต้นฉบับ
+    queue.archive.append_segment(
+        [{"job_id": done.job_id, "status": "done"}], datetime.now(UTC)
+    )
+
+    other = FileQueue(tmp_path / "queue")
+    result = other.compact(older_than=timedelta(0))
+
+    assert result.archived_job_ids == []
+    assert not done.path.exists()
+    assert other.exists(done.job_id) is True
+    assert not (queue.queue_dir / "archive" / "compact.lock").exists()
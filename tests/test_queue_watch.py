@@ -0,0 +1,39 @@
+"""ทดสอบตัวเฝ้าดูคิว (inotify และ adaptive polling)"""
+
+from pathlib import Path
+
+import pytest
+
+from automation_core.queue_watch import QueueWatcher
+
+
+def test_polling_backoff_and_reset(tmp_path: Path):
+    watcher = QueueWatcher(
+        [tmp_path], min_poll_seconds=0.1, max_poll_seconds=0.4, use_inotify=False
+    )
+
+    assert watcher.uses_inotify is False
+    assert watcher.poll_timeout() == 0.1
+    assert watcher.check() is False
+    assert watcher.poll_timeout() == 0.2
+    assert watcher.check() is False
+    assert watcher.check() is False
+    assert watcher.poll_timeout() == 0.4
+
+    (tmp_path / "20260101T000000Z_job.json").write_text("{}", encoding="utf-8")
+    assert watcher.check() is True
+    assert watcher.poll_timeout() == 0.1
+
+
+def test_inotify_reports_new_file(tmp_path: Path):
+    watcher = QueueWatcher([tmp_path])
+    if not watcher.uses_inotify:
+        pytest.skip("inotify not available on this platform")
+    try:
+        assert watcher.poll_timeout() is None
+        assert watcher.check() is False
+        (tmp_path / "20260101T000000Z_job.json").write_text("{}", encoding="utf-8")
+        assert watcher.check() is True
+        assert watcher.check() is False
+    finally:
+        watcher.close()
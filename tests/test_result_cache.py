@@ -0,0 +1,85 @@
+"""ทดสอบ ResultCache (LRU + TTL) และ cache ผลค้นคืนของ ResearchRetrieval"""
+
+import json
+
+from agents.research_retrieval import ResearchRetrievalAgent, ResearchRetrievalInput
+from agents.research_retrieval.corpus_index import CorpusIndex
+from automation_core.result_cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_eviction_and_ttl_expiry():
+    clock = FakeClock()
+    cache = ResultCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # a ถูกใช้ล่าสุด b จึงถูกไล่ออกก่อน
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    clock.now += 11
+    assert cache.get("a") is None
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_persisted_entries_are_shared_until_they_expire(tmp_path):
+    clock = FakeClock()
+    path = tmp_path / "cache.sqlite3"
+    key = ResultCache.key("คำค้น", ["สติ"], 12)
+    ResultCache(ttl_seconds=10, path=path, clock=clock).put(key, {"ids": ["p1"]})
+
+    other = ResultCache(ttl_seconds=10, path=path, clock=clock)
+    assert other.get(key) == {"ids": ["p1"]}
+    clock.now += 11
+    assert ResultCache(path=path, clock=clock).get(key) is None
+
+
+def test_agent_reuses_retrieval_for_equivalent_queries(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "suttas.json").write_text(
+        json.dumps(
+            [
+                {
+                    "id": "breath",
+                    "original_text": "มีสติรู้ลมหายใจเข้าออก",
+                    "doctrinal_tags": ["สติ"],
+                }
+            ]
+        ),
+        encoding="utf-8",
+    )
+    agent = ResearchRetrievalAgent(
+        index=CorpusIndex(tmp_path / "index"), corpus_dir=corpus
+    )
+
+    def run(raw_query, topic_title="ลมหายใจ"):
+        return agent.run(
+            ResearchRetrievalInput(topic_title=topic_title, raw_query=raw_query)
+        )
+
+    first = run("สติ และ ลมหายใจ")
+    # ต่างกันเพียง stopword: ได้ผลเดิมจาก cache
+    second = run("สติ ลมหายใจ")
+    assert (first.meta.cache_hit, second.meta.cache_hit) == (False, True)
+    assert second.primary == first.primary
+
+    # หัวข้ออื่นที่คำค้นเดียวกัน: ชื่อหัวข้อไม่อยู่ใน key จึงใช้ผลเดิม
+    other_topic = run("สติ ลมหายใจ", topic_title="นอนไม่หลับเพราะคิดมาก")
+    assert other_topic.meta.cache_hit
+    assert other_topic.topic == "นอนไม่หลับเพราะคิดมาก"
+    assert other_topic.primary == first.primary
+
+    # ดัชนีเปลี่ยน version: ค้นใหม่
+    (corpus / "extra.md").write_text("ลมหายใจยาว", encoding="utf-8")
+    third = run("สติ ลมหายใจ")
+    assert not third.meta.cache_hit
+    assert len(third.primary + third.supportive) == 2
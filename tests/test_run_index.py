@@ -0,0 +1,192 @@
+"""ทดสอบดัชนีรอบ pipeline (run index) และหน้า /runs"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import config
+from automation_core.run_index import RunIndex, index_run_summary
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import orchestrator  # noqa: E402
+
+
+def _summary(run_id: str, started_at: str, **overrides) -> dict:
+    summary = {
+        "pipeline": "web",
+        "run_id": run_id,
+        "started_at": started_at,
+        "ended_at": started_at,
+        "duration_seconds": 12.5,
+        "total_steps": 2,
+        "successful": 2,
+        "failed": 0,
+        "results": {
+            "trend": {"status": "success", "output": "skipped"},
+            "script": {"status": "success", "output": "skipped"},
+        },
+        "step_seconds": {"trend": 2.0, "script": 10.5},
+        "output_dir": f"output/{run_id}",
+    }
+    summary.update(overrides)
+    return summary
+
+
+def test_query_pages_and_filters(tmp_path: Path):
+    index = RunIndex(tmp_path / "index")
+    for day in range(1, 8):
+        index.record_summary(
+            _summary(f"run_{day}", f"2026-01-0{day}T10:00:00"), "summary.json"
+        )
+    index.record_summary(
+        _summary(
+            "run_failed",
+            "2026-01-05T12:00:00",
+            pipeline="nightly",
+            failed=1,
+            results={"trend": {"status": "error", "error": "boom"}},
+        ),
+        "summary.json",
+    )
+
+    first = index.query(per_page=3)
+    assert [run.run_id for run in first.items] == ["run_7", "run_6", "run_failed"]
+    assert (first.total, first.pages) == (8, 3)
+    assert [run.run_id for run in index.query(page=3, per_page=3).items] == [
+        "run_2",
+        "run_1",
+    ]
+
+    assert [run.run_id for run in index.query(status="error").items] == ["run_failed"]
+    window = index.query(pipeline="web", since="2026-01-03", until="2026-01-05")
+    assert [run.run_id for run in window.items] == ["run_4", "run_3"]
+    assert index.pipelines() == ["nightly", "web"]
+
+
+def test_reindex_replaces_steps_and_stats_aggregate(tmp_path: Path):
+    artifact = tmp_path / "script.json"
+    artifact.write_text("x" * 100, encoding="utf-8")
+    index = RunIndex(tmp_path / "index")
+    index.record_summary(_summary("run_a", "2026-01-01T10:00:00"), "a.json")
+    index.record_summary(
+        _summary(
+            "run_a",
+            "2026-01-01T10:00:00",
+            duration_seconds=30.0,
+            results={"script": {"status": "success", "output": str(artifact)}},
+            step_seconds={"script": 4.0},
+        ),
+        "a.json",
+    )
+    index.record_summary(_summary("run_b", "2026-01-02T10:00:00"), "b.json")
+
+    run = index.get("run_a")
+    assert run is not None
+    assert [(step.step_id, step.size_bytes) for step in run.steps] == [("script", 100)]
+    assert run.artifact_bytes == 100
+
+    stats = index.stats()
+    assert stats.total == 2
+    assert stats.by_status == {"success": 2}
+    assert stats.max_duration_seconds == 30.0
+    assert stats.step_avg_seconds["script"] == (2, 7.25)
+    assert index.stats(since="2026-01-02").total == 1
+
+
+def test_rebuild_reads_existing_summaries(tmp_path: Path, monkeypatch):
+    output_dir = tmp_path / "output"
+    for run_id in ("run_1", "run_2"):
+        run_dir = output_dir / run_id
+        run_dir.mkdir(parents=True)
+        (run_dir / "pipeline_summary.json").write_text(
+            json.dumps(_summary(run_id, f"2026-02-0{run_id[-1]}T00:00:00")),
+            encoding="utf-8",
+        )
+    (output_dir / "broken").mkdir()
+    (output_dir / "broken" / "pipeline_summary.json").write_text("{", "utf-8")
+
+    assert RunIndex(tmp_path / "index").rebuild(output_dir) == 2
+
+    monkeypatch.setenv("RUN_INDEX_DIR", str(tmp_path / "env_index"))
+    index_run_summary(tmp_path, _summary("run_env", "2026-02-03"), "s.json")
+    # summary ที่ขาด run_id ต้องไม่ทำให้ pipeline ล้ม
+    index_run_summary(tmp_path, {"results": {}}, "s.json")
+    assert RunIndex(tmp_path / "env_index").query().total == 1
+
+
+def test_runs_page_lists_indexed_runs(tmp_path: Path, monkeypatch):
+    from app.main import app
+
+    monkeypatch.setattr(config, "RUN_INDEX_DIR", str(tmp_path / "index"))
+    index = RunIndex(tmp_path / "index")
+    index.record_summary(_summary("run_ok", "2026-03-01T08:00:00"), "s.json")
+    index.record_summary(
+        _summary(
+            "run_held",
+            "2026-03-02T08:00:00",
+            results={"approve": {"status": "held", "reason": "wait"}},
+        ),
+        "s.json",
+    )
+    client = TestClient(app)
+    client.post(
+        "/login",
+        data={"username": config.ADMIN_USERNAME, "password": config.ADMIN_PASSWORD},
+    )
+
+    response = client.get("/runs", params={"status": "held"})
+
+    assert response.status_code == 200
+    assert "run_held" in response.text
+    assert "run_ok" not in response.text
+    assert "รอบ pipeline ในดัชนี: 2" in client.get("/dashboard").text
+
+
+def test_failed_pipeline_is_summarised_and_indexed(tmp_path: Path, monkeypatch):
+    run_id = "run_boom"
+
+    def write_artifact(step, run_dir):
+        run_dir.mkdir(parents=True, exist_ok=True)
+        (run_dir / "a.json").write_text("x" * 10, encoding="utf-8")
+        # path สัมพัทธ์กับ ROOT แบบที่ step ส่วนใหญ่คืนมา (cwd ไม่ใช่ ROOT)
+        return f"output/{run_id}/a.json"
+
+    def fail(step, run_dir):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(orchestrator, "ROOT", tmp_path)
+    monkeypatch.setitem(orchestrator.AGENTS, "test.write", write_artifact)
+    monkeypatch.setitem(orchestrator.AGENTS, "test.fail", fail)
+    monkeypatch.setenv("PIPELINE_ENABLED", "true")
+    monkeypatch.setenv("RUN_INDEX_DIR", str(tmp_path / "index"))
+    pipeline_path = tmp_path / "pipeline.yml"
+    pipeline_path.write_text(
+        "pipeline: boom\nsteps:\n"
+        "  - id: write\n    uses: test.write\n"
+        "  - id: fail\n    uses: test.fail\n",
+        encoding="utf-8",
+    )
+
+    with pytest.raises(RuntimeError, match="boom"):
+        orchestrator.run_pipeline(pipeline_path, run_id)
+
+    summary_path = tmp_path / "output" / run_id / "pipeline_summary.json"
+    summary = json.loads(summary_path.read_text(encoding="utf-8"))
+    assert summary["results"]["fail"] == {"status": "error", "error": "boom"}
+    assert summary["failed"] == 1
+
+    index = RunIndex(tmp_path / "index")
+    assert [run.run_id for run in index.query(status="error").items] == [run_id]
+    run = index.get(run_id)
+    assert [(step.step_id, step.size_bytes) for step in run.steps] == [
+        ("write", 10),
+        ("fail", None),
+    ]
+
+    # rebuild จากไฟล์ summary ได้ผลเดียวกัน
+    rebuilt = RunIndex(tmp_path / "rebuilt")
+    assert rebuilt.rebuild(tmp_path / "output") == 1
+    assert rebuilt.get(run_id).artifact_bytes == 10
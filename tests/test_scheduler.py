@@ -8,7 +8,11 @@ from zoneinfo import ZoneInfo
 import pytest
 
 from automation_core.queue import FileQueue
-from automation_core.scheduler import SchedulePlanError, schedule_due_jobs
+from automation_core.scheduler import (
+    SchedulePlanCache,
+    SchedulePlanError,
+    schedule_due_jobs,
+)
 
 
 def _utc_iso(value: datetime) -> str:
@@ -53,7 +57,8 @@ def test_scheduler_due_selection_deterministic(tmp_path: Path):
     )
 
     assert len(result.enqueued_job_ids) == 2
-    assert any(skip.code == "entry_not_due" for skip in result.skipped_entries)
+    assert result.not_due_count > 0
+    assert result.skipped_entries[-1].code == "entry_not_due"
 
     tz = ZoneInfo("Asia/Bangkok")
     scheduled_utc = datetime(2026, 1, 1, 3, 0, tzinfo=UTC)
@@ -321,3 +326,134 @@ def test_scheduler_dry_run_matches_actual_run(tmp_path: Path):
     assert len(result4.enqueued_job_ids) == 0
     assert len(result4.skipped_entries) == 1
     assert result4.skipped_entries[0].code == "already_enqueued"
+
+
+def test_plan_cache_recompiles_only_when_plan_changes(tmp_path: Path):
+    plan_path = tmp_path / "schedule_plan.yaml"
+    _write_plan(plan_path)
+    cache = SchedulePlanCache(tmp_path / "cache")
+
+    first = cache.load(plan_path)
+    assert cache.load(plan_path) is first
+    assert [entry.publish_at for entry in first.entries] == [
+        "2026-01-01T10:00",
+        "2026-01-01T10:05+07:00",
+        "2026-01-01T10:30",
+    ]
+
+    # process ใหม่อ่านแผนที่คอมไพล์แล้วจากดิสก์ได้ผลเดียวกัน
+    reloaded = SchedulePlanCache(tmp_path / "cache").load(plan_path)
+    assert reloaded == first
+
+    plan_path.write_text(
+        plan_path.read_text(encoding="utf-8").replace("10:30", "11:30"),
+        encoding="utf-8",
+    )
+    changed = cache.load(plan_path)
+    assert changed.plan_hash != first.plan_hash
+    assert changed.entries[-1].publish_at == "2026-01-01T11:30"
+
+
+def test_schedule_reports_skips_in_plan_order_and_counts_not_due(tmp_path: Path):
+    plan_path = tmp_path / "schedule_plan.yaml"
+    entries = []
+    for hour in reversed(range(8, 20)):
+        entries.append(f'  - publish_at: "2026-01-01T{hour:02d}:00"')
+        entries.append('    pipeline_path: "pipeline.web.yml"')
+        if hour == 15:
+            entries.append('  - publish_at: "not-a-date"')
+            entries.append('    pipeline_path: "pipeline.web.yml"')
+    plan_path.write_text(
+        "\n".join(['schema_version: "v1"', 'timezone: "Asia/Bangkok"', "entries:"])
+        + "\n"
+        + "\n".join(entries),
+        encoding="utf-8",
+    )
+
+    def _tick(scheduler_enabled: bool):
+        return schedule_due_jobs(
+            plan_path=plan_path,
+            queue=FileQueue(tmp_path / "queue"),
+            now_utc=datetime(2026, 1, 1, 5, 0, tzinfo=UTC),
+            window_minutes=10,
+            dry_run=True,
+            scheduler_enabled=scheduler_enabled,
+            plan_cache=SchedulePlanCache(tmp_path / "cache"),
+        )
+
+    result = _tick(scheduler_enabled=True)
+
+    # 12:00 ของไทย (05:00 UTC) อยู่ใน window จึงถูก enqueue อีก 11 รายการนอก window
+    # ไม่ถูกวนทีละรายการ แต่นับรวมเป็น entry_not_due รายการเดียวท้ายสุด
+    assert len(result.enqueued_job_ids) == 1
+    assert [(skip.code, skip.message) for skip in result.skipped_entries] == [
+        ("job_invalid", result.skipped_entries[0].message),
+        ("entry_not_due", "11 entries not within window"),
+    ]
+    assert result.not_due_count == 11
+
+    disabled = _tick(scheduler_enabled=False)
+    assert disabled.enqueued_job_ids == []
+    assert [skip.code for skip in disabled.skipped_entries] == [
+        "job_invalid",
+        "scheduler_disabled",
+        "entry_not_due",
+    ]
+
+
+class _CountingQueue(FileQueue):
+    def __init__(self, queue_dir: Path) -> None:
+        super().__init__(queue_dir)
+        self.enqueue_calls = 0
+        self.exists_calls = 0
+
+    def enqueue(self, job, dry_run: bool = False) -> bool:
+        self.enqueue_calls += 1
+        return super().enqueue(job, dry_run=dry_run)
+
+    def exists(self, job_id: str) -> bool:
+        self.exists_calls += 1
+        return super().exists(job_id)
+
+
+def test_schedule_skips_queue_lookup_for_remembered_jobs(tmp_path: Path):
+    plan_path = tmp_path / "schedule_plan.yaml"
+    _write_plan(plan_path)
+    now_utc = datetime(2026, 1, 1, 3, 0, tzinfo=UTC)
+
+    def _tick(queue: FileQueue, dry_run: bool = False):
+        return schedule_due_jobs(
+            plan_path=plan_path,
+            queue=queue,
+            now_utc=now_utc,
+            window_minutes=10,
+            dry_run=dry_run,
+            scheduler_enabled=True,
+            plan_cache=SchedulePlanCache(tmp_path / "cache"),
+        )
+
+    first_queue = _CountingQueue(tmp_path / "queue")
+    # dry_run ไม่ถูกจำ จึงยังต้องถามคิวทุกครั้ง
+    _tick(first_queue, dry_run=True)
+    assert len(_tick(first_queue).enqueued_job_ids) == 2
+    assert first_queue.enqueue_calls == 4
+
+    second_queue = _CountingQueue(tmp_path / "queue")
+    repeat = _tick(second_queue)
+    assert repeat.enqueued_job_ids == []
+    assert [skip.code for skip in repeat.skipped_entries].count("already_enqueued") == 2
+    assert second_queue.enqueue_calls == 0
+    # คิวเปลี่ยนตั้งแต่รอบก่อน (รอบนั้น enqueue เอง) จึงตรวจรายการที่จำไว้ครั้งเดียว
+    assert second_queue.exists_calls == 2
+
+    # แผนและคิวไม่เปลี่ยน: เชื่อรายการที่จำไว้โดยไม่ถามคิวเลย
+    second_queue.exists_calls = 0
+    assert _tick(second_queue).enqueued_job_ids == []
+    assert second_queue.exists_calls == 0
+
+    # ผู้ดูแลลบงานออกจากคิว: job_id ที่จำไว้ไม่ตรงกับคิวแล้ว จึงถูก enqueue ใหม่
+    removed = second_queue.list_pending()[0]
+    removed.path.unlink()
+    again = _tick(second_queue)
+    assert again.enqueued_job_ids == [removed.job_id]
+    assert second_queue.enqueue_calls == 1
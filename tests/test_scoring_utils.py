@@ -6,14 +6,21 @@
 import sys
 from pathlib import Path
 
+import numpy as np
+import pytest
+
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 from automation_core.utils.scoring import (
     calculate_composite_score,
+    composite_scores,
+    min_max_normalize,
     normalize_scores,
     rank_items_by_score,
+    top_k_indices,
     validate_score_range,
+    z_score_normalize,
 )
 
 
@@ -202,6 +209,19 @@ class TestRankItemsByScore:
         scores = [item.get("score", 0) for item in result]
         assert scores == sorted(scores, reverse=True)
 
+    def test_non_numeric_keys_fall_back_to_sorted(self):
+        """ทดสอบคีย์ที่ไม่ใช่ตัวเลข (สตริงวันที่) เรียงแบบ sorted เดิม"""
+        items = [
+            {"name": "A", "published": "2026-01-02"},
+            {"name": "B", "published": "2026-03-01"},
+            {"name": "C", "published": "2025-12-31"},
+        ]
+
+        result = rank_items_by_score(items, "published")
+
+        assert [item["name"] for item in result] == ["B", "A", "C"]
+        assert [item["rank"] for item in result] == [1, 2, 3]
+
     def test_composite_score_ranking(self):
         """ทดสอบการจัดอันดับด้วยคะแนนรวม (เหมือน TrendScout)"""
         items = [
@@ -286,6 +306,75 @@ class TestValidateScoreRange:
         assert result is True  # ไม่มีคะแนนให้ตรวจสอบ
 
 
+class TestArrayScoring:
+    """ทดสอบฟังก์ชันแบบ array (คำนวณทุกรายการพร้อมกัน)"""
+
+    WEIGHTS = {"search_intent": 0.3, "freshness": 0.25, "evergreen": 0.25}
+
+    def test_composite_matches_scalar_with_missing_values(self):
+        """NaN ในคอลัมน์ให้ผลเหมือน key ที่ไม่มีใน dict ของ scalar API"""
+        rng = np.random.default_rng(0)
+        columns = {key: rng.random(500) for key in self.WEIGHTS}
+        columns["freshness"][rng.random(500) < 0.3] = np.nan
+
+        result = composite_scores(columns, self.WEIGHTS)
+
+        for i in range(500):
+            scores = {
+                key: float(column[i])
+                for key, column in columns.items()
+                if not np.isnan(column[i])
+            }
+            assert result[i] == calculate_composite_score(scores, self.WEIGHTS)
+
+    def test_composite_from_structured_array(self):
+        """รับ structured array ได้ และรายการที่ไม่มีมิติใดเลยได้ 0"""
+        items = np.array(
+            [(0.8, 0.6), (np.nan, np.nan)], dtype=[("a", "f8"), ("b", "f8")]
+        )
+
+        result = composite_scores(items, {"a": 1.0, "b": 1.0, "c": 5.0})
+
+        assert result.tolist() == pytest.approx([0.7, 0.0])
+
+    def test_min_max_ignores_nan(self):
+        """NaN ไม่ถูกนำมาคิดช่วงค่าและคงเป็น NaN"""
+        result = min_max_normalize([10, np.nan, 30, 20], 0.2, 0.8)
+
+        assert result[[0, 2, 3]].tolist() == pytest.approx([0.2, 0.8, 0.5])
+        assert np.isnan(result[1])
+        assert min_max_normalize([5, np.nan, 5]).tolist()[::2] == [0.0, 0.0]
+
+    def test_z_score_ignores_nan(self):
+        """z-score คำนวณจากค่าที่มีเท่านั้น"""
+        result = z_score_normalize([1.0, 2.0, np.nan, 3.0])
+
+        assert result[[0, 1, 3]].tolist() == pytest.approx(
+            [-1.2247, 0.0, 1.2247], abs=1e-4
+        )
+        assert np.isnan(result[2])
+        assert z_score_normalize([4, 4]).tolist() == [0.0, 0.0]
+
+    def test_top_k_matches_stable_sort(self):
+        """argpartition top-k ให้ผลเหมือน sorted แบบ stable แล้วตัด k ตัวแรก"""
+        values = np.random.default_rng(5).integers(0, 6, size=200).astype(float)
+
+        for reverse in (True, False):
+            expected = sorted(
+                range(len(values)), key=values.__getitem__, reverse=reverse
+            )
+            for k in (0, 1, 7, 50, 200, None):
+                assert top_k_indices(values, k, reverse).tolist() == expected[:k]
+
+    def test_top_k_puts_nan_last(self):
+        """NaN อยู่ท้ายเสมอไม่ว่าจะเรียงทางใด"""
+        values = [0.5, np.nan, 0.9, 0.1]
+
+        assert top_k_indices(values).tolist() == [2, 0, 3, 1]
+        assert top_k_indices(values, reverse=False).tolist() == [3, 0, 2, 1]
+        assert top_k_indices(values, 3).tolist() == [2, 0, 3]
+
+
 class TestScoringIntegration:
     """ทดสอบการทำงานร่วมกันของฟังก์ชันต่างๆ"""
 
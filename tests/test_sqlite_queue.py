@@ -0,0 +1,278 @@
+"""ทดสอบการทำงานของคิว SQLite (พฤติกรรมเดียวกับ FileQueue)"""
+
+import multiprocessing
+import sqlite3
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from automation_core.queue import (
+    FileQueue,
+    JobError,
+    JobSpec,
+    RetryPolicy,
+    open_queue,
+)
+from automation_core.sqlite_queue import SqliteQueue
+
+
+def _utc_iso(value: datetime) -> str:
+    return value.astimezone(UTC).isoformat().replace("+00:00", "Z")
+
+
+def _build_job(job_id: str, scheduled_for: datetime, run_id: str) -> JobSpec:
+    return JobSpec(
+        schema_version="v1",
+        job_id=job_id,
+        created_at=_utc_iso(datetime.now(UTC)),
+        scheduled_for=_utc_iso(scheduled_for),
+        pipeline_path="pipeline.web.yml",
+        run_id=run_id,
+        params={"topic_seed": "สติ"},
+        status="pending",
+        attempts=0,
+        last_error=None,
+    )
+
+
+def _drain(queue_dir: str, results: "multiprocessing.Queue[list[str]]") -> None:
+    queue = SqliteQueue(queue_dir)
+    claimed: list[str] = []
+    while True:
+        item = queue.dequeue_next()
+        if item is None:
+            break
+        claimed.append(item.job_id)
+        queue.mark_done(item)
+    results.put(claimed)
+
+
+def test_open_queue_selects_backend(tmp_path: Path):
+    assert isinstance(open_queue(tmp_path / "q"), FileQueue)
+    assert isinstance(open_queue(tmp_path / "q", "sqlite"), SqliteQueue)
+
+
+def test_enqueue_idempotent_and_wal(tmp_path: Path):
+    queue = SqliteQueue(tmp_path / "queue")
+    job = _build_job("job-001", datetime(2026, 1, 1, tzinfo=UTC), "run_001")
+
+    assert queue.enqueue(job, dry_run=True) is True
+    assert queue.list_pending() == []
+    assert queue.enqueue(job) is True
+    assert queue.enqueue(job) is False
+    assert queue.enqueue(job, dry_run=True) is False
+
+    pending = queue.list_pending()
+    assert [item.job_id for item in pending] == ["job-001"]
+    assert pending[0].filename == "20260101T000000Z_job-001.json"
+    assert pending[0].job is not None
+    assert pending[0].job.params == {"topic_seed": "สติ"}
+
+    mode = queue._connect().execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+
+def test_fifo_ordering_and_state_transitions(tmp_path: Path):
+    queue = SqliteQueue(tmp_path / "queue")
+    now = datetime(2026, 1, 1, tzinfo=UTC)
+    queue.enqueue(_build_job("job-late", now + timedelta(minutes=5), "run_late"))
+    queue.enqueue(_build_job("job-early", now, "run_early"))
+
+    assert queue.peek_next().job_id == "job-early"
+
+    first = queue.dequeue_next()
+    assert first is not None
+    assert first.job_id == "job-early"
+    assert first.job.status == "running"
+    assert first.job.attempts == 1
+    done = queue.mark_done(first)
+    assert done.job.status == "done"
+
+    second = queue.dequeue_next()
+    failed = queue.mark_failed(second, JobError(code="test_error", message="fail"))
+    assert failed.job.status == "failed"
+    assert failed.job.last_error.code == "test_error"
+
+    assert queue.dequeue_next() is None
+    # ห้าม enqueue ซ้ำ แม้งานจะอยู่ใน done/failed แล้ว
+    assert queue.enqueue(_build_job("job-early", now, "run_early")) is False
+    assert queue.exists("job-late") is True
+
+
+def test_concurrent_workers_claim_each_job_once(tmp_path: Path):
+    queue_dir = tmp_path / "queue"
+    queue = SqliteQueue(queue_dir)
+    now = datetime(2026, 1, 1, tzinfo=UTC)
+    for index in range(60):
+        queue.enqueue(
+            _build_job(f"job-{index:03d}", now + timedelta(seconds=index), "run")
+        )
+    queue.close()
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(target=_drain, args=(str(queue_dir), results)) for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    claimed = [job_id for _ in workers for job_id in results.get(timeout=60)]
+    for worker in workers:
+        worker.join(timeout=60)
+
+    assert sorted(claimed) == [f"job-{index:03d}" for index in range(60)]
+    assert queue.list_pending() == []
+
+
+def test_expired_lease_requeued_with_backoff_then_dead(tmp_path: Path):
+    policy = RetryPolicy(max_attempts=2, base_delay_seconds=30)
+    queue = SqliteQueue(tmp_path / "queue", lease_seconds=60, retry_policy=policy)
+    now = datetime.now(UTC)
+    queue.enqueue(_build_job("job-lease", now, "run_lease"))
+
+    first = queue.dequeue_next()
+    assert queue.heartbeat(first) is True
+    assert queue.requeue_expired(now) == []
+
+    released = queue.requeue_expired(now + timedelta(seconds=120))
+    assert [item.job_id for item in released] == ["job-lease"]
+    assert released[0].job.last_error.code == "lease_expired"
+    assert released[0].job.retry_at is not None
+    assert queue.dequeue_next() is None
+    assert queue.heartbeat(first) is False
+
+    # จำลองว่าเวลา backoff ผ่านไปแล้ว
+    queue._connect().execute("UPDATE jobs SET available_at = 0")
+    second = queue.dequeue_next()
+    assert second.job.attempts == 2
+
+    dead = queue.release(second, JobError(code="worker_crashed", message="boom"))
+    assert dead.job.status == "dead"
+    assert queue.list_pending() == []
+    assert queue.exists("job-lease") is True
+
+
+def test_due_before_and_next_ready_at(tmp_path: Path):
+    queue = SqliteQueue(tmp_path / "queue")
+    now = datetime(2026, 1, 1, 0, 0, tzinfo=UTC)
+    queue.enqueue(_build_job("job-now", now, "run_now"))
+    queue.enqueue(_build_job("job-later", now + timedelta(minutes=5), "run_later"))
+
+    assert queue.next_ready_at() == now
+    assert queue.dequeue_next(due_before=now).job_id == "job-now"
+    assert queue.dequeue_next(due_before=now + timedelta(minutes=4)) is None
+    assert queue.next_ready_at() == now + timedelta(minutes=5)
+    assert queue.dequeue_next().job_id == "job-later"
+    assert queue.next_ready_at() is None
+
+
+def test_priority_lanes_and_legacy_schema_migration(tmp_path: Path):
+    queue_dir = tmp_path / "queue"
+    queue_dir.mkdir()
+    now = datetime(2026, 1, 1, tzinfo=UTC)
+    legacy = _build_job("job-legacy", now, "run_legacy")
+    # ฐานข้อมูลจากเวอร์ชันก่อนที่ยังไม่มีคอลัมน์ priority/resource_class
+    conn = sqlite3.connect(queue_dir / "queue.sqlite3")
+    conn.executescript(
+        "CREATE TABLE jobs (job_id TEXT PRIMARY KEY, filename TEXT NOT NULL, "
+        "scheduled_for TEXT NOT NULL, status TEXT NOT NULL, "
+        "attempts INTEGER NOT NULL DEFAULT 0, payload TEXT NOT NULL);"
+    )
+    conn.execute(
+        "INSERT INTO jobs VALUES (?, ?, ?, 'pending', 0, ?)",
+        (
+            "job-legacy",
+            "20260101T000000Z_job-legacy.json",
+            "20260101T000000Z",
+            legacy.model_dump_json(exclude={"priority", "resource_class"}),
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+    queue = SqliteQueue(queue_dir)
+    queue.enqueue(
+        _build_job("job-heavy", now - timedelta(minutes=1), "run_heavy").model_copy(
+            update={"resource_class": "cpu_heavy"}
+        )
+    )
+    queue.enqueue(
+        _build_job("job-urgent", now + timedelta(minutes=1), "run_urgent").model_copy(
+            update={"priority": 5, "resource_class": "light"}
+        )
+    )
+
+    due = now + timedelta(minutes=2)
+    assert queue.peek_next(due_before=due).job_id == "job-urgent"
+    assert queue.dequeue_next(due_before=due).job_id == "job-urgent"
+    legacy_item = queue.dequeue_next(due_before=due, exclude_classes={"cpu_heavy"})
+    assert legacy_item.job_id == "job-legacy"
+    assert legacy_item.job.resource_class == "default"
+    assert queue.dequeue_next(exclude_classes={"cpu_heavy"}) is None
+    assert queue.dequeue_next().job_id == "job-heavy"
+
+
+def test_enqueue_running_counts_as_running_for_both_backends(tmp_path: Path):
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    for backend in ("file", "sqlite"):
+        queue = open_queue(tmp_path / backend, backend)
+        queue.enqueue(_build_job("job-pending", start, "run_pending"))
+
+        item = queue.enqueue_running(_build_job("web_run_1", start, "run_1"))
+
+        assert item is not None and item.job is not None
+        assert item.job.status == "running"
+        assert item.job.attempts == 1
+        assert queue.count_by_state()["running"] == 1
+        # worker ตัวอื่นไม่หยิบงานนี้ซ้ำ และ job_id เดิมลงซ้ำไม่ได้
+        assert queue.dequeue_next().job_id == "job-pending"
+        assert queue.enqueue_running(_build_job("web_run_1", start, "run_1")) is None
+        assert queue.heartbeat(item) is True
+        assert queue.mark_done(item).job.status == "done"
+
+
+def test_expired_external_job_is_dead_lettered_for_both_backends(tmp_path: Path):
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    for backend in ("file", "sqlite"):
+        queue = open_queue(tmp_path / backend, backend)
+        web_job = _build_job("web_run_2", start, "run_2").model_copy(
+            update={"pipeline_path": "web:trend_scout"}
+        )
+        queue.enqueue_running(web_job)
+
+        # เว็บตายระหว่างรัน: ไม่มีไฟล์ pipeline ให้รันซ้ำ จึงไม่กลับไป pending
+        released = queue.requeue_expired(datetime.now(UTC) + timedelta(days=1))
+
+        assert [item.job.status for item in released] == ["dead"]
+        assert released[0].job.last_error.code == "lease_expired"
+        assert queue.list_pending() == []
+        assert queue.count_by_state()["dead"] == 1
+
+
+def test_stale_owner_cannot_touch_redequeued_job_for_both_backends(tmp_path: Path):
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    policy = RetryPolicy(base_delay_seconds=0)
+    for queue in (
+        FileQueue(tmp_path / "file", lease_seconds=60, retry_policy=policy),
+        SqliteQueue(tmp_path / "sqlite", lease_seconds=60, retry_policy=policy),
+    ):
+        queue.enqueue(_build_job("job-stale", start, "run_stale"))
+        first = queue.dequeue_next()
+        # lease ของ worker แรกหมดอายุ แล้ว worker ที่สองได้งานเดิมไป
+        queue.requeue_expired(datetime.now(UTC) + timedelta(seconds=120))
+        second = queue.dequeue_next()
+        assert second.job.attempts == 2
+
+        error = JobError(code="worker_crashed", message="boom")
+        assert queue.heartbeat(first) is False
+        with pytest.raises(FileNotFoundError):
+            queue.mark_done(first)
+        with pytest.raises(FileNotFoundError):
+            queue.mark_failed(first, error)
+        with pytest.raises(FileNotFoundError):
+            queue.release(first, error)
+
+        assert queue.count_by_state()["running"] == 1
+        assert queue.heartbeat(second) is True
+        assert queue.mark_done(second).job.status == "done"
@@ -0,0 +1,131 @@
+"""ทดสอบตัวตัดคำไทยแบบ maximal matching และ lexical similarity"""
+
+import numpy as np
+import pytest
+
+from agents.doctrine_validator.agent import DoctrineValidatorAgent
+from agents.doctrine_validator.lexical import LexicalIndex, cosine_similarity
+from agents.doctrine_validator.model import (
+    DoctrineValidatorInput,
+    Passage,
+    Passages,
+    ScriptSegment,
+    SegmentStatus,
+)
+from automation_core.thai_tokenizer import ThaiTokenizer, default_tokenizer
+
+
+def test_default_dictionary_segments_unspaced_thai():
+    tokens = default_tokenizer().tokenize("การมีสติรู้ลมหายใจเข้าออก, Mindfulness 101")
+
+    assert tokens == [
+        "การ",
+        "มี",
+        "สติ",
+        "รู้",
+        "ลม",
+        "หายใจ",
+        "เข้า",
+        "ออก",
+        "mindfulness",
+        "101",
+    ]
+
+
+def test_prefers_known_words_then_fewer_tokens_and_merges_unknown():
+    tokenizer = ThaiTokenizer(["ตา", "กลม", "ตาก", "ลม", "สงบ"])
+
+    # "ตา|กลม" กับ "ตาก|ลม" จำนวนคำเท่ากัน ส่วน "สงบ" ต้องไม่ถูกแยก
+    assert tokenizer.segment("ตากลมสงบ") in {("ตา", "กลม", "สงบ"), ("ตาก", "ลม", "สงบ")}
+    # อักษรนอกพจนานุกรมที่ติดกันรวมเป็น token เดียว
+    assert tokenizer.segment("ลมพัดแรงสงบ") == ("ลม", "พัดแรง", "สงบ")
+
+
+def test_never_splits_inside_a_character_cluster():
+    # "เก" ห้ามแยกจากสระหน้า และ "กี่" ห้ามแยกสระบน/วรรณยุกต์ออกจากพยัญชนะ
+    tokenizer = ThaiTokenizer(["ก", "เ"])
+
+    assert tokenizer.segment("เกกี่") == ("เกกี่",)
+
+
+def test_bulk_scores_match_pairwise_cosine():
+    # ตารางที่คำนวณครั้งเดียวกับการเทียบทีละคู่ต้องได้คะแนนเท่ากัน (threshold ชุดเดียวกัน)
+    rows = [
+        ("a", "การมีสติรู้ลมหายใจ"),
+        ("a", "รู้ลมหายใจเข้าออก"),
+        ("b", "การปล่อยวางความคิด"),
+        ("c", "ใจสงบเมื่อมีสติ"),
+    ]
+    index = LexicalIndex([pid for pid, _ in rows], [text for _, text in rows])
+    queries = ["มีสติกับลมหายใจ", "ปล่อยวางแล้วใจสงบ", "ธรรมะ"]
+
+    expected = [
+        [
+            max(cosine_similarity(query, text) for pid, text in rows if pid == column)
+            for column in index.passage_ids
+        ]
+        for query in queries
+    ]
+
+    np.testing.assert_allclose(index.scores(queries), expected, atol=1e-6)
+
+    # คะแนนของคู่หนึ่งไม่ขึ้นกับ passage อื่นใน bundle
+    alone = LexicalIndex(["b"], [rows[2][1]])
+    assert alone.scores(queries)[:, 0] == pytest.approx(
+        index.scores(queries)[:, index.column("b")], abs=1e-6
+    )
+
+
+def test_similarity_table_agrees_with_per_pair_fallback(monkeypatch):
+    monkeypatch.setattr(DoctrineValidatorAgent, "_embedding_model_failed", True)
+    agent = DoctrineValidatorAgent()
+    passages = {
+        "p1": Passage(id="p1", original_text="การให้ทานด้วยใจเมตตา"),
+        "p2": Passage(
+            id="p2",
+            original_text="การมีสติรู้ลมหายใจ",
+            thai_modernized="รู้ลมหายใจเข้าออกช่วยให้ใจสงบ",
+        ),
+    }
+    segment = ScriptSegment(
+        segment_type="teaching", text="มีสติรู้ลมหายใจแล้วใจสงบ [CIT:p1]"
+    )
+    table = agent._build_similarity_table([segment], passages)
+
+    for passage in passages.values():
+        assert agent._compute_similarity(segment.text, passage, table) == pytest.approx(
+            agent._compute_similarity(segment.text, passage), abs=1e-6
+        )
+
+
+def test_thai_paraphrase_scores_above_whitespace_split():
+    # เดิม split() ได้ token เดียวทั้งประโยค จึงได้ 0 เสมอ
+    score = cosine_similarity(
+        "การมีสติรู้ลมหายใจเข้าออกช่วยให้ใจสงบ", "การมีสติอยู่กับลมหายใจทำให้ใจสงบ"
+    )
+
+    assert 0.5 < score < 1.0
+
+
+def test_offline_validation_suggests_passage_from_lexical_index(monkeypatch):
+    monkeypatch.setattr(DoctrineValidatorAgent, "_embedding_model_failed", True)
+    passages = Passages(
+        primary=[
+            Passage(id="p1", original_text="การให้ทานด้วยใจเมตตา"),
+            Passage(id="p2", original_text="การมีสติรู้ลมหายใจเข้าออกช่วยให้ใจสงบ"),
+        ]
+    )
+    segments = [
+        ScriptSegment(
+            segment_type="teaching", text="การมีสติรู้ลมหายใจเข้าออกช่วยให้ใจสงบ [CIT:p1]"
+        )
+    ]
+
+    result = DoctrineValidatorAgent().run(
+        DoctrineValidatorInput(script_segments=segments, passages=passages)
+    )
+
+    assert result.segments[0].status == SegmentStatus.MISMATCH
+    (suggestion,) = result.rewrite_suggestions
+    assert suggestion.candidates[0].passage_id == "p2"
+    assert suggestion.candidates[0].similarity == pytest.approx(1.0)
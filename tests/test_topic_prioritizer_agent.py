@@ -5,6 +5,8 @@ Test that TopicPrioritizerAgent v1 can be imported and instantiated
 import sys
 from pathlib import Path
 
+import pytest
+
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
@@ -201,3 +203,38 @@ def test_imports_work():
 
     assert trend_agent.name == "TrendScoutAgent"
     assert priority_agent.name == "TopicPrioritizerAgent"
+
+
+def test_priority_scores_are_clipped_and_ties_keep_input_order():
+    """Test vectorized priority scores, series bonus and stable ordering"""
+    agent = TopicPrioritizerAgent()
+
+    def topic(title, pillar, views, **scores):
+        return CandidateTopic(
+            title=title,
+            pillar=pillar,
+            predicted_14d_views=views,
+            scores=scores,
+            reason="ทดสอบ",
+        )
+
+    input_data = PriorityInput(
+        candidate_topics=[
+            topic("ใจสงบ", "อื่นๆ", 5000),
+            topic("ชาดกชุดหนึ่ง", "เจาะลึก/ซีรีส์", 10000, composite=0.8, brand_fit=0.9),
+            topic("ใจสบาย", "อื่นๆ", 5000),
+        ],
+        strategy_focus="depth_series",
+        capacity=WeeksCapacity(longform_per_week=2, shorts_per_week=2),
+    )
+
+    scored = agent._calculate_priority_scores(input_data)
+
+    assert [(t.title, c, r) for t, _, c, r in scored] == [
+        ("ชาดกชุดหนึ่ง", "longform", "series_part"),
+        ("ใจสงบ", "longform", "balance_filler"),
+        ("ใจสบาย", "longform", "balance_filler"),
+    ]
+    # (56 + 30 + 7.2 + 3 + 6) * 1.18 ถูก clip ที่ 100; มิติที่ไม่มีใช้ 0.5
+    assert scored[0][1] == 100
+    assert scored[1][1] == scored[2][1] == pytest.approx(35 + 15 + 4 + 3)
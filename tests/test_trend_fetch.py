@@ -0,0 +1,128 @@
+"""ทดสอบการดึง Google Trends/YouTube แบบขนานและ cache ผลของ TrendScoutAgent"""
+
+import threading
+from datetime import UTC, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from agents.trend_scout import TrendScoutAgent
+from agents.trend_scout import agent as trend_module
+from agents.trend_scout.series_store import TrendSeriesStore
+from automation_core.result_cache import ResultCache
+from tests.helpers import StandInTrendReq, StandInYouTube
+
+KEYWORDS = ["สมาธิ", "นอนไม่หลับ", "ความเครียด", "ปล่อยวาง", "เมตตา", "กรรม", "ทาน"]
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def today(self):
+        return datetime.fromtimestamp(self.now, UTC).date()
+
+
+@pytest.fixture
+def stand_ins(monkeypatch):
+    monkeypatch.setattr(trend_module.config, "youtube_api_key", "test_key")
+    monkeypatch.setattr(StandInTrendReq, "payloads", [])
+    monkeypatch.setattr(StandInTrendReq, "timeframes", [])
+    youtube = StandInYouTube(["ฝึกสมาธิก่อนนอน", "ปล่อยวางความเครียด"])
+    monkeypatch.setattr(trend_module, "TrendReq", StandInTrendReq)
+    monkeypatch.setattr(trend_module, "build", lambda *args, **kwargs: youtube)
+    return youtube
+
+
+def _agent(tmp_path, clock=None):
+    clock = clock or FakeClock()
+    cache = ResultCache(
+        ttl_seconds=trend_module.FETCH_CACHE_TTL_SECONDS,
+        path=tmp_path / "responses.sqlite3",
+        clock=clock,
+    )
+    store = TrendSeriesStore(tmp_path / "series.sqlite3", today=clock.today)
+    return TrendScoutAgent(fetch_cache=cache, series_store=store)
+
+
+def _window(today, days=30):
+    return [today - timedelta(days=i) for i in reversed(range(days))]
+
+
+def test_large_keyword_sets_are_split_around_an_anchor(stand_ins, tmp_path):
+    clock = FakeClock()
+    items = _agent(tmp_path, clock)._fetch_google_trends(KEYWORDS)
+
+    payloads = StandInTrendReq.payloads
+    assert len(payloads) == 2
+    assert all(len(payload) <= 5 for payload in payloads)
+    assert payloads[1][0] == KEYWORDS[0]
+    assert [item.term for item in items] == KEYWORDS
+
+    # คำใน payload หลังถูกปรับสเกลให้เทียบกับ payload แรก
+    days = _window(clock.today())
+    peak = max(StandInTrendReq.raw_series(k, days).max() for k in payloads[0])
+    expected = np.minimum(
+        100, StandInTrendReq.raw_series(KEYWORDS[-1], days) * 100 / peak
+    )
+    np.testing.assert_allclose(items[-1].score_series, expected, atol=3)
+
+
+def test_responses_are_reused_until_the_ttl_expires(stand_ins, tmp_path):
+    clock = FakeClock()
+    day_one = clock.today()
+    _agent(tmp_path, clock)._fetch_sources(KEYWORDS[:3])
+    assert (len(StandInTrendReq.payloads), stand_ins.requests) == (1, 2)
+
+    # agent ใหม่ (เช่นรอบถัดไปของ pipeline) ใช้ผลจากดิสก์ ไม่เรียก API
+    trends, videos = _agent(tmp_path, clock)._fetch_sources(KEYWORDS[:3])
+    assert (len(StandInTrendReq.payloads), stand_ins.requests) == (1, 2)
+    assert len(trends) == 3
+    assert [v.title for v in videos] == stand_ins.titles
+
+    # วันถัดไป: ขอ Google Trends เฉพาะวันที่ขาด + ช่วงซ้อนสำหรับเทียบสเกล
+    clock.now += trend_module.FETCH_CACHE_TTL_SECONDS + 1
+    trends, _ = _agent(tmp_path, clock)._fetch_sources(KEYWORDS[:3])
+    assert (len(StandInTrendReq.payloads), stand_ins.requests) == (2, 4)
+    day_two = clock.today()
+    assert StandInTrendReq.timeframes[-1] == f"{day_one - timedelta(days=7)} {day_two}"
+
+    # อนุกรมที่ต่อกันแล้วยังอยู่ในสเกลของการดึงครั้งแรก
+    first_window = _window(day_one)
+    peak = max(StandInTrendReq.raw_series(k, first_window).max() for k in KEYWORDS[:3])
+    expected = {
+        k: StandInTrendReq.raw_series(k, _window(day_two)) * 100 / peak
+        for k in KEYWORDS[:3]
+    }
+    scale = min(1.0, 100 / max(series.max() for series in expected.values()))
+    for item in trends:
+        assert len(item.score_series) == 30
+        np.testing.assert_allclose(
+            item.score_series, expected[item.term] * scale, atol=3
+        )
+
+
+def test_sources_are_fetched_concurrently(stand_ins, tmp_path, monkeypatch):
+    # ทั้งสองแหล่งต้องรอกันที่ barrier: ถ้าดึงทีละแหล่งจะ timeout
+    barrier = threading.Barrier(2, timeout=2)
+    trend_payload = StandInTrendReq.build_payload
+    youtube_search = stand_ins.search
+
+    def build_payload(self, *args, **kwargs):
+        barrier.wait()
+        return trend_payload(self, *args, **kwargs)
+
+    def search():
+        barrier.wait()
+        return youtube_search()
+
+    monkeypatch.setattr(StandInTrendReq, "build_payload", build_payload)
+    monkeypatch.setattr(stand_ins, "search", search)
+
+    trends, videos = _agent(tmp_path)._fetch_sources(KEYWORDS[:3])
+
+    assert len(trends) == 3
+    assert len(videos) == 2
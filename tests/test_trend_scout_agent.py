@@ -300,8 +300,9 @@ class TestTrendScoutAPIIntegration:
         return mock_youtube
 
     @pytest.fixture
-    def agent(self):
-        """สร้าง TrendScoutAgent สำหรับทดสอบ API"""
+    def agent(self, monkeypatch, tmp_path):
+        """สร้าง TrendScoutAgent สำหรับทดสอบ API (cache ผล API แยกต่อเทส)"""
+        monkeypatch.setenv("TREND_CACHE_DIR", str(tmp_path))
         return TrendScoutAgent()
 
     def test_google_trends_integration(self, agent, mock_google_trends, monkeypatch):
@@ -326,3 +327,16 @@ class TestTrendScoutAPIIntegration:
 
         assert len(result.topics) > 0
         assert mock_youtube_api.search().list.called
+
+
+def test_limited_ranking_matches_full_ranking():
+    """สร้างเฉพาะ limit อันดับแรกได้ผลเดียวกับการจัดอันดับทั้งหมด"""
+    agent = TrendScoutAgent()
+    input_data = TrendScoutInput(keywords=["สมาธิ", "ปล่อยวาง", "นอนไม่หลับ", "เมตตา"])
+    candidates = agent._generate_candidate_topics(agent._collect_keywords(input_data))
+
+    full = agent._score_and_rank_topics(candidates, input_data)
+    top = agent._score_and_rank_topics(candidates, input_data, limit=3)
+
+    assert len(full) == len(candidates)
+    assert [t.model_dump() for t in top] == [t.model_dump() for t in full[:3]]
@@ -0,0 +1,74 @@
+"""ทดสอบคลังอนุกรมคะแนน Google Trends รายวันของ TrendScout"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from agents.trend_scout import TrendScoutAgent, TrendScoutInput
+from agents.trend_scout.series_store import OVERLAP_DAYS, TrendSeriesStore
+
+DAY = date(2026, 3, 1)
+
+
+class FakeToday:
+    def __init__(self) -> None:
+        self.day = DAY
+
+    def __call__(self) -> date:
+        return self.day
+
+
+@pytest.fixture
+def today():
+    return FakeToday()
+
+
+@pytest.fixture
+def store(tmp_path, today):
+    return TrendSeriesStore(tmp_path / "series.sqlite3", today=today)
+
+
+def test_plan_requests_only_missing_days_with_overlap(store, today):
+    assert store.plan(["สมาธิ"], "TH") == {DAY - timedelta(days=29): ["สมาธิ"]}
+    store.merge({"สมาธิ": [50] * 30}, "TH", DAY - timedelta(days=29))
+    assert store.plan(["สมาธิ", "เมตตา"], "TH") == {DAY - timedelta(days=29): ["เมตตา"]}
+
+    today.day = DAY + timedelta(days=2)
+    assert store.plan(["สมาธิ"], "TH") == {DAY - timedelta(days=OVERLAP_DAYS): ["สมาธิ"]}
+
+    # ขาดช่วงนานเกินไป: เริ่มหน้าต่างใหม่
+    today.day = DAY + timedelta(days=400)
+    assert store.plan(["สมาธิ"], "TH") == {today.day - timedelta(days=29): ["สมาธิ"]}
+
+
+def test_merge_rescales_new_days_to_the_stored_series(store, today):
+    store.merge({"สมาธิ": [50] * 30}, "TH", DAY - timedelta(days=29))
+
+    # คำขอใหม่ถูก normalize ต่างออกไป (สเกลครึ่งหนึ่ง) และวันสุดท้ายเดิมถูกแทนที่
+    today.day = DAY + timedelta(days=1)
+    store.merge({"สมาธิ": [25] * OVERLAP_DAYS + [20, 30]}, "TH", DAY - timedelta(days=7))
+
+    ((first, scores),) = store.load(["สมาธิ"], "TH").values()
+    assert first == DAY - timedelta(days=29)
+    assert scores.tolist() == [50] * 29 + [40, 60]
+    assert store.windows(["สมาธิ"], "TH") == {"สมาธิ": [50] * 28 + [40, 60]}
+
+
+def test_rising_series_raises_freshness(store, tmp_path):
+    store.merge(
+        {"สมาธิ": [10] * 60 + [30] * 7, "เมตตา": [20] * 67},
+        "TH",
+        DAY - timedelta(days=66),
+    )
+    features = store.features(["สมาธิ", "เมตตา", "ทาน"], "TH")
+    assert features["สมาธิ"].momentum == pytest.approx(3.0)
+    assert features["เมตตา"].momentum == pytest.approx(1.0)
+    assert "ทาน" not in features
+
+    agent = TrendScoutAgent(series_store=store)
+    input_data = TrendScoutInput(keywords=["สมาธิ"])
+    plain = agent._calculate_freshness_score(["สมาธิ"], input_data, 7)
+    rising = agent._calculate_freshness_score(["สมาธิ"], input_data, 7, features)
+    steady = agent._calculate_freshness_score(["เมตตา"], input_data, 7, features)
+    assert rising == pytest.approx(min(1.0, plain + 0.3))
+    assert steady == plain
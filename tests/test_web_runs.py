@@ -0,0 +1,133 @@
+"""ทดสอบตัวจัดการงานของเว็บ (หลายรอบต่อเอเจนต์ + ความจุร่วมกับคิว)"""
+
+import asyncio
+import sys
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pytest
+import yaml
+
+from app.core import jobs, runner
+from app.core.jobs import JobManager
+from app.core.runner import Runner
+from automation_core.queue import FileQueue, JobSpec
+
+
+def _utc_iso(value: datetime) -> str:
+    return value.astimezone(UTC).isoformat().replace("+00:00", "Z")
+
+
+def _scheduled_job(job_id: str) -> JobSpec:
+    now = _utc_iso(datetime.now(UTC))
+    return JobSpec(
+        job_id=job_id,
+        created_at=now,
+        scheduled_for=now,
+        pipeline_path="pipeline.web.yml",
+        run_id=job_id,
+        status="pending",
+    )
+
+
+@pytest.fixture
+def manager_factory(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(runner, "LOG_DIR", tmp_path / "logs")
+    monkeypatch.setattr(jobs, "DISPATCH_POLL_SECONDS", 0.05)
+    monkeypatch.setenv("PIPELINE_ENABLED", "true")
+    mapping = tmp_path / "agent_commands.yml"
+    mapping.write_text(
+        yaml.safe_dump(
+            {"sleepy": {"cmd": [sys.executable, "-c", "import time; time.sleep(0.3)"]}}
+        ),
+        encoding="utf-8",
+    )
+    queue = FileQueue(tmp_path / "queue")
+
+    def _build(max_running: int) -> JobManager:
+        return JobManager(
+            runner=Runner(str(mapping)),
+            queue_factory=lambda: queue,
+            max_running=max_running,
+        )
+
+    return _build, queue
+
+
+async def _wait_until(predicate, timeout: float = 10.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.02)
+
+
+def test_concurrent_runs_per_agent_share_the_queue_cap(manager_factory):
+    build, queue = manager_factory
+    manager = build(max_running=2)
+
+    async def scenario() -> list[str]:
+        runs = [manager.submit("sleepy") for _ in range(3)]
+        await _wait_until(lambda: runs[1].status == "running")
+        # เพดานรวม 2 งาน รอบที่ 3 จึงยังรอคิว
+        assert runs[2].status == "queued"
+        assert queue.count_by_state()["running"] == 2
+        await _wait_until(lambda: all(run.status == "completed" for run in runs))
+        return [str(run.run_id) for run in runs]
+
+    run_ids = asyncio.run(scenario())
+
+    assert len(set(run_ids)) == 3
+    assert [job.run_id for job in manager.runs_for("sleepy")] == run_ids[::-1]
+    counts = queue.count_by_state()
+    assert counts["done"] == 3 and counts["running"] == 0
+    for run_id in run_ids:
+        log_file = runner.LOG_DIR / "sleepy" / f"{run_id}.log"
+        assert log_file.read_text(encoding="utf-8").strip().endswith("งานเสร็จสมบูรณ์")
+
+
+def test_web_runs_wait_for_scheduled_jobs_and_can_be_cancelled(manager_factory):
+    build, queue = manager_factory
+    manager = build(max_running=1)
+    queue.enqueue(_scheduled_job("scheduled-1"))
+    scheduled = queue.dequeue_next()
+
+    async def scenario() -> tuple[str, str, str]:
+        first = manager.submit("sleepy")
+        second = manager.submit("sleepy")
+        await asyncio.sleep(0.2)
+        assert first.status == "queued"
+        manager.stop("sleepy", second.run_id)
+
+        queue.mark_done(scheduled)
+        await _wait_until(lambda: first.status == "completed")
+        await asyncio.sleep(0.2)
+        return first.status, second.status, str(second.run_id)
+
+    first_status, second_status, cancelled_id = asyncio.run(scenario())
+
+    assert (first_status, second_status) == ("completed", "stopped")
+    assert queue.count_by_state()["done"] == 2
+    # รอบที่ยกเลิกก่อนเริ่มไม่เคยลงคิวและไม่เปิด process
+    assert not queue.exists(f"web_{cancelled_id}")
+    assert not (runner.LOG_DIR / "sleepy" / f"{cancelled_id}.log").exists()
+
+
+def test_capacity_skips_cancelled_runs_trimmed_from_history(tmp_path: Path):
+    mapping = tmp_path / "agent_commands.yml"
+    mapping.write_text(
+        yaml.safe_dump({"sleepy": {"cmd": [sys.executable, "-c", "pass"]}}),
+        encoding="utf-8",
+    )
+    manager = JobManager(
+        runner=Runner(str(mapping)),
+        queue_factory=lambda: FileQueue(tmp_path / "queue"),
+        max_running=1,
+        history_limit=1,
+    )
+    cancelled = manager.submit("sleepy")
+    manager.stop("sleepy", str(cancelled.run_id))
+    # รอบใหม่ทำให้รอบที่ยกเลิกถูกตัดออกจากประวัติ ขณะ run_id ยังค้างใน pending
+    manager.submit("sleepy")
+
+    assert manager.get_run(str(cancelled.run_id)) is None
+    assert manager.capacity()["web_pending"] == 1
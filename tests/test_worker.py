@@ -1,13 +1,14 @@
 """ทดสอบการทำงานของ worker runner"""
 
 import importlib.util
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
 from types import ModuleType
 
 import pytest
 
 from automation_core.queue import FileQueue, JobSpec
+from automation_core.sqlite_queue import SqliteQueue
 
 
 def _utc_iso(value: datetime) -> str:
@@ -183,3 +184,94 @@ def test_worker_rejects_pipeline_path_outside_base_dir(
     assert summary["error"]["code"] == "orchestrator_failed"
     assert called["count"] == 0
     assert list(queue.failed_dir.glob("*.json"))
+
+
+def test_worker_runs_once_sqlite_backend(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    runner = _load_runner()
+    monkeypatch.setenv("PIPELINE_ENABLED", "true")
+    monkeypatch.setenv("WORKER_ENABLED", "true")
+
+    queue = SqliteQueue(tmp_path / "queue")
+    queue.enqueue(
+        _build_job("job-sqlite", datetime(2026, 1, 1, 0, 0, tzinfo=UTC), "run3")
+    )
+
+    summary = runner.run_worker(
+        queue_dir=tmp_path / "queue",
+        dry_run=False,
+        base_dir=tmp_path,
+        pipeline_runner=lambda *_args: None,
+        backend="sqlite",
+    )
+
+    assert summary is not None
+    assert summary["decision"] == "done"
+    assert queue.list_pending() == []
+    assert not (tmp_path / "queue" / "pending").exists()
+
+
+@pytest.mark.parametrize("backend", ["file", "sqlite"])
+@pytest.mark.parametrize("pipeline_fails", [False, True])
+def test_worker_survives_lost_lease(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    backend: str,
+    pipeline_fails: bool,
+) -> None:
+    runner = _load_runner()
+    monkeypatch.setenv("PIPELINE_ENABLED", "true")
+    monkeypatch.setenv("WORKER_ENABLED", "true")
+
+    queue_type = FileQueue if backend == "file" else SqliteQueue
+    queue = queue_type(tmp_path / "queue")
+    queue.enqueue(
+        _build_job("job-lost", datetime(2026, 1, 1, 0, 0, tzinfo=UTC), "run-lost")
+    )
+
+    def _runner_stub(*_args):
+        # process อื่นเห็นว่า lease หมดอายุแล้ว requeue งานไประหว่างที่ยังรันอยู่
+        queue.requeue_expired(datetime.now(UTC) + timedelta(days=1))
+        if pipeline_fails:
+            raise RuntimeError("render failed")
+
+    summary = runner.run_worker(
+        queue_dir=tmp_path / "queue",
+        dry_run=False,
+        base_dir=tmp_path,
+        pipeline_runner=_runner_stub,
+        backend=backend,
+    )
+
+    assert summary is not None
+    assert summary["decision"] == "skipped"
+    assert summary["error"]["code"] == "lease_lost"
+    assert [item.job_id for item in queue.list_pending()] == ["job-lost"]
+
+
+def test_worker_does_not_replay_web_runs(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    runner = _load_runner()
+    monkeypatch.setenv("PIPELINE_ENABLED", "true")
+    monkeypatch.setenv("WORKER_ENABLED", "true")
+
+    queue = FileQueue(tmp_path / "queue")
+    job = _build_job("web_run_old", datetime(2026, 1, 1, 0, 0, tzinfo=UTC), "run-old")
+    queue.enqueue(job.model_copy(update={"pipeline_path": "web:trend_scout"}))
+    called = []
+
+    summary = runner.run_worker(
+        queue_dir=tmp_path / "queue",
+        dry_run=False,
+        base_dir=tmp_path,
+        pipeline_runner=lambda *args: called.append(args),
+    )
+
+    assert summary is not None
+    assert summary["decision"] == "failed"
+    assert summary["error"]["code"] == "job_not_replayable"
+    assert called == []
+    assert queue.list_pending() == []
+    assert list(queue.failed_dir.glob("*.json"))
@@ -225,6 +225,9 @@ def test_params_not_json_serializable_marks_failed_and_restores_env(
             self.mark_failed_called = False
             self.last_error: str | None = None
 
+        def requeue_expired(self) -> list[QueueItem]:
+            return []
+
         def dequeue_next(self) -> QueueItem | None:
             return item
 
@@ -233,7 +236,9 @@ def test_params_not_json_serializable_marks_failed_and_restores_env(
             self.last_error = getattr(error, "code", None)
             return _item
 
-    monkeypatch.setattr(runner, "FileQueue", _FakeQueue)
+    monkeypatch.setattr(
+        runner, "open_queue", lambda queue_dir, _backend="file": _FakeQueue(queue_dir)
+    )
 
     called = {"count": 0}
 
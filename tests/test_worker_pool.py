@@ -0,0 +1,271 @@
+"""ทดสอบโหมด worker pool (work --concurrency N --loop)"""
+
+import importlib.util
+import json
+import os
+import signal
+import time
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+
+from automation_core.queue import FileQueue, JobSpec
+
+
+def _utc_iso(value: datetime) -> str:
+    return value.astimezone(UTC).isoformat().replace("+00:00", "Z")
+
+
+def _build_job(job_id: str, scheduled_for: datetime, run_id: str) -> JobSpec:
+    return JobSpec(
+        schema_version="v1",
+        job_id=job_id,
+        created_at=_utc_iso(datetime.now(UTC)),
+        scheduled_for=_utc_iso(scheduled_for),
+        pipeline_path="pipeline.web.yml",
+        run_id=run_id,
+        params=None,
+        status="pending",
+        attempts=0,
+        last_error=None,
+    )
+
+
+def _load_runner() -> ModuleType:
+    runner_path = Path(__file__).parent.parent / "scripts" / "scheduler_runner.py"
+    spec = importlib.util.spec_from_file_location("scheduler_runner", runner_path)
+    module = importlib.util.module_from_spec(spec)
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+def _enqueue_jobs(queue: FileQueue, count: int) -> None:
+    start = datetime(2026, 1, 1, 0, 0, tzinfo=UTC)
+    for index in range(count):
+        queue.enqueue(
+            _build_job(f"job-{index}", start + timedelta(minutes=index), f"run{index}")
+        )
+
+
+@pytest.fixture(autouse=True)
+def _set_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("YOUTUBE_UPLOAD_ENABLED", "false")
+    monkeypatch.setenv("PIPELINE_ENABLED", "true")
+    monkeypatch.setenv("WORKER_ENABLED", "true")
+
+
+def test_pool_drains_queue_with_per_job_logs(tmp_path: Path) -> None:
+    runner = _load_runner()
+    queue = FileQueue(tmp_path / "queue")
+    _enqueue_jobs(queue, 4)
+
+    def _runner_stub(_pipeline_path: Path, run_id: str) -> None:
+        print(f"rendering {run_id}")
+        if run_id == "run2":
+            raise RuntimeError("render failed")
+
+    summary = runner.run_worker_pool(
+        queue_dir=tmp_path / "queue",
+        concurrency=2,
+        loop=False,
+        base_dir=tmp_path,
+        pipeline_runner=_runner_stub,
+        poll_interval=0.1,
+    )
+
+    assert summary is not None
+    assert summary["engine"] == "worker_pool"
+    assert summary["jobs_done"] == 3
+    assert summary["jobs_failed"] == 1
+    failed = [job for job in summary["jobs"] if job["decision"] == "failed"]
+    assert failed[0]["job_id"] == "job-2"
+    assert failed[0]["error"]["code"] == "orchestrator_failed"
+    assert queue.list_pending() == []
+    assert len(list(queue.done_dir.glob("*.json"))) == 3
+
+    log_text = (tmp_path / "output" / "worker" / "logs" / "job-1.log").read_text(
+        encoding="utf-8"
+    )
+    assert "rendering run1" in log_text
+    pool_summaries = list(
+        (tmp_path / "output" / "worker" / "artifacts").glob("worker_pool_summary_*")
+    )
+    assert len(pool_summaries) == 1
+    assert json.loads(pool_summaries[0].read_text(encoding="utf-8"))["jobs_done"] == 3
+
+
+def test_pool_requeues_crashed_child_with_backoff(tmp_path: Path) -> None:
+    runner = _load_runner()
+    queue = FileQueue(tmp_path / "queue")
+    _enqueue_jobs(queue, 1)
+
+    def _runner_stub(*_args) -> None:
+        os._exit(3)
+
+    summary = runner.run_worker_pool(
+        queue_dir=tmp_path / "queue",
+        concurrency=1,
+        loop=False,
+        base_dir=tmp_path,
+        pipeline_runner=_runner_stub,
+        poll_interval=0.1,
+    )
+
+    assert summary["jobs"][0]["error"]["code"] == "worker_crashed"
+    assert list(queue.running_dir.glob("*.json")) == []
+    pending = queue.list_pending()
+    assert len(pending) == 1
+    assert pending[0].job.attempts == 1
+    assert pending[0].job.last_error.code == "worker_crashed"
+    assert pending[0].job.retry_at is not None
+    # ยังไม่ถึงเวลา retry จึงยังไม่ถูก dequeue
+    assert queue.dequeue_next() is None
+
+
+def test_pool_sigterm_finishes_running_job_and_stops(tmp_path: Path) -> None:
+    runner = _load_runner()
+    queue = FileQueue(tmp_path / "queue")
+    _enqueue_jobs(queue, 3)
+
+    def _runner_stub(*_args) -> None:
+        os.kill(os.getppid(), signal.SIGTERM)
+        time.sleep(0.3)
+
+    summary = runner.run_worker_pool(
+        queue_dir=tmp_path / "queue",
+        concurrency=1,
+        loop=True,
+        base_dir=tmp_path,
+        pipeline_runner=_runner_stub,
+        poll_interval=0.1,
+    )
+
+    assert summary["stopped_by_signal"] is True
+    assert summary["jobs_done"] == 1
+    assert len(queue.list_pending()) == 2
+    assert signal.getsignal(signal.SIGTERM) is signal.SIG_DFL
+
+
+def test_pool_respects_worker_disabled(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    runner = _load_runner()
+    monkeypatch.setenv("WORKER_ENABLED", "false")
+    queue = FileQueue(tmp_path / "queue")
+    _enqueue_jobs(queue, 1)
+
+    summary = runner.run_worker_pool(
+        queue_dir=tmp_path / "queue",
+        concurrency=4,
+        loop=True,
+        base_dir=tmp_path,
+        pipeline_runner=lambda *_args: None,
+    )
+
+    assert summary["decision"] == "skipped"
+    assert summary["error"]["code"] == "worker_disabled"
+    assert len(queue.list_pending()) == 1
+
+
+def test_loop_starts_job_when_due(tmp_path: Path) -> None:
+    runner = _load_runner()
+    queue = FileQueue(tmp_path / "queue")
+    due_at = datetime.now(UTC) + timedelta(seconds=1.5)
+    queue.enqueue(_build_job("job-due", due_at, "run_due"))
+    started_file = tmp_path / "started_at.txt"
+
+    def _runner_stub(*_args) -> None:
+        started_file.write_text(str(time.time()), encoding="utf-8")
+        os.kill(os.getppid(), signal.SIGTERM)
+
+    summary = runner.run_worker_pool(
+        queue_dir=tmp_path / "queue",
+        concurrency=1,
+        loop=True,
+        base_dir=tmp_path,
+        pipeline_runner=_runner_stub,
+        poll_interval=30.0,
+    )
+
+    started_at = float(started_file.read_text(encoding="utf-8"))
+    # scheduled_for ถูกปัดเป็นวินาทีในชื่อไฟล์ จึงเผื่อ 1 วินาที
+    assert started_at >= due_at.timestamp() - 1.0
+    assert started_at - due_at.timestamp() < 1.5
+    assert summary["jobs_done"] == 1
+
+
+def test_pool_respects_resource_class_limit(tmp_path: Path) -> None:
+    runner = _load_runner()
+    queue = FileQueue(tmp_path / "queue")
+    start = datetime(2026, 1, 1, 0, 0, tzinfo=UTC)
+    for index in range(2):
+        queue.enqueue(
+            _build_job(
+                f"job-heavy{index}", start + timedelta(minutes=index), f"heavy{index}"
+            ).model_copy(update={"resource_class": "cpu_heavy"})
+        )
+    queue.enqueue(
+        _build_job("job-light", start + timedelta(minutes=5), "light").model_copy(
+            update={"resource_class": "light"}
+        )
+    )
+    spans_dir = tmp_path / "spans"
+    spans_dir.mkdir()
+
+    def _runner_stub(_pipeline_path: Path, run_id: str) -> None:
+        started = time.time()
+        time.sleep(0.3)
+        (spans_dir / run_id).write_text(f"{started} {time.time()}", encoding="utf-8")
+
+    summary = runner.run_worker_pool(
+        queue_dir=tmp_path / "queue",
+        concurrency=2,
+        loop=False,
+        base_dir=tmp_path,
+        pipeline_runner=_runner_stub,
+        poll_interval=0.1,
+        class_limits={"cpu_heavy": 1},
+    )
+
+    assert summary["jobs_done"] == 3
+    spans = {
+        path.name: tuple(map(float, path.read_text(encoding="utf-8").split()))
+        for path in spans_dir.iterdir()
+    }
+    heavy0, heavy1 = spans["heavy0"], spans["heavy1"]
+    # งาน cpu_heavy ไม่ทับซ้อนกัน ส่วนงาน light ได้ slot ว่างไปรันคู่กัน
+    assert heavy1[0] >= heavy0[1] or heavy0[0] >= heavy1[1]
+    assert spans["light"][0] < min(heavy0[1], heavy1[1])
+
+
+def test_pool_respects_queue_wide_running_cap(tmp_path: Path) -> None:
+    runner = _load_runner()
+    queue = FileQueue(tmp_path / "queue")
+    _enqueue_jobs(queue, 1)
+    # งานจากเว็บใช้ความจุอยู่ 1 ช่อง
+    web_item = queue.enqueue_running(
+        _build_job("web_run_1", datetime(2026, 1, 1, tzinfo=UTC), "web_run_1")
+    )
+    pool = runner.WorkerPool(
+        queue_dir=tmp_path / "queue",
+        backend="file",
+        concurrency=2,
+        loop=False,
+        base_dir=tmp_path,
+        poll_interval=0.1,
+        pipeline_runner=lambda *_args: None,
+        max_running=1,
+    )
+
+    assert pool._fill() is True
+    assert pool._slots == []
+    assert len(queue.list_pending()) == 1
+
+    queue.mark_done(web_item)
+    summary = pool.run()
+
+    assert summary["max_running"] == 1
+    assert summary["jobs_done"] == 1